@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Job offline: alinha dois corpora inteiros (top-k versos do alvo para cada
+verso da origem) a partir dos embeddings já persistidos.
+
+Produtos de matrizes em blocos, em todos os núcleos, com checkpoint:
+rodar de novo o mesmo comando continua de onde parou.
+
+Uso:
+    python scripts/align_corpora.py --source wh --target nt --top-k 5
+    python scripts/align_corpora.py --source nt --target nt --csv data/nt_nt.csv
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+import numpy as np
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.alignment import AlignmentJob, read_alignment
+from src.services.index_registry import CORPUS_ALIASES, SHARD_CORPORA, SHARDS
+from src.services.intertextuality_engine import IntertextualityEngine
+from src.services.snapshots import resolve_paths
+from src.services.verse_ids import assign_verse_ids
+
+
+def load_corpus_arrays(name: str):
+    """
+    Embeddings (memmap), ids e referências de um corpus persistido.
+
+    Versos removidos (tombstones) ficam fora; deltas ainda não compactados
+    não entram (rode a compactação antes).
+    """
+    name = CORPUS_ALIASES.get(name, name)
+    index_path, meta_path = resolve_paths(name, *SHARDS[name][1:])
+    embeddings_path = IntertextualityEngine._sibling_path(
+        index_path, "embeddings", ".npy"
+    )
+    if not (os.path.exists(embeddings_path) and os.path.exists(meta_path)):
+        raise FileNotFoundError(
+            f"Embeddings/metadados de '{name}' não encontrados "
+            f"({embeddings_path}); execute scripts/setup_corpus.py"
+        )
+    embeddings = np.load(embeddings_path, mmap_mode="r")
+    with open(meta_path, "r", encoding="utf-8") as f:
+        verses = json.load(f)[: len(embeddings)]
+    ids = assign_verse_ids(verses, SHARD_CORPORA[name])
+    live = np.array([not v.get("removed") for v in verses], dtype=bool)
+    if not live.all():
+        embeddings = embeddings[np.flatnonzero(live)]
+        ids = ids[live]
+        verses = [v for v, keep in zip(verses, live) if keep]
+    references = {
+        int(verse_id): f"{v['book']} {v['chapter']}:{v['verse']}"
+        for verse_id, v in zip(ids, verses)
+    }
+    return embeddings, ids, references
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--source", default="wh", help="Corpus de origem (nt, ot, wh)")
+    parser.add_argument("--target", default="nt", help="Corpus alvo (nt, ot, wh)")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--min-score", type=float, default=None)
+    parser.add_argument("--block-rows", type=int, default=1024)
+    parser.add_argument("--block-cols", type=int, default=8192)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default=None, help="Arquivo binário de pares")
+    parser.add_argument("--csv", default=None, help="Exporta os pares com referências")
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignora o checkpoint existente"
+    )
+    args = parser.parse_args()
+
+    source_name = CORPUS_ALIASES.get(args.source, args.source)
+    target_name = CORPUS_ALIASES.get(args.target, args.target)
+    output = args.output or f"data/alignment_{source_name}_{target_name}.bin"
+    try:
+        source, source_ids, source_refs = load_corpus_arrays(source_name)
+        target, target_ids, target_refs = load_corpus_arrays(target_name)
+    except (KeyError, FileNotFoundError) as e:
+        print(f"✗ {e}")
+        return 1
+
+    print(
+        f"⏳ Alinhando {source_name} ({len(source):,} versos) × "
+        f"{target_name} ({len(target):,} versos), top-{args.top_k}..."
+    )
+    job = AlignmentJob(
+        source,
+        target,
+        source_ids,
+        target_ids,
+        output,
+        top_k=args.top_k,
+        block_rows=args.block_rows,
+        block_cols=args.block_cols,
+        workers=args.workers,
+        min_score=args.min_score,
+        same_corpus=source_name == target_name,
+    )
+    job.run(resume=not args.restart)
+
+    if args.csv:
+        pairs = read_alignment(output)
+        os.makedirs(os.path.dirname(args.csv) or ".", exist_ok=True)
+        with open(args.csv, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["source", "target", "score"])
+            for pair in pairs:
+                writer.writerow(
+                    [
+                        source_refs[int(pair["source_id"])],
+                        target_refs[int(pair["target_id"])],
+                        f"{pair['score']:.4f}",
+                    ]
+                )
+        print(f"✓ {len(pairs):,} pares exportados para {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
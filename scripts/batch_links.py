@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Job offline: links intertextuais (top-k versos similares) de todos os
+versos de um corpus, ou de um recorte por livro/capítulos.
+
+Não interativo e retomável: cada shard de versos vira um arquivo
+``part-NNNNN.parquet`` (ou .csv sem pyarrow); rodar de novo o mesmo comando
+calcula só os shards que faltam. Usa os vetores já indexados, sem o modelo.
+
+Uso:
+    python scripts/batch_links.py --corpus nt --top-k 10 --exclude-same-book
+    python scripts/batch_links.py --book Revelation --chapters 12-14 --format csv
+"""
+
+import argparse
+import os
+import sys
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.batch_links import BatchLinkJob, parse_range
+from src.services.index_registry import CORPUS_ALIASES, SHARD_CORPORA, SHARDS
+from src.services.snapshots import resolve_paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default="nt", help="Corpus (nt, ot, wh)")
+    parser.add_argument("--book", action="append", help="Livro (repetível)")
+    parser.add_argument("--chapters", default=None, help='Capítulos, ex.: "3" ou "1-5"')
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--min-score", type=float, default=None)
+    parser.add_argument("--exclude-same-book", action="store_true")
+    parser.add_argument("--batch-size", type=int, default=512, help="Versos por shard")
+    parser.add_argument("--workers", type=int, default=None, help="Processos")
+    parser.add_argument("--format", choices=["parquet", "csv"], default=None)
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument(
+        "--restart", action="store_true", help="Apaga os shards e recomeça"
+    )
+    args = parser.parse_args()
+
+    name = CORPUS_ALIASES.get(args.corpus, args.corpus)
+    if name not in SHARDS:
+        print(f"✗ Corpus desconhecido: {args.corpus}")
+        return 1
+    # Versão ativa do snapshot do corpus, se houver
+    index_path, meta_path = resolve_paths(name, *SHARDS[name][1:])
+    if not (os.path.exists(index_path) and os.path.exists(meta_path)):
+        print(f"✗ Índice de '{name}' não encontrado; execute scripts/setup_corpus.py")
+        return 1
+
+    try:
+        job = BatchLinkJob(
+            index_path,
+            meta_path,
+            args.output_dir or os.path.join("data", "links", name),
+            corpus=SHARD_CORPORA[name],
+            top_k=args.top_k,
+            min_score=args.min_score,
+            exclude_same_book=args.exclude_same_book,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            fmt=args.format,
+        )
+        job.run(args.book, parse_range(args.chapters), restart=args.restart)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Benchmarks offline: parsing do corpus, embeddings, construção do índice,
+latência de busca (p50/p99), caminhos de cache e /find-similar via ASGI.
+
+Roda sobre um corpus sintético (tamanho configurável) com o HashingEncoder
+(sem download) ou um modelo Sentence Transformers local. Os resultados vão
+para um JSON; com --compare, cada métrica é comparada a um baseline e as
+regressões acima da tolerância fazem o script sair com código 1.
+
+Uso:
+    python scripts/benchmark.py --verses 5000 --output bench/baseline.json
+    python scripts/benchmark.py --verses 5000 --compare bench/baseline.json
+    python scripts/benchmark.py --model paraphrase-multilingual-mpnet-base-v2
+    python scripts/benchmark.py --first-pass 256:fp16 128:int8
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+import numpy as np
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.compressed_index import code_bytes
+from src.services.corpus_processor import NT_BOOKS, CorpusProcessor
+from src.services.encoders import HashingEncoder
+from src.services.intertextuality_engine import IntertextualityEngine
+
+_LETTERS = "αβγδεζηθικλμνξοπρστυφχψω"
+_VOWELS = "αεηιουω"
+_ACCENTED = "άέήίόύώὰὲὴὶὸὺὼᾶῆῖῦῶἀἐἠἰὀὐὠ"
+
+
+def synthetic_words(count: int, rng: random.Random) -> List[str]:
+    """Vocabulário pseudo-grego (sílabas com acentos) de ``count`` formas."""
+    words = set()
+    while len(words) < count:
+        syllables = [
+            rng.choice(_LETTERS) + rng.choice(_VOWELS) for _ in range(rng.randint(1, 4))
+        ]
+        word = "".join(syllables)
+        if rng.random() < 0.5:
+            pos = rng.randrange(len(word))
+            word = word[:pos] + rng.choice(_ACCENTED) + word[pos + 1 :]
+        words.add(word)
+    return sorted(words)
+
+
+def write_synthetic_sblgnt(directory: str, num_verses: int, seed: int = 0) -> int:
+    """
+    Grava arquivos no formato MorphGNT com ``num_verses`` versos
+    distribuídos pelos livros do NT (distribuição de Zipf das palavras).
+
+    Returns:
+        Número de versos gravados
+    """
+    rng = random.Random(seed)
+    vocabulary = synthetic_words(5000, rng)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    books = list(NT_BOOKS)
+    per_book = -(-num_verses // len(books))
+    written = 0
+    for code in books:
+        lines = []
+        for i in range(min(per_book, num_verses - written)):
+            chapter, verse = divmod(i, 30)
+            ref = f"{code}{chapter + 1:02d}{verse + 1:02d}"
+            for word in rng.choices(vocabulary, weights, k=rng.randint(6, 24)):
+                lines.append(f"{ref} N- ----NSF- {word} {word} {word} {word}")
+            written += 1
+        if lines:
+            path = os.path.join(directory, f"{code}-synthetic-morphgnt.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+    return written
+
+
+def timed(fn: Callable, repeat: int = 1) -> List[float]:
+    """Tempos (ms) de ``repeat`` chamadas de ``fn``."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def latency_metrics(results: Dict, name: str, samples: List[float]):
+    results[f"{name}.p50_ms"] = _metric(float(np.percentile(samples, 50)), "ms")
+    results[f"{name}.p99_ms"] = _metric(float(np.percentile(samples, 99)), "ms")
+
+
+def _metric(value: float, unit: str, better: str = "lower") -> Dict:
+    return {"value": round(value, 4), "unit": unit, "better": better}
+
+
+def run_benchmarks(args) -> Dict:
+    results: Dict[str, Dict] = {}
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_synthetic_sblgnt(directory, args.verses, args.seed)
+        processor = CorpusProcessor()
+        start = time.perf_counter()
+        verses = processor.process_all_sblgnt(directory)
+        elapsed = time.perf_counter() - start
+    results["parse.seconds"] = _metric(elapsed, "s")
+    results["parse.verses_per_s"] = _metric(len(verses) / elapsed, "verses/s", "higher")
+
+    if args.model == "hashing":
+        model = HashingEncoder(dim=args.dim)
+    else:
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(args.model, device="cpu")
+    engine = IntertextualityEngine(model=model)
+
+    start = time.perf_counter()
+    embeddings = engine.create_embeddings(verses)
+    elapsed = time.perf_counter() - start
+    results["encode.seconds"] = _metric(elapsed, "s")
+    results["encode.verses_per_s"] = _metric(len(verses) / elapsed, "verses/s", "higher")
+
+    start = time.perf_counter()
+    engine.build_index(embeddings)
+    results["build_index.seconds"] = _metric(time.perf_counter() - start, "s")
+
+    # Queries distintas (sem cache): trechos de versos do corpus
+    def fresh_queries(count: int) -> List[str]:
+        picked = rng.sample(verses, min(count, len(verses)))
+        return [" ".join(v["words"][: rng.randint(3, 8)]) + f" {i}" for i, v in enumerate(picked)]
+
+    for query in fresh_queries(5):
+        engine.find_similar(query, 10)  # aquecimento
+    for top_k in args.top_k:
+        samples = [
+            timed(lambda q=q: engine.find_similar(q, top_k))[0]
+            for q in fresh_queries(args.queries)
+        ]
+        latency_metrics(results, f"find_similar.top{top_k}", samples)
+
+    if args.first_pass:
+        first_pass_benchmarks(results, engine, embeddings, fresh_queries(args.queries), args)
+
+    # Cache de embeddings de query do engine (só a busca FAISS)
+    hot = fresh_queries(1)[0]
+    engine.find_similar(hot, 10)
+    latency_metrics(
+        results, "find_similar.query_cache_hit", timed(lambda: engine.find_similar(hot, 10), args.queries)
+    )
+
+    # Serviço e API com o engine sintético no lugar do índice real. O
+    # src.app cria o BibleService na importação: o engine entra antes disso,
+    # para que nada seja carregado do disco nem do hub
+    os.environ.setdefault("ENABLE_CACHE", "1")
+    from fastapi.testclient import TestClient
+
+    from src.services.bible_service import BibleService
+
+    BibleService._load_nt_engine = staticmethod(lambda: engine)
+    from src import app as app_module
+
+    service = app_module.bible_service
+    service.intertextuality_engine = engine
+    service.index_loaded = True
+    service.index_registry = None
+    service._similarity_cache.clear()
+
+    service.find_similar_verses(hot, 10)
+    latency_metrics(
+        results,
+        "bible_service.result_cache_hit",
+        timed(lambda: service.find_similar_verses(hot, 10), args.queries),
+    )
+
+    client = TestClient(app_module.app)
+    client.post("/find-similar", json={"query": hot, "top_k": 10})
+    samples = [
+        timed(lambda q=q: client.post("/find-similar", json={"query": q, "top_k": 10}))[0]
+        for q in fresh_queries(args.queries)
+    ]
+    latency_metrics(results, "api.find_similar", samples)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "verses": len(verses),
+            "dim": int(embeddings.shape[1]),
+            "model": args.model,
+            "queries": args.queries,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def first_pass_benchmarks(
+    results: Dict, engine: IntertextualityEngine, embeddings: np.ndarray, queries, args
+):
+    """
+    Índices comprimidos (--first-pass dim:codec) contra o IndexFlatIP do
+    ``engine``: recall@k dos resultados re-pontuados, latência da busca
+    (sem o encoder) e bytes por vetor do índice.
+    """
+    vectors = [engine._encode_query(q) for q in queries]
+    k = max(args.top_k)
+    exact = [[row for row, _ in engine._search_rows(v, k)] for v in vectors]
+    latency_metrics(
+        results, "search_exact", [timed(lambda v=v: engine._search_rows(v, k))[0] for v in vectors]
+    )
+    results["search_exact.bytes_per_vector"] = _metric(code_bytes(engine.index), "B")
+
+    for spec in args.first_pass:
+        dim, codec = spec.split(":")
+        compressed = IntertextualityEngine(model=engine.model, corpus=engine.corpus)
+        compressed.verses = engine.verses
+        compressed.build_index(embeddings, first_pass=(int(dim), codec))
+        name = f"first_pass.{dim}_{codec}"
+        for top_k in args.top_k:
+            hits = sum(
+                len({row for row, _ in compressed._search_rows(v, top_k)} & set(rows[:top_k]))
+                for v, rows in zip(vectors, exact)
+            )
+            results[f"{name}.recall@{top_k}"] = _metric(
+                hits / (top_k * len(vectors)), "ratio", "higher"
+            )
+        latency_metrics(
+            results,
+            f"{name}.search",
+            [timed(lambda v=v: compressed._search_rows(v, k))[0] for v in vectors],
+        )
+        results[f"{name}.bytes_per_vector"] = _metric(code_bytes(compressed.index), "B")
+
+
+def compare(
+    current: Dict, baseline: Dict, tolerance: float, noise_floor_ms: float = 0.0
+) -> List[str]:
+    """
+    Compara as métricas com o baseline.
+
+    Tempos que pioram menos que ``noise_floor_ms`` em valor absoluto não
+    contam como regressão (ruído de medidas sub-milissegundo).
+
+    Returns:
+        Nomes das métricas que pioraram mais que ``tolerance`` (fração)
+    """
+    regressions = []
+    print(f"\n{'métrica':<42}{'baseline':>12}{'atual':>12}{'variação':>10}")
+    for name, metric in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None or not base["value"]:
+            continue
+        change = metric["value"] / base["value"] - 1
+        worse = change > tolerance if metric["better"] == "lower" else change < -tolerance
+        scale = {"ms": 1, "s": 1000}.get(metric["unit"])
+        if worse and scale and (metric["value"] - base["value"]) * scale < noise_floor_ms:
+            worse = False
+        flag = "  ✗ REGRESSÃO" if worse else ""
+        print(f"{name:<42}{base['value']:>12.3f}{metric['value']:>12.3f}{change:>+10.1%}{flag}")
+        if worse:
+            regressions.append(name)
+    if current["meta"]["verses"] != baseline.get("meta", {}).get("verses"):
+        print("Aviso: baseline com outro tamanho de corpus; comparação aproximada")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--verses", type=int, default=2000, help="Tamanho do corpus sintético")
+    parser.add_argument(
+        "--model", default="hashing", help='"hashing" ou modelo Sentence Transformers local'
+    )
+    parser.add_argument("--dim", type=int, default=384, help="Dimensão do HashingEncoder")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--queries", type=int, default=200, help="Amostras por medição")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--first-pass",
+        nargs="*",
+        default=[],
+        metavar="DIM:CODEC",
+        help="Índices comprimidos a comparar com o exato, ex.: 256:fp16 128:int8",
+    )
+    parser.add_argument("--output", default="benchmarks/latest.json")
+    parser.add_argument("--compare", default=None, help="JSON de baseline")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Piora tolerada (fração, ex.: 0.2)"
+    )
+    parser.add_argument(
+        "--noise-floor-ms", type=float, default=0.5, help="Piora absoluta ignorada (ms)"
+    )
+    args = parser.parse_args()
+
+    report = run_benchmarks(args)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n✓ Resultados salvos em {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.noise_floor_ms)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regressão(ões) acima de {args.tolerance:.0%}")
+            return 1
+        print("\n✓ Sem regressões")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Monta um bundle versionado (encoder, re-ranker e snapshots) para
+subir a API sem rede com ARTIFACT_BUNDLE=<diretório do bundle>.
+
+Uso:
+    python scripts/bundle_artifacts.py --corpora nt,ot
+    python scripts/bundle_artifacts.py --corpora nt --archive
+    python scripts/bundle_artifacts.py --verify bundles/20261019-120000
+"""
+
+import argparse
+import os
+import sys
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.artifact_bundle import archive_bundle, build_bundle, verify_bundle
+from src.services.index_registry import CORPUS_ALIASES
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--model",
+        default=None,
+        help="Encoder usado nos índices (default: o registrado nos snapshots)",
+    )
+    parser.add_argument("--corpora", default="nt", help="Corpora separados por vírgula")
+    parser.add_argument("--output", default="bundles", help="Diretório dos bundles")
+    parser.add_argument("--version", default=None, help="Nome da versão (default: data/hora)")
+    parser.add_argument("--reranker", default=None, help="Cross-encoder a incluir")
+    parser.add_argument("--archive", action="store_true", help="Gera também <bundle>.tar")
+    parser.add_argument("--verify", default=None, help="Confere os sha256 de um bundle")
+    args = parser.parse_args()
+
+    if args.verify:
+        try:
+            problems = verify_bundle(args.verify)
+        except ValueError as e:
+            print(f"✗ {e}")
+            return 1
+        for problem in problems:
+            print(f"✗ {problem}")
+        if problems:
+            return 1
+        print(f"✓ Bundle íntegro: {args.verify}")
+        return 0
+
+    corpora = [CORPUS_ALIASES.get(c.strip(), c.strip()) for c in args.corpora.split(",") if c.strip()]
+    try:
+        path = build_bundle(
+            args.output, args.model, corpora, version=args.version, reranker=args.reranker
+        )
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+    if args.archive:
+        print(f"✓ Arquivo: {archive_bundle(path)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Paridade e latência de um backend de encoder (ENCODER_BACKEND) contra o
+SentenceTransformer em PyTorch fp32, sobre versos do corpus indexado.
+
+Falha (código 1) se o desvio dos scores de similaridade passar da
+tolerância ou se o recall@k dos vizinhos cair abaixo do mínimo.
+
+Uso:
+    python scripts/encoder_parity.py --backend onnx-int8
+    python scripts/encoder_parity.py --backend torch-int8 --sample 2000 --tolerance 0.03
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.encoders import ENCODER_BACKENDS, encoder_parity, load_encoder
+from src.services.index_registry import SHARDS
+
+
+def query_latency_ms(model, queries) -> np.ndarray:
+    """Latência (ms) de queries isoladas, como no caminho de /find-similar."""
+    for query in queries[:5]:
+        model.encode([query], convert_to_numpy=True, normalize_embeddings=True)
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        model.encode([query], convert_to_numpy=True, normalize_embeddings=True)
+        samples.append((time.perf_counter() - start) * 1000)
+    return np.array(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default="paraphrase-multilingual-mpnet-base-v2")
+    parser.add_argument(
+        "--backend", choices=[b for b in ENCODER_BACKENDS if b != "torch"], default="onnx-int8"
+    )
+    parser.add_argument("--meta", default=SHARDS["nt"][2], help="Metadados dos versos")
+    parser.add_argument("--sample", type=int, default=1000, help="Versos do corpus")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Desvio máx. de score")
+    parser.add_argument("--min-recall", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Relatório JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.meta):
+        print(f"✗ Metadados não encontrados: {args.meta} (execute scripts/setup_corpus.py)")
+        return 1
+    with open(args.meta, "r", encoding="utf-8") as f:
+        verses = [v for v in json.load(f) if not v.get("removed")]
+    rng = random.Random(args.seed)
+    sample = rng.sample(verses, min(args.sample, len(verses)))
+    # Mesma entrada do engine: forma canônica quando existir
+    corpus_texts = [v.get("normalized") or v["text"].strip() for v in sample]
+    query_texts = [
+        " ".join(text.split()[: rng.randint(3, 8)])
+        for text in rng.sample(corpus_texts, min(args.queries, len(corpus_texts)))
+    ]
+
+    print(f"Carregando {args.model} (torch fp32 e {args.backend})...")
+    reference = load_encoder(args.model, "torch")
+    candidate = load_encoder(args.model, args.backend)
+    backend = candidate.encoder_backend
+
+    report = encoder_parity(reference, candidate, corpus_texts, query_texts, args.top_k)
+    latency_ref = query_latency_ms(reference, query_texts)
+    latency_cand = query_latency_ms(candidate, query_texts)
+    report.update(
+        {
+            "model": args.model,
+            "backend": backend,
+            "verses": len(corpus_texts),
+            "queries": len(query_texts),
+            "torch_p50_ms": round(float(np.percentile(latency_ref, 50)), 3),
+            f"{backend}_p50_ms": round(float(np.percentile(latency_cand, 50)), 3),
+            "speedup": round(float(np.median(latency_ref) / np.median(latency_cand)), 2),
+        }
+    )
+
+    recall = report[f"recall@{min(args.top_k, len(corpus_texts))}"]
+    print(f"\nBackend {backend} vs torch fp32 ({len(corpus_texts)} versos)")
+    print(f"  • Cosseno entre vetores: mín {report['min_cosine']:.4f}, médio {report['mean_cosine']:.4f}")
+    print(
+        f"  • Desvio de score: máx {report['max_score_deviation']:.4f}, "
+        f"p99 {report['p99_score_deviation']:.4f} (tolerância {args.tolerance})"
+    )
+    print(f"  • Recall@{args.top_k}: {recall:.3f} (mínimo {args.min_recall})")
+    print(
+        f"  • Latência por query (p50): {report['torch_p50_ms']:.1f} ms → "
+        f"{report[f'{backend}_p50_ms']:.1f} ms ({report['speedup']:.1f}x)"
+    )
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Relatório salvo em {args.output}")
+
+    if report["max_score_deviation"] > args.tolerance or recall < args.min_recall:
+        print("\n✗ Paridade fora da tolerância")
+        return 1
+    print("\n✓ Paridade dentro da tolerância")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
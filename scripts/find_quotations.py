@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Job offline: lista todos os pares de versos com grande sobreposição de
+trechos (citações quase literais) usando MinHash/LSH.
+
+Não usa o modelo de embeddings, apenas o corpus processado.
+
+Uso:
+    python scripts/find_quotations.py --threshold 0.5 --output data/quotations.csv
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.corpus_processor import CorpusProcessor
+from src.services.quotation_detector import QuotationIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", default="data/nt_corpus.json")
+    parser.add_argument("--output", default="data/quotations.csv")
+    parser.add_argument(
+        "--threshold", type=float, default=0.5, help="Jaccard estimado mínimo"
+    )
+    parser.add_argument(
+        "--min-span", type=int, default=None, help="Trecho mínimo em palavras"
+    )
+    parser.add_argument("--shingle-size", type=int, default=4)
+    args = parser.parse_args()
+
+    verses = CorpusProcessor().load_corpus(args.corpus)
+    if not verses:
+        print(f"✗ Corpus não encontrado em {args.corpus}")
+        return 1
+
+    index = QuotationIndex(shingle_size=args.shingle_size)
+    index.build(verses)
+    min_span = args.min_span or args.shingle_size
+
+    def ref(row):
+        v = verses[row]
+        return f"{v['book']} {v['chapter']}:{v['verse']}"
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    count = 0
+    with open(args.output, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["source", "target", "jaccard", "longest_span", "shared_text"]
+        )
+        for i, j, score in index.all_pairs(args.threshold):
+            spans = index.aligned_spans(index.tokens[i], j, min_span)
+            if not spans:
+                continue
+            longest = max(spans, key=lambda s: s["query_end"] - s["query_start"])
+            writer.writerow(
+                [
+                    ref(i),
+                    ref(j),
+                    f"{score:.3f}",
+                    longest["query_end"] - longest["query_start"],
+                    longest["text"],
+                ]
+            )
+            count += 1
+
+    print(f"✓ {count:,} pares salvos em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
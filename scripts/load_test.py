@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Teste de carga da aplicação em execução: varre níveis de concorrência
+(loop fechado: cada worker envia a próxima requisição ao receber a
+resposta) e reporta vazão, latência de cauda, erros e o ponto de
+saturação dos workers.
+
+Para não pagar APIs reais, suba a aplicação com o stub
+(LLM_PROVIDER=STUB, ou o servidor scripts/stub_llm_server.py como Ollama
+ou OpenAI) e passe --stub-url para incluir as estatísticas do upstream.
+
+Uso:
+    python scripts/load_test.py --endpoint ask --endpoint explain-links \\
+        --concurrency 1,2,4,8,16,32 --duration 20 --output load.json
+    python scripts/load_test.py --endpoint find-similar --stub-url http://localhost:11435
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+import requests
+
+QUERIES = [
+    "ἀγάπη",
+    "ἐν ἀρχῇ ἦν ὁ λόγος",
+    "João 3:16",
+    "Mt 4:4",
+    "πίστις ἐλπίς ἀγάπη",
+    "ὁ δίκαιος ἐκ πίστεως ζήσεται",
+    "Rev 12:1",
+    "βασιλεία τοῦ θεοῦ",
+]
+
+PAYLOADS = {
+    "ask": lambda q: ("/ask", {"question": f"O que significa {q}?"}),
+    "explain-links": lambda q: ("/explain-links", {"query": q, "top_k": 5}),
+    "find-similar": lambda q: ("/find-similar", {"query": q, "top_k": 10}),
+}
+
+
+def _stub_stats(stub_url: Optional[str]) -> Optional[Dict]:
+    if not stub_url:
+        return None
+    try:
+        return requests.get(f"{stub_url.rstrip('/')}/stats", timeout=5).json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def run_step(
+    url: str, endpoints: List[str], concurrency: int, duration: float, timeout: float
+) -> Dict:
+    """Executa um nível de concorrência por ``duration`` segundos."""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_id: int):
+        session = requests.Session()
+        i = worker_id
+        while time.perf_counter() < deadline:
+            path, payload = PAYLOADS[endpoints[i % len(endpoints)]](
+                QUERIES[i % len(QUERIES)]
+            )
+            i += concurrency
+            start = time.perf_counter()
+            try:
+                status = session.post(url + path, json=payload, timeout=timeout).status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    samples = np.array(latencies) if latencies else np.zeros(1)
+    ok = sum(count for status, count in statuses.items() if status == 200)
+    throughput = ok / wall
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput_rps": round(throughput, 2),
+        "errors": {str(s): c for s, c in statuses.items() if s != 200},
+        "latency_ms": {
+            "p50": round(float(np.percentile(samples, 50)), 1),
+            "p90": round(float(np.percentile(samples, 90)), 1),
+            "p99": round(float(np.percentile(samples, 99)), 1),
+            "max": round(float(samples.max()), 1),
+        },
+        # Lei de Little: requisições em andamento na aplicação
+        "in_flight": round(len(latencies) / wall * float(samples.mean()) / 1000, 2),
+    }
+
+
+def saturation_point(steps: List[Dict], min_gain: float = 0.1) -> Optional[int]:
+    """
+    Primeira concorrência em que a vazão cresce menos que ``min_gain``
+    (fração) em relação ao nível anterior: os workers da aplicação (ou o
+    upstream) estão saturados e mais clientes só aumentam a fila.
+    """
+    for previous, step in zip(steps, steps[1:]):
+        if previous["throughput_rps"] and (
+            step["throughput_rps"] < previous["throughput_rps"] * (1 + min_gain)
+        ):
+            return previous["concurrency"]
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument(
+        "--endpoint",
+        action="append",
+        choices=sorted(PAYLOADS),
+        help="Endpoint(s) a exercitar, alternados (default: ask)",
+    )
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="Níveis, ex.: 1,4,16")
+    parser.add_argument("--duration", type=float, default=15, help="Segundos por nível")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--stub-url", default=None, help="Servidor stub (para /stats)")
+    parser.add_argument("--output", default=None, help="Relatório JSON")
+    args = parser.parse_args()
+
+    endpoints = args.endpoint or ["ask"]
+    url = args.url.rstrip("/")
+    try:
+        requests.get(f"{url}/health", timeout=5).raise_for_status()
+    except requests.RequestException as e:
+        print(f"✗ Aplicação indisponível em {url}: {e}")
+        return 1
+
+    steps = []
+    print(f"{'conc':>5}{'req/s':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'andamento':>11}  erros")
+    for concurrency in (int(c) for c in args.concurrency.split(",")):
+        before = _stub_stats(args.stub_url)
+        step = run_step(url, endpoints, concurrency, args.duration, args.timeout)
+        after = _stub_stats(args.stub_url)
+        if before and after:
+            step["upstream"] = {
+                "calls": after["served"] - before["served"],
+                "failed": after["failed"] - before["failed"],
+                "max_in_flight": after["max_in_flight"],
+            }
+        steps.append(step)
+        latency = step["latency_ms"]
+        print(
+            f"{concurrency:>5}{step['throughput_rps']:>9.1f}{latency['p50']:>9.0f}"
+            f"{latency['p90']:>9.0f}{latency['p99']:>9.0f}{step['in_flight']:>11.1f}"
+            f"  {step['errors'] or '-'}"
+        )
+
+    knee = saturation_point(steps)
+    best = max(steps, key=lambda s: s["throughput_rps"])
+    print(f"\n✓ Vazão máxima: {best['throughput_rps']:.1f} req/s (concorrência {best['concurrency']})")
+    if knee is not None:
+        print(f"  Saturação a partir de {knee} clientes simultâneos")
+    else:
+        print("  Sem saturação nos níveis testados")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "url": url,
+                    "endpoints": endpoints,
+                    "duration_s": args.duration,
+                    "steps": steps,
+                    "saturation_concurrency": knee,
+                    "max_throughput_rps": best["throughput_rps"],
+                },
+                f,
+                indent=2,
+            )
+        print(f"✓ Relatório salvo em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
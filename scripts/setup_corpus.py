@@ -2,19 +2,135 @@
 """
 Script de setup para processar corpus bíblico e construir índices FAISS.
 Execute este script antes de iniciar a aplicação pela primeira vez.
+
+Uso:
+    python scripts/setup_corpus.py             # pergunta antes de reconstruir
+    python scripts/setup_corpus.py --rebuild   # reconstrói sem perguntar
+    python scripts/setup_corpus.py --no-input  # mantém índices existentes
+    python scripts/setup_corpus.py --rebuild --workers 4  # encoding em 4 processos
+    python scripts/setup_corpus.py --rebuild --in-place   # sobrescreve indexes/*.index
+
+Por padrão cada índice é publicado como um novo snapshot versionado
+(indexes/snapshots/<corpus>/<versão>/); a API em execução troca para ele
+com POST /admin/snapshots/reload (ou SNAPSHOT_WATCH_SECONDS).
 """
 
+import argparse
 import os
 import sys
 
 # Adiciona o diretório raiz ao path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from src.services import snapshots
 from src.services.corpus_processor import CorpusProcessor
+from src.services.index_registry import SHARD_CORPORA, SHARDS
 from src.services.intertextuality_engine import IntertextualityEngine
 
 
+def encoding_pipeline(engine: IntertextualityEngine, args, name: str):
+    """Encoding em chunks com checkpoint em ``--encode-dir/<name>``."""
+    return engine.encoding_pipeline(
+        os.path.join(args.encode_dir, name),
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+    )
+
+
+def index_exists(name: str, index_file: str, args) -> bool:
+    """Há índice do corpus (snapshot ativo ou arquivo legado)?"""
+    if not args.in_place and snapshots.current_snapshot(snapshots.snapshot_root(name)):
+        return True
+    return os.path.exists(index_file)
+
+
+def publish(engine: IntertextualityEngine, name: str, args, index_file, meta_file, prepare=None):
+    """Grava o índice como snapshot novo (ou no lugar, com --in-place)."""
+    if args.in_place:
+        engine.save_index(index_file, meta_file)
+        if prepare is not None:
+            prepare(engine)
+    else:
+        snapshots.write_snapshot(engine, snapshots.snapshot_root(name), prepare=prepare)
+
+
+def setup_ot_shard(processor: CorpusProcessor, model, args) -> None:
+    """Constrói o shard do AT (BHSA) se os arquivos text-fabric existirem."""
+    corpus_file, index_file, meta_file = SHARDS["ot"]
+    if index_exists("ot", index_file, args):
+        print(f"✓ Shard do AT já existe em {index_file}")
+        return
+
+    if os.path.exists(corpus_file):
+        verses = processor.load_corpus(corpus_file)
+    else:
+        verses = processor.process_bhsa()
+        if not verses:
+            print("Aviso: BHSA não encontrado; shard do AT não será criado.")
+            print("  Copie os arquivos .tf para Documentação/Bible/bhsa/")
+            return
+        processor.save_corpus(verses, corpus_file)
+
+    print(f"⏳ Shard do AT: gerando embeddings de {len(verses)} versos...")
+    engine = IntertextualityEngine(model=model, corpus=SHARD_CORPORA["ot"])
+    engine.build_index(engine.create_embeddings(verses, encoding_pipeline(engine, args, "ot")))
+    engine.get_lemma_index()
+    publish(engine, "ot", args, index_file, meta_file)
+
+
+def setup_wh_shard(processor: CorpusProcessor, model, args) -> None:
+    """Constrói o corpus Westcott–Hort (Apocalipse) se o texto e o SBLGNT existirem."""
+    corpus_file, index_file, meta_file = SHARDS["wh"]
+    if index_exists("wh", index_file, args) and not args.rebuild:
+        print(f"✓ Corpus WH já existe em {index_file}")
+        return
+
+    # Sempre reprocessado (texto pequeno): um JSON antigo pode ter a
+    # numeração por linha, anterior à versificação do SBLGNT
+    verses = processor.process_wh()
+    if not verses:
+        return
+    processor.save_corpus(verses, corpus_file)
+
+    print(f"⏳ Corpus WH: gerando embeddings de {len(verses)} versos...")
+    engine = IntertextualityEngine(model=model, corpus=SHARD_CORPORA["wh"])
+    engine.build_index(engine.create_embeddings(verses, encoding_pipeline(engine, args, "wh")))
+    engine.get_concordance()
+    publish(engine, "wh", args, index_file, meta_file)
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Processa o corpus e constrói os índices")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--rebuild", action="store_true", help="Reconstrói o índice existente sem perguntar"
+    )
+    mode.add_argument(
+        "--no-input",
+        action="store_true",
+        help="Não interativo: mantém o índice existente",
+    )
+    parser.add_argument(
+        "--in-place",
+        action="store_true",
+        help="Sobrescreve indexes/*.index em vez de publicar snapshots versionados",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Processos de encoding em CPU (cada um carrega o modelo)",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=2048, help="Versos por chunk de checkpoint"
+    )
+    parser.add_argument(
+        "--encode-dir",
+        default="data/encode_checkpoints",
+        help="Chunks de embeddings já gerados (retomados após interrupção)",
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("SETUP: Processamento de Corpus e Construção de Índices")
     print("=" * 60)
@@ -44,23 +160,49 @@ def main():
     engine = IntertextualityEngine()
     
     # Verifica se índice já existe
-    index_file = "indexes/faiss_nt.index"
-    if os.path.exists(index_file):
+    _corpus_file, index_file, meta_file = SHARDS["nt"]
+    if index_exists("nt", index_file, args):
         print(f"✓ Índice já existe em {index_file}")
-        response = input("Reconstruir índice? (s/N): ").strip().lower()
+        if args.rebuild:
+            response = "s"
+        elif args.no_input or not sys.stdin.isatty():
+            response = "n"
+        else:
+            response = input("Reconstruir índice? (s/N): ").strip().lower()
         if response != 's':
             print("Usando índice existente.")
+            setup_ot_shard(processor, engine.model, args)
+            setup_wh_shard(processor, engine.model, args)
             return 0
     
     print("⏳ Gerando embeddings vetoriais (progresso abaixo)...")
-    embeddings = engine.create_embeddings(verses)
+    embeddings = engine.create_embeddings(verses, encoding_pipeline(engine, args, "nt"))
     print(f"✓ Embeddings criados: {embeddings.shape}")
     
     # Passo 3: Construir índice FAISS
     print("\n[3/3] Construindo índice FAISS...")
     print("⏳ Indexando versos para busca rápida...")
     engine.build_index(embeddings)
-    engine.save_index()
+    print("⏳ Construindo sub-índices de passagens e capítulos...")
+    engine.build_granularity_indexes()
+    if verses and "lemmas" in verses[0]:
+        engine.get_lemma_index()
+    else:
+        print("Aviso: corpus sem lemas; apague data/nt_corpus.json e rode de novo")
+    print("⏳ Construindo concordância (suffix array)...")
+    engine.get_concordance()
+
+    def similarity_matrices(built: IntertextualityEngine):
+        print("⏳ Pré-calculando matrizes de similaridade (livros e capítulos)...")
+        for level in ("book", "chapter"):
+            built.get_similarity_matrices(level)
+
+    publish(engine, "nt", args, index_file, meta_file, prepare=similarity_matrices)
+
+    print("\n⏳ Antigo Testamento (BHSA)...")
+    setup_ot_shard(processor, engine.model, args)
+    print("\n⏳ Westcott–Hort (Apocalipse)...")
+    setup_wh_shard(processor, engine.model, args)
     
     # Teste rápido
     print("\n" + "=" * 60)
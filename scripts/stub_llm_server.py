@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Servidor LLM simulado para testes de carga: fala os formatos do Ollama
+(/api/generate, /api/chat, /api/tags) e da OpenAI (/v1/chat/completions),
+com streaming, latência configurável, erros injetados e limites de vazão.
+
+Apontando a aplicação para ele:
+    LLM_PROVIDER=OLLAMA OLLAMA_HOST=http://localhost:11435
+    LLM_PROVIDER=OPENAI OPENAI_API_KEY=stub OPENAI_BASE_URL=http://localhost:11435/v1
+
+Uso:
+    python scripts/stub_llm_server.py --port 11435 --latency-ms 800 --dist lognormal
+    python scripts/stub_llm_server.py --error-rate 0.05 --max-concurrency 4
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Adiciona o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.providers.stub_provider import LatencySimulator, StubError
+
+
+def _prompt_from_messages(messages) -> str:
+    return "\n".join(str(m.get("content", "")) for m in messages or [])
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    simulator: LatencySimulator = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *_args):
+        pass  # Sem log por requisição (atrapalha a medição)
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, data: str):
+        payload = data.encode("utf-8")
+        self.wfile.write(f"{len(payload):X}\r\n".encode("ascii") + payload + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": "stub", "model": "stub"}]})
+        elif self.path == "/stats":
+            self._send_json(200, self.simulator.stats())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "JSON inválido"})
+            return
+
+        if self.path == "/api/generate":
+            self._ollama(request, request.get("prompt", ""), chat=False)
+        elif self.path == "/api/chat":
+            self._ollama(request, _prompt_from_messages(request.get("messages")), chat=True)
+        elif self.path == "/v1/chat/completions":
+            self._openai(request, _prompt_from_messages(request.get("messages")))
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _ollama(self, request: dict, prompt: str, chat: bool):
+        model = request.get("model", "stub")
+        # O Ollama faz streaming por padrão
+        stream = request.get("stream", True)
+
+        def message(text: str, done: bool) -> dict:
+            base = {
+                "model": model,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "done": done,
+            }
+            if chat:
+                base["message"] = {"role": "assistant", "content": text}
+            else:
+                base["response"] = text
+            return base
+
+        tokens = self.simulator.stream(prompt)
+        try:
+            if not stream:
+                self._send_json(200, message("".join(tokens).strip(), True))
+                return
+            first = next(tokens, "")
+            self._start_stream("application/x-ndjson")
+            for token in itertools.chain([first], tokens):
+                self._chunk(json.dumps(message(token, False)) + "\n")
+            self._chunk(json.dumps(message("", True)) + "\n")
+            self._end_stream()
+        except StubError as e:
+            self._send_json(500, {"error": str(e)})
+
+    def _openai(self, request: dict, prompt: str):
+        model = request.get("model", "stub")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        tokens = self.simulator.stream(prompt)
+        try:
+            if not request.get("stream"):
+                text = "".join(tokens).strip()
+                self._send_json(
+                    200,
+                    {
+                        "id": completion_id,
+                        "object": "chat.completion",
+                        "created": created,
+                        "model": model,
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": text},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": {
+                            "prompt_tokens": len(prompt.split()),
+                            "completion_tokens": self.simulator.tokens,
+                            "total_tokens": len(prompt.split()) + self.simulator.tokens,
+                        },
+                    },
+                )
+                return
+
+            def event(delta: dict, finish=None) -> str:
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                }
+                return f"data: {json.dumps(chunk)}\n\n"
+
+            first = next(tokens, "")
+            self._start_stream("text/event-stream")
+            self._chunk(event({"role": "assistant"}))
+            for token in itertools.chain([first], tokens):
+                self._chunk(event({"content": token}))
+            self._chunk(event({}, "stop"))
+            self._chunk("data: [DONE]\n\n")
+            self._end_stream()
+        except StubError as e:
+            self._send_json(
+                500, {"error": {"message": str(e), "type": "server_error"}}
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency-ms", type=float, default=None)
+    parser.add_argument("--dist", choices=LatencySimulator.DISTRIBUTIONS, default=None)
+    parser.add_argument("--sigma", type=float, default=None)
+    parser.add_argument("--tokens", type=int, default=None)
+    parser.add_argument("--token-ms", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=None)
+    parser.add_argument("--max-rps", type=float, default=None)
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    StubHandler.simulator = LatencySimulator(
+        latency_ms=args.latency_ms,
+        distribution=args.dist,
+        sigma=args.sigma,
+        tokens=args.tokens,
+        token_ms=args.token_ms,
+        error_rate=args.error_rate,
+        max_rps=args.max_rps,
+        max_concurrency=args.max_concurrency,
+        seed=args.seed,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    sim = StubHandler.simulator
+    print(
+        f"✓ Stub LLM em http://{args.host}:{args.port} "
+        f"(latência {sim.latency_ms:.0f} ms {sim.distribution}, "
+        f"erros {sim.error_rate:.0%}, estatísticas em /stats)"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
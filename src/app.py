@@ -1,18 +1,38 @@
+import hmac
+import json
 import os
+import time
+from contextlib import asynccontextmanager
+from typing import Literal
 
+import anyio
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, Header
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
+from src.services import metrics, tracing
 from src.services.bible_service import BibleService
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
-app = FastAPI(title="AN Agent - Bible Study One Web")
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """
+    Tamanho do threadpool dos endpoints síncronos (SERVER_THREADS; padrão
+    do anyio: 40). Requisições além do limite esperam no event loop.
+    """
+    server_threads = int(os.getenv("SERVER_THREADS", "0"))
+    if server_threads > 0:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = server_threads
+    yield
+
+
+app = FastAPI(title="AN Agent - Bible Study One Web", lifespan=lifespan)
 
 # Configurar serviço
 bible_service = BibleService()
@@ -27,6 +47,156 @@ class QuestionRequest(BaseModel):
 class SimilarityRequest(BaseModel):
     query: str
     top_k: int = 5
+    # verse: versos; passage: janelas de versos; coarse: capítulos → versos
+    granularity: Literal["verse", "passage", "coarse"] = "verse"
+    # Segundo estágio com cross-encoder (requer RERANKER_MODEL)
+    rerank: bool = False
+    # Funde busca vetorial e lexical (BM25 sobre lemas)
+    hybrid: bool = False
+    # nt: SBLGNT; ot: BHSA; all: todos os shards em paralelo
+    testament: Literal["nt", "ot", "all"] = "nt"
+    # Corpus nomeado (sblgnt, wh, bhsa, traduções); precede testament
+    corpus: str | None = None
+
+
+class RangeSimilarityRequest(BaseModel):
+    query: str
+    threshold: float = 0.8
+    page_size: int = Field(50, ge=1, le=500)
+    cursor: str | None = None
+    include_text: bool = True
+    corpus: str | None = None
+
+
+def _reference_fields(verse: dict) -> dict:
+    """Referência do resultado, com fim da janela (passagens) e lemas em comum
+    (busca híbrida) quando presentes."""
+    fields = {
+        "book": verse["book"],
+        "chapter": verse["chapter"],
+        "verse": verse["verse"],
+    }
+    if "end_verse" in verse:
+        fields["end_chapter"] = verse["end_chapter"]
+        fields["end_verse"] = verse["end_verse"]
+    if "shared_lemmas" in verse:
+        fields["shared_lemmas"] = verse["shared_lemmas"]
+    if "corpus" in verse:
+        fields["corpus"] = verse["corpus"]
+    return fields
+
+
+class QuotationRequest(BaseModel):
+    query: str
+    top_k: int = 10
+    # Tamanho mínimo do trecho em comum (palavras)
+    min_span: int | None = Field(None, ge=1)
+
+
+class MorphologyRequest(BaseModel):
+    # Ex.: [{"tense": "aorist", "voice": "passive", "mood": "participle"},
+    #       {"lemma": "ἀγάπη"}]
+    words: list[dict[str, str]]
+    op: Literal["and", "or"] = "and"
+    query: str | None = None
+    top_k: int = 10
+    limit: int = Field(100, ge=1, le=1000)
+
+
+class VerseUpdate(BaseModel):
+    book: str
+    chapter: int
+    verse: int
+    text: str
+    words: list[str] | None = None
+    lemmas: list[str] | None = None
+    corpus: str | None = None
+
+
+class VerseUpsertRequest(BaseModel):
+    verses: list[VerseUpdate]
+
+
+class VerseRemoveRequest(BaseModel):
+    # Referências ("João 3:16")
+    references: list[str]
+
+
+def _require_admin(token: str | None):
+    """Endpoints de administração exigem ADMIN_TOKEN (desabilitados sem ele)."""
+    expected = os.getenv("ADMIN_TOKEN", "")
+    if not expected:
+        raise HTTPException(status_code=403, detail="ADMIN_TOKEN não configurado")
+    if not hmac.compare_digest((token or "").encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Token de administração inválido")
+
+
+def _wants_debug(request: Request) -> bool:
+    return (
+        request.query_params.get("debug") == "timing"
+        or request.headers.get("x-debug-timing") == "1"
+    )
+
+
+async def _with_debug_block(response, spans, elapsed: float):
+    """Acrescenta ``debug.timing`` ao corpo JSON da resposta."""
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    headers = {
+        k: v
+        for k, v in response.headers.items()
+        if k.lower() not in ("content-length", "content-type")
+    }
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return Response(body, response.status_code, headers, response.media_type)
+    if isinstance(data, dict):
+        data["debug"] = {
+            "timing": tracing.summarize(spans),
+            "total_ms": round(elapsed * 1000, 3),
+        }
+    return JSONResponse(data, response.status_code, headers)
+
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """
+    Tempo total por rota (template, não o caminho: cardinalidade fixa),
+    header Server-Timing com os spans da requisição, bloco ``debug`` com
+    ``?debug=timing`` e profiling da requisição com ``X-Profile: 1``.
+    """
+    spans = tracing.start_trace()
+    profiler = None
+    if request.headers.get("x-profile") == "1":
+        try:
+            _require_admin(request.headers.get("x-admin-token"))
+        except HTTPException as e:
+            return JSONResponse({"detail": e.detail}, e.status_code)
+        profiler = tracing.profile_request(float(os.getenv("PROFILE_INTERVAL_MS", "2")))
+
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        if metrics.ENABLED:
+            route = request.scope.get("route")
+            metrics.REQUEST_SECONDS.labels(
+                request.method, getattr(route, "path", "unmatched"), status
+            ).observe(elapsed)
+        if profiler is not None:
+            profiler.stop()
+
+    if profiler is not None:
+        response.headers["X-Profile-Output"] = profiler.write(label="request")
+    if os.getenv("SERVER_TIMING", "0") == "1":
+        response.headers["Server-Timing"] = tracing.server_timing(spans, elapsed)
+    is_json = response.headers.get("content-type", "").startswith("application/json")
+    if is_json and _wants_debug(request):
+        return await _with_debug_block(response, spans, elapsed)
+    return response
 
 
 # Montar arquivos estáticos
@@ -72,15 +242,35 @@ def ask_bible_question(
 @app.post("/find-similar")
 def find_similar_verses(request: SimilarityRequest):
     """Encontra versos similares usando busca semântica."""
-    results = bible_service.find_similar_verses(request.query, request.top_k)
+    try:
+        results = bible_service.find_similar_verses(
+            request.query,
+            request.top_k,
+            request.granularity,
+            request.rerank,
+            request.hybrid,
+            request.testament,
+            corpus=request.corpus,
+        )
+        source = bible_service.resolve_reference(request.query, request.corpus)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {
         "query": request.query,
+        "source": (
+            {
+                "book": source["book"],
+                "chapter": source["chapter"],
+                "verse": source["verse"],
+                "text": source["text"],
+            }
+            if source
+            else None
+        ),
         "results": [
             {
-                "book": verse["book"],
-                "chapter": verse["chapter"],
-                "verse": verse["verse"],
+                **_reference_fields(verse),
                 "text": verse["text"],
                 "similarity_score": float(score),
             }
@@ -89,10 +279,125 @@ def find_similar_verses(request: SimilarityRequest):
     }
 
 
+@app.post("/find-similar/range")
+def find_similar_verses_range(request: RangeSimilarityRequest):
+    """
+    Retorna todos os versos acima de um threshold de similaridade, paginados
+    por cursor (passe `next_cursor` na requisição seguinte).
+    """
+    try:
+        page = bible_service.find_verses_above_threshold(
+            request.query,
+            request.threshold,
+            page_size=request.page_size,
+            cursor=request.cursor,
+            include_text=request.include_text,
+            corpus=request.corpus,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"query": request.query, "threshold": request.threshold, **page}
+
+
+@app.post("/quotations")
+def find_quotations(request: QuotationRequest):
+    """Encontra versos com trechos longos em comum (citações quase literais)."""
+    hits = bible_service.find_quotations(
+        request.query, request.top_k, request.min_span
+    )
+    return {
+        "query": request.query,
+        "results": [
+            {
+                **_reference_fields(verse),
+                "text": verse["text"],
+                "jaccard": score,
+                "spans": spans,
+            }
+            for verse, score, spans in hits
+        ],
+    }
+
+
+@app.get("/concordance")
+def concordance(
+    q: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=1000),
+    context: int = Query(40, ge=0, le=200),
+    count_only: bool = False,
+):
+    """
+    Concordância (keyword-in-context) de uma forma ou frase grega, sem
+    diferenciar acentos e maiúsculas. Com `count_only=true` retorna só o total.
+    """
+    result = bible_service.concordance(q, offset, limit, context, count_only)
+    return {"query": q, **result}
+
+
+@app.get("/analytics/similarity-matrix")
+def similarity_matrix(
+    level: Literal["book", "chapter"] = "book",
+    metric: Literal["mean", "max", "links"] = "mean",
+    corpus: str | None = None,
+):
+    """
+    Matriz de similaridade entre livros ou capítulos, pronta para heatmap
+    (pré-calculada e cacheada em disco).
+    """
+    try:
+        result = bible_service.similarity_matrix(level, metric, corpus)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"level": level, "metric": metric, **result}
+
+
+@app.post("/morphology-search")
+def morphology_search(request: MorphologyRequest):
+    """
+    Busca versos por traços morfológicos (MorphGNT) e lemas; com `query`,
+    ranqueia semanticamente apenas os versos filtrados.
+    """
+    try:
+        found = bible_service.search_morphology(
+            request.words,
+            request.op,
+            query=request.query,
+            top_k=request.top_k,
+            limit=request.limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "total": found["total"],
+        "results": [
+            {
+                **_reference_fields(verse),
+                "text": verse["text"],
+                "similarity_score": score,
+            }
+            for verse, score in found["results"]
+        ],
+    }
+
+
 @app.post("/explain-links")
 def explain_intertextual_links(request: SimilarityRequest):
     """Encontra versos similares e explica as conexões intertextuais."""
-    links = bible_service.find_similar_verses(request.query, request.top_k)
+    try:
+        links = bible_service.find_similar_verses(
+            request.query,
+            request.top_k,
+            request.granularity,
+            request.rerank,
+            request.hybrid,
+            request.testament,
+            corpus=request.corpus,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     if not links:
         return {
@@ -101,15 +406,21 @@ def explain_intertextual_links(request: SimilarityRequest):
             "explanation": "Nenhuma conexão intertextual encontrada. Certifique-se de que o índice foi construído.",
         }
 
-    explanation = bible_service.explain_intertextual_links(request.query, links)
+    # Para referências, o LLM recebe o texto do verso e não "João 3:16"
+    source = bible_service.resolve_reference(request.query, request.corpus)
+    verse_text = request.query
+    if source:
+        verse_text = (
+            f"{source['book']} {source['chapter']}:{source['verse']} "
+            f"— {source['text']}"
+        )
+    explanation = bible_service.explain_intertextual_links(verse_text, links)
 
     return {
         "query": request.query,
         "links": [
             {
-                "book": verse["book"],
-                "chapter": verse["chapter"],
-                "verse": verse["verse"],
+                **_reference_fields(verse),
                 "text": verse["text"][:100] + "...",
                 "similarity_score": float(score),
             }
@@ -119,30 +430,131 @@ def explain_intertextual_links(request: SimilarityRequest):
     }
 
 
+@app.post("/admin/verses")
+def upsert_verses(
+    request: VerseUpsertRequest, x_admin_token: str | None = Header(None)
+):
+    """Adiciona ou substitui versos sem reconstruir o índice."""
+    _require_admin(x_admin_token)
+    verses = [v.model_dump(exclude_none=True) for v in request.verses]
+    try:
+        ids = bible_service.upsert_verses(verses)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ids": ids}
+
+
+@app.post("/admin/verses/remove")
+def remove_verses(
+    request: VerseRemoveRequest, x_admin_token: str | None = Header(None)
+):
+    """Remove versos do índice pela referência."""
+    _require_admin(x_admin_token)
+    try:
+        ids = bible_service.remove_verses(request.references)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"removed": ids}
+
+
+@app.post("/admin/profile")
+def start_profile(
+    seconds: float = Query(10, gt=0, le=600),
+    interval_ms: float = Query(5, ge=1, le=1000),
+    x_admin_token: str | None = Header(None),
+):
+    """
+    Perfila o processo por `seconds` segundos (amostragem de pilhas); o
+    resultado vai para PROFILE_DIR no formato folded (flamegraph).
+    """
+    _require_admin(x_admin_token)
+    try:
+        return tracing.start_profiling(seconds, interval_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/admin/profile")
+def profile_status(x_admin_token: str | None = Header(None)):
+    """Estado do profiling, último perfil gravado e funções mais amostradas."""
+    _require_admin(x_admin_token)
+    return tracing.profiling_status()
+
+
+@app.get("/admin/snapshots")
+def snapshot_status(x_admin_token: str | None = Header(None)):
+    """Versões de índice carregadas e ativas, snapshots do NT e última recarga."""
+    _require_admin(x_admin_token)
+    return bible_service.snapshot_status()
+
+
+@app.post("/admin/snapshots/reload")
+def reload_snapshot(
+    corpus: str = Query("nt"),
+    version: str | None = Query(None),
+    wait: bool = Query(False),
+    x_admin_token: str | None = Header(None),
+):
+    """
+    Carrega o snapshot ativo (ou `version`) em background e troca o índice
+    sem reiniciar; as buscas usam o índice anterior até a troca.
+    """
+    _require_admin(x_admin_token)
+    try:
+        return bible_service.reload_index(corpus, version, wait)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/corpora")
+def list_corpora():
+    """Corpora disponíveis e carregados, com a memória estimada de cada um."""
+    return bible_service.list_corpora()
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Métricas no formato Prometheus (latências, caches, erros, índice)."""
+    metrics.update_runtime(bible_service)
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
 
 
+def _engine_or_503():
+    engine = bible_service.intertextuality_engine
+    if engine is None:
+        raise HTTPException(status_code=503, detail="Motor de intertextualidade indisponível")
+    return engine
+
+
 @app.get("/gpu/status")
 def get_gpu_status():
-    """Retorna o status atual da GPU."""
-    return bible_service.engine.get_device_info()
+    """Retorna o status atual da GPU e o orçamento de threads."""
+    info = _engine_or_503().get_device_info()
+    info["threads"]["server_threads"] = int(
+        anyio.to_thread.current_default_thread_limiter().total_tokens
+    )
+    return info
 
 
 @app.post("/gpu/set")
 def set_gpu_device(device: str):
     """Altera o device (cpu/cuda) em runtime."""
-    result = bible_service.engine.set_device(device)
+    result = _engine_or_503().set_device(device)
     return result
 
 
 @app.post("/gpu/toggle")
 def toggle_gpu():
     """Alterna entre CPU e GPU automaticamente."""
-    current = bible_service.engine.device
-    new_device = "cpu" if current == "cuda" else "cuda"
-    result = bible_service.engine.set_device(new_device)
+    engine = _engine_or_503()
+    new_device = "cpu" if engine.device == "cuda" else "cuda"
+    result = engine.set_device(new_device)
     return result
 
 
@@ -4,6 +4,7 @@ from typing import Optional
 import requests
 
 from src.providers.llm_base import LLMProvider
+from src.services.metrics import record_provider_error
 
 
 class HuggingFaceProvider(LLMProvider):
@@ -33,6 +34,7 @@ class HuggingFaceProvider(LLMProvider):
             r.raise_for_status()
             data = r.json()
         except (requests.RequestException, ValueError) as e:
+            record_provider_error(self.name, e)
             return f"[HuggingFaceProvider] Erro: {e}"
         if isinstance(data, list) and data and "generated_text" in data[0]:
             return data[0]["generated_text"]
@@ -4,6 +4,7 @@ from typing import Optional
 import requests
 
 from src.providers.llm_base import LLMProvider
+from src.services.metrics import record_provider_error
 
 
 class OllamaProvider(LLMProvider):
@@ -20,7 +21,8 @@ class OllamaProvider(LLMProvider):
             r = requests.post(f"{self.host}/api/generate", json=payload, timeout=120)
             r.raise_for_status()
             data = r.json()
-        except requests.ConnectionError:
+        except requests.ConnectionError as e:
+            record_provider_error(self.name, e)
             return (
                 "❌ Ollama não está rodando. Para usar modelos locais:\n\n"
                 "1. Instale Ollama: https://ollama.com/download\n"
@@ -29,6 +31,7 @@ class OllamaProvider(LLMProvider):
                 "Ou escolha outro modelo de IA no seletor acima."
             )
         except requests.HTTPError as e:
+            record_provider_error(self.name, e)
             if "404" in str(e):
                 return (
                     f"❌ Modelo '{use_model}' não encontrado no Ollama.\n\n"
@@ -37,6 +40,7 @@ class OllamaProvider(LLMProvider):
                 )
             return f"[OllamaProvider] Erro HTTP: {e}"
         except (requests.RequestException, ValueError) as e:
+            record_provider_error(self.name, e)
             return f"[OllamaProvider] Erro: {e}"
         if isinstance(data, dict) and "response" in data:
             return data["response"]
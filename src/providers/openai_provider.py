@@ -2,6 +2,7 @@ import os
 from typing import Optional
 
 from src.providers.llm_base import LLMProvider
+from src.services.metrics import record_provider_error
 
 try:
     from openai import OpenAI
@@ -32,6 +33,7 @@ class OpenAIProvider(LLMProvider):
             )
             return resp.choices[0].message.content
         except Exception as e:
+            record_provider_error(self.name, e)
             error_msg = str(e)
             if (
                 "not_authorized_invalid_key_type" in error_msg
@@ -0,0 +1,180 @@
+import math
+import os
+import random
+import threading
+import time
+from typing import Iterator, Optional
+
+from src.providers.llm_base import LLMProvider
+
+_WORDS = (
+    "o texto retoma o vocabulário e os temas do verso analisado "
+    "com paralelos de aliança, promessa, fé, graça e cumprimento"
+).split()
+
+
+class StubError(RuntimeError):
+    """Erro injetado pelo stub (simula falha do provedor)."""
+
+
+class LatencySimulator:
+    """
+    Latência, erros e limites de vazão de um LLM simulado.
+
+    Compartilhado pelo StubProvider e pelo servidor stub HTTP
+    (scripts/stub_llm_server.py). Configuração (parâmetros ou env):
+
+    - ``STUB_LATENCY_MS``: latência média até o primeiro token
+    - ``STUB_LATENCY_DIST``: fixed, normal, lognormal ou exponential
+    - ``STUB_LATENCY_SIGMA``: dispersão (desvio relativo; sigma do log
+      na lognormal)
+    - ``STUB_TOKENS`` / ``STUB_TOKEN_MS``: tokens por resposta e intervalo
+      entre tokens (streaming)
+    - ``STUB_ERROR_RATE``: fração de chamadas que falham
+    - ``STUB_MAX_RPS``: vazão máxima (token bucket; excesso espera)
+    - ``STUB_MAX_CONCURRENCY``: chamadas simultâneas (excesso espera)
+    """
+
+    DISTRIBUTIONS = ("fixed", "normal", "lognormal", "exponential")
+
+    def __init__(
+        self,
+        latency_ms: Optional[float] = None,
+        distribution: Optional[str] = None,
+        sigma: Optional[float] = None,
+        tokens: Optional[int] = None,
+        token_ms: Optional[float] = None,
+        error_rate: Optional[float] = None,
+        max_rps: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        seed: Optional[int] = None,
+    ):
+        def setting(value, name: str, default: str, cast):
+            return value if value is not None else cast(os.getenv(name, default))
+
+        self.latency_ms = setting(latency_ms, "STUB_LATENCY_MS", "200", float)
+        self.distribution = setting(distribution, "STUB_LATENCY_DIST", "lognormal", str)
+        if self.distribution not in self.DISTRIBUTIONS:
+            raise ValueError(
+                f"Distribuição inválida: {self.distribution} "
+                f"(use {', '.join(self.DISTRIBUTIONS)})"
+            )
+        self.sigma = setting(sigma, "STUB_LATENCY_SIGMA", "0.5", float)
+        self.tokens = setting(tokens, "STUB_TOKENS", "64", int)
+        self.token_ms = setting(token_ms, "STUB_TOKEN_MS", "0", float)
+        self.error_rate = setting(error_rate, "STUB_ERROR_RATE", "0", float)
+        self.max_rps = setting(max_rps, "STUB_MAX_RPS", "0", float)
+        max_concurrency = setting(max_concurrency, "STUB_MAX_CONCURRENCY", "0", int)
+        self._slots = (
+            threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+        )
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # Token bucket: próxima hora livre (time.monotonic)
+        self._next_slot = 0.0
+        # Estatísticas (lidas pelo /stats do servidor stub)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.served = 0
+        self.failed = 0
+
+    def sample_latency(self) -> float:
+        """Latência (s) até o primeiro token, segundo a distribuição."""
+        mean = self.latency_ms / 1000
+        with self._lock:
+            if self.distribution == "fixed":
+                value = mean
+            elif self.distribution == "normal":
+                value = self._rng.gauss(mean, mean * self.sigma)
+            elif self.distribution == "exponential":
+                value = self._rng.expovariate(1 / mean) if mean > 0 else 0.0
+            else:
+                # Média da lognormal = exp(mu + sigma²/2) = mean
+                mu = math.log(mean) - self.sigma**2 / 2 if mean > 0 else -math.inf
+                value = self._rng.lognormvariate(mu, self.sigma) if mean > 0 else 0.0
+        return max(0.0, value)
+
+    def _throttle(self):
+        if self.max_rps <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + 1 / self.max_rps
+        if start > now:
+            time.sleep(start - now)
+
+    def __enter__(self):
+        if self._slots is not None:
+            self._slots.acquire()
+        self._throttle()
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self._rng.random() < self.error_rate
+        if fail:
+            self._release(failed=True)
+            raise StubError("Erro injetado pelo stub")
+        return self
+
+    def __exit__(self, exc_type, _exc, _tb):
+        # GeneratorExit (stream abandonado pelo cliente) não conta como falha
+        failed = exc_type is not None and issubclass(exc_type, Exception)
+        self._release(failed=failed)
+
+    def _release(self, failed: bool):
+        with self._lock:
+            self.in_flight -= 1
+            self.served += 1
+            self.failed += int(failed)
+        if self._slots is not None:
+            self._slots.release()
+
+    def tokens_for(self, prompt: str) -> Iterator[str]:
+        """Tokens da resposta (texto determinístico pelo prompt)."""
+        offset = sum(map(ord, prompt[:64]))
+        for i in range(self.tokens):
+            yield _WORDS[(offset + i) % len(_WORDS)] + " "
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """
+        Gera a resposta token a token, com a latência simulada.
+
+        Raises:
+            StubError: Para chamadas sorteadas pela taxa de erro
+        """
+        with self:
+            time.sleep(self.sample_latency())
+            for i, token in enumerate(self.tokens_for(prompt)):
+                if i and self.token_ms:
+                    time.sleep(self.token_ms / 1000)
+                yield token
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "served": self.served,
+                "failed": self.failed,
+            }
+
+
+class StubProvider(LLMProvider):
+    """
+    Provider local para testes de carga: responde como um LLM, com
+    latência, streaming, erros e limites configuráveis (ver
+    LatencySimulator), sem chamar nenhuma API.
+    """
+
+    name = "stub"
+
+    def __init__(self, simulator: Optional[LatencySimulator] = None):
+        self.simulator = simulator or LatencySimulator()
+
+    def generate(self, prompt: str, model: Optional[str] = None) -> str:
+        return "".join(self.simulator.stream(prompt)).strip()
+
+    def stream(self, prompt: str, model: Optional[str] = None) -> Iterator[str]:
+        """Resposta token a token (ver LatencySimulator.stream)."""
+        return self.simulator.stream(prompt)
@@ -0,0 +1,274 @@
+import json
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from src.services.analytics import crc_rows
+
+# Registro gravado por par alinhado (20 bytes): ids estáveis e score
+ALIGNMENT_DTYPE = np.dtype(
+    [("source_id", "<i8"), ("target_id", "<i8"), ("score", "<f4")]
+)
+
+
+def top_k_block(
+    source_block: np.ndarray,
+    target: np.ndarray,
+    top_k: int,
+    block_cols: int = 8192,
+    self_offset: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top-k por linha de ``source_block @ target.T``, em tiles de colunas.
+
+    Cada tile (linhas x block_cols) é fundido ao top-k acumulado com
+    argpartition: a memória fica limitada a um tile, qualquer que seja o
+    tamanho do corpus alvo.
+
+    Args:
+        source_block: Vetores (b, d) normalizados
+        target: Vetores (n, d) normalizados (pode ser memmap)
+        top_k: Vizinhos por linha
+        block_cols: Linhas do alvo por tile
+        self_offset: Linha do alvo que corresponde à primeira linha do
+            bloco, quando origem e alvo são o mesmo corpus (o próprio verso
+            fica fora do top-k)
+
+    Returns:
+        Tupla (scores (b, k), colunas (b, k)), ordenada por score
+        decrescente; posições sem vizinho têm score -inf e coluna -1
+    """
+    b, k = len(source_block), min(top_k, len(target))
+    best_scores = np.full((b, k), -np.inf, dtype=np.float32)
+    best_cols = np.full((b, k), -1, dtype=np.int64)
+    if b == 0 or k == 0:
+        return best_scores, best_cols
+
+    rows = np.arange(b)
+    for start in range(0, len(target), block_cols):
+        tile = np.ascontiguousarray(target[start : start + block_cols], dtype=np.float32)
+        scores = source_block @ tile.T
+        if self_offset is not None:
+            # Diagonal (o próprio verso) dentro deste tile
+            cols = rows + self_offset - start
+            inside = (cols >= 0) & (cols < len(tile))
+            scores[rows[inside], cols[inside]] = -np.inf
+
+        cand_scores = np.concatenate([best_scores, scores], axis=1)
+        cand_cols = np.concatenate(
+            [best_cols, np.broadcast_to(np.arange(start, start + len(tile)), scores.shape)],
+            axis=1,
+        )
+        keep = np.argpartition(-cand_scores, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(cand_scores, keep, axis=1)
+        best_cols = np.take_along_axis(cand_cols, keep, axis=1)
+
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    best_scores = np.take_along_axis(best_scores, order, axis=1)
+    best_cols = np.take_along_axis(best_cols, order, axis=1)
+    best_cols[~np.isfinite(best_scores)] = -1
+    return best_scores, best_cols
+
+
+def read_alignment(path: str) -> np.ndarray:
+    """Pares gravados por AlignmentJob (memmap de ALIGNMENT_DTYPE)."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=ALIGNMENT_DTYPE)
+    return np.memmap(path, dtype=ALIGNMENT_DTYPE, mode="r")
+
+
+class AlignmentJob:
+    """
+    Alinhamento de dois corpora inteiros: para cada verso da origem, os
+    top-k versos mais similares do alvo.
+
+    A origem é processada em blocos de linhas, em paralelo (threads: o
+    produto de matrizes do numpy libera o GIL); cada bloco percorre o alvo
+    em tiles (ver top_k_block). Os pares são gravados em ordem, em um
+    arquivo binário de registros ALIGNMENT_DTYPE, e um manifesto
+    ``<saída>.json`` registra o último bloco concluído: uma execução
+    interrompida continua de onde parou.
+    """
+
+    def __init__(
+        self,
+        source: np.ndarray,
+        target: np.ndarray,
+        source_ids: np.ndarray,
+        target_ids: np.ndarray,
+        output: str,
+        top_k: int = 10,
+        block_rows: int = 1024,
+        block_cols: int = 8192,
+        workers: Optional[int] = None,
+        min_score: Optional[float] = None,
+        same_corpus: bool = False,
+    ):
+        """
+        Args:
+            source, target: Embeddings normalizados (podem ser memmap)
+            source_ids, target_ids: Ids estáveis de cada linha
+            output: Arquivo binário de saída
+            top_k: Vizinhos por verso da origem
+            block_rows: Linhas da origem por tarefa
+            block_cols: Linhas do alvo por tile
+            workers: Threads (default: número de CPUs)
+            min_score: Pares abaixo deste score não são gravados
+            same_corpus: Origem e alvo são o mesmo corpus (exclui o
+                próprio verso)
+        """
+        if source.shape[1] != target.shape[1]:
+            raise ValueError(
+                f"Dimensões diferentes: {source.shape[1]} e {target.shape[1]}"
+            )
+        self.source, self.target = source, target
+        self.source_ids = np.asarray(source_ids, dtype=np.int64)
+        self.target_ids = np.asarray(target_ids, dtype=np.int64)
+        self.output = output
+        self.manifest_path = output + ".json"
+        self.top_k = top_k
+        self.block_rows = block_rows
+        self.block_cols = block_cols
+        self.workers = workers or os.cpu_count() or 1
+        self.min_score = min_score
+        self.same_corpus = same_corpus
+        self._fingerprints: Optional[Dict[str, int]] = None
+
+    @property
+    def num_blocks(self) -> int:
+        return -(-len(self.source) // self.block_rows)
+
+    def _fingerprint(self) -> Dict[str, int]:
+        # Mesma forma, outro conteúdo (corpus atualizado ou recodificado)
+        # não pode emendar pares novos nos antigos
+        if self._fingerprints is None:
+            self._fingerprints = {
+                name: crc_rows(vectors, zlib.crc32(ids.tobytes()))
+                for name, vectors, ids in (
+                    ("source", self.source, self.source_ids),
+                    ("target", self.target, self.target_ids),
+                )
+            }
+        return self._fingerprints
+
+    def _params(self) -> Dict:
+        # Um checkpoint só é retomado se os parâmetros forem os mesmos
+        return {
+            "fingerprint": self._fingerprint(),
+            "source_rows": len(self.source),
+            "target_rows": len(self.target),
+            "dim": int(self.source.shape[1]),
+            "top_k": self.top_k,
+            "block_rows": self.block_rows,
+            "min_score": self.min_score,
+            "same_corpus": self.same_corpus,
+        }
+
+    def _read_manifest(self) -> Optional[Dict]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get("params") == self._params() else None
+
+    def _write_manifest(self, manifest: Dict):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _align_block(self, block: int) -> np.ndarray:
+        start = block * self.block_rows
+        rows = np.ascontiguousarray(
+            self.source[start : start + self.block_rows], dtype=np.float32
+        )
+        scores, cols = top_k_block(
+            rows,
+            self.target,
+            self.top_k,
+            self.block_cols,
+            self_offset=start if self.same_corpus else None,
+        )
+        keep = cols >= 0
+        if self.min_score is not None:
+            keep &= scores >= self.min_score
+        source_rows = np.broadcast_to(
+            np.arange(start, start + len(rows))[:, None], cols.shape
+        )
+        records = np.empty(int(keep.sum()), dtype=ALIGNMENT_DTYPE)
+        records["source_id"] = self.source_ids[source_rows[keep]]
+        records["target_id"] = self.target_ids[cols[keep]]
+        records["score"] = scores[keep]
+        return records
+
+    def run(self, resume: bool = True, max_blocks: Optional[int] = None) -> Dict:
+        """
+        Executa (ou retoma) o alinhamento.
+
+        Args:
+            resume: Continua do último checkpoint compatível; se False, ou
+                sem checkpoint, recomeça do zero
+            max_blocks: Para após este número de blocos (o checkpoint
+                permite continuar depois)
+
+        Returns:
+            Manifesto: blocos concluídos, pares e bytes gravados, ``done``
+        """
+        manifest = self._read_manifest() if resume else None
+        if manifest is not None and (
+            not os.path.exists(self.output) or os.path.getsize(self.output) < manifest["bytes"]
+        ):
+            # Saída ausente ou menor que o checkpoint (truncada por fora):
+            # retomar deixaria um buraco de zeros no meio dos pares
+            print(f"Aviso: {self.output} não confere com o checkpoint; recomeçando")
+            manifest = None
+        if manifest is None:
+            manifest = {"params": self._params(), "next_block": 0, "pairs": 0, "bytes": 0}
+        os.makedirs(os.path.dirname(self.output) or ".", exist_ok=True)
+
+        first = manifest["next_block"]
+        last = self.num_blocks if max_blocks is None else min(
+            self.num_blocks, first + max_blocks
+        )
+        if first > 0:
+            print(f"✓ Retomando alinhamento do bloco {first}/{self.num_blocks}")
+
+        mode = "r+b" if first > 0 else "wb"
+        with open(self.output, mode) as f, ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="align"
+        ) as executor:
+            # Descarta o que foi gravado depois do último checkpoint
+            f.truncate(manifest["bytes"])
+            f.seek(manifest["bytes"])
+            # Janela limitada de blocos em andamento (memória constante),
+            # gravados na ordem da origem
+            pending: deque = deque()
+            next_submit = first
+            for block in range(first, last):
+                while next_submit < last and len(pending) < 2 * self.workers:
+                    pending.append(executor.submit(self._align_block, next_submit))
+                    next_submit += 1
+                records = pending.popleft().result()
+                f.write(records.tobytes())
+                f.flush()
+                manifest.update(
+                    next_block=block + 1,
+                    pairs=manifest["pairs"] + len(records),
+                    bytes=f.tell(),
+                )
+                self._write_manifest(manifest)
+                print(
+                    f"  Alinhando: bloco {block + 1}/{self.num_blocks} "
+                    f"({manifest['pairs']:,} pares)",
+                    end="\r",
+                )
+
+        manifest["done"] = manifest["next_block"] >= self.num_blocks
+        self._write_manifest(manifest)
+        print(f"\n✓ Alinhamento: {manifest['pairs']:,} pares em {self.output}")
+        return manifest
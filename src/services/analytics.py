@@ -0,0 +1,159 @@
+import os
+import tempfile
+import zlib
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+LEVELS = ("book", "chapter")
+METRICS = ("mean", "max", "links")
+
+
+def group_rows(verses: Sequence[Dict], level: str) -> Tuple[List[str], np.ndarray]:
+    """
+    Grupo (livro ou capítulo) de cada verso, na ordem do corpus.
+
+    Returns:
+        Tupla (rótulos dos grupos, grupo de cada linha; -1 para versos
+        removidos)
+
+    Raises:
+        ValueError: Para nível desconhecido
+    """
+    if level not in LEVELS:
+        raise ValueError(f"Nível inválido: {level} (use {', '.join(LEVELS)})")
+    labels: List[str] = []
+    positions: Dict[str, int] = {}
+    groups = np.full(len(verses), -1, dtype=np.int64)
+    for row, verse in enumerate(verses):
+        if verse.get("removed"):
+            continue
+        label = verse["book"] if level == "book" else f"{verse['book']} {verse['chapter']}"
+        if label not in positions:
+            positions[label] = len(labels)
+            labels.append(label)
+        groups[row] = positions[label]
+    return labels, groups
+
+
+def crc_rows(embeddings: np.ndarray, value: int = 0, block_rows: int = 4096) -> int:
+    """
+    CRC32 dos vetores (e da forma), lidos em blocos de linhas: em mmap não
+    são carregados de uma vez.
+    """
+    value = zlib.crc32(f"{embeddings.shape}".encode("ascii"), value)
+    for start in range(0, len(embeddings), block_rows):
+        block = np.ascontiguousarray(embeddings[start : start + block_rows], dtype=np.float32)
+        value = zlib.crc32(block.tobytes(), value)
+    return value
+
+
+def fingerprint(
+    verse_ids: np.ndarray,
+    groups: np.ndarray,
+    top_k: int,
+    embeddings: np.ndarray,
+    block_rows: int = 4096,
+) -> int:
+    """
+    Identifica o estado do corpus de que as matrizes foram calculadas: ids,
+    grupos, top_k e os embeddings (um replace_verses muda só os vetores).
+    """
+    data = np.ascontiguousarray(verse_ids, dtype=np.int64).tobytes()
+    data += np.ascontiguousarray(groups, dtype=np.int64).tobytes()
+    return crc_rows(embeddings, zlib.crc32(data + f"{top_k}:".encode("ascii")), block_rows)
+
+
+def similarity_matrices(
+    embeddings: np.ndarray,
+    groups: np.ndarray,
+    num_groups: int,
+    top_k: int = 10,
+    block_rows: int = 1024,
+) -> Dict[str, np.ndarray]:
+    """
+    Matrizes grupo × grupo a partir dos embeddings normalizados dos versos.
+
+    - ``mean``: cosseno entre os centróides (mean pooling) dos grupos;
+    - ``max``: maior similaridade entre um verso de cada grupo (max
+      pooling; o par de um verso consigo mesmo não conta);
+    - ``links``: quantos dos top-k vizinhos dos versos do grupo da linha
+      caem no grupo da coluna.
+
+    As linhas são ordenadas por grupo uma vez; cada bloco de linhas faz um
+    produto contra o corpus inteiro e as reduções por grupo são
+    ``np.maximum.reduceat`` (colunas) e ``np.maximum.at`` (linhas), de modo
+    que a memória fica limitada a block_rows × versos.
+    """
+    live = np.flatnonzero(groups >= 0)
+    order = live[np.argsort(groups[live], kind="stable")]
+    sorted_groups = groups[order]
+    vectors = np.ascontiguousarray(embeddings[order], dtype=np.float32)
+    counts = np.bincount(sorted_groups, minlength=num_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    centroids = np.zeros((num_groups, vectors.shape[1]), dtype=np.float32)
+    np.add.at(centroids, sorted_groups, vectors)
+    norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+    centroids /= np.where(norms > 0, norms, 1)
+    mean = centroids @ centroids.T
+
+    maximum = np.full((num_groups, num_groups), -np.inf, dtype=np.float32)
+    links = np.zeros((num_groups, num_groups), dtype=np.int64)
+    nonempty = counts > 0
+    k = min(top_k, len(vectors) - 1)
+    for start in range(0, len(vectors), block_rows):
+        block = vectors[start : start + block_rows]
+        rows = np.arange(len(block))
+        scores = block @ vectors.T
+        scores[rows, rows + start] = -np.inf
+
+        # Máximo por grupo de coluna, depois por grupo de linha
+        by_column = np.full((len(block), num_groups), -np.inf, dtype=np.float32)
+        by_column[:, nonempty] = np.maximum.reduceat(scores, starts[nonempty], axis=1)
+        np.maximum.at(maximum, sorted_groups[start : start + len(block)], by_column)
+
+        if k > 0:
+            neighbours = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            np.add.at(
+                links,
+                (
+                    np.repeat(sorted_groups[start : start + len(block)], k),
+                    sorted_groups[neighbours].ravel(),
+                ),
+                1,
+            )
+
+    maximum[~np.isfinite(maximum)] = 0.0
+    return {"mean": mean, "max": maximum, "links": links, "counts": counts}
+
+
+def save_matrices(path: str, labels: List[str], matrices: Dict[str, np.ndarray], key: int):
+    """Salva as matrizes (.npz) com os rótulos e a impressão do corpus."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # Temporário por chamada: requisições concorrentes não gravam no mesmo arquivo
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp.npz")
+    os.close(fd)
+    try:
+        np.savez(tmp_path, labels=np.array(labels), fingerprint=np.array(key), **matrices)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_matrices(path: str, key: int):
+    """
+    Matrizes salvas por save_matrices, se ainda corresponderem ao corpus.
+
+    Returns:
+        Tupla (rótulos, matrizes) ou None se ausentes ou desatualizadas
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if int(data["fingerprint"]) != key:
+            return None
+        labels = [str(label) for label in data["labels"]]
+        return labels, {name: data[name] for name in (*METRICS, "counts")}
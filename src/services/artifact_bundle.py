@@ -0,0 +1,230 @@
+"""
+Bundle de artefatos para subir a aplicação offline: pesos e tokenizer do
+encoder e snapshots dos índices em um diretório versionado, com manifest
+(tamanho e sha256 de cada arquivo).
+
+Layout::
+
+    bundles/20261019-120000/
+        manifest.json
+        model/                  # SentenceTransformer.save (pesos + tokenizer)
+        reranker/               # cross-encoder (opcional)
+        indexes/<corpus>/<versão>/ + CURRENT   # mesmo layout de snapshots
+
+Com ``ARTIFACT_BUNDLE=<diretório>``, o BibleService carrega tudo daí
+(``activate_bundle``): Hugging Face em modo offline, SNAPSHOT_DIR apontando
+para ``indexes/`` e o encoder lido de ``model/``. O bundle nunca é
+alterado: deltas e caches vão para SNAPSHOT_LOCAL_DIR, fora dele.
+"""
+
+import json
+import os
+import shutil
+import tarfile
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from src.services import snapshots
+from src.services.index_registry import SHARD_CORPORA, SHARDS
+from src.services.intertextuality_engine import IntertextualityEngine
+
+MANIFEST_FILE = "manifest.json"
+MODEL_DIR = "model"
+RERANKER_DIR = "reranker"
+INDEX_DIR = "indexes"
+
+
+def _snapshot_model(name: str) -> Optional[str]:
+    """Encoder registrado na versão ativa do snapshot do corpus, se houver."""
+    source = snapshots.current_snapshot(snapshots.snapshot_root(name))
+    return snapshots.read_manifest(source).get("model") if source else None
+
+
+def _copy_index(name: str, model, model_name: str, target_root: str, version: str) -> str:
+    """
+    Copia a versão ativa do snapshot do corpus para o bundle (ou publica o
+    índice legado como snapshot) e retorna a versão copiada. Com deltas
+    pendentes, a versão é carregada com eles e publicada no bundle.
+    """
+    root = snapshots.snapshot_root(name)
+    source = snapshots.current_snapshot(root)
+    deltas = os.path.join(snapshots.local_dir(root), "deltas")
+    if source is not None and os.path.isdir(deltas) and os.listdir(deltas):
+        print(f"Aviso: '{name}' tem deltas não compactados; incluídos no bundle como versão {version}")
+        engine = snapshots.load_snapshot(source, model=model, model_name=model_name)
+        snapshots.write_snapshot(engine, target_root, version=version)
+        return version
+    if source is not None:
+        snapshot_version = os.path.basename(source)
+        shutil.copytree(source, os.path.join(target_root, snapshot_version))
+        snapshots.activate(target_root, snapshot_version)
+        return snapshot_version
+
+    _corpus, index_path, meta_path = SHARDS[name]
+    if not os.path.exists(index_path):
+        raise ValueError(f"Índice de '{name}' não encontrado; execute scripts/setup_corpus.py")
+    engine = IntertextualityEngine(model=model, corpus=SHARD_CORPORA[name])
+    engine.model_name = model_name
+    engine.load_index(index_path, meta_path)
+    snapshots.write_snapshot(engine, target_root, version=version)
+    return version
+
+
+def build_bundle(
+    output_dir: str,
+    model_name: Optional[str],
+    corpora: List[str],
+    version: Optional[str] = None,
+    reranker: Optional[str] = None,
+) -> str:
+    """
+    Monta um bundle em ``output_dir/<versão>`` (gravado em um diretório
+    temporário e publicado com rename).
+
+    Args:
+        output_dir: Diretório dos bundles
+        model_name: Encoder (nome no hub ou diretório local; default: o
+            registrado nos snapshots dos corpora)
+        corpora: Corpora incluídos ("nt", "ot", "wh")
+        version: Nome da versão (default: data/hora UTC)
+        reranker: Cross-encoder a incluir (opcional)
+
+    Returns:
+        Diretório do bundle
+
+    Raises:
+        ValueError: Corpus desconhecido ou sem índice, encoder diferente do
+            dos snapshots, dimensão incompatível ou versão existente
+    """
+    from sentence_transformers import CrossEncoder, SentenceTransformer
+
+    unknown = [name for name in corpora if name not in SHARDS]
+    if unknown:
+        raise ValueError(f"Corpus desconhecido: {', '.join(unknown)}")
+    models = {name: _snapshot_model(name) for name in corpora}
+    recorded = sorted({m for m in models.values() if m})
+    if model_name is None:
+        if len(recorded) != 1:
+            raise ValueError("Informe o encoder: os snapshots não registram um modelo único")
+        model_name = recorded[0]
+    mismatched = [name for name, m in models.items() if m and m != model_name]
+    if mismatched:
+        raise ValueError(
+            f"Snapshots de {', '.join(mismatched)} foram gerados com outro encoder "
+            f"(não {model_name}): gere o índice com o mesmo modelo"
+        )
+    version = version or datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    final_dir = os.path.join(output_dir, version)
+    if os.path.exists(final_dir):
+        raise ValueError(f"Bundle já existe: {final_dir}")
+    tmp_dir = os.path.join(output_dir, f".tmp-{version}")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    print(f"⏳ Encoder {model_name}...")
+    model = SentenceTransformer(model_name, device="cpu")
+    model.save(os.path.join(tmp_dir, MODEL_DIR))
+    # Renomeado em versões recentes do sentence-transformers
+    dimension = getattr(model, "get_embedding_dimension", model.get_sentence_embedding_dimension)()
+    if reranker:
+        print(f"⏳ Re-ranker {reranker}...")
+        CrossEncoder(reranker, device="cpu").save(os.path.join(tmp_dir, RERANKER_DIR))
+
+    included = {}
+    for name in corpora:
+        print(f"⏳ Índice '{name}'...")
+        target_root = os.path.join(tmp_dir, INDEX_DIR, name)
+        included[name] = _copy_index(name, model, model_name, target_root, version)
+        manifest = snapshots.read_manifest(os.path.join(target_root, included[name]))
+        if manifest.get("dimension") not in (None, dimension):
+            raise ValueError(
+                f"Índice '{name}' tem dimensão {manifest['dimension']}, "
+                f"o encoder {dimension}: gere o índice com o mesmo modelo"
+            )
+
+    snapshots.write_json_atomic(
+        os.path.join(tmp_dir, MANIFEST_FILE),
+        {
+            "version": version,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "model": model_name,
+            "dimension": dimension,
+            "reranker": reranker,
+            "corpora": included,
+            "files": snapshots.list_files(tmp_dir),
+        },
+    )
+    os.rename(tmp_dir, final_dir)
+    print(f"✓ Bundle {version} em {final_dir}")
+    return final_dir
+
+
+def archive_bundle(path: str) -> str:
+    """Empacota o bundle em ``<bundle>.tar`` (sem compressão: pesos não comprimem)."""
+    archive = path.rstrip(os.sep) + ".tar"
+    with tarfile.open(archive, "w") as tar:
+        tar.add(path, arcname=os.path.basename(path.rstrip(os.sep)))
+    return archive
+
+
+def read_bundle_manifest(path: str) -> Dict:
+    """
+    Manifest de um bundle.
+
+    Raises:
+        ValueError: Se o diretório não for um bundle
+    """
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path) or not os.path.isdir(os.path.join(path, MODEL_DIR)):
+        raise ValueError(f"Bundle inválido (sem manifest ou modelo): {path}")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def verify_bundle(path: str, checksums: bool = True) -> List[str]:
+    """Arquivos ausentes ou divergentes do bundle (lista vazia = íntegro)."""
+    return snapshots.verify_files(path, read_bundle_manifest(path)["files"], checksums)
+
+
+def activate_bundle(path: str) -> Dict:
+    """
+    Prepara o processo para carregar só do bundle: confere os arquivos
+    (tamanhos; sha256 com ``ARTIFACT_VERIFY=sha256``), liga o modo offline
+    do Hugging Face e aponta SNAPSHOT_DIR e RERANKER_MODEL para o bundle;
+    SNAPSHOT_LOCAL_DIR (default ``indexes/bundle-local/<versão>``) recebe
+    o que o serviço grava.
+
+    Returns:
+        Manifest do bundle, com ``model_dir`` (diretório do encoder)
+
+    Raises:
+        ValueError: Bundle ausente, incompleto ou corrompido
+    """
+    manifest = read_bundle_manifest(path)
+    problems = verify_bundle(path, checksums=os.getenv("ARTIFACT_VERIFY", "size") == "sha256")
+    if problems:
+        raise ValueError(f"Bundle {path} corrompido: {', '.join(problems[:5])}")
+
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["TRANSFORMERS_OFFLINE"] = "1"
+    try:
+        import huggingface_hub.constants
+
+        # Lida na importação: o hub já pode ter sido importado
+        huggingface_hub.constants.HF_HUB_OFFLINE = True
+    except ImportError:
+        pass
+    os.environ["SNAPSHOT_DIR"] = os.path.join(path, INDEX_DIR)
+    # Deltas e caches fora do bundle (que pode estar montado só para leitura)
+    if not os.getenv("SNAPSHOT_LOCAL_DIR"):
+        os.environ["SNAPSHOT_LOCAL_DIR"] = os.path.join(
+            "indexes", "bundle-local", manifest["version"]
+        )
+    reranker_dir = os.path.join(path, RERANKER_DIR)
+    if os.path.isdir(reranker_dir):
+        os.environ["RERANKER_MODEL"] = reranker_dir
+    elif os.getenv("RERANKER_MODEL"):
+        print("Aviso: re-ranker fora do bundle; re-ranking desabilitado no modo offline")
+        os.environ["RERANKER_MODEL"] = ""
+    print(f"✓ Bundle {manifest['version']} ({', '.join(manifest['corpora'])}) em modo offline")
+    return {**manifest, "model_dir": os.path.join(path, MODEL_DIR)}
@@ -0,0 +1,387 @@
+import csv
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from src.services.compressed_index import first_pass_depth, is_compressed
+from src.services.verse_ids import assign_verse_ids
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - dependência opcional
+    pa = None
+    pq = None
+
+LINK_COLUMNS = [
+    "source_id",
+    "source_ref",
+    "target_id",
+    "target_ref",
+    "rank",
+    "score",
+]
+
+# Estado de cada processo do pool (carregado uma vez no initializer)
+_worker: Dict = {}
+
+
+def _reference(verse: Dict) -> str:
+    return f"{verse['book']} {verse['chapter']}:{verse['verse']}"
+
+
+def parse_range(spec: Optional[str]) -> Optional[Tuple[int, int]]:
+    """ "3" → (3, 3); "1-5" → (1, 5); None → None."""
+    if not spec:
+        return None
+    start, _, end = spec.partition("-")
+    return int(start), int(end or start)
+
+
+def select_rows(
+    verses: Sequence[Dict],
+    books: Optional[Sequence[str]] = None,
+    chapters: Optional[Tuple[int, int]] = None,
+) -> np.ndarray:
+    """Linhas dos versos vivos dos livros e do intervalo de capítulos pedidos."""
+    wanted = set(books) if books else None
+    return np.array(
+        [
+            row
+            for row, verse in enumerate(verses)
+            if not verse.get("removed")
+            and (wanted is None or verse["book"] in wanted)
+            and (
+                chapters is None or chapters[0] <= int(verse["chapter"]) <= chapters[1]
+            )
+        ],
+        dtype=np.int64,
+    )
+
+
+def _init_worker(index_path: str, meta_path: str, embeddings_path: str, corpus: str):
+    # Um thread de FAISS por processo: o paralelismo vem do pool
+    faiss.omp_set_num_threads(1)
+    with open(meta_path, "r", encoding="utf-8") as f:
+        verses = json.load(f)
+    ids = assign_verse_ids(verses, corpus)
+    order = np.argsort(ids, kind="stable")
+    _worker.update(
+        index=faiss.read_index(index_path),
+        verses=verses,
+        ids=ids,
+        sorted_ids=ids[order],
+        sorted_rows=order,
+        embeddings=np.load(embeddings_path, mmap_mode="r")
+        if os.path.exists(embeddings_path)
+        else None,
+    )
+
+
+def _rescore_rows(
+    vectors: np.ndarray, targets: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Scores exatos dos candidatos (índice comprimido), reordenados por linha."""
+    embeddings = _worker["embeddings"]
+    scores = np.full(targets.shape, -np.inf, dtype="float32")
+    for i, (vector, row_targets) in enumerate(zip(vectors, targets)):
+        valid = row_targets >= 0
+        scores[i, valid] = np.asarray(embeddings[row_targets[valid]], dtype="float32") @ vector
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(scores, order, 1), np.take_along_axis(targets, order, 1)
+
+
+def _vectors(rows: np.ndarray) -> np.ndarray:
+    if _worker["embeddings"] is not None:
+        return np.ascontiguousarray(_worker["embeddings"][rows], dtype="float32")
+    index = _worker["index"]
+    return np.vstack([index.reconstruct(int(_worker["ids"][row])) for row in rows])
+
+
+def _candidates(rows: np.ndarray, depth: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(scores, linhas) dos ``depth`` vizinhos de cada linha (-1 = sem verso)."""
+    ids = _worker["ids"]
+    rescores = _worker["embeddings"] is not None and is_compressed(_worker["index"])
+    if rescores:
+        depth = first_pass_depth(depth)
+    depth = min(depth, _worker["index"].ntotal)
+    vectors = _vectors(rows)
+    scores, labels = _worker["index"].search(vectors, depth)
+
+    pos = np.clip(
+        np.searchsorted(_worker["sorted_ids"], labels), 0, len(ids) - 1
+    )
+    targets = _worker["sorted_rows"][pos]
+    targets[_worker["sorted_ids"][pos] != labels] = -1
+    if rescores:
+        scores, targets = _rescore_rows(vectors, targets)
+    return scores, targets
+
+
+def _row_links(
+    row: int,
+    row_scores: np.ndarray,
+    row_targets: np.ndarray,
+    top_k: int,
+    min_score: Optional[float],
+    exclude_same_book: bool,
+) -> Tuple[List[Tuple[int, float]], bool]:
+    """
+    Links de um verso entre os candidatos.
+
+    Returns:
+        Tupla (lista (linha alvo, score), True se os candidatos bastaram:
+        top_k links ou score mínimo atingido)
+    """
+    verses = _worker["verses"]
+    source = verses[row]
+    links = []
+    for score, target in zip(row_scores, row_targets):
+        if len(links) == top_k or (min_score is not None and score < min_score):
+            return links, True
+        if target < 0 or target == row or verses[target].get("removed"):
+            continue
+        if exclude_same_book and verses[target]["book"] == source["book"]:
+            continue
+        links.append((int(target), float(score)))
+    return links, len(links) == top_k
+
+
+def _search_shard(
+    shard: int,
+    rows: np.ndarray,
+    top_k: int,
+    min_score: Optional[float],
+    exclude_same_book: bool,
+    output_dir: str,
+    fmt: str,
+) -> Tuple[int, int]:
+    """
+    Busca em lote os vizinhos de ``rows`` e grava um shard de saída. Os
+    versos que não completam top_k links na profundidade inicial (mesmo
+    livro filtrado, tombstones) são buscados de novo com o quádruplo da
+    profundidade, até o índice inteiro.
+    """
+    verses, ids = _worker["verses"], _worker["ids"]
+    ntotal = _worker["index"].ntotal
+    # Folga para o próprio verso e, se filtrado, versos do mesmo livro
+    depth = top_k + 1 if not exclude_same_book else top_k * 4 + 1
+    found: Dict[int, List[Tuple[int, float]]] = {}
+    pending = rows
+    while len(pending):
+        scores, targets = _candidates(pending, depth)
+        retry = []
+        for row, row_scores, row_targets in zip(pending, scores, targets):
+            links, complete = _row_links(
+                int(row), row_scores, row_targets, top_k, min_score, exclude_same_book
+            )
+            if complete or depth >= ntotal:
+                found[int(row)] = links
+            else:
+                retry.append(row)
+        pending = np.array(retry, dtype=np.int64)
+        depth *= 4
+
+    records: Dict[str, List] = {column: [] for column in LINK_COLUMNS}
+    for row in rows:
+        source = verses[row]
+        for rank, (target, score) in enumerate(found[int(row)], 1):
+            records["source_id"].append(int(ids[row]))
+            records["source_ref"].append(_reference(source))
+            records["target_id"].append(int(ids[target]))
+            records["target_ref"].append(_reference(verses[target]))
+            records["rank"].append(rank)
+            records["score"].append(round(float(score), 6))
+
+    write_shard(records, shard_path(output_dir, shard, fmt), fmt)
+    return shard, len(records["rank"])
+
+
+def shard_path(output_dir: str, shard: int, fmt: str) -> str:
+    return os.path.join(output_dir, f"part-{shard:05d}.{fmt}")
+
+
+def write_shard(records: Dict[str, List], path: str, fmt: str):
+    """Grava um shard de forma atômica (arquivo temporário + rename)."""
+    tmp_path = path + ".tmp"
+    if fmt == "parquet":
+        pq.write_table(pa.table(records), tmp_path)
+    else:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(LINK_COLUMNS)
+            writer.writerows(zip(*(records[column] for column in LINK_COLUMNS)))
+    os.replace(tmp_path, path)
+
+
+class BatchLinkJob:
+    """
+    Links intertextuais de todos os versos (ou de um recorte) de um corpus.
+
+    Os versos são divididos em shards de ``batch_size``; cada shard é uma
+    busca em lote no índice FAISS com os vetores já persistidos (sem
+    recodificar), executada em um pool de processos, e vira um arquivo
+    ``part-NNNNN.{parquet,csv}``. Shards já gravados são o checkpoint: uma
+    execução interrompida refaz só os que faltam.
+    """
+
+    def __init__(
+        self,
+        index_path: str,
+        meta_path: str,
+        output_dir: str,
+        corpus: str = "sblgnt",
+        top_k: int = 10,
+        min_score: Optional[float] = None,
+        exclude_same_book: bool = False,
+        batch_size: int = 512,
+        workers: Optional[int] = None,
+        fmt: Optional[str] = None,
+    ):
+        """
+        Args:
+            index_path, meta_path: Índice FAISS e metadados persistidos
+            output_dir: Diretório dos shards de saída
+            corpus: Corpus dos ids estáveis
+            top_k: Links por verso
+            min_score: Score mínimo de um link
+            exclude_same_book: Ignora links dentro do mesmo livro
+            batch_size: Versos por shard
+            workers: Processos (default: número de CPUs)
+            fmt: "parquet" ou "csv" (default: parquet se pyarrow instalado)
+
+        Raises:
+            ValueError: Se fmt="parquet" sem pyarrow instalado
+        """
+        fmt = fmt or ("parquet" if pq is not None else "csv")
+        if fmt == "parquet" and pq is None:
+            raise ValueError("Formato parquet requer pyarrow (pip install pyarrow)")
+        if fmt not in ("parquet", "csv"):
+            raise ValueError(f"Formato desconhecido: {fmt}")
+        # Import tardio: os processos do pool não carregam o engine (torch)
+        from src.services.intertextuality_engine import IntertextualityEngine
+
+        self.index_path = index_path
+        self.meta_path = meta_path
+        self.embeddings_path = IntertextualityEngine._sibling_path(
+            index_path, "embeddings", ".npy"
+        )
+        self.output_dir = output_dir
+        self.corpus = corpus
+        self.top_k = top_k
+        self.min_score = min_score
+        self.exclude_same_book = exclude_same_book
+        self.batch_size = batch_size
+        self.workers = workers or os.cpu_count() or 1
+        self.fmt = fmt
+
+    @staticmethod
+    def _file_stamp(path: str) -> Optional[Dict]:
+        """Tamanho e mtime de um arquivo (None se ausente)."""
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        return {"bytes": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def _manifest(self, rows: np.ndarray) -> Dict:
+        return {
+            "index": os.path.abspath(self.index_path),
+            # Índice regravado no mesmo caminho invalida os shards
+            "files": {
+                name: self._file_stamp(path)
+                for name, path in (
+                    ("index", self.index_path),
+                    ("meta", self.meta_path),
+                    ("embeddings", self.embeddings_path),
+                )
+            },
+            "rows": int(len(rows)),
+            "first_row": int(rows[0]) if len(rows) else None,
+            "last_row": int(rows[-1]) if len(rows) else None,
+            "top_k": self.top_k,
+            "min_score": self.min_score,
+            "exclude_same_book": self.exclude_same_book,
+            "batch_size": self.batch_size,
+            "format": self.fmt,
+        }
+
+    def _prepare(self, rows: np.ndarray, restart: bool):
+        """Começa do zero se pedido ou se os parâmetros mudaram."""
+        manifest = self._manifest(rows)
+        manifest_path = os.path.join(self.output_dir, "manifest.json")
+        previous = None
+        if os.path.exists(manifest_path) and not restart:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        if previous != manifest:
+            if os.path.isdir(self.output_dir):
+                for name in os.listdir(self.output_dir):
+                    if name.startswith("part-"):
+                        os.remove(os.path.join(self.output_dir, name))
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+
+    def run(
+        self,
+        books: Optional[Sequence[str]] = None,
+        chapters: Optional[Tuple[int, int]] = None,
+        restart: bool = False,
+    ) -> Dict:
+        """
+        Calcula os links dos versos selecionados.
+
+        Returns:
+            Dict com shards totais, shards calculados nesta execução e links
+            gravados nesta execução
+        """
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            rows = select_rows(json.load(f), books, chapters)
+        self._prepare(rows, restart)
+
+        shards = [
+            (shard, rows[start : start + self.batch_size])
+            for shard, start in enumerate(range(0, len(rows), self.batch_size))
+        ]
+        pending = [
+            (shard, shard_rows)
+            for shard, shard_rows in shards
+            if not os.path.exists(shard_path(self.output_dir, shard, self.fmt))
+        ]
+        if len(pending) < len(shards):
+            print(f"✓ Retomando: {len(shards) - len(pending)}/{len(shards)} shards prontos")
+
+        links = 0
+        if pending:
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(pending)),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.index_path, self.meta_path, self.embeddings_path, self.corpus),
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _search_shard,
+                        shard,
+                        shard_rows,
+                        self.top_k,
+                        self.min_score,
+                        self.exclude_same_book,
+                        self.output_dir,
+                        self.fmt,
+                    )
+                    for shard, shard_rows in pending
+                ]
+                for done, future in enumerate(as_completed(futures), 1):
+                    _shard, count = future.result()
+                    links += count
+                    print(f"  Shards: {done}/{len(pending)} ({links:,} links)", end="\r")
+            print()
+
+        print(f"✓ {len(shards)} shards em {self.output_dir}")
+        return {"shards": len(shards), "computed": len(pending), "links": links}
@@ -1,4 +1,9 @@
+import base64
+import json
 import os
+import threading
+import time
+from datetime import datetime, timezone
 from typing import Dict, List, Optional, Tuple
 
 from src.providers.anthropic_provider import AnthropicProvider
@@ -7,11 +12,20 @@ from src.providers.hf_provider import HuggingFaceProvider
 from src.providers.llm_base import DummyProvider, LLMProvider
 from src.providers.ollama_provider import OllamaProvider
 from src.providers.openai_provider import OpenAIProvider
+from src.providers.stub_provider import StubProvider
+from src.services import metrics, tracing
+from src.services.greek_text import normalize_greek
 
 try:
+    from src.services import artifact_bundle, snapshots
+    from src.services.index_registry import TESTAMENT_SHARDS, IndexRegistry
     from src.services.intertextuality_engine import IntertextualityEngine
 except ImportError:  # noqa: PERF401
     IntertextualityEngine = None
+    IndexRegistry = None
+    TESTAMENT_SHARDS = ()
+    artifact_bundle = None
+    snapshots = None
 
 
 class BibleService:
@@ -21,17 +35,28 @@ class BibleService:
         # Engine
         self.intertextuality_engine = None
         self.index_loaded = False
+        # Corpora nomeados (NT = intertextuality_engine, fixo; AT, WH e
+        # traduções carregados sob demanda)
+        self.index_registry = None
         if IntertextualityEngine is not None:
             try:
-                self.intertextuality_engine = IntertextualityEngine()
-                self.intertextuality_engine.load_index()
+                self.intertextuality_engine = self._load_nt_engine()
                 self.index_loaded = self.intertextuality_engine.index is not None
                 if not self.index_loaded:
                     print(
                         "Aviso: Índice FAISS não encontrado. "
                         "Execute 'python scripts/setup_corpus.py'."
                     )
+                else:
+                    self.index_registry = IndexRegistry()
+                    self.index_registry.add(
+                        "nt", self.intertextuality_engine, pin=True
+                    )
+                    self.index_registry.load(["ot"])
             except Exception as e:  # noqa: BLE001
+                if os.getenv("ARTIFACT_BUNDLE"):
+                    # Modo offline: sem o bundle a API não tem o que servir
+                    raise
                 print(
                     "Aviso: Motor de intertextualidade não pôde ser "
                     f"inicializado: {e}"
@@ -43,7 +68,226 @@ class BibleService:
             self._cache_max = int(os.getenv("CACHE_MAX_SIZE", "128"))
         except ValueError:
             self._cache_max = 128
-        self._similarity_cache: Dict[Tuple[str, int], List[Tuple[Dict, float]]] = {}
+        self._similarity_cache: Dict[
+            Tuple[str, int, str, bool, str, str, int], List[Tuple[Dict, float]]
+        ] = {}
+        # Incrementada a cada troca de índice: entradas de cache gravadas
+        # por buscas iniciadas antes da troca nunca mais são lidas
+        self._index_generation = 0
+
+        # Recarga de snapshots em background (endpoint ou SNAPSHOT_WATCH_SECONDS)
+        self._reload_lock = threading.Lock()
+        self._reload_thread: Optional[threading.Thread] = None
+        self.reload_status: Dict = {"state": "idle"}
+        watch_seconds = float(os.getenv("SNAPSHOT_WATCH_SECONDS", "0"))
+        if watch_seconds > 0 and snapshots is not None:
+            threading.Thread(
+                target=self._watch_snapshots,
+                args=(watch_seconds,),
+                name="snapshot-watch",
+                daemon=True,
+            ).start()
+
+    @staticmethod
+    def _shard_name(corpus: Optional[str]) -> str:
+        """Shard de um corpus (None = "nt"), mesmo sem o motor instalado."""
+        if not corpus:
+            return "nt"
+        return IndexRegistry.resolve(corpus) if IndexRegistry is not None else corpus
+
+    def _engine_for(self, corpus: Optional[str]):
+        """
+        Engine de um corpus nomeado (None = NT/SBLGNT).
+
+        Raises:
+            ValueError: Se o corpus não existir
+        """
+        if self._shard_name(corpus) == "nt":
+            return self.intertextuality_engine
+        if self.index_registry is None:
+            raise ValueError(f"Corpus não disponível: {corpus}")
+        return self.index_registry.get(corpus)
+
+    def list_corpora(self) -> Dict:
+        """Corpora disponíveis e carregados, com uso de memória."""
+        if self.index_registry is None:
+            return {"available": [], "loaded": [], "memory_mb": 0, "budget_mb": 0}
+        return self.index_registry.stats()
+
+    # ------------------------------------------------------------------
+    # Snapshots: recarga sem reinício
+    # ------------------------------------------------------------------
+
+    def _loaded_engines(self) -> Dict:
+        engines = dict(self.index_registry.engines) if self.index_registry else {}
+        if self.intertextuality_engine is not None:
+            engines["nt"] = self.intertextuality_engine
+        return engines
+
+    def snapshot_status(self) -> Dict:
+        """Versões carregadas e ativas em disco, snapshots do NT e última recarga."""
+        if snapshots is None:
+            return {"loaded": {}, "current": {}, "snapshots": [], "reload": self.reload_status}
+        loaded = {
+            name: engine.snapshot_version for name, engine in self._loaded_engines().items()
+        }
+        return {
+            "loaded": loaded,
+            "current": {
+                name: snapshots.current_version(snapshots.snapshot_root(name))
+                for name in loaded
+            },
+            "snapshots": snapshots.list_snapshots(snapshots.snapshot_root("nt")),
+            "reload": dict(self.reload_status),
+        }
+
+    def reload_index(
+        self, corpus: str = "nt", version: Optional[str] = None, wait: bool = False
+    ) -> Dict:
+        """
+        Carrega um snapshot em background e troca o engine do corpus quando
+        ele estiver pronto; as buscas continuam no engine antigo até a troca.
+        Uma versão diferente da ativa passa a ser a ativa (rollback).
+
+        Args:
+            corpus: Corpus ("nt", "ot", "wh" ou aliases)
+            version: Versão (default: a apontada por CURRENT)
+            wait: Se True, só retorna após a troca
+
+        Returns:
+            Estado da recarga
+
+        Raises:
+            ValueError: Sem snapshot, versão inválida ou recarga em andamento
+        """
+        if snapshots is None:
+            raise ValueError("Motor de intertextualidade indisponível")
+        name = self._shard_name(corpus)
+        root = snapshots.snapshot_root(name)
+        version = version or snapshots.current_version(root)
+        if version is None:
+            raise ValueError(f"Nenhum snapshot de '{name}' em {root}")
+        snapshots.check_version(root, version)
+        if name != "nt" and self.index_registry is None:
+            raise ValueError("Índice do NT não carregado")
+
+        with self._reload_lock:
+            if self._reload_thread is not None and self._reload_thread.is_alive():
+                raise ValueError("Já existe uma recarga em andamento")
+            self.reload_status = {"state": "loading", "corpus": name, "version": version}
+            thread = threading.Thread(
+                target=self._reload, args=(name, root, version), name="snapshot-reload", daemon=True
+            )
+            self._reload_thread = thread
+            thread.start()
+        if wait:
+            thread.join()
+        return dict(self.reload_status)
+
+    def _reload(self, name: str, root: str, version: str):
+        start = time.perf_counter()
+        try:
+            path = os.path.join(root, version)
+            model_name = self._snapshot_model_name(snapshots.read_manifest(path))
+            previous = self._loaded_engines().get(name) or self.intertextuality_engine
+            same_model = previous is not None and previous.model_name == model_name
+            engine = snapshots.load_snapshot(
+                path, model=previous.model if same_model else None, model_name=model_name
+            )
+            if same_model:
+                # Mesmo encoder: os embeddings de queries continuam válidos
+                engine._query_cache = previous._query_cache
+            if previous is not None:
+                engine._reranker = previous._reranker
+            self._swap_engine(name, engine)
+            if engine._reranker is not None:
+                # Só o modelo é reaproveitado: o cache é por referência, e a
+                # versão nova pode ter outro texto no mesmo verso
+                engine._reranker.clear_cache()
+            if snapshots.current_version(root) != version:
+                snapshots.activate(root, version)
+            self.reload_status = {
+                "state": "done",
+                "corpus": name,
+                "version": version,
+                "seconds": round(time.perf_counter() - start, 3),
+                "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            }
+            print(f"✓ Snapshot {version} de '{name}' ativo ({len(engine.verses):,} versos)")
+        except Exception as e:  # noqa: BLE001
+            self.reload_status = {
+                "state": "failed",
+                "corpus": name,
+                "version": version,
+                "error": str(e),
+            }
+            print(f"Erro ao recarregar snapshot {version} de '{name}': {e}")
+
+    def _swap_engine(self, name: str, engine):
+        """Troca o engine de um corpus (atribuição atômica) e invalida o cache."""
+        if name == "nt":
+            if self.index_registry is None:
+                self.index_registry = IndexRegistry()
+            self.index_registry.add("nt", engine, pin=True)
+            self.intertextuality_engine = engine
+            self.index_loaded = engine.index is not None
+        else:
+            self.index_registry.add(name, engine)
+        self._index_generation += 1
+        self._similarity_cache.clear()
+
+    def _watch_snapshots(self, interval: float):
+        """Recarrega os corpora carregados quando o CURRENT em disco muda."""
+        while True:
+            time.sleep(interval)
+            for name, engine in self._loaded_engines().items():
+                version = snapshots.current_version(snapshots.snapshot_root(name))
+                status = self.reload_status
+                failed = status.get("state") == "failed" and (
+                    status.get("corpus"),
+                    status.get("version"),
+                ) == (name, version)
+                if version is None or version == engine.snapshot_version or failed:
+                    continue
+                try:
+                    self.reload_index(name, version, wait=True)
+                except ValueError as e:
+                    print(f"Aviso: recarga automática de '{name}' ignorada: {e}")
+
+    @staticmethod
+    def _snapshot_model_name(manifest: Dict) -> str:
+        """
+        Encoder de um snapshot: o do manifest ou, em modo bundle, o diretório
+        do modelo do bundle (os snapshots do bundle usam o mesmo modelo).
+        """
+        bundle_path = os.getenv("ARTIFACT_BUNDLE")
+        if bundle_path:
+            return os.path.join(bundle_path, artifact_bundle.MODEL_DIR)
+        return manifest["model"]
+
+    @staticmethod
+    def _load_nt_engine():
+        """
+        Engine do NT: do bundle (``ARTIFACT_BUNDLE``, offline), da versão
+        ativa do snapshot ou, sem snapshot, do índice legado.
+
+        Raises:
+            ValueError: Bundle inválido ou sem snapshot do NT
+        """
+        bundle_path = os.getenv("ARTIFACT_BUNDLE")
+        if bundle_path:
+            # Encoder e índices só do bundle: nada é buscado no hub
+            bundle = artifact_bundle.activate_bundle(bundle_path)
+            snapshot = snapshots.current_snapshot(snapshots.snapshot_root("nt"))
+            if snapshot is None:
+                raise ValueError(f"Bundle {bundle_path} sem snapshot do NT")
+            return snapshots.load_snapshot(snapshot, model_name=bundle["model_dir"])
+        snapshot = snapshots.current_snapshot(snapshots.snapshot_root("nt"))
+        if snapshot is not None:
+            return snapshots.load_snapshot(snapshot)
+        engine = IntertextualityEngine()
+        engine.load_index()
+        return engine
 
     def _init_provider(self, name: str) -> LLMProvider:
         mapping = {
@@ -53,6 +297,7 @@ class BibleService:
             "hf": HuggingFaceProvider,
             "huggingface": HuggingFaceProvider,
             "ollama": OllamaProvider,
+            "stub": StubProvider,
         }
         provider_cls = mapping.get(name)
         if provider_cls is None:
@@ -124,12 +369,26 @@ class BibleService:
         )
         prompt = system_prompt + question
         try:
-            return provider_to_use.generate(prompt, model=model_to_use)
+            with metrics.timed(
+                metrics.LLM_SECONDS,
+                provider_to_use.name,
+                model_to_use or "default",
+                span="llm",
+            ):
+                return provider_to_use.generate(prompt, model=model_to_use)
         except Exception as e:  # noqa: BLE001
+            metrics.record_provider_error(provider_to_use.name, e)
             return f"Erro ao gerar resposta: {e}"
 
     def find_similar_verses(
-        self, query: str, top_k: int = 5
+        self,
+        query: str,
+        top_k: int = 5,
+        granularity: str = "verse",
+        rerank: bool = False,
+        hybrid: bool = False,
+        testament: str = "nt",
+        corpus: Optional[str] = None,
     ) -> List[Tuple[Dict, float]]:
         """
         Busca versos similares usando o motor de intertextualidade.
@@ -137,28 +396,378 @@ class BibleService:
         Args:
             query: Texto ou referência para buscar
             top_k: Número de resultados
+            granularity: "verse" (índice de versos), "passage" (janelas de
+                versos consecutivos) ou "coarse" (capítulos → versos)
+            rerank: Re-ranqueia os versos com o cross-encoder (só para
+                granularity="verse"; sem efeito se RERANKER_MODEL vazio)
+            hybrid: Funde busca vetorial e lexical (BM25 sobre lemas); os
+                versos retornados trazem ``shared_lemmas`` (só com
+                granularity="verse" e sem rerank)
+            testament: "nt" (SBLGNT), "ot" (BHSA) ou "all" (shards em
+                paralelo); fora do NT só há busca por verso, sem rerank
+                nem híbrida
+            corpus: Corpus nomeado ("sblgnt", "wh", "bhsa" ou de
+                CORPORA_CONFIG), carregado sob demanda; tem precedência
+                sobre ``testament``
 
         Returns:
-            Lista de tuplas (verso, score)
+            Lista de tuplas (verso ou passagem, score)
+
+        Raises:
+            ValueError: Se o corpus não existir ou a combinação de opções
+                não for suportada
         """
+        if hybrid and (granularity != "verse" or rerank):
+            raise ValueError("Busca híbrida só com granularity='verse' e sem rerank")
+        if not corpus and testament != "nt" and (granularity != "verse" or rerank or hybrid):
+            raise ValueError(
+                f"testament='{testament}' só tem busca por verso (sem granularity, rerank ou hybrid)"
+            )
         if self.intertextuality_engine is None or not self.index_loaded:
             return []
-        key = (query, top_k)
-        if self._cache_enabled and key in self._similarity_cache:
+        if corpus:
+            testament = "nt"
+        # Resultados re-ranqueados não entram neste cache: o re-ranker tem
+        # cache próprio por par (query, verso) e pode ter caído no fallback
+        # do primeiro estágio por falta de orçamento.
+        use_cache = self._cache_enabled and not rerank
+        if corpus:
+            names = [self._shard_name(corpus)]
+        elif testament == "all":
+            names = list(TESTAMENT_SHARDS)
+        else:
+            names = [self._shard_name(testament)]
+        key = (
+            self._cache_query(query, names),
+            top_k,
+            granularity,
+            hybrid,
+            testament,
+            self._shard_name(corpus),
+            self._index_generation,
+        )
+        if use_cache and key in self._similarity_cache:
+            metrics.cache_event("similarity", "hit")
+            tracing.record("result_cache_hit", 0.0)
             return self._similarity_cache[key]
+        if use_cache:
+            metrics.cache_event("similarity", "miss")
+        # Depois do cache: um acerto não carrega o corpus sob demanda
+        engine = self._engine_for(corpus)
         try:
-            results = self.intertextuality_engine.find_similar(query, top_k)
-            if self._cache_enabled:
+            match = None
+            if testament != "nt":
+                if self.index_registry is None:
+                    return []
+                shards = None if testament == "all" else [testament]
+                # Os shards rodam em um pool próprio: um span para o conjunto
+                with tracing.span("shard_search"):
+                    results = self.index_registry.search(query, top_k, shards)
+            elif hybrid:
+                results = engine.find_similar_hybrid(query, top_k)
+            elif granularity == "passage":
+                results = engine.find_similar_passages(query, top_k)
+            elif granularity == "coarse":
+                results = engine.find_similar_coarse_to_fine(query, top_k)
+            else:
+                extra = {"rerank": True} if rerank else {}
+                if hasattr(engine, "find_by_reference"):
+                    # Referências ("João 3:16") usam o vetor já indexado do verso
+                    match = engine.find_by_reference(query, top_k, **extra)
+                if match is not None:
+                    results = match[1]
+                else:
+                    results = engine.find_similar(query, top_k, **extra)
+            if corpus:
+                name = self._shard_name(corpus)
+                results = [({**verse, "corpus": name}, score) for verse, score in results]
+            if use_cache:
                 if len(self._similarity_cache) >= self._cache_max:
                     # política simples: remove primeira chave inserida
                     first_key = next(iter(self._similarity_cache.keys()))
                     self._similarity_cache.pop(first_key, None)
+                    metrics.cache_event("similarity", "eviction")
                 self._similarity_cache[key] = results
             return results
         except Exception as e:  # noqa: BLE001
             print(f"Erro na busca de similaridade: {e}")
             return []
 
+    def _cache_query(self, query: str, names: List[str]) -> str:
+        """
+        Query na chave do cache de similaridade: a forma canônica ("ἀγάπη",
+        "αγαπη" e "ΑΓΑΠΗ" compartilham a entrada) só quando todos os corpora
+        da busca estão carregados e normalizam as queries (campo
+        ``normalized``); senão, a query como veio.
+        """
+        engines = self._loaded_engines()
+        if names and all(
+            getattr(engines.get(name), "canonical_inputs", False) for name in names
+        ):
+            return normalize_greek(query)
+        return query
+
+    @staticmethod
+    def _encode_cursor(score: float, row: int) -> str:
+        payload = json.dumps({"s": score, "r": row}).encode("utf-8")
+        return base64.urlsafe_b64encode(payload).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[float, int]:
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            return float(data["s"]), int(data["r"])
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Cursor inválido: {cursor}") from e
+
+    def find_verses_above_threshold(
+        self,
+        query: str,
+        threshold: float,
+        page_size: int = 50,
+        cursor: Optional[str] = None,
+        include_text: bool = True,
+        corpus: Optional[str] = None,
+    ) -> Dict:
+        """
+        Busca paginada de todos os versos com similaridade acima do threshold.
+
+        Args:
+            query: Texto ou referência para buscar
+            threshold: Similaridade mínima
+            page_size: Itens por página
+            cursor: Cursor opaco retornado pela página anterior
+            include_text: Se False, omite o texto dos versos
+            corpus: Corpus nomeado (default: NT/SBLGNT)
+
+        Returns:
+            Dict com total, results e next_cursor (None na última página)
+
+        Raises:
+            ValueError: Se o cursor for inválido ou o corpus não existir
+        """
+        page = {"total": 0, "results": [], "next_cursor": None}
+        after = self._decode_cursor(cursor) if cursor else None
+        if self.intertextuality_engine is None or not self.index_loaded:
+            return page
+        engine = self._engine_for(corpus)
+
+        try:
+            rows, total = engine.find_above_threshold(
+                query, threshold, page_size, after
+            )
+        except Exception as e:  # noqa: BLE001
+            print(f"Erro na busca por threshold: {e}")
+            return page
+
+        for row, score in rows:
+            verse = engine.verses[row]
+            item = {
+                "verse_id": int(engine.verse_ids[row]),
+                "book": verse["book"],
+                "chapter": verse["chapter"],
+                "verse": verse["verse"],
+                "similarity_score": score,
+            }
+            if include_text:
+                item["text"] = verse["text"]
+            page["results"].append(item)
+
+        page["total"] = total
+        if len(rows) == page_size:
+            last_row, last_score = rows[-1]
+            page["next_cursor"] = self._encode_cursor(last_score, last_row)
+        return page
+
+    def search_morphology(
+        self,
+        words: List[Dict[str, str]],
+        op: str = "and",
+        query: Optional[str] = None,
+        top_k: int = 10,
+        limit: int = 100,
+    ) -> Dict:
+        """
+        Busca estruturada por traços morfológicos, opcionalmente ranqueada
+        semanticamente por uma query (a morfologia atua como pré-filtro).
+
+        Args:
+            words: Especificações de palavra (ver MorphologyIndex.query)
+            op: "and" ou "or" entre as especificações
+            query: Texto para ranquear os versos filtrados (opcional)
+            top_k: Resultados quando há query
+            limit: Máximo de versos listados quando não há query
+
+        Returns:
+            Dict com total de versos filtrados e results [(verso, score)];
+            score é None quando não há query
+
+        Raises:
+            ValueError: Para traços, valores ou operador inválidos
+        """
+        engine = self.intertextuality_engine
+        if engine is None or not self.index_loaded:
+            return {"total": 0, "results": []}
+
+        rows = engine.search_morphology(words, op)
+        if query and len(rows):
+            results = engine.find_similar(query, top_k, verse_filter=rows)
+        else:
+            results = [(engine.verses[int(row)], None) for row in rows[:limit]]
+        return {"total": int(len(rows)), "results": results}
+
+    def find_quotations(
+        self, query: str, top_k: int = 10, min_span: Optional[int] = None
+    ) -> List[Tuple[Dict, float, List[Dict]]]:
+        """
+        Busca citações quase literais (trechos longos em comum).
+
+        Returns:
+            Lista de tuplas (verso, jaccard estimado, trechos alinhados)
+        """
+        engine = self.intertextuality_engine
+        if engine is None or not self.index_loaded:
+            return []
+        try:
+            return engine.find_quotations(query, top_k, min_span)
+        except Exception as e:  # noqa: BLE001
+            print(f"Erro na busca de citações: {e}")
+            return []
+
+    def concordance(
+        self,
+        query: str,
+        offset: int = 0,
+        limit: int = 50,
+        context: int = 40,
+        count_only: bool = False,
+    ) -> Dict:
+        """
+        Concordância KWIC de uma forma ou frase grega.
+
+        Returns:
+            Dict com total de ocorrências e lines (book, chapter, verse,
+            left, match, right); lines vazio se count_only
+        """
+        engine = self.intertextuality_engine
+        if engine is None or not self.index_loaded:
+            return {"total": 0, "lines": []}
+
+        concordance = engine.get_concordance()
+        if count_only:
+            return {"total": concordance.count(query), "lines": []}
+
+        total, lines = concordance.kwic(query, offset, limit, context)
+        for line in lines:
+            verse = engine.verses[line.pop("row")]
+            line.update(
+                book=verse["book"], chapter=verse["chapter"], verse=verse["verse"]
+            )
+        return {"total": total, "lines": lines}
+
+    def similarity_matrix(
+        self, level: str = "book", metric: str = "mean", corpus: Optional[str] = None
+    ) -> Dict:
+        """
+        Matriz de similaridade entre livros ou capítulos (dados de heatmap).
+
+        Args:
+            level: "book" ou "chapter"
+            metric: "mean" (centróides), "max" (par de versos mais próximo)
+                ou "links" (contagem de vizinhos top-k)
+            corpus: Corpus nomeado (default: NT/SBLGNT)
+
+        Returns:
+            Dict com labels, matrix (lista de linhas) e verse_counts
+
+        Raises:
+            ValueError: Para nível, métrica ou corpus inválidos
+        """
+        if metric not in ("mean", "max", "links"):
+            raise ValueError(f"Métrica inválida: {metric} (use mean, max ou links)")
+        if self.intertextuality_engine is None or not self.index_loaded:
+            return {"labels": [], "matrix": [], "verse_counts": []}
+        engine = self._engine_for(corpus)
+        labels, matrices = engine.get_similarity_matrices(level)
+        matrix = matrices[metric]
+        if metric != "links":
+            matrix = matrix.round(4)
+        return {
+            "labels": labels,
+            "matrix": matrix.tolist(),
+            "verse_counts": matrices["counts"].tolist(),
+        }
+
+    def upsert_verses(self, verses: List[Dict]) -> List[int]:
+        """
+        Adiciona ou substitui versos no índice em memória (gravados como
+        deltas) e limpa o cache de similaridade. Cada verso vai para o
+        engine do seu ``corpus`` (default: NT/SBLGNT).
+
+        Returns:
+            Ids estáveis dos versos, na ordem recebida
+
+        Raises:
+            ValueError: Se o índice não estiver carregado ou um corpus não
+                existir (nenhum engine é alterado nesse caso)
+        """
+        if self.intertextuality_engine is None or not self.index_loaded:
+            raise ValueError("Índice não carregado")
+        groups: Dict[str, List[Tuple[int, Dict]]] = {}
+        for position, verse in enumerate(verses):
+            verse = dict(verse)
+            # O id usa o corpus do engine ("ot" e "bhsa" dão o mesmo id)
+            corpus = verse.pop("corpus", None) or "nt"
+            groups.setdefault(corpus, []).append((position, verse))
+        engines = {corpus: self._engine_for(corpus) for corpus in groups}
+
+        ids: List[int] = [0] * len(verses)
+        for corpus, items in groups.items():
+            group_ids = engines[corpus].replace_verses([verse for _, verse in items])
+            for (position, _), verse_id in zip(items, group_ids):
+                ids[position] = verse_id
+        self._similarity_cache.clear()
+        return ids
+
+    def remove_verses(self, references: List[str]) -> List[int]:
+        """
+        Remove versos por referência ("João 3:16") e limpa o cache.
+
+        Returns:
+            Ids estáveis removidos
+
+        Raises:
+            ValueError: Se o índice não estiver carregado ou uma referência
+                não existir no corpus
+        """
+        engine = self.intertextuality_engine
+        if engine is None or not self.index_loaded:
+            raise ValueError("Índice não carregado")
+        ids = []
+        for reference in references:
+            row = engine.lookup_reference(reference)
+            if row is None:
+                raise ValueError(f"Referência não encontrada: {reference}")
+            ids.append(int(engine.verse_ids[row]))
+        removed = engine.remove_verses(ids)
+        self._similarity_cache.clear()
+        return removed
+
+    def resolve_reference(
+        self, query: str, corpus: Optional[str] = None
+    ) -> Optional[Dict]:
+        """
+        Retorna o verso de origem quando a query é uma referência bíblica
+        presente no índice (ex.: "João 3:16", "Rev 12:1").
+        """
+        if self.intertextuality_engine is None or not self.index_loaded:
+            return None
+        engine = self._engine_for(corpus)
+        if not hasattr(engine, "lookup_reference"):
+            return None
+        row = engine.lookup_reference(query)
+        return engine.verses[row] if row is not None else None
+
     def explain_intertextual_links(
         self, verse_text: str, links: List[Tuple[Dict, float]]
     ) -> str:
@@ -179,8 +788,13 @@ class BibleService:
         links_context = "\n".join(
             [
                 (
-                    f"- {v['book']} {v['chapter']}:{v['verse']} "
-                    f"(sim: {score:.2%})\n  {v['text'][:100]}..."
+                    f"- {v['book']} {v['chapter']}:{v['verse']}"
+                    + (
+                        f"–{v['end_chapter']}:{v['end_verse']}"
+                        if "end_verse" in v
+                        else ""
+                    )
+                    + f" (sim: {score:.2%})\n  {v['text'][:100]}..."
                 )
                 for v, score in links[:5]
             ]
@@ -0,0 +1,132 @@
+"""
+Índice comprimido para o primeiro estágio da busca densa.
+
+Em vez do ``IndexFlatIP`` com os vetores completos (768 floats por verso),
+o índice guarda uma projeção em ``FIRST_PASS_DIM`` dimensões, quantizada
+(``FIRST_PASS_CODEC``: fp16, int8 ou fp32). A busca percorre esses códigos
+(bem menos bytes por query) atrás de ``FIRST_PASS_CANDIDATES`` candidatos,
+que são re-pontuados com os embeddings completos (``*.embeddings.npy``, em
+mmap). O score devolvido é sempre o cosseno exato.
+
+A projeção é a PCA sem centralizar (autovetores de XᵀX): é a melhor
+aproximação de posto ``dim`` dos produtos internos, que são o que o índice
+compara. A PCA centralizada do FAISS (``PCAMatrix``) distorce o ranking
+pelo termo ⟨média, x⟩.
+"""
+
+import os
+from typing import Optional, Tuple
+
+import faiss
+import numpy as np
+
+CODECS = ("fp16", "int8", "fp32")
+
+# Vetores usados para estimar a projeção e os limites do int8
+_TRAIN_SAMPLE = 50_000
+
+
+def first_pass_config() -> Optional[Tuple[int, str]]:
+    """
+    (dimensão, codec) do índice comprimido, ou None (índice exato).
+
+    Raises:
+        ValueError: Codec desconhecido
+    """
+    dim = int(os.getenv("FIRST_PASS_DIM", "0"))
+    if dim <= 0:
+        return None
+    codec = os.getenv("FIRST_PASS_CODEC", "fp16").lower()
+    if codec not in CODECS:
+        raise ValueError(f"FIRST_PASS_CODEC inválido: {codec} (use {', '.join(CODECS)})")
+    return dim, codec
+
+
+def first_pass_depth(top_k: int) -> int:
+    """Candidatos do primeiro estágio re-pontuados para devolver ``top_k``."""
+    return max(top_k * 4, int(os.getenv("FIRST_PASS_CANDIDATES", "100")))
+
+
+def first_pass_margin() -> float:
+    """Folga do threshold no range search aproximado (antes do score exato)."""
+    return float(os.getenv("FIRST_PASS_MARGIN", "0.05"))
+
+
+def projection(sample: np.ndarray, dim: int) -> faiss.LinearTransform:
+    """Projeção linear (sem viés) nos ``dim`` autovetores principais de XᵀX."""
+    sample = np.asarray(sample, dtype="float64")
+    _, vectors = np.linalg.eigh(sample.T @ sample)
+    matrix = np.ascontiguousarray(vectors[:, ::-1][:, :dim].T, dtype="float32")
+    transform = faiss.LinearTransform(sample.shape[1], dim, False)
+    faiss.copy_array_to_vector(matrix.ravel(), transform.A)
+    transform.is_trained = True
+    transform.set_is_orthonormal()
+    return transform
+
+
+def build_compressed_index(embeddings: np.ndarray, dim: int, codec: str) -> faiss.Index:
+    """
+    Índice vazio (IndexIDMap2) treinado para os ``embeddings``: projeção
+    para ``dim`` dimensões (se menor que a original) + scalar quantizer.
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Codec inválido: {codec} (use {', '.join(CODECS)})")
+    step = max(1, len(embeddings) // _TRAIN_SAMPLE)
+    sample = np.ascontiguousarray(embeddings[::step], dtype="float32")
+    dimension = sample.shape[1]
+    dim = min(dim, dimension)
+
+    if codec == "fp32":
+        base = faiss.IndexFlatIP(dim)
+    else:
+        qtype = {
+            "fp16": faiss.ScalarQuantizer.QT_fp16,
+            "int8": faiss.ScalarQuantizer.QT_8bit,
+        }[codec]
+        base = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_INNER_PRODUCT)
+
+    if dim < dimension:
+        index = faiss.IndexPreTransform(projection(sample, dim), base)
+    else:
+        index = base
+    if not index.is_trained:
+        index.train(sample)
+    return faiss.IndexIDMap2(index)
+
+
+def is_compressed(index) -> bool:
+    """True se o índice (IDMap) não guarda os vetores completos em float32."""
+    inner = getattr(index, "index", None)
+    if inner is None:
+        return False
+    inner = faiss.downcast_index(inner)
+    return not (
+        isinstance(inner, faiss.IndexFlat) or type(inner).__name__.startswith("GpuIndexFlat")
+    )
+
+
+def code_bytes(index) -> int:
+    """Bytes por vetor armazenado no índice."""
+    try:
+        return int(index.sa_code_size())
+    except RuntimeError:
+        return int(index.d) * 4
+
+
+def rescore(
+    embeddings: np.ndarray, vector: np.ndarray, rows: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Scores exatos (produto interno com os embeddings completos) das
+    ``rows``, em ordem decrescente de score.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if rows.size == 0:
+        return rows, np.zeros(0, dtype="float32")
+    # Linhas em ordem crescente: leitura sequencial quando em mmap
+    order = np.sort(rows)
+    scores = np.asarray(embeddings[order], dtype="float32") @ np.asarray(
+        vector, dtype="float32"
+    ).reshape(-1)
+    best = np.lexsort((order, -scores))
+    return order[best], scores[best]
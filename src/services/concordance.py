@@ -0,0 +1,178 @@
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.services.greek_text import normalize_greek
+
+_SEPARATOR = "\n"
+
+
+def _encode(text: str) -> np.ndarray:
+    # UTF-32 big-endian: a ordem dos bytes coincide com a dos code points
+    return np.frombuffer(text.encode("utf-32-be"), dtype=">u4")
+
+
+def _decode(codes: np.ndarray) -> str:
+    return np.asarray(codes, dtype=">u4").tobytes().decode("utf-32-be")
+
+
+def build_suffix_array(codes: np.ndarray) -> np.ndarray:
+    """
+    Suffix array por prefix doubling (vetorizado com numpy).
+
+    Cada rodada ordena os sufixos pelo par (rank[i], rank[i + k]) e dobra k,
+    até que todos os ranks sejam distintos: O(n log² n) no pior caso, com
+    o número de rodadas limitado pelo maior trecho repetido do corpus.
+    """
+    n = len(codes)
+    if n == 0:
+        return np.zeros(0, dtype=np.int32)
+    rank = np.asarray(codes, dtype=np.int64)
+    k = 1
+    while True:
+        # Rank do sufixo k posições adiante (-1 além do fim do texto)
+        shifted = np.full(n, -1, dtype=np.int64)
+        if k < n:
+            shifted[: n - k] = rank[k:]
+        sa = np.lexsort((shifted, rank))
+        changed = (np.diff(rank[sa]) != 0) | (np.diff(shifted[sa]) != 0)
+        rank = np.empty(n, dtype=np.int64)
+        rank[sa] = np.concatenate([[0], np.cumsum(changed)])
+        if rank[sa[-1]] == n - 1:
+            return sa.astype(np.int32)
+        k *= 2
+
+
+class Concordance:
+    """
+    Concordância KWIC sobre o texto normalizado do corpus.
+
+    Os versos normalizados são concatenados (separados por quebra de linha)
+    e indexados por um suffix array. Buscas de forma ou frase são duas
+    buscas binárias (O(m log n)); a contagem é ``hi - lo`` e só as linhas
+    pedidas são materializadas.
+    """
+
+    def __init__(self):
+        self.codes = np.zeros(0, dtype=">u4")
+        self.suffix_array = np.zeros(0, dtype=np.int32)
+        self.verse_starts = np.zeros(0, dtype=np.int64)
+
+    def build(self, verses: List[Dict]):
+        """Constrói o texto concatenado e o suffix array."""
+        texts = [
+            v["normalized"] if "normalized" in v else normalize_greek(v["text"])
+            for v in verses
+        ]
+        lengths = np.array([len(t) + 1 for t in texts], dtype=np.int64)
+        self.verse_starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        self.codes = _encode(_SEPARATOR.join(texts) + _SEPARATOR)
+        self.suffix_array = build_suffix_array(self.codes)
+        print(f"✓ Concordância: {len(self.codes):,} caracteres indexados")
+
+    def _suffix_bytes(self, position: int, length: int) -> bytes:
+        return self.codes[position : position + length].tobytes()
+
+    def search(self, pattern: str) -> Tuple[int, int]:
+        """
+        Intervalo [lo, hi) do suffix array cujos sufixos começam com o
+        padrão (já normalizado).
+        """
+        key = _encode(pattern).tobytes()
+        m = len(pattern)
+        sa = self.suffix_array
+
+        lo, hi = 0, len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._suffix_bytes(int(sa[mid]), m) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = lo
+
+        hi = len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._suffix_bytes(int(sa[mid]), m) <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return start, lo
+
+    def count(self, query: str) -> int:
+        """Número de ocorrências, sem materializar os resultados."""
+        pattern = normalize_greek(query)
+        if not pattern:
+            return 0
+        lo, hi = self.search(pattern)
+        return hi - lo
+
+    def kwic(
+        self, query: str, offset: int = 0, limit: int = 50, context: int = 40
+    ) -> Tuple[int, List[Dict]]:
+        """
+        Linhas keyword-in-context de uma forma ou frase.
+
+        Os resultados seguem a ordem do suffix array, isto é, a ordem
+        alfabética do contexto à direita (ordenação clássica de concordância).
+
+        Args:
+            query: Forma ou frase (normalizada internamente)
+            offset: Primeira ocorrência a retornar
+            limit: Máximo de linhas
+            context: Caracteres de contexto de cada lado (limitado ao verso)
+
+        Returns:
+            Tupla (total de ocorrências, linhas com row, left, match, right)
+        """
+        pattern = normalize_greek(query)
+        if not pattern:
+            return 0, []
+        lo, hi = self.search(pattern)
+        positions = np.asarray(
+            self.suffix_array[lo + offset : min(hi, lo + offset + limit)],
+            dtype=np.int64,
+        )
+        rows = np.searchsorted(self.verse_starts, positions, side="right") - 1
+
+        lines = []
+        m = len(pattern)
+        for position, row in zip(positions, rows):
+            verse_start = int(self.verse_starts[row])
+            if row + 1 < len(self.verse_starts):
+                verse_end = int(self.verse_starts[row + 1]) - 1
+            else:
+                verse_end = len(self.codes) - 1
+            lines.append(
+                {
+                    "row": int(row),
+                    "left": _decode(
+                        self.codes[max(verse_start, position - context) : position]
+                    ),
+                    "match": pattern,
+                    "right": _decode(
+                        self.codes[position + m : min(verse_end, position + m + context)]
+                    ),
+                }
+            )
+        return hi - lo, lines
+
+    def save(self, directory: str):
+        """Salva os arrays (.npy) em um diretório."""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "text.npy"), self.codes)
+        np.save(os.path.join(directory, "suffix_array.npy"), self.suffix_array)
+        np.save(os.path.join(directory, "verse_starts.npy"), self.verse_starts)
+
+    @classmethod
+    def load(cls, directory: str) -> "Concordance":
+        """Carrega os arrays com mmap (lidos do disco sob demanda)."""
+        concordance = cls()
+        concordance.codes = np.load(os.path.join(directory, "text.npy"), mmap_mode="r")
+        concordance.suffix_array = np.load(
+            os.path.join(directory, "suffix_array.npy"), mmap_mode="r"
+        )
+        concordance.verse_starts = np.load(os.path.join(directory, "verse_starts.npy"))
+        return concordance
@@ -1,9 +1,162 @@
+import bisect
+import difflib
+import glob
 import os
 import re
-from typing import List, Dict
+from typing import Dict, Iterator, List, Optional, Tuple
 import json
 from tqdm import tqdm
 
+from src.services.greek_text import normalize_greek, normalize_word
+
+
+# Códigos MorphGNT → nomes canônicos dos livros do NT
+NT_BOOKS = {
+    "61": "Matthew", "62": "Mark", "63": "Luke", "64": "John",
+    "65": "Acts", "66": "Romans", "67": "1Corinthians", "68": "2Corinthians",
+    "69": "Galatians", "70": "Ephesians", "71": "Philippians", "72": "Colossians",
+    "73": "1Thessalonians", "74": "2Thessalonians", "75": "1Timothy", 
+    "76": "2Timothy", "77": "Titus", "78": "Philemon", "79": "Hebrews",
+    "80": "James", "81": "1Peter", "82": "2Peter", "83": "1John",
+    "84": "2John", "85": "3John", "86": "Jude", "87": "Revelation"
+}
+
+# Nomes de livros do BHSA (feature ``book``) → nomes canônicos do AT
+OT_BOOKS = {
+    "Genesis": "Genesis", "Exodus": "Exodus", "Leviticus": "Leviticus",
+    "Numeri": "Numbers", "Deuteronomium": "Deuteronomy", "Josua": "Joshua",
+    "Judices": "Judges", "Ruth": "Ruth", "Samuel_I": "1Samuel",
+    "Samuel_II": "2Samuel", "Reges_I": "1Kings", "Reges_II": "2Kings",
+    "Chronica_I": "1Chronicles", "Chronica_II": "2Chronicles", "Esra": "Ezra",
+    "Nehemia": "Nehemiah", "Esther": "Esther", "Iob": "Job",
+    "Psalmi": "Psalms", "Proverbia": "Proverbs", "Ecclesiastes": "Ecclesiastes",
+    "Canticum": "SongOfSongs", "Jesaia": "Isaiah", "Jeremia": "Jeremiah",
+    "Threni": "Lamentations", "Ezechiel": "Ezekiel", "Daniel": "Daniel",
+    "Hosea": "Hosea", "Joel": "Joel", "Amos": "Amos", "Obadia": "Obadiah",
+    "Jona": "Jonah", "Micha": "Micah", "Nahum": "Nahum", "Habakuk": "Habakkuk",
+    "Zephania": "Zephaniah", "Haggai": "Haggai", "Sacharia": "Zechariah",
+    "Maleachi": "Malachi",
+}
+
+
+# Cabeçalho de capítulo nos textos Westcott–Hort ("[ΚΕΦΑΛΑΙΟΝ 12]")
+_WH_CHAPTER_RE = re.compile(r"^\[ΚΕΦΑΛΑΙΟΝ\s+(\d+)\]$")
+# Linhas de código do arquivo WH (atribuições Python como ``cap13 = \"\"\"...``)
+_WH_CODE_RE = re.compile(r"^[A-Za-z_]\w*\s*[=(\[]")
+
+
+def _tf_spec_ranges(spec: str) -> List[Tuple[int, int]]:
+    """Especificação de nós text-fabric ("1-3,7") → intervalos fechados."""
+    ranges = []
+    for part in spec.split(","):
+        start, _, end = part.partition("-")
+        ranges.append((int(start), int(end or start)))
+    return ranges
+
+
+def _read_tf_lines(filepath: str) -> Iterator[str]:
+    """Linhas de dados de um arquivo .tf (pula o cabeçalho ``@...``)."""
+    with open(filepath, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("@"):
+                continue
+            # Linha vazia que separa cabeçalho e dados
+            break
+        for line in f:
+            yield line.rstrip("\n")
+
+
+def _read_tf_ranges(filepath: str) -> Iterator[Tuple[int, int, str]]:
+    """
+    Lê uma feature de nó text-fabric como intervalos (início, fim, valor).
+
+    Cada linha é ``[nós\t]valor``; sem especificação de nós, o valor vale
+    para o nó seguinte ao da linha anterior (começando no nó 1).
+    """
+    node = 1
+    for line in _read_tf_lines(filepath):
+        if "\t" in line:
+            spec, value = line.split("\t", 1)
+            ranges = _tf_spec_ranges(spec)
+        else:
+            value, ranges = line, [(node, node)]
+        if value:
+            for start, end in ranges:
+                yield start, end, value
+        node = ranges[-1][1] + 1
+
+
+def _read_tf_feature(filepath: str, nodes: Optional[set] = None) -> Dict[int, str]:
+    """Feature de nó como dict nó → valor (opcionalmente só para ``nodes``)."""
+    values = {}
+    for start, end, value in _read_tf_ranges(filepath):
+        for node in range(start, end + 1):
+            if nodes is None or node in nodes:
+                values[node] = value
+    return values
+
+
+def _read_tf_oslots(filepath: str, first_node: int, nodes: set) -> Dict[int, List[int]]:
+    """
+    Lê a aresta ``oslots`` (nó → palavras/slots) só para ``nodes``.
+
+    Cada linha é ``[nó\t]slots``; a numeração implícita começa logo após
+    o último slot (``first_node``).
+    """
+    slots = {}
+    node = first_node
+    for line in _read_tf_lines(filepath):
+        if "\t" in line:
+            spec, targets = line.split("\t", 1)
+            node = _tf_spec_ranges(spec)[0][0]
+        else:
+            targets = line
+        if node in nodes:
+            slots[node] = [
+                slot
+                for start, end in _tf_spec_ranges(targets)
+                for slot in range(start, end + 1)
+            ]
+        node += 1
+    return slots
+
+
+def _split_by_versification(
+    words: List[str], reference: List[Dict]
+) -> List[Tuple[int, List[str]]]:
+    """
+    Distribui as palavras de um capítulo sem numeração de versos pelos
+    versos do mesmo capítulo em um texto de referência, alinhando as formas
+    normalizadas (difflib). Palavras sem par (variantes) ficam no verso da
+    palavra anterior; versos da referência sem nenhuma palavra são omitidos.
+
+    Returns:
+        Lista de tuplas (número do verso, palavras), na ordem do texto
+    """
+    target, verse_of = [], []
+    for verse in reference:
+        for word in verse["words"]:
+            target.append(normalize_word(word))
+            verse_of.append(verse["verse"])
+    assigned: List[Optional[int]] = [None] * len(words)
+    matcher = difflib.SequenceMatcher(
+        None, [normalize_word(word) for word in words], target, autojunk=False
+    )
+    for i, j, size in matcher.get_matching_blocks():
+        assigned[i:i + size] = verse_of[j:j + size]
+
+    current = next((verse for verse in assigned if verse is not None), None)
+    if current is None:
+        return []
+    groups: List[Tuple[int, List[str]]] = []
+    for word, verse in zip(words, assigned):
+        current = verse if verse is not None else current
+        if groups and groups[-1][0] == current:
+            groups[-1][1].append(word)
+        else:
+            groups.append((current, [word]))
+    return groups
+
 
 class CorpusProcessor:
     """Processa e normaliza textos bíblicos (SBLGNT, BHS) para análise."""
@@ -15,11 +168,14 @@ class CorpusProcessor:
     def parse_sblgnt_file(self, filepath: str) -> List[Dict]:
         """
         Parse arquivos MorphGNT format (SBLGNT).
-        Formato: book chapter verse part word pos parsing_code
-        Ex: 610101 N- Βίβλος βίβλος βίβλος N-NSF
+        Formato: ref pos parsing_code text word normalized lemma
+        Ex: 610101 N- ----NSF- Βίβλος Βίβλος βίβλος βίβλος
         """
         verses_data = []
-        current_verse = {"book": "", "chapter": 0, "verse": 0, "text": "", "words": []}
+        current_verse = {
+            "book": "", "chapter": 0, "verse": 0, "text": "",
+            "words": [], "lemmas": [], "pos": [], "parsing": []
+        }
         
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
@@ -41,6 +197,10 @@ class CorpusProcessor:
                     # Format: ref pos parsing word1 word2 word3 lemma
                     # We want word1 (index 3) - the actual Greek word with accents/punctuation
                     word = parts[3]  # Greek word with accents
+                    lemma = parts[-1]  # Lemma (última coluna)
+                    # Classe gramatical (ex.: "V-") e código morfológico
+                    # (pessoa, tempo, voz, modo, caso, número, gênero, grau)
+                    pos, parsing = parts[1], parts[2]
                     
                     # Se mudou de verso, salva o anterior
                     if current_verse["verse"] != verse or current_verse["chapter"] != chapter:
@@ -52,10 +212,17 @@ class CorpusProcessor:
                             "verse": verse,
                             "text": "",
                             "words": [],
-                            "language": "greek"
+                            "lemmas": [],
+                            "pos": [],
+                            "parsing": [],
+                            "language": "greek",
+                            "testament": "NT"
                         }
                     
                     current_verse["words"].append(word)
+                    current_verse["lemmas"].append(lemma)
+                    current_verse["pos"].append(pos)
+                    current_verse["parsing"].append(parsing)
                     current_verse["text"] += word + " "
                 
                 # Adiciona último verso
@@ -64,21 +231,16 @@ class CorpusProcessor:
                     
         except Exception as e:
             print(f"Erro ao processar {filepath}: {e}")
+
+        # Forma canônica (sem acentos/caixa/pontuação) calculada uma só vez
+        for verse_data in verses_data:
+            verse_data["normalized"] = normalize_greek(verse_data["text"])
         
         return verses_data
     
     def _get_book_name(self, book_num: str) -> str:
         """Mapeia código numérico para nome do livro (NT)."""
-        books = {
-            "61": "Matthew", "62": "Mark", "63": "Luke", "64": "John",
-            "65": "Acts", "66": "Romans", "67": "1Corinthians", "68": "2Corinthians",
-            "69": "Galatians", "70": "Ephesians", "71": "Philippians", "72": "Colossians",
-            "73": "1Thessalonians", "74": "2Thessalonians", "75": "1Timothy", 
-            "76": "2Timothy", "77": "Titus", "78": "Philemon", "79": "Hebrews",
-            "80": "James", "81": "1Peter", "82": "2Peter", "83": "1John",
-            "84": "2John", "85": "3John", "86": "Jude", "87": "Revelation"
-        }
-        return books.get(book_num, f"Book{book_num}")
+        return NT_BOOKS.get(book_num, f"Book{book_num}")
     
     def process_all_sblgnt(self, sblgnt_dir: str = None) -> List[Dict]:
         """Processa todos os arquivos SBLGNT no diretório."""
@@ -98,6 +260,187 @@ class CorpusProcessor:
         
         return all_verses
     
+    def process_bhsa(self, bhsa_dir: str = None) -> List[Dict]:
+        """
+        Processa o BHSA (Bíblia Hebraica, formato text-fabric .tf).
+
+        Usa as features ``otype``, ``oslots``, ``book``, ``chapter``,
+        ``verse``, ``g_word_utf8``, ``trailer_utf8`` e ``lex_utf8`` (lemas).
+        Aceita o diretório da versão (ex.: ``bhsa/tf/2021``) ou um pai que
+        contenha ``otype.tf`` em algum subdiretório.
+
+        Returns:
+            Lista de versos no mesmo formato de parse_sblgnt_file
+            (sem ``pos``/``parsing``, que são códigos MorphGNT)
+        """
+        if bhsa_dir is None:
+            bhsa_dir = os.path.join("Documentação", "Bible", "bhsa")
+
+        tf_dir = None
+        for root, _dirs, files in os.walk(bhsa_dir):
+            if "otype.tf" in files:
+                tf_dir = root
+        if tf_dir is None:
+            print(f"Arquivos text-fabric (otype.tf) não encontrados em {bhsa_dir}.")
+            return []
+
+        def feature_path(name: str) -> str:
+            return os.path.join(tf_dir, f"{name}.tf")
+
+        try:
+            # Tipos de nó: slots (palavras) e intervalos de livros/capítulos/versos
+            max_slot = 0
+            section_nodes: Dict[str, List[int]] = {"book": [], "chapter": [], "verse": []}
+            for start, end, otype in _read_tf_ranges(feature_path("otype")):
+                if otype == "word":
+                    max_slot = max(max_slot, end)
+                elif otype in section_nodes:
+                    section_nodes[otype].extend(range(start, end + 1))
+
+            all_sections = {n for nodes in section_nodes.values() for n in nodes}
+            oslots = _read_tf_oslots(feature_path("oslots"), max_slot + 1, all_sections)
+            books = _read_tf_feature(feature_path("book"), all_sections)
+            chapters = _read_tf_feature(feature_path("chapter"), all_sections)
+            verse_numbers = _read_tf_feature(
+                feature_path("verse"), set(section_nodes["verse"])
+            )
+            words = _read_tf_feature(feature_path("g_word_utf8"))
+            trailers = _read_tf_feature(feature_path("trailer_utf8"))
+            lexemes = _read_tf_feature(feature_path("lex_utf8"))
+        except (OSError, ValueError) as e:
+            print(f"Erro ao processar BHSA em {tf_dir}: {e}")
+            return []
+
+        def enclosing(kind: str):
+            # Seção que contém um slot (busca binária pelo primeiro slot)
+            nodes = sorted(section_nodes[kind], key=lambda n: oslots[n][0])
+            starts = [oslots[n][0] for n in nodes]
+            return lambda slot: nodes[bisect.bisect_right(starts, slot) - 1]
+
+        book_of, chapter_of = enclosing("book"), enclosing("chapter")
+
+        verses_data = []
+        for node in sorted(section_nodes["verse"], key=lambda n: oslots[n][0]):
+            slots = oslots[node]
+            book = books.get(node) or books[book_of(slots[0])]
+            chapter = chapters.get(node) or chapters[chapter_of(slots[0])]
+            text = "".join(words.get(s, "") + trailers.get(s, "") for s in slots)
+            verses_data.append({
+                "book": OT_BOOKS.get(book, book),
+                "chapter": int(chapter),
+                "verse": int(verse_numbers[node]),
+                "text": text.strip(),
+                "words": [words.get(s, "") for s in slots],
+                "lemmas": [lexemes.get(s, "") for s in slots],
+                "language": "hebrew",
+                "testament": "OT",
+                "normalized": normalize_greek(text),
+            })
+
+        print(f"✓ BHSA: {len(verses_data)} versos")
+        return verses_data
+
+    def process_wh(self, filepath: str = None, reference: str = None) -> List[Dict]:
+        """
+        Processa o Apocalipse em Westcott–Hort 1881 (arquivo .txt).
+
+        O arquivo traz os capítulos em blocos iniciados por "[ΚΕΦΑΛΑΙΟΝ n]",
+        intercalados com títulos, marcadores "[...]" e linhas de código;
+        estes são ignorados. Um capítulo repetido (ex.: marcador substituído
+        depois pelo texto) usa o último bloco não vazio.
+
+        O texto não numera os versos e as linhas seguem a diagramação
+        (quebras poéticas, versos partidos): as palavras de cada capítulo
+        são distribuídas pela versificação do SBLGNT, alinhando-as ao texto
+        do Apocalipse do SBLGNT, para que "Ap 18:20" e os ids estáveis
+        apontem o mesmo verso nos dois corpora.
+
+        Args:
+            filepath: Texto WH (default: Documentação/Bible/*Westcott*.txt)
+            reference: Apocalipse do SBLGNT em formato MorphGNT (default:
+                Documentação/Bible/sblgnt/*-Re-morphgnt.txt)
+
+        Returns:
+            Lista de versos no mesmo formato de parse_sblgnt_file
+            (sem lemas nem morfologia); vazia sem o texto de referência
+        """
+        if reference is None:
+            matches = sorted(
+                glob.glob(os.path.join("Documentação", "Bible", "sblgnt", "*-Re-morphgnt.txt"))
+            )
+            if not matches:
+                print("Apocalipse do SBLGNT não encontrado: sem versificação para o WH.")
+                return []
+            reference = matches[0]
+        reference_chapters: Dict[int, List[Dict]] = {}
+        for verse in self.parse_sblgnt_file(reference):
+            reference_chapters.setdefault(verse["chapter"], []).append(verse)
+        if not reference_chapters:
+            print(f"Versificação de referência vazia em {reference}.")
+            return []
+
+        if filepath is None:
+            matches = sorted(
+                glob.glob(os.path.join("Documentação", "Bible", "*Westcott*.txt"))
+            )
+            if not matches:
+                print("Texto Westcott–Hort não encontrado em Documentação/Bible.")
+                return []
+            filepath = matches[0]
+
+        chapters: Dict[int, List[str]] = {}
+        chapter, lines = None, []
+
+        def close_block():
+            if chapter is not None and lines:
+                chapters[chapter] = lines
+
+        try:
+            with open(filepath, "r", encoding="utf-8") as f:
+                for raw in f:
+                    line = raw.strip()
+                    header = _WH_CHAPTER_RE.match(line)
+                    if header:
+                        close_block()
+                        chapter, lines = int(header.group(1)), []
+                        continue
+                    closes = line.endswith('"""')
+                    if closes or line.startswith("#") or _WH_CODE_RE.match(line):
+                        line = line[:-3].strip() if closes and chapter is not None else ""
+                        if line and not line.startswith("["):
+                            lines.append(line)
+                        close_block()
+                        chapter, lines = None, []
+                        continue
+                    if chapter is not None and line and not line.startswith("["):
+                        lines.append(line)
+            close_block()
+        except OSError as e:
+            print(f"Erro ao processar {filepath}: {e}")
+            return []
+
+        verses_data = []
+        for number in sorted(chapters):
+            if number not in reference_chapters:
+                print(f"Aviso: capítulo {number} do WH fora da versificação; ignorado")
+                continue
+            words = " ".join(chapters[number]).split()
+            for verse, verse_words in _split_by_versification(words, reference_chapters[number]):
+                text = " ".join(verse_words)
+                verses_data.append({
+                    "book": "Revelation",
+                    "chapter": number,
+                    "verse": verse,
+                    "text": text,
+                    "words": text.split(),
+                    "language": "greek",
+                    "testament": "NT",
+                    "normalized": normalize_greek(text),
+                })
+
+        print(f"✓ Westcott–Hort: {len(verses_data)} versos em {len(chapters)} capítulos")
+        return verses_data
+
     def save_corpus(self, verses: List[Dict], output_file: str = "data/nt_corpus.json"):
         """Salva corpus processado em JSON."""
         os.makedirs(os.path.dirname(output_file), exist_ok=True)
@@ -110,7 +453,12 @@ class CorpusProcessor:
         if not os.path.exists(corpus_file):
             return []
         with open(corpus_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            verses = json.load(f)
+        # Corpus gerado antes da forma canônica: completa na carga
+        for verse in verses:
+            if "normalized" not in verse:
+                verse["normalized"] = normalize_greek(verse["text"])
+        return verses
 
 
 if __name__ == "__main__":
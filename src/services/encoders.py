@@ -0,0 +1,203 @@
+import os
+import warnings
+import zlib
+from typing import List, Optional
+
+import numpy as np
+
+from src.services.greek_text import normalize_greek
+
+
+class HashingEncoder:
+    """
+    Encoder determinístico e sem download: n-gramas de caracteres do texto
+    normalizado espalhados por hashing em ``dim`` dimensões.
+
+    Não captura semântica; serve para benchmarks e execuções offline, com
+    a mesma interface de ``SentenceTransformer.encode`` usada pelo engine.
+    """
+
+    device = "cpu"
+
+    def __init__(self, dim: int = 384, ngram: int = 3):
+        self.dim = dim
+        self.ngram = ngram
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _features(self, text: str) -> List[int]:
+        padded = f" {normalize_greek(text)} "
+        n = self.ngram
+        return [
+            zlib.crc32(padded[i : i + n].encode("utf-8")) % self.dim
+            for i in range(max(1, len(padded) - n + 1))
+        ]
+
+    def encode(
+        self,
+        texts,
+        batch_size: int = 32,
+        show_progress_bar: bool = False,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = True,
+        **_kwargs,
+    ) -> np.ndarray:
+        if isinstance(texts, str):
+            texts = [texts]
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            np.add.at(vectors[row], self._features(text), 1.0)
+        if normalize_embeddings:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms > 0, norms, 1)
+        return vectors
+
+
+# Backends do encoder de embeddings (ENCODER_BACKEND); os quantizados só
+# valem em CPU. Verifique a paridade com scripts/encoder_parity.py.
+ENCODER_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+
+def encoder_backend(backend: Optional[str] = None) -> str:
+    """
+    Backend configurado (parâmetro ou ENCODER_BACKEND; padrão "torch").
+
+    Raises:
+        ValueError: Se o backend não existir
+    """
+    backend = (backend or os.getenv("ENCODER_BACKEND", "torch")).lower()
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(
+            f"Backend de encoder inválido: {backend} (use {', '.join(ENCODER_BACKENDS)})"
+        )
+    return backend
+
+
+def quantize_dynamic_int8(model):
+    """
+    Quantização dinâmica int8 (pesos int8, ativações quantizadas em tempo
+    de execução) das camadas Linear do modelo.
+    """
+    import torch
+
+    # inplace: troca os submódulos Linear onde estiverem (transformer e
+    # eventuais camadas Dense), sem depender dos atributos do wrapper
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+        )
+    return model
+
+
+def _onnx_export_dir(model_name: str) -> str:
+    base = os.getenv("ONNX_EXPORT_DIR", "models/onnx")
+    return os.path.join(base, model_name.strip("/").replace("/", "__"))
+
+
+def _load_onnx(model_name: str, quantized: bool):
+    """
+    Modelo ONNX Runtime exportado do Sentence Transformers (em cache em
+    ONNX_EXPORT_DIR; a exportação roda só na primeira vez).
+    """
+    import onnxruntime  # noqa: F401  (ImportError → fallback em load_encoder)
+    import optimum  # noqa: F401
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+    export_dir = _onnx_export_dir(model_name)
+    fp32_file = os.path.join(export_dir, "onnx", "model.onnx")
+    if not os.path.exists(fp32_file):
+        print(f"Exportando {model_name} para ONNX em {export_dir}...")
+        SentenceTransformer(model_name, backend="onnx", device="cpu").save_pretrained(
+            export_dir
+        )
+    if not quantized:
+        return SentenceTransformer(export_dir, backend="onnx", device="cpu")
+
+    # Conjunto de instruções alvo: arm64, avx2, avx512 ou avx512_vnni
+    config = os.getenv("ONNX_QUANTIZATION", "avx2")
+    file_name = f"onnx/model_qint8_{config}.onnx"
+    if not os.path.exists(os.path.join(export_dir, file_name)):
+        print(f"Quantizando o grafo ONNX (int8, {config})...")
+        fp32 = SentenceTransformer(export_dir, backend="onnx", device="cpu")
+        export_dynamic_quantized_onnx_model(
+            fp32, config, export_dir, file_suffix=f"qint8_{config}"
+        )
+    return SentenceTransformer(
+        export_dir, backend="onnx", device="cpu", model_kwargs={"file_name": file_name}
+    )
+
+
+def load_encoder(model_name: str, backend: Optional[str] = None):
+    """
+    Carrega o encoder em CPU com o backend pedido.
+
+    - ``torch``: SentenceTransformer em precisão total
+    - ``torch-int8``: quantização dinâmica int8 do PyTorch (sem dependências)
+    - ``onnx`` / ``onnx-int8``: ONNX Runtime (requer
+      ``sentence-transformers[onnx]``); sem ele, cai para ``torch`` /
+      ``torch-int8``
+
+    Returns:
+        Encoder com a interface de ``SentenceTransformer.encode``
+    """
+    from sentence_transformers import SentenceTransformer
+
+    backend = encoder_backend(backend)
+    if backend.startswith("onnx"):
+        try:
+            model = _load_onnx(model_name, quantized=backend == "onnx-int8")
+            model.encoder_backend = backend
+            return model
+        except ImportError as e:
+            backend = "torch-int8" if backend == "onnx-int8" else "torch"
+            print(f"Aviso: ONNX Runtime indisponível ({e}); usando {backend}")
+    model = SentenceTransformer(model_name, device="cpu")
+    if backend == "torch-int8":
+        quantize_dynamic_int8(model)
+    # Backend efetivo (após um eventual fallback)
+    model.encoder_backend = backend
+    return model
+
+
+def encoder_parity(
+    reference, candidate, corpus_texts: List[str], query_texts: List[str], top_k: int = 10
+) -> dict:
+    """
+    Compara um encoder candidato com o de referência.
+
+    As queries do candidato são pontuadas contra os vetores do corpus
+    gerados pela referência (cenário real: índice em fp32, queries no
+    backend quantizado).
+
+    Returns:
+        Dict com o cosseno mínimo/médio entre os vetores dos dois encoders,
+        o desvio máximo e p99 dos scores query × corpus e o recall@k dos
+        vizinhos da referência
+    """
+    kwargs = {"convert_to_numpy": True, "normalize_embeddings": True}
+    corpus_ref = np.asarray(reference.encode(corpus_texts, **kwargs), dtype=np.float32)
+    corpus_cand = np.asarray(candidate.encode(corpus_texts, **kwargs), dtype=np.float32)
+    query_ref = np.asarray(reference.encode(query_texts, **kwargs), dtype=np.float32)
+    query_cand = np.asarray(candidate.encode(query_texts, **kwargs), dtype=np.float32)
+
+    self_cosine = np.sum(corpus_ref * corpus_cand, axis=1)
+    scores_ref = query_ref @ corpus_ref.T
+    scores_cand = query_cand @ corpus_ref.T
+    deviation = np.abs(scores_ref - scores_cand)
+
+    k = min(top_k, corpus_ref.shape[0])
+    top_ref = np.argpartition(-scores_ref, k - 1, axis=1)[:, :k]
+    top_cand = np.argpartition(-scores_cand, k - 1, axis=1)[:, :k]
+    recall = np.mean(
+        [len(set(a) & set(b)) / k for a, b in zip(top_ref.tolist(), top_cand.tolist())]
+    )
+    return {
+        "min_cosine": float(self_cosine.min()),
+        "mean_cosine": float(self_cosine.mean()),
+        "max_score_deviation": float(deviation.max()),
+        "p99_score_deviation": float(np.percentile(deviation, 99)),
+        f"recall@{k}": float(recall),
+    }
@@ -0,0 +1,214 @@
+"""
+Encoding do corpus em chunks ordenados por tamanho, com checkpoint em disco
+e pool de processos opcional (ver ``EncodingPipeline``).
+"""
+
+import json
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Encoder de cada processo do pool (criado uma vez no initializer)
+_worker: Dict = {}
+
+
+def _init_worker(model_factory: Callable, threads: int):
+    import torch
+
+    # O paralelismo vem do pool: poucas threads por processo
+    torch.set_num_threads(threads)
+    _worker["model"] = model_factory()
+
+
+def _encode(model, texts: Sequence[str], batch_size: int) -> np.ndarray:
+    return np.asarray(
+        model.encode(
+            list(texts),
+            batch_size=batch_size,
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+        ),
+        dtype=np.float32,
+    )
+
+
+def _encode_chunk(
+    chunk: int, texts: Sequence[str], batch_size: int, output_dir: str
+) -> Tuple[int, int]:
+    vectors = _encode(_worker["model"], texts, batch_size)
+    write_chunk(vectors, chunk_path(output_dir, chunk))
+    return chunk, len(texts)
+
+
+def chunk_path(output_dir: str, chunk: int) -> str:
+    return os.path.join(output_dir, f"chunk-{chunk:05d}.npy")
+
+
+def write_chunk(vectors: np.ndarray, path: str):
+    """Grava um chunk de forma atômica (arquivo temporário + rename)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, vectors)
+    os.replace(tmp_path, path)
+
+
+def length_order(texts: Sequence[str]) -> np.ndarray:
+    """Índices dos textos do mais curto ao mais longo (ordem estável)."""
+    return np.argsort(np.fromiter((len(t) for t in texts), dtype=np.int64), kind="stable")
+
+
+def texts_fingerprint(texts: Sequence[str]) -> int:
+    """CRC32 dos textos (na ordem): muda se o corpus mudar."""
+    crc = 0
+    for text in texts:
+        crc = zlib.crc32(text.encode("utf-8") + b"\0", crc)
+    return crc
+
+
+class EncodingPipeline:
+    """
+    Gera os embeddings de um corpus inteiro em chunks com checkpoint.
+
+    Os textos são ordenados por tamanho e cortados em chunks de
+    ``chunk_size``: cada chunk tem textos de tamanho parecido (quase sem
+    padding nos batches) e vira um arquivo ``chunk-NNNNN.npy``. Os chunks
+    gravados são o checkpoint: uma execução interrompida refaz só os que
+    faltam. Com ``workers > 1`` os chunks são codificados em um pool de
+    processos, cada um com ``threads`` threads do torch.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        model=None,
+        model_factory: Optional[Callable] = None,
+        model_name: str = "",
+        backend: str = "",
+        chunk_size: int = 2048,
+        batch_size: int = 64,
+        workers: int = 1,
+        threads: Optional[int] = None,
+    ):
+        """
+        Args:
+            output_dir: Diretório dos chunks e do manifest
+            model: Encoder já carregado (usado com workers=1)
+            model_factory: Função sem argumentos (picklable) que carrega o
+                encoder em cada processo; obrigatória com workers > 1
+            model_name: Nome do modelo (parte do manifest)
+            backend: Backend do encoder (parte do manifest: chunks de
+                outro backend, ex.: int8 x fp32, não são reaproveitados)
+            chunk_size: Textos por chunk (unidade de checkpoint)
+            batch_size: Batch do encoder dentro de um chunk
+            workers: Processos (1 = no próprio processo)
+            threads: Threads do torch por processo (default: CPUs / workers)
+
+        Raises:
+            ValueError: Sem model nem model_factory adequados
+        """
+        if workers > 1 and model_factory is None:
+            raise ValueError("workers > 1 requer model_factory")
+        if workers <= 1 and model is None and model_factory is None:
+            raise ValueError("Informe model ou model_factory")
+        self.output_dir = output_dir
+        self.model = model
+        self.model_factory = model_factory
+        self.model_name = model_name
+        self.backend = backend
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.workers)
+
+    def _manifest(self, texts: Sequence[str]) -> Dict:
+        return {
+            "model": self.model_name,
+            "backend": self.backend,
+            "texts": len(texts),
+            "fingerprint": texts_fingerprint(texts),
+            "chunk_size": self.chunk_size,
+        }
+
+    def _prepare(self, texts: Sequence[str], restart: bool):
+        """Começa do zero se pedido ou se corpus/modelo/backend/chunks mudaram."""
+        manifest = self._manifest(texts)
+        manifest_path = os.path.join(self.output_dir, "manifest.json")
+        previous = None
+        if os.path.exists(manifest_path) and not restart:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        if previous != manifest:
+            if os.path.isdir(self.output_dir):
+                for name in os.listdir(self.output_dir):
+                    if name.startswith("chunk-"):
+                        os.remove(os.path.join(self.output_dir, name))
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+
+    def _encode_pending(self, pending: List[Tuple[int, List[str]]]):
+        total = len(pending)
+        if self.workers == 1:
+            model = self.model if self.model is not None else self.model_factory()
+            for done, (chunk, texts) in enumerate(pending, 1):
+                write_chunk(
+                    _encode(model, texts, self.batch_size),
+                    chunk_path(self.output_dir, chunk),
+                )
+                print(f"  Chunks: {done}/{total}", end="\r")
+            print()
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, total),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_factory, self.threads),
+        ) as executor:
+            futures = [
+                executor.submit(_encode_chunk, chunk, texts, self.batch_size, self.output_dir)
+                for chunk, texts in pending
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                future.result()
+                print(f"  Chunks: {done}/{total}", end="\r")
+        print()
+
+    def run(self, texts: Sequence[str], restart: bool = False) -> np.ndarray:
+        """
+        Codifica os textos, retomando dos chunks já gravados.
+
+        Returns:
+            Embeddings normalizados (float32) na ordem original dos textos
+        """
+        self._prepare(texts, restart)
+        order = length_order(texts)
+        chunks = [
+            (chunk, order[start : start + self.chunk_size])
+            for chunk, start in enumerate(range(0, len(texts), self.chunk_size))
+        ]
+        pending = [
+            (chunk, [texts[i] for i in rows])
+            for chunk, rows in chunks
+            if not os.path.exists(chunk_path(self.output_dir, chunk))
+        ]
+        if len(pending) < len(chunks):
+            print(f"✓ Retomando: {len(chunks) - len(pending)}/{len(chunks)} chunks prontos")
+        if pending:
+            self._encode_pending(pending)
+
+        embeddings = None
+        for chunk, rows in chunks:
+            vectors = np.load(chunk_path(self.output_dir, chunk))
+            if embeddings is None:
+                embeddings = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            embeddings[rows] = vectors
+        if embeddings is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        print(f"✓ {len(texts)} textos codificados em {len(chunks)} chunks ({self.output_dir})")
+        return embeddings
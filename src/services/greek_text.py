@@ -0,0 +1,31 @@
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+# Pontuação, símbolos e o sinal numeral grego (keraia "ʹ", que \w aceita
+# como letra) viram espaço: "3:16" → "3 16", sem fundir os números.
+_NON_WORD_RE = re.compile(r"[\W_ʹ]+")
+
+
+@lru_cache(maxsize=65536)
+def normalize_greek(text: str) -> str:
+    """
+    Forma canônica de um texto: sem diacríticos (NFD), casefold, sigma final
+    unificado e pontuação removida; palavras separadas por um espaço.
+
+    Ex.: "ἀγάπη θεοῦ", "αγαπη θεου" e "ΑΓΑΠΗ ΘΕΟΥ" → "αγαπη θεου".
+
+    O resultado é internado e memoizado: chaves de cache, índices léxicos
+    e deduplicação compartilham a mesma string sem recalcular a forma.
+    """
+    decomposed = unicodedata.normalize("NFD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    folded = stripped.casefold().replace("ς", "σ")
+    return sys.intern(" ".join(_NON_WORD_RE.sub(" ", folded).split()))
+
+
+@lru_cache(maxsize=65536)
+def normalize_word(word: str) -> str:
+    """Forma canônica de uma palavra (ver normalize_greek), sem espaços."""
+    return sys.intern(normalize_greek(word).replace(" ", ""))
@@ -0,0 +1,380 @@
+import heapq
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.services import metrics
+from src.services.compressed_index import code_bytes
+from src.services.intertextuality_engine import IntertextualityEngine
+from src.services.snapshots import current_snapshot, load_snapshot, snapshot_root
+
+# Corpora conhecidos: nome → (corpus processado, índice, metadados)
+SHARDS: Dict[str, Tuple[str, str, str]] = {
+    "nt": ("data/nt_corpus.json", "indexes/faiss_nt.index", "indexes/verses_meta.json"),
+    "ot": ("data/ot_corpus.json", "indexes/faiss_ot.index", "indexes/verses_meta_ot.json"),
+    "wh": ("data/wh_corpus.json", "indexes/faiss_wh.index", "indexes/verses_meta_wh.json"),
+}
+# Corpus de cada shard (parte dos ids estáveis dos versos)
+SHARD_CORPORA: Dict[str, str] = {"nt": "sblgnt", "ot": "bhsa", "wh": "wh"}
+# Shards de testamento: testament="all" busca só estes (não edições
+# alternativas como o WH nem traduções, que duplicariam versos)
+TESTAMENT_SHARDS: Tuple[str, ...] = ("nt", "ot")
+# Nomes de corpus aceitos como sinônimos dos shards
+CORPUS_ALIASES: Dict[str, str] = {"sblgnt": "nt", "bhsa": "ot"}
+
+# Metadados JSON em memória ocupam algumas vezes o tamanho do arquivo
+# (dicts, listas e strings do Python)
+_META_MEMORY_FACTOR = 3
+
+
+def _array_bytes(array) -> int:
+    """Bytes residentes de um array (0 para memmap: paginado pelo SO)."""
+    if array is None or isinstance(array, np.memmap):
+        return 0
+    return int(getattr(array, "nbytes", 0))
+
+
+def _faiss_bytes(index) -> int:
+    """Bytes dos códigos de um índice plano ou comprimido (e dos ids, se IDMap)."""
+    if index is None:
+        return 0
+    size = int(index.ntotal) * code_bytes(index)
+    if hasattr(index, "id_map"):
+        size += int(index.ntotal) * 8
+    return size
+
+
+def estimate_memory_bytes(engine: IntertextualityEngine) -> int:
+    """
+    Estimativa da memória de um engine: índices FAISS, embeddings fora de
+    mmap, arrays auxiliares e metadados (pelo tamanho do JSON em disco).
+    O encoder não entra na conta: é compartilhado entre os corpora.
+    """
+    size = (
+        _faiss_bytes(engine.index)
+        + _faiss_bytes(engine.passage_index)
+        + _faiss_bytes(engine.chapter_index)
+        + _array_bytes(engine.embeddings)
+        + _array_bytes(engine.verse_ids) * 3
+    )
+    if engine.quotation_index is not None:
+        size += _array_bytes(engine.quotation_index.signatures)
+    if engine.concordance is not None:
+        size += _array_bytes(engine.concordance.codes)
+        size += _array_bytes(engine.concordance.suffix_array)
+    if engine._paths is not None and os.path.exists(engine._paths[1]):
+        size += os.path.getsize(engine._paths[1]) * _META_MEMORY_FACTOR
+    return size
+
+
+class IndexRegistry:
+    """
+    Registro de corpora nomeados (um IntertextualityEngine por corpus).
+
+    Os corpora compartilham o mesmo encoder e são carregados sob demanda
+    (get). A memória estimada de cada um é contabilizada contra um
+    orçamento; acima dele, os corpora usados há mais tempo são
+    descarregados (exceto os fixados, como o NT do BibleService).
+
+    Uma busca em um único corpus vai direto ao engine; em vários, a query é
+    codificada uma vez e cada índice FAISS é consultado em paralelo (o
+    FAISS libera o GIL durante a busca), com os top-k fundidos por score.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        memory_budget_mb: Optional[float] = None,
+    ):
+        """
+        Args:
+            max_workers: Threads de busca entre shards
+                (default: env INDEX_SEARCH_THREADS ou número de CPUs)
+            memory_budget_mb: Orçamento de memória dos corpora carregados
+                (default: env CORPUS_MEMORY_BUDGET_MB; 0 = sem limite)
+        """
+        self.engines: Dict[str, IntertextualityEngine] = {}
+        self.max_workers = max_workers or int(
+            os.getenv("INDEX_SEARCH_THREADS", "0")
+        ) or (os.cpu_count() or 1)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.getenv("CORPUS_MEMORY_BUDGET_MB", "0"))
+        self.memory_budget = int(memory_budget_mb * 1024**2)
+        # Catálogo: nome → (índice, metadados, corpus dos ids)
+        self.catalog: Dict[str, Tuple[str, str, str]] = {
+            name: (index_path, meta_path, SHARD_CORPORA[name])
+            for name, (_corpus, index_path, meta_path) in SHARDS.items()
+        }
+        self._load_catalog_file(os.getenv("CORPORA_CONFIG", ""))
+        self.memory: Dict[str, int] = {}
+        self.pinned: set = set()
+        # Ordem de uso (o mais antigo primeiro)
+        self._lru: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.model = None
+        # Modo bundle (ARTIFACT_BUNDLE): só os snapshots do bundle, nunca os
+        # índices legados do host
+        self.snapshots_only = bool(os.getenv("ARTIFACT_BUNDLE"))
+
+    def _load_catalog_file(self, path: str):
+        """
+        Registra corpora extras (ex.: traduções) de um JSON no formato
+        ``{"nome": {"index": ..., "meta": ..., "corpus": ...}}``.
+        """
+        if not path:
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            for name, entry in entries.items():
+                self.register(name, entry["index"], entry["meta"], entry.get("corpus"))
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            print(f"Aviso: CORPORA_CONFIG inválido ({path}): {e}")
+
+    def register(
+        self, name: str, index_path: str, meta_path: str, corpus: Optional[str] = None
+    ):
+        """Adiciona um corpus ao catálogo (carregado só no primeiro uso)."""
+        self.catalog[name] = (index_path, meta_path, corpus or name)
+
+    @staticmethod
+    def resolve(name: str) -> str:
+        """Nome do shard de um corpus ("sblgnt" → "nt")."""
+        return CORPUS_ALIASES.get(name, name)
+
+    def add(self, name: str, engine: IntertextualityEngine, pin: bool = False):
+        """
+        Registra um engine já carregado como corpus ``name``.
+
+        Args:
+            pin: Se True, o corpus nunca é descarregado pelo orçamento
+        """
+        with self._lock:
+            self.engines[name] = engine
+            if self.model is None:
+                self.model = engine.model
+            if pin:
+                self.pinned.add(name)
+            self.memory[name] = estimate_memory_bytes(engine)
+            self._touch(name)
+            self._enforce_budget(keep=name)
+
+    def available(self) -> List[str]:
+        """Corpora carregados ou com índice em disco."""
+        return [
+            name
+            for name, (index_path, _meta, _corpus) in self.catalog.items()
+            if name in self.engines
+            or (not self.snapshots_only and os.path.exists(index_path))
+            or current_snapshot(snapshot_root(name))
+        ] + [name for name in self.engines if name not in self.catalog]
+
+    def _load_one(self, name: str) -> Optional[IntertextualityEngine]:
+        index_path, meta_path, corpus = self.catalog[name]
+        snapshot = current_snapshot(snapshot_root(name))
+        if snapshot is not None:
+            engine = load_snapshot(snapshot, model=self.model)
+        elif not self.snapshots_only and os.path.exists(index_path):
+            engine = IntertextualityEngine(model=self.model, corpus=corpus)
+            engine.load_index(index_path, meta_path)
+        else:
+            return None
+        if engine.index is None:
+            return None
+        self.model = engine.model
+        return engine
+
+    def get(self, name: str) -> IntertextualityEngine:
+        """
+        Engine de um corpus, carregado sob demanda.
+
+        Raises:
+            ValueError: Se o corpus não existir no catálogo ou em disco
+        """
+        name = self.resolve(name)
+        with self._lock:
+            engine = self.engines.get(name)
+            if engine is None:
+                if name not in self.catalog:
+                    raise ValueError(f"Corpus desconhecido: {name}")
+                metrics.cache_event("corpus", "miss")
+                engine = self._load_one(name)
+                if engine is None:
+                    raise ValueError(f"Índice do corpus '{name}' não encontrado")
+                self.engines[name] = engine
+                self.memory[name] = estimate_memory_bytes(engine)
+                print(f"✓ Corpus '{name}' carregado ({self.memory[name] / 1024**2:.1f} MB)")
+            else:
+                metrics.cache_event("corpus", "hit")
+            self._touch(name)
+            self._enforce_budget(keep=name)
+            return engine
+
+    def load(self, names: Optional[List[str]] = None, model=None) -> List[str]:
+        """
+        Carrega os corpora cujos índices existem em disco.
+
+        Args:
+            names: Corpora a carregar (default: todos do catálogo ainda não
+                carregados)
+            model: Encoder a compartilhar (default: o do primeiro corpus
+                registrado; senão o primeiro engine carrega o modelo)
+
+        Returns:
+            Nomes dos corpora carregados
+        """
+        with self._lock:
+            if model is not None:
+                self.model = model
+            names = names or [name for name in self.catalog if name not in self.engines]
+            loaded = []
+            for name in names:
+                try:
+                    self.get(name)
+                except ValueError:
+                    continue
+                loaded.append(self.resolve(name))
+            return loaded
+
+    def unload(self, name: str) -> bool:
+        """Descarrega um corpus (buscas em andamento mantêm sua referência)."""
+        name = self.resolve(name)
+        with self._lock:
+            if self.engines.pop(name, None) is None:
+                return False
+            self.memory.pop(name, None)
+            self._lru.pop(name, None)
+            self.pinned.discard(name)
+            return True
+
+    def _touch(self, name: str):
+        self._lru[name] = None
+        self._lru.move_to_end(name)
+
+    def _enforce_budget(self, keep: Optional[str] = None):
+        """Descarrega os corpora menos usados até caber no orçamento."""
+        if self.memory_budget <= 0:
+            return
+        for name in list(self._lru):
+            if sum(self.memory.values()) <= self.memory_budget:
+                break
+            if name == keep or name in self.pinned:
+                continue
+            self.unload(name)
+            metrics.cache_event("corpus", "eviction")
+            print(f"✓ Corpus '{name}' descarregado (orçamento de memória)")
+
+    def stats(self) -> Dict:
+        """Corpora disponíveis, carregados (ordem LRU) e uso de memória."""
+        with self._lock:
+            return {
+                "available": self.available(),
+                "loaded": [
+                    {
+                        "name": name,
+                        "verses": len(self.engines[name].verses),
+                        "memory_mb": round(self.memory.get(name, 0) / 1024**2, 2),
+                        "pinned": name in self.pinned,
+                    }
+                    for name in self._lru
+                ],
+                "memory_mb": round(sum(self.memory.values()) / 1024**2, 2),
+                "budget_mb": round(self.memory_budget / 1024**2, 2),
+            }
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="shard-search"
+            )
+        return self._executor
+
+    def _select(self, shards: Optional[List[str]]) -> Dict[str, IntertextualityEngine]:
+        if not shards:
+            available = self.available()
+            shards = [name for name in TESTAMENT_SHARDS if name in available]
+            if not shards:
+                return {}
+        return {self.resolve(name): self.get(name) for name in shards}
+
+    def search(
+        self, query: str, top_k: int = 5, shards: Optional[List[str]] = None
+    ) -> List[Tuple[Dict, float]]:
+        """
+        Busca versos similares em um ou mais shards.
+
+        Se a query for uma referência encontrada em algum shard, o vetor
+        indexado desse verso é usado em todos os shards e o próprio verso
+        fica fora dos resultados.
+
+        Args:
+            query: Texto ou referência
+            top_k: Número de resultados após a fusão
+            shards: Nomes dos corpora, carregados sob demanda (default:
+                os shards de testamento disponíveis, TESTAMENT_SHARDS)
+
+        Returns:
+            Lista (verso, score) ordenada por score; cada verso traz
+            ``corpus`` com o nome do shard
+
+        Raises:
+            ValueError: Se algum corpus pedido não existir
+        """
+        engines = self._select(shards)
+        if not engines:
+            return []
+
+        source: Optional[Tuple[str, int]] = None
+        for name, engine in engines.items():
+            row = engine.lookup_reference(query)
+            if row is not None:
+                source = (name, row)
+                break
+
+        if source is None and len(engines) == 1:
+            name, engine = next(iter(engines.items()))
+            return [
+                ({**verse, "corpus": name}, score)
+                for verse, score in engine.find_similar(query, top_k)
+            ]
+
+        # Um vetor por forma de entrada do modelo (canônica ou texto original),
+        # calculado antes de paralelizar: o encoder fica fora das threads
+        vectors: Dict[bool, np.ndarray] = {}
+        if source is not None:
+            name, row = source
+            vector = engines[name]._row_vector(row)
+            vectors = {True: vector, False: vector}
+        for engine in engines.values():
+            if engine.canonical_inputs not in vectors:
+                vectors[engine.canonical_inputs] = engine._encode_query(query)
+        depth = top_k + (1 if source is not None else 0)
+
+        def search_shard(item):
+            name, engine = item
+            return name, engine._search_rows(vectors[engine.canonical_inputs], depth)
+
+        if len(engines) == 1:
+            shard_hits = [search_shard(next(iter(engines.items())))]
+        else:
+            shard_hits = list(self._pool().map(search_shard, engines.items()))
+
+        merged = heapq.nlargest(
+            top_k,
+            (
+                (score, name, row)
+                for name, hits in shard_hits
+                for row, score in hits
+                if (name, row) != source
+            ),
+        )
+        return [
+            ({**engines[name].verses[row], "corpus": name}, score)
+            for score, name, row in merged
+        ]
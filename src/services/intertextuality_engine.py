@@ -1,30 +1,289 @@
+import glob
 import json
 import os
-from typing import Dict, List, Tuple
+import shutil
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import partial
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 
 import faiss
 import numpy as np
 import torch
 from sentence_transformers import SentenceTransformer
 
+from src.services import analytics, metrics, tracing
+from src.services.compressed_index import (
+    build_compressed_index,
+    first_pass_config,
+    first_pass_depth,
+    first_pass_margin,
+    is_compressed,
+    rescore,
+)
+from src.services.concordance import Concordance
+from src.services.encoders import encoder_backend, load_encoder
+from src.services.encoding_pipeline import EncodingPipeline
+from src.services.greek_text import normalize_greek
+from src.services.lexical_index import LemmaIndex, reciprocal_rank_fusion
+from src.services.morphology_index import MorphologyIndex
+from src.services.quotation_detector import QuotationIndex
+from src.services.reference_parser import parse_reference
+from src.services.reranker import CrossEncoderReranker
+from src.services.verse_ids import assign_verse_ids, make_verse_id
+
+
+def _cpu_count() -> int:
+    """Núcleos disponíveis para o processo (respeita affinity/cgroups)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def thread_budget() -> Dict[str, int]:
+    """
+    Orçamento de threads em CPU, das variáveis de ambiente ou derivado do
+    número de núcleos, de modo que encodes simultâneos × threads do torch
+    não passem do total de núcleos:
+
+    - ``MAX_CONCURRENT_ENCODES``: forward passes simultâneos (padrão:
+      metade dos núcleos, até 4)
+    - ``TORCH_THREADS``: threads intra-op do torch (padrão: núcleos /
+      encodes simultâneos)
+    - ``FAISS_THREADS``: threads OpenMP do FAISS (padrão: igual ao torch)
+    """
+    cores = _cpu_count()
+    encodes = int(os.getenv("MAX_CONCURRENT_ENCODES", "0")) or max(1, min(4, cores // 2))
+    torch_threads = int(os.getenv("TORCH_THREADS", "0")) or max(1, cores // encodes)
+    faiss_threads = int(os.getenv("FAISS_THREADS", "0")) or torch_threads
+    return {
+        "cores": cores,
+        "max_concurrent_encodes": encodes,
+        "torch_threads": torch_threads,
+        "faiss_threads": faiss_threads,
+    }
+
+
+class FifoSemaphore:
+    """
+    Semáforo com fila FIFO: a vaga liberada passa direto para quem espera
+    há mais tempo (no threading.Semaphore uma chamada nova pode passar na
+    frente e deixar requisições antigas esperando, o que estoura o p99).
+    """
+
+    def __init__(self, value: int):
+        self._value = value
+        self._total = value
+        self._lock = threading.Lock()
+        self._waiters: "deque[threading.Event]" = deque()
+
+    def acquire(self):
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return
+            turn = threading.Event()
+            self._waiters.append(turn)
+        turn.wait()
+
+    def release(self):
+        with self._lock:
+            # Valor negativo: vagas a menos após um resize, ainda ocupadas
+            if self._waiters and self._value >= 0:
+                self._waiters.popleft().set()
+            else:
+                self._value += 1
+
+    def resize(self, value: int):
+        """
+        Muda o número de vagas sem trocar o semáforo: quem já tem uma vaga
+        a devolve neste mesmo objeto (ao diminuir, as novas aquisições
+        esperam até as vagas excedentes serem liberadas).
+        """
+        with self._lock:
+            self._value += value - self._total
+            self._total = value
+            while self._value > 0 and self._waiters:
+                self._value -= 1
+                self._waiters.popleft().set()
+
+
+# Orçamento aplicado ao processo. O torch é configurado para o processo;
+# o número de threads do OpenMP (FAISS) vale por thread, então cada thread
+# que busca aplica o seu (ver _apply_faiss_threads).
+_budget: Optional[Dict[str, int]] = None
+_budget_generation = 0
+_encode_slots = FifoSemaphore(1)
+# Jobs em lote que ocupam todos os núcleos (ver _all_cores)
+_exclusive_lock = threading.Lock()
+_budget_lock = threading.Lock()
+_faiss_local = threading.local()
+
+
+def apply_thread_budget(force: bool = False) -> Dict[str, int]:
+    """Aplica o orçamento de threads uma vez por processo (ou de novo, com force)."""
+    global _budget, _budget_generation
+
+    with _budget_lock:
+        if _budget is None or force:
+            budget = thread_budget()
+            torch.set_num_threads(budget["torch_threads"])
+            _encode_slots.resize(budget["max_concurrent_encodes"])
+            _budget = budget
+            _budget_generation += 1
+        return _budget
+
+
+def _apply_faiss_threads():
+    """
+    Aplica FAISS_THREADS na thread atual (o ``omp_set_num_threads`` só vale
+    para a thread que o chama; as threads do servidor começam com o padrão
+    do OpenMP, todos os núcleos).
+    """
+    if getattr(_faiss_local, "generation", None) != _budget_generation:
+        faiss.omp_set_num_threads(apply_thread_budget()["faiss_threads"])
+        _faiss_local.generation = _budget_generation
+
+
+@contextmanager
+def _all_cores(cores: int) -> Iterator[None]:
+    """
+    Job em lote (setup) com todos os núcleos no torch: ocupa todas as vagas
+    de encode, então nenhuma query roda com o torch acima do orçamento.
+    """
+    with _exclusive_lock:
+        slots = _budget["max_concurrent_encodes"]
+        for _ in range(slots):
+            _encode_slots.acquire()
+    torch.set_num_threads(cores)
+    try:
+        yield
+    finally:
+        torch.set_num_threads(_budget["torch_threads"])
+        for _ in range(slots):
+            _encode_slots.release()
+
+
+class _IndexState(NamedTuple):
+    """
+    Índice, versos, embeddings e mapas de ids publicados juntos: mutações
+    montam um estado novo e o trocam com uma única atribuição, então uma
+    busca que leu ``engine._state`` vê sempre uma versão coerente.
+    """
+
+    index: Optional[faiss.Index]
+    verses: List[Dict]
+    embeddings: Optional[np.ndarray]
+    # Id estável (64 bits) de cada linha; os ids são os rótulos do FAISS
+    verse_ids: np.ndarray
+    # Ids ordenados e suas linhas (busca binária id → linha)
+    sorted_ids: np.ndarray
+    sorted_rows: np.ndarray
+    # Linhas removidas (tombstones) até a próxima compactação em disco
+    removed_rows: frozenset
+    # (livro, capítulo, verso) → linha no índice
+    reference_index: Dict[Tuple[str, int, int], int]
+
+
+def _state_field(name: str) -> property:
+    """Atributo do engine lido de/gravado em ``_state`` (troca de um campo)."""
+
+    def getter(self):
+        return getattr(self._state, name)
+
+    def setter(self, value):
+        self._state = self._state._replace(**{name: value})
+
+    return property(getter, setter)
+
 
 class IntertextualityEngine:
     """Motor de busca semântica para detectar intertextualidade bíblica."""
 
-    def __init__(self, model_name: str = "paraphrase-multilingual-mpnet-base-v2"):
+    index = _state_field("index")
+    verses = _state_field("verses")
+    embeddings = _state_field("embeddings")
+    verse_ids = _state_field("verse_ids")
+    _sorted_ids = _state_field("sorted_ids")
+    _sorted_rows = _state_field("sorted_rows")
+    _removed_rows = _state_field("removed_rows")
+    _reference_index = _state_field("reference_index")
+
+    def __init__(
+        self,
+        model_name: str = "paraphrase-multilingual-mpnet-base-v2",
+        model=None,
+        corpus: str = "sblgnt",
+    ):
         """
         Inicializa o motor com um modelo de embeddings.
 
         Args:
             model_name: Nome do modelo Sentence Transformers
                        (default: multilíngue incluindo grego/hebraico)
+            model: Encoder já carregado (ex.: compartilhado entre shards);
+                se informado, model_name não é carregado
+            corpus: Nome do corpus, parte dos ids estáveis dos versos
         """
-        print(f"Carregando modelo {model_name}...")
         self.model_name = model_name
-        self._init_device()
-        self.index = None
-        self.verses = []
-        self.embeddings = None
+        self.thread_budget = apply_thread_budget()
+        if model is None:
+            print(f"Carregando modelo {model_name}...")
+            self._init_device()
+        else:
+            self.model = model
+            self.device = str(getattr(model, "device", "cpu")).split(":")[0]
+            self.encoder_backend = "external"
+        self._state = _IndexState(
+            index=None,
+            verses=[],
+            embeddings=None,
+            verse_ids=np.zeros(0, dtype=np.int64),
+            sorted_ids=np.zeros(0, dtype=np.int64),
+            sorted_rows=np.zeros(0, dtype=np.int64),
+            removed_rows=frozenset(),
+            reference_index={},
+        )
+        self.corpus = corpus
+        # Deltas persistidos desde a última base (ver add_verses)
+        self._paths: Optional[Tuple[str, str]] = None
+        self._delta_seq = 0
+        # Diretório gravável fora da versão publicada de um snapshot (deltas e
+        # matrizes recalculadas); None = ao lado do índice
+        self._local_dir: Optional[str] = None
+        # Raiz onde a compactação publica a versão nova (None: somente leitura)
+        self._snapshot_root: Optional[str] = None
+        # Versão do snapshot carregado/publicado (ver snapshots), se houver
+        self.snapshot_version: Optional[str] = None
+        self._mutation_lock = threading.RLock()
+        self._compaction: Optional[threading.Thread] = None
+        # Sub-índices de granularidade maior (janelas de versos e capítulos)
+        self.passage_index = None
+        self.passages: List[Dict] = []
+        self.chapter_index = None
+        self.chapters: List[Dict] = []
+        # Índice invertido de lemas (BM25) para busca lexical/híbrida
+        self.lemma_index: Optional[LemmaIndex] = None
+        # Tabela morfológica (bitmaps por traço) construída sob demanda
+        self.morphology_index: Optional[MorphologyIndex] = None
+        # Shingles + MinHash/LSH para citações quase literais
+        self.quotation_index: Optional[QuotationIndex] = None
+        # Suffix array do texto normalizado (concordância KWIC)
+        self.concordance: Optional[Concordance] = None
+        # Re-ranker (cross-encoder) carregado sob demanda
+        self._reranker: Optional[CrossEncoderReranker] = None
+        # Falha ao carregar o re-ranker: não tenta de novo neste engine
+        self._reranker_failed = False
+        # Embeddings de queries já vistas (LRU por forma de entrada do modelo)
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_cache_max = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+        # Matrizes livro × livro / capítulo × capítulo: nível → (impressão,
+        # rótulos, matrizes)
+        # nível → (estado, top_k, rótulos, matrizes) do último cálculo
+        self._similarity_matrices: Dict[str, Tuple[_IndexState, int, List[str], Dict]] = {}
 
     def _init_device(self):
         """Inicializa ou reinicializa o device baseado nas variáveis de ambiente."""
@@ -39,12 +298,14 @@ class IntertextualityEngine:
         else:  # auto
             self.device = "cuda" if torch.cuda.is_available() else "cpu"
 
-        # Carregar modelo no device apropriado
-        if hasattr(self, "model"):
-            # Recarregar modelo em device diferente
+        # Backend quantizado (ENCODER_BACKEND) só em CPU; em GPU, PyTorch
+        self.encoder_backend = encoder_backend()
+        if self.device == "cuda" or self.encoder_backend == "torch":
+            self.encoder_backend = "torch"
             self.model = SentenceTransformer(self.model_name, device=self.device)
         else:
-            self.model = SentenceTransformer(self.model_name, device=self.device)
+            self.model = load_encoder(self.model_name, self.encoder_backend)
+            self.encoder_backend = self.model.encoder_backend
 
         if self.device == "cuda":
             gpu_name = torch.cuda.get_device_name(0)
@@ -53,7 +314,7 @@ class IntertextualityEngine:
             print(f"  • Memória GPU: {gpu_memory:.2f} GB")
             print(f"  • CUDA Version: {torch.version.cuda}")
         else:
-            print("✓ Modelo carregado em CPU")
+            print(f"✓ Modelo carregado em CPU (backend {self.encoder_backend})")
             print("  💡 Para usar GPU: execute scripts/check_gpu.py")
 
     def set_device(self, device: str) -> dict:
@@ -89,7 +350,15 @@ class IntertextualityEngine:
         """Retorna informações sobre o device atual."""
         info = {
             "device": self.device,
+            "encoder_backend": self.encoder_backend,
             "cuda_available": torch.cuda.is_available(),
+            "threads": {
+                "cores": self.thread_budget["cores"],
+                "max_concurrent_encodes": self.thread_budget["max_concurrent_encodes"],
+                "torch_threads": torch.get_num_threads(),
+                # Aplicado em cada thread de busca (ver _apply_faiss_threads)
+                "faiss_threads": apply_thread_budget()["faiss_threads"],
+            },
         }
 
         if torch.cuda.is_available():
@@ -103,35 +372,81 @@ class IntertextualityEngine:
 
         return info
 
-    def create_embeddings(self, verses: List[Dict]) -> np.ndarray:
+    def encoding_pipeline(
+        self, output_dir: str, workers: int = 1, **kwargs
+    ) -> EncodingPipeline:
+        """
+        Pipeline de encoding em chunks com checkpoint para este modelo; com
+        workers > 1 (só em CPU), cada processo carrega o modelo com o mesmo
+        backend do engine (um encoder externo não é recriável: workers=1).
+        """
+        backend = self.encoder_backend
+        if self.device == "cuda":
+            workers = 1
+        if backend == "external" and workers > 1:
+            print("Aviso: encoder externo não pode ser recriado nos processos; usando workers=1")
+            workers = 1
+        kwargs.setdefault("threads", max(1, self.thread_budget["cores"] // max(1, workers)))
+        return EncodingPipeline(
+            output_dir,
+            model=self.model,
+            model_factory=(
+                partial(load_encoder, self.model_name, backend) if backend != "external" else None
+            ),
+            model_name=self.model_name,
+            backend=backend,
+            workers=workers,
+            **kwargs,
+        )
+
+    def create_embeddings(
+        self, verses: List[Dict], pipeline: Optional[EncodingPipeline] = None
+    ) -> np.ndarray:
         """
         Cria embeddings para todos os versos.
 
         Args:
-            verses: Lista de dicts ('text','book','chapter','verse')
+            verses: Lista de dicts ('text','book','chapter','verse'); o
+                engine guarda cópias (os ids são gravados nelas)
+            pipeline: Encoding em chunks com checkpoint e processos (ver
+                encoding_pipeline); None codifica tudo de uma vez
 
         Returns:
             Array numpy com embeddings
         """
-        self.verses = verses
-        texts = [v["text"].strip() for v in verses]
+        self.verses = [dict(v) for v in verses]
+        self._build_reference_index()
+        texts = [self._model_input(v) for v in verses]
 
         print(f"Gerando embeddings para {len(texts)} versos...")
-        self.embeddings = self.model.encode(
-            texts,
-            show_progress_bar=True,
-            convert_to_numpy=True,
-            normalize_embeddings=True,  # Normaliza para cosine similarity
-        )
+        # Job em lote (setup): usa todos os núcleos, não a fatia por encode
+        # (com processos, cada um recebe a sua parte em pipeline.threads)
+        with _all_cores(self.thread_budget["cores"]):
+            if pipeline is not None:
+                self.embeddings = pipeline.run(texts)
+            else:
+                self.embeddings = self.model.encode(
+                    texts,
+                    show_progress_bar=True,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,  # Normaliza para cosine similarity
+                )
 
         return self.embeddings
 
-    def build_index(self, embeddings: np.ndarray = None):
+    def build_index(
+        self,
+        embeddings: np.ndarray = None,
+        first_pass: Optional[Tuple[int, str]] = None,
+    ):
         """
         Constrói índice FAISS para busca rápida.
 
         Args:
             embeddings: Array de embeddings (usa self.embeddings se None)
+            first_pass: (dimensão, codec) do índice comprimido com
+                re-pontuação exata (ver compressed_index); None usa
+                FIRST_PASS_DIM/FIRST_PASS_CODEC (sem eles, IndexFlatIP)
         """
         if embeddings is None:
             embeddings = self.embeddings
@@ -140,6 +455,7 @@ class IntertextualityEngine:
             raise ValueError(
                 ("Embeddings não encontrados. Execute " "create_embeddings primeiro.")
             )
+        self.embeddings = embeddings
 
         dimension = embeddings.shape[1]
         num_vectors = embeddings.shape[0]
@@ -147,18 +463,30 @@ class IntertextualityEngine:
             f"Construindo índice FAISS (dim={dimension}, " f"{num_vectors:,} versos)..."
         )
 
-        # IndexFlatIP: Inner Product (cosine similarity)
-        self.index = faiss.IndexFlatIP(dimension)
+        # IndexFlatIP: Inner Product (cosine similarity), rotulado pelos
+        # ids estáveis dos versos (IndexIDMap2 permite reconstruir por id)
+        self._assign_ids(num_vectors)
+        first_pass = first_pass or first_pass_config()
+        if first_pass is None:
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+        else:
+            print(f"  Primeiro estágio comprimido: {first_pass[0]} dims, {first_pass[1]}")
+            self.index = build_compressed_index(embeddings, *first_pass)
 
         # Adiciona embeddings em batches para feedback visual
         batch_size = 1000
         for i in range(0, num_vectors, batch_size):
             end = min(i + batch_size, num_vectors)
-            self.index.add(embeddings[i:end].astype("float32"))
+            self.index.add_with_ids(
+                np.ascontiguousarray(embeddings[i:end], dtype="float32"),
+                self.verse_ids[i:end],
+            )
             pct = (end / num_vectors) * 100
             print(f"  Indexando: {end:,}/{num_vectors:,} ({pct:.1f}%)", end="\r")
 
         print(f"\n✓ Índice construído com {self.index.ntotal:,} versos")
+        self.lemma_index = None
+        self._prepare_lemma_index()
         # Opcional: mover índice para GPU se disponível e solicitado
         try:
             if os.getenv("USE_FAISS_GPU", "0") == "1" and hasattr(
@@ -174,13 +502,450 @@ class IntertextualityEngine:
         except Exception as e:
             print(f"Aviso: Falha ao migrar índice para GPU: {e}")
 
-    def find_similar(self, query: str, top_k: int = 5) -> List[Tuple[Dict, float]]:
+    def _get_embeddings(self, state: Optional[_IndexState] = None) -> np.ndarray:
+        """Matriz de embeddings dos versos (reconstruída do índice se preciso)."""
+        state = state or self._state
+        if state.embeddings is not None or state.index is None:
+            return state.embeddings
+        # Tombstones não estão no índice: vetor nulo
+        zeros = np.zeros((1, state.index.d), dtype="float32")
+        embeddings = np.vstack(
+            [
+                zeros if row in state.removed_rows else self._row_vector(row, state)
+                for row in range(len(state.verses))
+            ]
+        )
+        with self._mutation_lock:
+            if self._state is state:
+                self._state = state._replace(embeddings=embeddings)
+        return embeddings
+
+    def _assign_ids(self, num_rows: Optional[int] = None):
+        """
+        Atribui (ou relê) o id estável de cada verso, gravado em ``verse["id"]``.
+
+        Versos repetidos no mesmo corpus recebem variantes (byte baixo do
+        id). Sem metadados para todas as linhas, os ids são as próprias
+        linhas (índices de teste/legados).
+        """
+        num_rows = len(self.verses) if num_rows is None else num_rows
+        if len(self.verses) != num_rows:
+            verse_ids = np.arange(num_rows, dtype=np.int64)
+        else:
+            verse_ids = assign_verse_ids(self.verses, self.corpus)
+        sorted_ids, sorted_rows = self._id_lookup(verse_ids)
+        self._state = self._state._replace(
+            verse_ids=verse_ids, sorted_ids=sorted_ids, sorted_rows=sorted_rows
+        )
+
+    @staticmethod
+    def _id_lookup(verse_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Mapa id → linha: (ids ordenados, linhas) para busca binária."""
+        order = np.argsort(verse_ids, kind="stable")
+        return verse_ids[order], order.astype(np.int64)
+
+    def _labels_to_rows(
+        self, labels: np.ndarray, state: Optional[_IndexState] = None
+    ) -> np.ndarray:
+        """Rótulos do FAISS (ids) → linhas; ids desconhecidos viram -1."""
+        state = state or self._state
+        labels = np.asarray(labels, dtype=np.int64)
+        sorted_ids = state.sorted_ids
+        if sorted_ids.size == 0:
+            return np.full(labels.shape, -1, dtype=np.int64)
+        pos = np.clip(np.searchsorted(sorted_ids, labels), 0, sorted_ids.size - 1)
+        rows = state.sorted_rows[pos]
+        rows[(sorted_ids[pos] != labels) | (labels < 0)] = -1
+        return rows
+
+    def row_for_id(
+        self, verse_id: int, state: Optional[_IndexState] = None
+    ) -> Optional[int]:
+        """Linha atual de um id estável (None se ausente ou removido)."""
+        state = state or self._state
+        row = int(self._labels_to_rows(np.array([verse_id]), state)[0])
+        if row < 0 or row in state.removed_rows:
+            return None
+        return row
+
+    def build_granularity_indexes(
+        self,
+        window_sizes: Optional[Tuple[int, ...]] = None,
+        stride: Optional[int] = None,
+    ):
+        """
+        Constrói os sub-índices de passagens (janelas deslizantes de versos)
+        e de capítulos.
+
+        As janelas são codificadas pelo modelo como texto contínuo, para
+        capturar alusões que atravessam a fronteira entre versos. Os vetores
+        de capítulo são a média normalizada dos vetores dos seus versos.
+
+        Args:
+            window_sizes: Tamanhos das janelas em versos
+                (default: env PASSAGE_WINDOWS ou "2,3")
+            stride: Passo entre janelas consecutivas
+                (default: env PASSAGE_STRIDE ou 1)
+        """
+        if window_sizes is None:
+            window_sizes = tuple(
+                int(w) for w in os.getenv("PASSAGE_WINDOWS", "2,3").split(",")
+            )
+        if stride is None:
+            stride = int(os.getenv("PASSAGE_STRIDE", "1"))
+
+        if self._get_embeddings() is None or not self.verses:
+            raise ValueError("Índice não construído. Execute build_index primeiro.")
+
+        self._build_chapter_index()
+
+        # Passagens: janelas deslizantes dentro de cada livro
+        keys = [(v["book"], v["chapter"]) for v in self.verses]
+        book_starts = [0] + [
+            i for i in range(1, len(keys)) if keys[i][0] != keys[i - 1][0]
+        ]
+        book_ends = book_starts[1:] + [len(keys)]
+        self.passages = []
+        for size in window_sizes:
+            for book_start, book_end in zip(book_starts, book_ends):
+                for start in range(book_start, book_end - size + 1, stride):
+                    first, last = self.verses[start], self.verses[start + size - 1]
+                    self.passages.append(
+                        {
+                            "book": first["book"],
+                            "chapter": first["chapter"],
+                            "verse": first["verse"],
+                            "end_chapter": last["chapter"],
+                            "end_verse": last["verse"],
+                            "row_start": start,
+                            "row_end": start + size,
+                            "text": " ".join(
+                                v["text"].strip()
+                                for v in self.verses[start : start + size]
+                            ),
+                        }
+                    )
+
+        print(f"Gerando embeddings para {len(self.passages)} passagens...")
+        if self.passages:
+            passage_vectors = self.model.encode(
+                [
+                    " ".join(
+                        self._model_input(v)
+                        for v in self.verses[p["row_start"] : p["row_end"]]
+                    )
+                    for p in self.passages
+                ],
+                show_progress_bar=True,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            )
+        else:
+            # Livros mais curtos que as janelas: sub-índice vazio
+            passage_vectors = np.zeros((0, self._get_embeddings().shape[1]), dtype="float32")
+        self.passage_index = self._flat_index(passage_vectors)
+        print(f"✓ Sub-índice de passagens: {len(self.passages):,} janelas")
+
+    def _build_chapter_index(self):
+        """Capítulos: média normalizada dos vetores dos seus versos."""
+        # Sequências contíguas de versos com mesmo (livro, capítulo)
+        keys = [(v["book"], v["chapter"]) for v in self.verses]
+        starts = [0] + [i for i in range(1, len(keys)) if keys[i] != keys[i - 1]]
+        ends = starts[1:] + [len(keys)]
+        self.chapters = [
+            {
+                "book": keys[start][0],
+                "chapter": keys[start][1],
+                "row_start": start,
+                "row_end": end,
+            }
+            for start, end in zip(starts, ends)
+        ]
+        chapter_vectors = np.add.reduceat(
+            np.asarray(self._get_embeddings(), dtype="float32"), starts, axis=0
+        )
+        faiss.normalize_L2(chapter_vectors)
+        self.chapter_index = self._flat_index(chapter_vectors)
+        print(f"✓ Sub-índice de capítulos: {len(self.chapters):,} capítulos")
+
+    @staticmethod
+    def _flat_index(vectors: np.ndarray):
+        index = faiss.IndexFlatIP(vectors.shape[1])
+        index.add(np.ascontiguousarray(vectors, dtype="float32"))
+        return index
+
+    @staticmethod
+    def _reference_map(verses: List[Dict]) -> Dict[Tuple[str, int, int], int]:
+        """(livro, capítulo, verso) → linha do índice, para lookup O(1)."""
+        return {
+            (v["book"], int(v["chapter"]), int(v["verse"])): row
+            for row, v in enumerate(verses)
+            if not v.get("removed")
+        }
+
+    def _build_reference_index(self):
+        self._reference_index = self._reference_map(self.verses)
+
+    def lookup_reference(self, query: str) -> Optional[int]:
+        """
+        Resolve uma referência bíblica ("João 3:16", "Rev 12:1") para a
+        linha do verso no índice.
+
+        Returns:
+            Linha do verso ou None se a query não for uma referência conhecida
+        """
+        return self._lookup(query, self._state)
+
+    @staticmethod
+    def _lookup(query: str, state: _IndexState) -> Optional[int]:
+        reference = parse_reference(query)
+        if reference is None:
+            return None
+        return state.reference_index.get(reference)
+
+    @property
+    def canonical_inputs(self) -> bool:
+        """
+        True se o corpus traz a forma canônica (campo ``normalized``): nesse
+        caso versos e queries são codificados sem acentos/caixa/pontuação,
+        e "ἀγάπη", "αγαπη" e "ΑΓΑΠΗ" geram o mesmo embedding.
+        """
+        return bool(self.verses) and "normalized" in self.verses[0]
+
+    def _model_input(self, verse: Dict) -> str:
+        """Texto de um verso na forma usada como entrada do modelo."""
+        if "normalized" in verse:
+            return verse["normalized"]
+        return verse["text"].strip()
+
+    @contextmanager
+    def _encode_slot(self) -> Iterator[None]:
+        """
+        Limita os forward passes simultâneos (MAX_CONCURRENT_ENCODES): além
+        do limite, as requisições esperam em vez de disputar os núcleos.
+        """
+        start = time.perf_counter()
+        _encode_slots.acquire()
+        waited = time.perf_counter() - start
+        if waited > 1e-4:
+            tracing.record("encode_wait", waited)
+        try:
+            yield
+        finally:
+            _encode_slots.release()
+
+    def _encode_query(self, query: str) -> np.ndarray:
+        """Gera o embedding normalizado (1, dim) de uma query textual."""
+        text = normalize_greek(query) if self.canonical_inputs else query
+        cached = self._query_cache.get(text)
+        if cached is not None:
+            self._query_cache.move_to_end(text)
+            metrics.cache_event("query_embedding", "hit")
+            return cached
+
+        metrics.cache_event("query_embedding", "miss")
+        with self._encode_slot(), metrics.timed(
+            metrics.STAGE_SECONDS, "encode", span="encode"
+        ):
+            query_embedding = self.model.encode(
+                [text], convert_to_numpy=True, normalize_embeddings=True
+            ).astype("float32")
+        self._query_cache[text] = query_embedding
+        while len(self._query_cache) > self._query_cache_max:
+            self._query_cache.popitem(last=False)
+            metrics.cache_event("query_embedding", "eviction")
+        return query_embedding
+
+    @property
+    def rescores(self) -> bool:
+        """Índice comprimido cujos candidatos são re-pontuados (embeddings completos)."""
+        return self._rescores(self._state)
+
+    @staticmethod
+    def _rescores(state: _IndexState) -> bool:
+        return state.embeddings is not None and is_compressed(state.index)
+
+    def _row_vector(self, row: int, state: Optional[_IndexState] = None) -> np.ndarray:
+        """Recupera o vetor armazenado de um verso sem passar pelo modelo."""
+        state = state or self._state
+        if self._rescores(state):
+            # O índice comprimido só reconstrói uma aproximação
+            return np.asarray(state.embeddings[row], dtype="float32").reshape(1, -1)
+        verse_id = int(state.verse_ids[row])
+        return state.index.reconstruct(verse_id).reshape(1, -1).astype("float32")
+
+    def _search_rows(
+        self,
+        vector: np.ndarray,
+        top_k: int,
+        verse_filter: Optional[np.ndarray] = None,
+        state: Optional[_IndexState] = None,
+    ) -> List[Tuple[int, float]]:
+        """
+        Busca no índice FAISS e retorna pares (linha, score).
+
+        Args:
+            verse_filter: Se informado, restringe a busca a estas linhas
+                (pré-filtro via IDSelector do FAISS)
+            state: Estado a consultar (default: o publicado agora)
+        """
+        _apply_faiss_threads()
+        state = state or self._state
+        num_verses = len(state.verses)
+        rescores = self._rescores(state)
+        depth = first_pass_depth(top_k) if rescores else top_k
+        stage = "faiss_search"
+        with metrics.timed(metrics.STAGE_SECONDS, stage, span=stage):
+            if verse_filter is None:
+                scores, labels = state.index.search(vector, depth)
+            else:
+                allowed = state.verse_ids[np.asarray(verse_filter, dtype=np.int64)]
+                selector = faiss.IDSelectorBatch(np.ascontiguousarray(allowed))
+                params = faiss.SearchParameters(sel=selector)
+                scores, labels = state.index.search(vector, depth, params=params)
+        rows = self._labels_to_rows(labels[0], state)
+        if rescores:
+            with metrics.timed(metrics.STAGE_SECONDS, "rescore", span="rescore"):
+                rows, scores = rescore(
+                    state.embeddings, vector, rows[(rows >= 0) & (rows < num_verses)]
+                )
+            rows, scores = rows[:top_k], scores[:top_k].reshape(1, -1)
+        return [
+            (int(row), float(score))
+            for row, score in zip(rows, scores[0])
+            if 0 <= row < num_verses
+        ]
+
+    def _query_vector(
+        self, query: str, state: Optional[_IndexState] = None
+    ) -> np.ndarray:
+        """Vetor da query: vetor indexado se for referência, senão o encoder."""
+        state = state or self._state
+        row = self._lookup(query, state)
+        if row is not None:
+            return self._row_vector(row, state)
+        return self._encode_query(query)
+
+    def _range_rows(
+        self, vector: np.ndarray, threshold: float, state: Optional[_IndexState] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Retorna (linhas, scores) de todos os versos com score > threshold."""
+        _apply_faiss_threads()
+        state = state or self._state
+        index = state.index
+        rescores = self._rescores(state)
+        # Scores aproximados: folga no primeiro estágio, corte no score exato
+        first_threshold = threshold - first_pass_margin() if rescores else threshold
+        try:
+            lims, scores, labels = index.range_search(vector, first_threshold)
+            labels, scores = labels[lims[0] : lims[1]], scores[lims[0] : lims[1]]
+        except RuntimeError:
+            # Índices FAISS em GPU não implementam range_search
+            scores, labels = index.search(vector, index.ntotal)
+            mask = (labels[0] >= 0) & (scores[0] > first_threshold)
+            labels, scores = labels[0][mask], scores[0][mask]
+        rows = self._labels_to_rows(labels, state)
+        rows, scores = rows[rows >= 0], scores[rows >= 0]
+        if rescores:
+            rows, scores = rescore(state.embeddings, vector, rows[rows < len(state.verses)])
+            keep = scores > threshold
+            rows, scores = rows[keep], scores[keep]
+        return rows, scores
+
+    def find_above_threshold(
+        self,
+        query: str,
+        threshold: float,
+        limit: int = 50,
+        after: Optional[Tuple[float, int]] = None,
+    ) -> Tuple[List[Tuple[int, float]], int]:
+        """
+        Busca todos os versos com similaridade acima do threshold (range_search),
+        retornando uma página ordenada por score.
+
+        A paginação é por chave (keyset): ``after`` é o par (score, linha) do
+        último item da página anterior. Só linhas e scores são materializados;
+        os metadados dos versos ficam a cargo de quem chama.
+
+        Args:
+            query: Texto ou referência da consulta
+            threshold: Similaridade mínima (cosseno)
+            limit: Tamanho máximo da página
+            after: Cursor (score, linha) do último item já retornado
+
+        Returns:
+            Tupla (lista de (linha, score) da página, total de versos acima
+            do threshold)
+        """
+        if self.index is None:
+            raise ValueError("Índice não construído. Execute build_index primeiro.")
+
+        state = self._state
+        rows, scores = self._range_rows(self._query_vector(query, state), threshold, state)
+        valid = rows < len(state.verses)
+        rows, scores = rows[valid], scores[valid]
+        total = int(rows.shape[0])
+
+        if after is not None:
+            last_score, last_row = after
+            keep = (scores < last_score) | ((scores == last_score) & (rows > last_row))
+            rows, scores = rows[keep], scores[keep]
+
+        # Ordena por score decrescente, desempate pela linha (ordem estável)
+        order = np.lexsort((rows, -scores))[:limit]
+        page = [(int(rows[i]), float(scores[i])) for i in order]
+        return page, total
+
+    def get_reranker(self) -> Optional[CrossEncoderReranker]:
+        """
+        Retorna o re-ranker, carregando-o na primeira chamada.
+
+        O re-ranking fica desabilitado (None) se RERANKER_MODEL for vazio
+        ou se o modelo não puder ser carregado.
+        """
+        if (
+            self._reranker is None
+            and not self._reranker_failed
+            and os.getenv("RERANKER_MODEL", "") != ""
+        ):
+            try:
+                self._reranker = CrossEncoderReranker(device=self.device)
+            except Exception as e:  # noqa: BLE001
+                print(f"Aviso: Re-ranker não pôde ser carregado: {e}")
+                self._reranker_failed = True
+        return self._reranker
+
+    def _rerank(
+        self, query_text: str, candidates: List[Tuple[Dict, float]], top_k: int
+    ) -> List[Tuple[Dict, float]]:
+        """Aplica o re-ranker se disponível; senão mantém a ordem do FAISS."""
+        reranker = self.get_reranker()
+        if reranker is not None:
+            with tracing.span("rerank"):
+                candidates, _ = reranker.rerank(query_text, candidates)
+        return candidates[:top_k]
+
+    def _rerank_depth(self, top_k: int) -> int:
+        """Número de candidatos do primeiro estágio enviados ao re-ranker."""
+        return max(top_k, int(os.getenv("RERANK_TOP_N", "50")))
+
+    def find_similar(
+        self,
+        query: str,
+        top_k: int = 5,
+        rerank: bool = False,
+        verse_filter: Optional[np.ndarray] = None,
+    ) -> List[Tuple[Dict, float]]:
         """
         Encontra versos similares a uma query.
 
         Args:
             query: Texto da consulta
             top_k: Número de resultados a retornar
+            rerank: Se True, re-pontua os RERANK_TOP_N primeiros candidatos
+                com o cross-encoder (ver get_reranker)
+            verse_filter: Linhas permitidas (ex.: resultado de
+                search_morphology); None busca em todo o corpus
 
         Returns:
             Lista de tuplas (verso, score)
@@ -188,21 +953,50 @@ class IntertextualityEngine:
         if self.index is None:
             raise ValueError("Índice não construído. Execute build_index primeiro.")
 
-        # Gera embedding da query
-        query_embedding = self.model.encode(
-            [query], convert_to_numpy=True, normalize_embeddings=True
-        )
+        state = self._state
+        depth = self._rerank_depth(top_k) if rerank else top_k
+        rows = self._search_rows(self._encode_query(query), depth, verse_filter, state)
+        with metrics.timed(metrics.STAGE_SECONDS, "metadata", span="metadata"):
+            results = [(state.verses[row], score) for row, score in rows]
+        if rerank:
+            return self._rerank(query, results, top_k)
+        return results
 
-        # Busca no índice
-        scores, indices = self.index.search(query_embedding.astype("float32"), top_k)
+    def find_by_reference(
+        self,
+        query: str,
+        top_k: int = 5,
+        exclude_same_book: bool = False,
+        rerank: bool = False,
+    ) -> Optional[Tuple[Dict, List[Tuple[Dict, float]]]]:
+        """
+        Busca links a partir de uma referência, usando o vetor já indexado
+        do verso (sem forward pass do modelo).
 
-        # Retorna versos com scores
-        results = []
-        for idx, score in zip(indices[0], scores[0]):
-            if idx < len(self.verses):
-                results.append((self.verses[idx], float(score)))
+        Args:
+            query: Referência bíblica (ex.: "João 3:16")
+            top_k: Número de links a retornar
+            exclude_same_book: Se True, exclui versos do mesmo livro
+            rerank: Se True, re-pontua os candidatos com o cross-encoder,
+                usando o texto do verso de origem como query
 
-        return results
+        Returns:
+            Tupla (verso de origem, links) ou None se a query não for uma
+            referência presente no corpus
+        """
+        if self.index is None:
+            raise ValueError("Índice não construído. Execute build_index primeiro.")
+
+        state = self._state
+        row = self._lookup(query, state)
+        if row is None:
+            return None
+        source = state.verses[row]
+        if not rerank:
+            return source, self._links(row, top_k, exclude_same_book, state)
+
+        candidates = self._links(row, self._rerank_depth(top_k), exclude_same_book, state)
+        return source, self._rerank(source["text"], candidates, top_k)
 
     def find_intertextual_links(
         self,
@@ -221,14 +1015,19 @@ class IntertextualityEngine:
         Returns:
             Lista de tuplas (verso, score) ordenada por similaridade
         """
-        if verse_idx >= len(self.verses):
+        return self._links(verse_idx, top_k, exclude_same_book, self._state)
+
+    def _links(
+        self, verse_idx: int, top_k: int, exclude_same_book: bool, state: _IndexState
+    ) -> List[Tuple[Dict, float]]:
+        if verse_idx >= len(state.verses):
             return []
 
-        source_verse = self.verses[verse_idx]
-        results = self.find_similar(source_verse["text"], top_k + 1)
+        source_verse = state.verses[verse_idx]
+        rows = self._search_rows(self._row_vector(verse_idx, state), top_k + 1, state=state)
 
         # Remove o próprio verso
-        results = [r for r in results if r[0] != source_verse]
+        results = [(state.verses[r], s) for r, s in rows if r != verse_idx]
 
         # Filtra mesmo livro se solicitado
         if exclude_same_book:
@@ -236,6 +1035,693 @@ class IntertextualityEngine:
 
         return results[:top_k]
 
+    def get_lemma_index(self) -> LemmaIndex:
+        """Retorna o índice de lemas, construindo-o a partir dos versos se preciso."""
+        if self.lemma_index is None:
+            lemma_index = LemmaIndex()
+            lemma_index.build(self.verses)
+            self.lemma_index = lemma_index
+        return self.lemma_index
+
+    def _prepare_lemma_index(self):
+        """
+        Constrói o índice de lemas junto com o vetorial (se os versos têm
+        lemas): a busca híbrida não paga isso na requisição.
+        """
+        if self.verses and all("lemmas" in verse for verse in self.verses):
+            self.get_lemma_index()
+            print(f"✓ Índice de lemas construído ({len(self.lemma_index.lemmas):,} lemas)")
+
+    def find_similar_hybrid(
+        self,
+        query: str,
+        top_k: int = 5,
+        depth: int = 100,
+        rrf_k: int = 60,
+    ) -> List[Tuple[Dict, float]]:
+        """
+        Busca híbrida: funde o ranking vetorial (FAISS) e o lexical (BM25
+        sobre lemas) por Reciprocal Rank Fusion.
+
+        Para referências, os lemas da query são os do próprio verso (que
+        fica fora dos resultados); para texto livre, as formas são mapeadas
+        para lemas pelo vocabulário do corpus.
+
+        Args:
+            query: Texto ou referência da consulta
+            top_k: Número de resultados
+            depth: Profundidade de cada ranking antes da fusão
+            rrf_k: Constante k do RRF
+
+        Returns:
+            Lista de tuplas (verso, score RRF); cada verso é uma cópia com o
+            campo extra ``shared_lemmas`` (lemas em comum com a query)
+        """
+        if self.index is None:
+            raise ValueError("Índice não construído. Execute build_index primeiro.")
+
+        state = self._state
+        lemma_index = self.get_lemma_index()
+        row = self._lookup(query, state)
+        if row is not None:
+            vector = self._row_vector(row, state)
+            query_lemmas = list(dict.fromkeys(state.verses[row]["lemmas"]))
+        else:
+            vector = self._encode_query(query)
+            query_lemmas = lemma_index.query_lemmas(query)
+
+        dense_rows = np.array(
+            [hit for hit, _ in self._search_rows(vector, depth, state=state)], dtype=np.int64
+        )
+        with tracing.span("lexical_search"):
+            lexical_rows, _ = lemma_index.search(query_lemmas, depth)
+
+        rows, scores = reciprocal_rank_fusion([dense_rows, lexical_rows], rrf_k)
+        if row is not None:
+            # Remove o próprio verso
+            keep = rows != row
+            rows, scores = rows[keep], scores[keep]
+        results = []
+        for hit, score in zip(rows[:top_k], scores[:top_k]):
+            verse = state.verses[int(hit)]
+            verse_lemmas = set(verse["lemmas"])
+            shared = [lemma for lemma in query_lemmas if lemma in verse_lemmas]
+            results.append(({**verse, "shared_lemmas": shared}, float(score)))
+        return results
+
+    def get_morphology_index(self) -> MorphologyIndex:
+        """Retorna o índice morfológico, construindo-o a partir dos versos se preciso."""
+        if self.morphology_index is None:
+            morphology_index = MorphologyIndex()
+            morphology_index.build(self.verses)
+            self.morphology_index = morphology_index
+        return self.morphology_index
+
+    def search_morphology(
+        self, words: List[Dict[str, str]], op: str = "and"
+    ) -> np.ndarray:
+        """
+        Linhas dos versos que satisfazem uma consulta morfológica
+        (ver MorphologyIndex.query). O resultado pode ser passado como
+        ``verse_filter`` para find_similar.
+        """
+        return self.get_morphology_index().query(words, op)
+
+    def get_quotation_index(self) -> QuotationIndex:
+        """Retorna o índice MinHash/LSH, construindo-o a partir dos versos se preciso."""
+        if self.quotation_index is None:
+            quotation_index = QuotationIndex()
+            quotation_index.build(self.verses)
+            self.quotation_index = quotation_index
+        return self.quotation_index
+
+    def find_quotations(
+        self, query: str, top_k: int = 10, min_span: Optional[int] = None
+    ) -> List[Tuple[Dict, float, List[Dict]]]:
+        """
+        Encontra versos que compartilham trechos longos (citações quase
+        literais) com a query ou com o verso referenciado.
+
+        Args:
+            query: Texto ou referência ("Mt 4:4")
+            top_k: Máximo de resultados
+            min_span: Tamanho mínimo do trecho em comum, em palavras
+
+        Returns:
+            Lista de tuplas (verso, jaccard estimado, trechos alinhados)
+        """
+        quotation_index = self.get_quotation_index()
+        row = self.lookup_reference(query)
+        if row is not None:
+            tokens = quotation_index.tokens[row]
+        else:
+            tokens = QuotationIndex.tokenize(query)
+        hits = quotation_index.find(tokens, top_k, min_span, exclude_row=row)
+        return [(self.verses[hit], score, spans) for hit, score, spans in hits]
+
+    def get_concordance(self) -> Concordance:
+        """Retorna a concordância, construindo o suffix array se preciso."""
+        if self.concordance is None:
+            concordance = Concordance()
+            concordance.build(self.verses)
+            self.concordance = concordance
+        return self.concordance
+
+    def get_similarity_matrices(
+        self, level: str = "book", top_k: int = 10
+    ) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """
+        Matrizes de similaridade agregadas por livro ou capítulo (ver
+        analytics.similarity_matrices).
+
+        Calculadas uma vez e salvas ao lado do índice
+        (``<índice>.analytics_<nível>.npz``; de um snapshot publicado só são
+        lidas, as recalculadas vão para o diretório local). Em memória o
+        cache vale enquanto o estado do índice não mudar; em disco, enquanto
+        ids, grupos e embeddings dos versos forem os mesmos.
+
+        Returns:
+            Tupla (rótulos, matrizes mean/max/links e counts)
+        """
+        state = self._state
+        cached = self._similarity_matrices.get(level)
+        if cached is not None and cached[0] is state and cached[1] == top_k:
+            return cached[2], cached[3]
+
+        embeddings = self._get_embeddings(state)
+        if state.embeddings is None and self._state.embeddings is embeddings:
+            state = self._state  # embeddings reconstruídos do índice e publicados
+        labels, groups = analytics.group_rows(state.verses, level)
+        key = analytics.fingerprint(state.verse_ids, groups, top_k, embeddings)
+
+        paths = []
+        if self._paths is not None:
+            paths.append(self._sibling_path(self._paths[0], f"analytics_{level}", ".npz"))
+        if self._local_dir is not None:
+            paths.append(os.path.join(self._local_dir, f"analytics_{level}.npz"))
+        loaded, path = None, paths[-1] if paths else None
+        for candidate in paths:
+            loaded = analytics.load_matrices(candidate, key)
+            if loaded is not None:
+                break
+        if loaded is None:
+            print(f"⏳ Calculando matrizes de similaridade por {level}...")
+            matrices = analytics.similarity_matrices(embeddings, groups, len(labels), top_k)
+            loaded = (labels, matrices)
+            if path:
+                # Cache em disco é só otimização: falha de escrita não derruba
+                # a requisição (snapshot somente leitura, disco cheio)
+                try:
+                    analytics.save_matrices(path, labels, matrices, key)
+                    print(f"✓ Matrizes salvas em {path}")
+                except OSError as e:
+                    print(f"Aviso: matrizes não gravadas em {path}: {e}")
+        self._similarity_matrices[level] = (state, top_k, *loaded)
+        return loaded
+
+    def find_similar_passages(
+        self, query: str, top_k: int = 5
+    ) -> List[Tuple[Dict, float]]:
+        """
+        Busca no sub-índice de passagens (janelas de versos consecutivos).
+        Para referências, as janelas que contêm o próprio verso ficam fora.
+
+        Returns:
+            Lista de tuplas (passagem, score); cada passagem tem book,
+            chapter, verse (início), end_chapter, end_verse e text
+        """
+        if self.passage_index is None:
+            raise ValueError(
+                "Sub-índice de passagens ausente. Execute "
+                "build_granularity_indexes primeiro."
+            )
+        if self.passage_index.ntotal == 0:
+            return []
+        state = self._state
+        row = self._lookup(query, state)
+        own = set()
+        if row is not None:
+            vector = self._row_vector(row, state)
+            own = {
+                i for i, p in enumerate(self.passages) if p["row_start"] <= row < p["row_end"]
+            }
+        else:
+            vector = self._encode_query(query)
+        _apply_faiss_threads()
+        scores, indices = self.passage_index.search(vector, top_k + len(own))
+        results = [
+            (self.passages[idx], float(score))
+            for idx, score in zip(indices[0], scores[0])
+            if 0 <= idx < len(self.passages) and idx not in own
+        ]
+        return results[:top_k]
+
+    def find_similar_coarse_to_fine(
+        self, query: str, top_k: int = 5, n_chapters: int = 10
+    ) -> List[Tuple[Dict, float]]:
+        """
+        Busca em dois níveis: seleciona os capítulos mais próximos da query
+        e pontua apenas os versos desses capítulos. Para referências, o
+        capítulo do próprio verso fica fora.
+
+        Args:
+            query: Texto ou referência da consulta
+            top_k: Número de versos a retornar
+            n_chapters: Número de capítulos candidatos
+
+        Returns:
+            Lista de tuplas (verso, score)
+        """
+        if self.chapter_index is None:
+            raise ValueError(
+                "Sub-índice de capítulos ausente. Execute "
+                "build_granularity_indexes primeiro."
+            )
+        if self.chapter_index.ntotal == 0 or top_k < 1:
+            return []
+        state = self._state
+        row = self._lookup(query, state)
+        own = None
+        if row is not None:
+            vector = self._row_vector(row, state)
+            own = next(
+                (c for c, ch in enumerate(self.chapters) if ch["row_start"] <= row < ch["row_end"]),
+                None,
+            )
+        else:
+            vector = self._encode_query(query)
+        _apply_faiss_threads()
+        _, chapter_ids = self.chapter_index.search(vector, n_chapters + (own is not None))
+        ranges = [
+            np.arange(self.chapters[c]["row_start"], self.chapters[c]["row_end"])
+            for c in chapter_ids[0]
+            if c >= 0 and c != own
+        ][:n_chapters]
+        if not ranges:
+            return []
+        rows = np.concatenate(ranges)
+        if state.removed_rows:
+            rows = rows[~np.isin(rows, list(state.removed_rows))]
+        if len(rows) == 0:
+            return []
+        scores = np.asarray(self._get_embeddings(state)[rows], dtype="float32") @ vector[0]
+
+        k = min(top_k, len(rows))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(state.verses[int(rows[i])], float(scores[i])) for i in best]
+
+    # ------------------------------------------------------------------
+    # Mutação incremental (ids estáveis + deltas em disco)
+    # ------------------------------------------------------------------
+
+    def _verse_vectors(
+        self, verses: Sequence[Dict], embeddings: Optional[np.ndarray]
+    ) -> np.ndarray:
+        if embeddings is None:
+            with self._encode_slot():
+                embeddings = self.model.encode(
+                    [self._model_input(v) for v in verses],
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                )
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        if embeddings.shape[0] != len(verses):
+            raise ValueError("Número de embeddings diferente do número de versos")
+        return embeddings
+
+    def _invalidate_derived(self):
+        """
+        Descarta os índices derivados dos versos (reconstruídos sob demanda,
+        exceto o de lemas, refeito na hora para não pesar na busca híbrida).
+        Os sub-índices de passagens e capítulos ficam como estão até a
+        próxima compactação.
+        """
+        had_lemmas = self.lemma_index is not None
+        self.lemma_index = None
+        if had_lemmas:
+            self.get_lemma_index()
+        self.morphology_index = None
+        self.quotation_index = None
+        self.concordance = None
+        # Scores do cross-encoder são por (query, referência): texto mudou
+        if self._reranker is not None:
+            self._reranker.clear_cache()
+
+    def _apply_add(self, verses: List[Dict], vectors: np.ndarray, replace: bool):
+        """
+        Aplica add/replace: confere todos os ids antes de mudar qualquer
+        coisa, monta o novo estado sobre cópias e o publica de uma vez.
+
+        Raises:
+            ValueError: Ids repetidos no lote, ou id existente sem replace
+        """
+        state = self._state
+        labels = np.array([int(v["id"]) for v in verses], dtype=np.int64)
+        if len(np.unique(labels)) != len(labels):
+            raise ValueError("Ids de versos repetidos no mesmo lote")
+        rows = self._labels_to_rows(labels, state)
+        existing = rows >= 0
+        # Linhas vivas (não tombstones) cujo vetor sai do índice
+        live = existing & ~np.isin(rows, list(state.removed_rows))
+        if live.any() and not replace:
+            raise ValueError(
+                f"Verso {int(labels[live][0])} já existe; use replace_verses para alterá-lo"
+            )
+
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        index = faiss.clone_index(state.index)
+        if live.any():
+            index.remove_ids(labels[live])
+        index.add_with_ids(vectors, labels)
+
+        verses_list = list(state.verses)
+        embeddings = np.array(self._get_embeddings(state), dtype="float32")
+        for verse, vector, row in zip(verses, vectors, rows):
+            if row >= 0:
+                verses_list[row] = verse
+                embeddings[row] = vector
+        # Id removido e readicionado reaproveita a linha do tombstone
+        removed_rows = state.removed_rows - set(rows[existing].tolist())
+
+        new = ~existing
+        verse_ids, sorted_ids, sorted_rows = state.verse_ids, state.sorted_ids, state.sorted_rows
+        if new.any():
+            verses_list.extend(v for v, is_new in zip(verses, new) if is_new)
+            embeddings = np.vstack([embeddings, vectors[new]])
+            verse_ids = np.concatenate([state.verse_ids, labels[new]])
+            sorted_ids, sorted_rows = self._id_lookup(verse_ids)
+
+        self._state = _IndexState(
+            index=index,
+            verses=verses_list,
+            embeddings=embeddings,
+            verse_ids=verse_ids,
+            sorted_ids=sorted_ids,
+            sorted_rows=sorted_rows,
+            removed_rows=removed_rows,
+            reference_index=self._reference_map(verses_list),
+        )
+
+    def _apply_remove(self, verse_ids: Sequence[int]) -> List[int]:
+        """Remove ids deixando tombstones nas linhas (novo estado publicado de uma vez)."""
+        state = self._state
+        rows = [
+            (int(verse_id), row)
+            for verse_id in verse_ids
+            if (row := self.row_for_id(int(verse_id), state)) is not None
+        ]
+        if not rows:
+            return []
+        index = faiss.clone_index(state.index)
+        index.remove_ids(np.array([verse_id for verse_id, _ in rows], dtype=np.int64))
+        verses_list = list(state.verses)
+        for _, row in rows:
+            verse = verses_list[row]
+            tombstone = {
+                "id": verse["id"],
+                "book": verse["book"],
+                "chapter": verse["chapter"],
+                "verse": verse["verse"],
+                "text": "",
+                "words": [],
+                "lemmas": [],
+                "pos": [],
+                "parsing": [],
+                "removed": True,
+            }
+            if "normalized" in verse:
+                tombstone["normalized"] = ""
+            verses_list[row] = tombstone
+        self._state = state._replace(
+            index=index,
+            verses=verses_list,
+            removed_rows=state.removed_rows | {row for _, row in rows},
+            reference_index=self._reference_map(verses_list),
+        )
+        return [verse_id for verse_id, _ in rows]
+
+    def add_verses(
+        self,
+        verses: List[Dict],
+        embeddings: Optional[np.ndarray] = None,
+        replace: bool = False,
+    ) -> List[int]:
+        """
+        Adiciona versos ao índice sem reconstruí-lo.
+
+        Os versos (mesmo formato do corpus; ``corpus`` opcional, default o do
+        engine) recebem ids estáveis. Se o engine foi salvo ou carregado, a
+        mudança é gravada como um arquivo delta pequeno; a compactação em
+        disco roda em background quando há DELTA_COMPACT_THRESHOLD deltas.
+
+        A troca é copy-on-write: buscas em andamento continuam usando o
+        índice anterior.
+
+        Args:
+            verses: Versos novos
+            embeddings: Vetores já calculados (default: codifica com o modelo)
+            replace: Se True, ids existentes são substituídos (ver
+                replace_verses); se False, geram ValueError
+
+        Returns:
+            Ids estáveis dos versos
+        """
+        if self.index is None:
+            raise ValueError("Índice não construído. Execute build_index primeiro.")
+        verses = [dict(v) for v in verses]
+        for verse in verses:
+            if "normalized" not in verse and self.canonical_inputs:
+                verse["normalized"] = normalize_greek(verse["text"])
+            # Sem dados morfológicos (ex.: upsert pela API): formas da
+            # superfície como lemas e traços vazios, alinhados por palavra
+            words = verse.setdefault("words", verse["text"].split())
+            lemmas = verse.setdefault("lemmas", list(words))
+            verse.setdefault("pos", [""] * len(lemmas))
+            verse.setdefault("parsing", [""] * len(lemmas))
+            if "id" not in verse:
+                verse["id"] = make_verse_id(
+                    verse.get("corpus", self.corpus),
+                    verse["book"],
+                    verse["chapter"],
+                    verse["verse"],
+                )
+        vectors = self._verse_vectors(verses, embeddings)
+
+        with self._mutation_lock:
+            self._apply_add(verses, vectors, replace)
+            self._invalidate_derived()
+            self._write_delta("replace" if replace else "add", verses, vectors)
+        return [v["id"] for v in verses]
+
+    def replace_verses(
+        self, verses: List[Dict], embeddings: Optional[np.ndarray] = None
+    ) -> List[int]:
+        """
+        Substitui texto/metadados e vetor de versos existentes (mesmo id,
+        mesma linha); ids ausentes são adicionados.
+        """
+        return self.add_verses(verses, embeddings, replace=True)
+
+    def remove_verses(self, verse_ids: Sequence[int]) -> List[int]:
+        """
+        Remove versos pelo id estável (ids ausentes são ignorados).
+
+        Returns:
+            Ids efetivamente removidos
+        """
+        if self.index is None:
+            raise ValueError("Índice não construído. Execute build_index primeiro.")
+        with self._mutation_lock:
+            removed = self._apply_remove(verse_ids)
+            if removed:
+                self._invalidate_derived()
+                self._write_delta(
+                    "remove", [{"id": verse_id} for verse_id in removed], None
+                )
+        return removed
+
+    @classmethod
+    def _artifact_paths(cls, index_path: str, meta_path: str) -> List[str]:
+        """Todos os arquivos gravados por save_index para uma base."""
+        return [
+            index_path,
+            meta_path,
+            cls._sibling_path(index_path, "embeddings", ".npy"),
+            cls._sibling_path(index_path, "lemmas", ".npz"),
+            cls._sibling_path(meta_path, "lemmas"),
+            cls._sibling_path(index_path, "minhash", ".npz"),
+            cls._sibling_path(index_path, "concordance", ""),
+            cls._sibling_path(index_path, "passages"),
+            cls._sibling_path(meta_path, "passages"),
+            cls._sibling_path(index_path, "chapters"),
+            cls._sibling_path(meta_path, "chapters"),
+        ]
+
+    def _delta_dir(self) -> Optional[str]:
+        if self._local_dir is not None:
+            return os.path.join(self._local_dir, "deltas")
+        if self._paths is None:
+            return None
+        return self._sibling_path(self._paths[0], "deltas", "")
+
+    def _write_delta(
+        self, op: str, verses: List[Dict], vectors: Optional[np.ndarray]
+    ):
+        """Grava uma mutação como ``<seq>.npz`` no diretório de deltas."""
+        delta_dir = self._delta_dir()
+        if delta_dir is None:
+            return
+        os.makedirs(delta_dir, exist_ok=True)
+        self._delta_seq += 1
+        path = os.path.join(delta_dir, f"{self._delta_seq:08d}.npz")
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            op=np.array(op),
+            model=np.array(self.model_name),
+            verses=np.array(json.dumps(verses, ensure_ascii=False)),
+            vectors=(
+                vectors if vectors is not None else np.zeros((0, 0), dtype="float32")
+            ),
+        )
+        os.replace(tmp_path, path)
+
+        threshold = int(os.getenv("DELTA_COMPACT_THRESHOLD", "32"))
+        read_only = self._local_dir is not None and self._snapshot_root is None
+        if threshold > 0 and not read_only and len(self._delta_files()) >= threshold:
+            self.compact(background=True)
+
+    def _delta_files(self) -> List[str]:
+        delta_dir = self._delta_dir()
+        if delta_dir is None or not os.path.isdir(delta_dir):
+            return []
+        return sorted(
+            path
+            for path in glob.glob(os.path.join(delta_dir, "*.npz"))
+            if not path.endswith(".tmp.npz")
+        )
+
+    def _replay_deltas(self) -> int:
+        """
+        Reaplica os deltas gravados após a base (idempotente). Deltas de
+        outro encoder (snapshot novo com outro modelo) são recodificados.
+        """
+        files = self._delta_files()
+        for path in files:
+            data = np.load(path)
+            op = str(data["op"])
+            verses = json.loads(str(data["verses"]))
+            if op == "remove":
+                self._apply_remove([v["id"] for v in verses])
+            else:
+                vectors = data["vectors"]
+                if "model" in data.files and str(data["model"]) != self.model_name:
+                    vectors = self._verse_vectors(verses, None)
+                self._apply_add(verses, vectors, replace=True)
+            self._delta_seq = max(
+                self._delta_seq, int(os.path.basename(path).split(".")[0])
+            )
+        if files:
+            self._invalidate_derived()
+            print(f"✓ {len(files)} delta(s) reaplicado(s)")
+        return len(files)
+
+    def _compacted_copy(self) -> "IntertextualityEngine":
+        """
+        Novo engine só com as linhas vivas, em ordem canônica (por id), com
+        os índices derivados que este engine tinha. As janelas de passagens
+        que continuam contíguas reaproveitam os vetores existentes.
+        """
+        state = self._state
+        live = [row for row in range(len(state.verses)) if row not in state.removed_rows]
+        live.sort(key=lambda row: int(state.verse_ids[row]))
+        new_row = {old: new for new, old in enumerate(live)}
+
+        copy = IntertextualityEngine(model=self.model, corpus=self.corpus)
+        copy.verses = [state.verses[row] for row in live]
+        copy._build_reference_index()
+        copy.build_index(np.asarray(self._get_embeddings(state), dtype="float32")[live])
+        if self.chapter_index is not None:
+            copy._build_chapter_index()
+        if self.passage_index is not None:
+            kept, vectors = [], []
+            for i, passage in enumerate(self.passages):
+                rows = [new_row.get(row) for row in range(passage["row_start"], passage["row_end"])]
+                if None in rows or rows != list(range(rows[0], rows[0] + len(rows))):
+                    continue
+                kept.append({**passage, "row_start": rows[0], "row_end": rows[-1] + 1})
+                vectors.append(self.passage_index.reconstruct(i))
+            if kept:
+                copy.passages = kept
+                copy.passage_index = self._flat_index(np.vstack(vectors))
+        if self.lemma_index is not None:
+            copy.get_lemma_index()
+        if self.quotation_index is not None:
+            copy.get_quotation_index()
+        if self.concordance is not None:
+            copy.get_concordance()
+        return copy
+
+    def compact(self, background: bool = False) -> Optional[threading.Thread]:
+        """
+        Reescreve a base em disco incorporando os deltas e apaga-os.
+
+        O estado em memória não muda (buscas e cursores continuam válidos);
+        a base compactada, em ordem canônica e sem tombstones, vale a partir
+        da próxima carga. Cada arquivo é gravado à parte e movido com
+        os.replace; deltas gravados durante a compactação são preservados.
+        Um engine carregado de snapshot não reescreve a versão publicada:
+        a base compactada é publicada como versão nova (recusado com a
+        árvore de snapshots somente leitura, ex.: bundle).
+
+        Args:
+            background: Se True, roda em uma thread (uma por vez)
+
+        Returns:
+            A thread iniciada (background) ou None
+
+        Raises:
+            ValueError: Sem caminho de índice ou snapshots somente leitura
+        """
+        if self._paths is None:
+            raise ValueError("Engine sem caminho de índice: use save_index antes.")
+        if self._local_dir is not None and self._snapshot_root is None:
+            raise ValueError(
+                "Snapshots somente leitura (SNAPSHOT_LOCAL_DIR): compacte na origem e gere outro bundle"
+            )
+        if self._compaction is not None and self._compaction.is_alive():
+            return self._compaction if background else self._compaction.join()
+
+        def run():
+            with self._mutation_lock:
+                applied = self._delta_files()
+                copy = self._compacted_copy()
+            if self._local_dir is not None:
+                from src.services import snapshots
+
+                copy.model_name = self.model_name
+                snapshots.write_snapshot(copy, self._snapshot_root)
+                for path in applied:
+                    os.remove(path)
+                print(f"✓ Compactação: {len(copy.verses):,} versos, {len(applied)} delta(s) aplicados")
+                return
+            index_path, meta_path = self._paths
+            tmp_dir = os.path.join(os.path.dirname(index_path) or ".", ".compact-tmp")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            tmp_paths = (
+                os.path.join(tmp_dir, os.path.basename(index_path)),
+                os.path.join(tmp_dir, os.path.basename(meta_path)),
+            )
+            copy.save_index(*tmp_paths)
+            # Artefatos que a base compactada não tem (ex.: passagens) saem
+            for tmp, target in zip(
+                self._artifact_paths(*tmp_paths), self._artifact_paths(index_path, meta_path)
+            ):
+                if os.path.isdir(target):
+                    shutil.rmtree(target)
+                if os.path.exists(tmp):
+                    os.replace(tmp, target)
+                elif os.path.exists(target):
+                    os.remove(target)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            for path in applied:
+                os.remove(path)
+            print(f"✓ Compactação: {len(copy.verses):,} versos, {len(applied)} delta(s) aplicados")
+
+        if not background:
+            run()
+            return None
+        self._compaction = threading.Thread(target=run, name="index-compaction", daemon=True)
+        self._compaction.start()
+        return self._compaction
+
+    @staticmethod
+    def _sibling_path(path: str, tag: str, ext: Optional[str] = None) -> str:
+        """Ex.: ("indexes/faiss_nt.index", "passages") → faiss_nt.passages.index"""
+        base, original_ext = os.path.splitext(path)
+        return f"{base}.{tag}{original_ext if ext is None else ext}"
+
     def save_index(
         self,
         index_path: str = "indexes/faiss_nt.index",
@@ -253,6 +1739,43 @@ class IntertextualityEngine:
                 json.dump(self.verses, f, ensure_ascii=False, indent=2)
             print(f"✓ Metadados salvos em {meta_path}")
 
+        if self.embeddings is not None:
+            embeddings_path = self._sibling_path(index_path, "embeddings", ".npy")
+            np.save(embeddings_path, np.asarray(self.embeddings, dtype="float32"))
+            print(f"✓ Embeddings salvos em {embeddings_path}")
+
+        if self.lemma_index is not None:
+            self.lemma_index.save(
+                self._sibling_path(index_path, "lemmas", ".npz"),
+                self._sibling_path(meta_path, "lemmas"),
+            )
+            print("✓ Índice de lemas salvo")
+
+        if self.quotation_index is not None:
+            self.quotation_index.save(self._sibling_path(index_path, "minhash", ".npz"))
+            print("✓ Índice MinHash/LSH salvo")
+
+        if self.concordance is not None:
+            self.concordance.save(self._sibling_path(index_path, "concordance", ""))
+            print("✓ Concordância (suffix array) salva")
+
+        for tag, index, meta in (
+            ("passages", self.passage_index, self.passages),
+            ("chapters", self.chapter_index, self.chapters),
+        ):
+            if index is None:
+                continue
+            faiss.write_index(index, self._sibling_path(index_path, tag))
+            with open(self._sibling_path(meta_path, tag), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            print(f"✓ Sub-índice '{tag}' salvo ({index.ntotal:,} vetores)")
+
+        # A base salva já inclui todas as mutações: deltas antigos saem
+        self._paths = (index_path, meta_path)
+        for path in self._delta_files():
+            os.remove(path)
+        self._delta_seq = 0
+
     def load_index(
         self,
         index_path: str = "indexes/faiss_nt.index",
@@ -268,8 +1791,68 @@ class IntertextualityEngine:
         if os.path.exists(meta_path):
             with open(meta_path, "r", encoding="utf-8") as f:
                 self.verses = json.load(f)
+            self._build_reference_index()
             print(f"✓ Metadados carregados de {meta_path}")
 
+        if self.index is not None:
+            self._removed_rows = frozenset(
+                row for row, v in enumerate(self.verses) if v.get("removed")
+            )
+            self._assign_ids(len(self.verses) or self.index.ntotal)
+            if not isinstance(self.index, faiss.IndexIDMap2):
+                # Índice legado (rótulos = linhas): migra para ids estáveis
+                vectors = self.index.reconstruct_n(0, self.index.ntotal)
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(vectors.shape[1]))
+                self.index.add_with_ids(vectors, self.verse_ids[: len(vectors)])
+                print("✓ Índice migrado para ids estáveis (IndexIDMap2)")
+        self._paths = (index_path, meta_path)
+        self._delta_seq = 0
+
+        embeddings_path = self._sibling_path(index_path, "embeddings", ".npy")
+        if os.path.exists(embeddings_path):
+            # mmap: as linhas só são lidas do disco quando usadas
+            self.embeddings = np.load(embeddings_path, mmap_mode="r")
+        elif is_compressed(self.index):
+            print(
+                f"Aviso: índice comprimido sem {embeddings_path}; "
+                "scores do primeiro estágio (aproximados)"
+            )
+
+        lemma_path = self._sibling_path(index_path, "lemmas", ".npz")
+        lemma_vocab_path = self._sibling_path(meta_path, "lemmas")
+        if os.path.exists(lemma_path) and os.path.exists(lemma_vocab_path):
+            self.lemma_index = LemmaIndex.load(lemma_path, lemma_vocab_path)
+            print(f"✓ Índice de lemas carregado ({len(self.lemma_index.lemmas):,} lemas)")
+
+        minhash_path = self._sibling_path(index_path, "minhash", ".npz")
+        if os.path.exists(minhash_path):
+            self.quotation_index = QuotationIndex.load(minhash_path)
+            print("✓ Índice MinHash/LSH carregado")
+
+        concordance_dir = self._sibling_path(index_path, "concordance", "")
+        if os.path.isdir(concordance_dir):
+            self.concordance = Concordance.load(concordance_dir)
+            print("✓ Concordância carregada (mmap)")
+
+        for tag, index_attr in (
+            ("passages", "passage_index"),
+            ("chapters", "chapter_index"),
+        ):
+            sub_index_path = self._sibling_path(index_path, tag)
+            sub_meta_path = self._sibling_path(meta_path, tag)
+            if not (os.path.exists(sub_index_path) and os.path.exists(sub_meta_path)):
+                continue
+            with open(sub_meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            setattr(self, index_attr, faiss.read_index(sub_index_path))
+            setattr(self, tag, meta)
+            print(f"✓ Sub-índice '{tag}' carregado ({len(meta):,} entradas)")
+
+        if self.index is not None:
+            self._replay_deltas()
+            if self.lemma_index is None:
+                self._prepare_lemma_index()
+
 
 if __name__ == "__main__":
     # Teste rápido
@@ -0,0 +1,174 @@
+import json
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from src.services.greek_text import normalize_greek, normalize_word
+
+
+class LemmaIndex:
+    """
+    Índice invertido lema → versos com pesos BM25.
+
+    As postings ficam em arrays numpy contíguos (CSR): as linhas dos versos
+    do lema ``t`` são ``postings[offsets[t]:offsets[t + 1]]`` (ordenadas) e
+    ``weights`` guarda o peso BM25 já calculado de cada posting.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.lemmas: List[str] = []
+        self.vocab: Dict[str, int] = {}
+        self.form_to_lemma: Dict[str, str] = {}
+        self.num_docs = 0
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.postings = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+
+    def build(self, verses: List[Dict]):
+        """
+        Constrói o índice a partir dos versos (campo ``lemmas``, gerado por
+        CorpusProcessor.parse_sblgnt_file).
+
+        Raises:
+            ValueError: Se os versos não tiverem lemas (corpus antigo)
+        """
+        if verses and "lemmas" not in verses[0]:
+            raise ValueError(
+                "Versos sem lemas. Reprocesse o corpus com CorpusProcessor."
+            )
+
+        self.num_docs = len(verses)
+        self.vocab = {}
+        forms: Dict[str, Counter] = defaultdict(Counter)
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        for row, verse in enumerate(verses):
+            for word, lemma in zip(verse.get("words", []), verse["lemmas"]):
+                forms[normalize_word(word)][lemma] += 1
+            for lemma in verse["lemmas"]:
+                term_ids.append(self.vocab.setdefault(lemma, len(self.vocab)))
+                doc_ids.append(row)
+
+        self.lemmas = [""] * len(self.vocab)
+        for lemma, term in self.vocab.items():
+            self.lemmas[term] = lemma
+        # Forma flexionada → lema mais frequente (para queries em texto livre)
+        self.form_to_lemma = {
+            form: counts.most_common(1)[0][0] for form, counts in forms.items()
+        }
+        for lemma in self.lemmas:
+            self.form_to_lemma.setdefault(normalize_word(lemma), lemma)
+
+        terms = np.asarray(term_ids, dtype=np.int64)
+        docs = np.asarray(doc_ids, dtype=np.int64)
+        doc_len = np.bincount(docs, minlength=self.num_docs).astype(np.float32)
+        avg_len = float(doc_len.mean()) if self.num_docs else 0.0
+
+        # Pares (lema, verso) únicos, ordenados por lema e depois verso
+        keys, tf = np.unique(terms * self.num_docs + docs, return_counts=True)
+        post_terms = keys // self.num_docs
+        self.postings = (keys % self.num_docs).astype(np.int32)
+        df = np.bincount(post_terms, minlength=len(self.lemmas))
+        self.offsets = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+
+        idf = np.log1p((self.num_docs - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * doc_len[self.postings] / avg_len)
+        self.weights = (
+            idf[post_terms] * tf * (self.k1 + 1) / (tf + norm)
+        ).astype(np.float32)
+
+        print(
+            f"✓ Índice de lemas: {len(self.lemmas):,} lemas, "
+            f"{len(self.postings):,} postings"
+        )
+
+    def query_lemmas(self, text: str) -> List[str]:
+        """Converte uma query em texto livre para lemas conhecidos (sem repetir)."""
+        lemmas = []
+        for token in normalize_greek(text).split():
+            lemma = self.form_to_lemma.get(normalize_word(token))
+            if lemma is not None and lemma not in lemmas:
+                lemmas.append(lemma)
+        return lemmas
+
+    def search(
+        self, lemmas: Sequence[str], top_k: int = 10
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ranqueia versos por BM25 somando os pesos das postings dos lemas.
+
+        Returns:
+            Tupla (linhas, scores) ordenada por score decrescente
+        """
+        terms = [self.vocab[lemma] for lemma in lemmas if lemma in self.vocab]
+        if not terms:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        slices = [slice(self.offsets[t], self.offsets[t + 1]) for t in terms]
+        rows = np.concatenate([self.postings[s] for s in slices])
+        weights = np.concatenate([self.weights[s] for s in slices])
+        scores = np.bincount(rows, weights=weights, minlength=self.num_docs)
+
+        candidates = np.flatnonzero(scores)
+        k = min(top_k, len(candidates))
+        best = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return best, scores[best].astype(np.float32)
+
+    def save(self, path: str, vocab_path: str):
+        """Salva arrays (.npz) e vocabulário/formas (.json)."""
+        np.savez(
+            path,
+            offsets=self.offsets,
+            postings=self.postings,
+            weights=self.weights,
+            params=np.array([self.k1, self.b, self.num_docs], dtype=np.float64),
+        )
+        with open(vocab_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"lemmas": self.lemmas, "form_to_lemma": self.form_to_lemma},
+                f,
+                ensure_ascii=False,
+            )
+
+    @classmethod
+    def load(cls, path: str, vocab_path: str) -> "LemmaIndex":
+        """Carrega um índice salvo com save()."""
+        data = np.load(path)
+        k1, b, num_docs = data["params"]
+        index = cls(float(k1), float(b))
+        index.num_docs = int(num_docs)
+        index.offsets = data["offsets"]
+        index.postings = data["postings"]
+        index.weights = data["weights"]
+        with open(vocab_path, "r", encoding="utf-8") as f:
+            vocab = json.load(f)
+        index.lemmas = vocab["lemmas"]
+        index.vocab = {lemma: term for term, lemma in enumerate(index.lemmas)}
+        index.form_to_lemma = vocab["form_to_lemma"]
+        return index
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[np.ndarray], k: int = 60
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Funde rankings (arrays de linhas ordenados) por Reciprocal Rank Fusion.
+
+    Returns:
+        Tupla (linhas, scores RRF) ordenada por score decrescente
+    """
+    rankings = [np.asarray(r, dtype=np.int64) for r in rankings if len(r)]
+    if not rankings:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+    rows = np.concatenate(rankings)
+    contrib = np.concatenate([1.0 / (k + np.arange(1, len(r) + 1)) for r in rankings])
+    unique_rows, inverse = np.unique(rows, return_inverse=True)
+    fused = np.bincount(inverse, weights=contrib)
+    order = np.argsort(-fused, kind="stable")
+    return unique_rows[order], fused[order]
+
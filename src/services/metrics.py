@@ -0,0 +1,321 @@
+"""
+Métricas no formato Prometheus (endpoint /metrics).
+
+Com ``prometheus_client`` instalado, as métricas são registradas no
+registro padrão dele (que inclui também as métricas do processo); sem ele,
+uma implementação mínima com a mesma interface (``labels(...).observe``,
+``inc``, ``set``) gera o formato texto. Em ambos os casos uma observação
+custa um ``bisect`` e um incremento sob lock, o que permite deixar a
+instrumentação ligada no caminho quente.
+
+Desligue com ``METRICS_ENABLED=0`` (as chamadas viram no-ops).
+"""
+
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from src.services import tracing
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Segundos: de encoding de query em cache (~µs) a respostas de LLM (~min)
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric(ABC):
+    """Família de métricas com rótulos (fallback sem prometheus_client)."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], "_Metric"] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_child(self):
+        """Série nova (um valor por combinação de rótulos)."""
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: rótulos esperados {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.samples(self.name, self.labelnames, key))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def samples(self, name, names, values) -> List[str]:
+        return [f"{name}{_format_labels(names, values)} {_format_value(self.value)}"]
+
+
+class _CounterValue(_Value):
+    def samples(self, name, names, values) -> List[str]:
+        return [f"{name}_total{_format_labels(names, values)} {_format_value(self.value)}"]
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    def samples(self, name, names, values) -> List[str]:
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines, cumulative = [], 0
+        for bound, count in zip((*self.buckets, float("inf")), counts):
+            cumulative += count
+            le = 'le="{}"'.format(_format_value(bound))
+            lines.append(f"{name}_bucket{_format_labels(names, values, le)} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(names, values)} {total!r}")
+        lines.append(f"{name}_count{_format_labels(names, values)} {cumulative}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        # Mesma convenção do prometheus_client: o sufixo _total é adicionado
+        if name.endswith("_total"):
+            name = name[: -len("_total")]
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+
+_REGISTRY: List[_Metric] = []
+
+
+def _create(kind: str, name: str, documentation: str, labelnames=(), **kwargs):
+    if prometheus_client is not None:
+        cls = getattr(prometheus_client, kind)
+        return cls(name, documentation, labelnames, **kwargs)
+    metric = {"Counter": Counter, "Gauge": Gauge, "Histogram": Histogram}[kind](
+        name, documentation, labelnames, **kwargs
+    )
+    _REGISTRY.append(metric)
+    return metric
+
+
+REQUEST_SECONDS = _create(
+    "Histogram",
+    "bible_request_seconds",
+    "Tempo total das requisições HTTP",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+STAGE_SECONDS = _create(
+    "Histogram",
+    "bible_stage_seconds",
+    "Tempo por etapa da busca (encode, faiss_search, metadata)",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_SECONDS = _create(
+    "Histogram",
+    "bible_llm_generation_seconds",
+    "Tempo de geração do LLM por provider e modelo",
+    ["provider", "model"],
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_EVENTS = _create(
+    "Counter",
+    "bible_cache_events_total",
+    "Hits, misses e evictions por cache",
+    ["cache", "event"],
+)
+PROVIDER_ERRORS = _create(
+    "Counter",
+    "bible_provider_errors_total",
+    "Falhas de chamadas a provedores LLM (kind: error ou timeout)",
+    ["provider", "kind"],
+)
+INDEX_VECTORS = _create(
+    "Gauge", "bible_index_vectors", "Vetores no índice FAISS por corpus", ["corpus"]
+)
+MODEL_INFO = _create(
+    "Gauge", "bible_model_info", "Modelo de embeddings carregado (valor 1)", ["model", "device"]
+)
+RESIDENT_MEMORY = _create(
+    "Gauge", "bible_resident_memory_bytes", "Memória residente (RSS) do processo"
+)
+
+
+@contextmanager
+def timed(histogram, *labels, span: Optional[str] = None) -> Iterator[None]:
+    """
+    Observa a duração do bloco (segundos) no histograma e, com ``span``,
+    também no trace da requisição (header Server-Timing).
+    """
+    if not ENABLED and span is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if ENABLED:
+            histogram.labels(*labels).observe(elapsed)
+        if span is not None:
+            tracing.record(span, elapsed)
+
+
+def cache_event(cache: str, event: str, amount: int = 1):
+    """Conta um hit, miss ou eviction de ``cache``."""
+    if ENABLED and amount:
+        CACHE_EVENTS.labels(cache, event).inc(amount)
+
+
+def record_provider_error(provider: str, error: BaseException):
+    """Conta uma falha de provider, separando timeouts dos demais erros."""
+    if not ENABLED:
+        return
+    timeout = isinstance(error, TimeoutError) or "Timeout" in type(error).__name__
+    PROVIDER_ERRORS.labels(provider, "timeout" if timeout else "error").inc()
+
+
+def resident_memory_bytes() -> int:
+    """RSS atual (Linux: /proc; demais: pico via resource)."""
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS informa bytes; Linux, KiB
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    except (ImportError, OSError):
+        return 0
+
+
+def update_runtime(service) -> None:
+    """Atualiza os gauges de índice, modelo e memória (chamado no scrape)."""
+    RESIDENT_MEMORY.set(resident_memory_bytes())
+    engine = getattr(service, "intertextuality_engine", None)
+    if engine is None:
+        return
+    if hasattr(MODEL_INFO, "clear"):
+        MODEL_INFO.clear()
+    MODEL_INFO.labels(engine.model_name, engine.device).set(1)
+    engines = {"nt": engine}
+    registry = getattr(service, "index_registry", None)
+    if registry is not None:
+        engines.update(dict(registry.engines))
+    for name, loaded in engines.items():
+        index = getattr(loaded, "index", None)
+        INDEX_VECTORS.labels(name).set(index.ntotal if index is not None else 0)
+
+
+def render() -> Tuple[bytes, str]:
+    """Exposição no formato texto do Prometheus: (corpo, content type)."""
+    if prometheus_client is not None:
+        return prometheus_client.generate_latest(), prometheus_client.CONTENT_TYPE_LATEST
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return ("\n".join(lines) + "\n").encode("utf-8"), CONTENT_TYPE
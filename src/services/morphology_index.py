@@ -0,0 +1,205 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.services.greek_text import normalize_word
+
+# Posição de cada traço no código morfológico MorphGNT (8 caracteres)
+PARSING_FEATURES = (
+    "person", "tense", "voice", "mood", "case", "number", "gender", "degree"
+)
+
+# Nomes aceitos nas consultas → código MorphGNT
+FEATURE_VALUES: Dict[str, Dict[str, str]] = {
+    "pos": {
+        "adjective": "A-", "conjunction": "C-", "adverb": "D-",
+        "interjection": "I-", "noun": "N-", "preposition": "P-",
+        "article": "RA", "demonstrative": "RD", "interrogative": "RI",
+        "personal_pronoun": "RP", "relative_pronoun": "RR", "verb": "V-",
+        "particle": "X-",
+    },
+    "person": {"first": "1", "second": "2", "third": "3"},
+    "tense": {
+        "present": "P", "imperfect": "I", "future": "F", "aorist": "A",
+        "perfect": "X", "pluperfect": "Y",
+    },
+    "voice": {"active": "A", "middle": "M", "passive": "P"},
+    "mood": {
+        "indicative": "I", "imperative": "D", "subjunctive": "S",
+        "optative": "O", "infinitive": "N", "participle": "P",
+    },
+    "case": {
+        "nominative": "N", "genitive": "G", "dative": "D", "accusative": "A",
+        "vocative": "V",
+    },
+    "number": {"singular": "S", "plural": "P"},
+    "gender": {"masculine": "M", "feminine": "F", "neuter": "N"},
+    "degree": {"comparative": "C", "superlative": "S"},
+}
+
+
+class MorphologyIndex:
+    """
+    Tabela colunar palavra-a-palavra dos códigos MorphGNT com bitmaps
+    (np.packbits) por valor de traço.
+
+    Uma consulta combina, para cada palavra especificada, os bitmaps dos
+    traços pedidos (AND) e reduz o resultado ao nível de verso; os versos
+    de cada especificação são então combinados com AND ou OR.
+    """
+
+    def __init__(self):
+        self.num_words = 0
+        self.num_verses = 0
+        self.verse_rows = np.zeros(0, dtype=np.int32)
+        # Primeira palavra de cada verso (para reduzir palavra → verso)
+        self.verse_offsets = np.zeros(0, dtype=np.int64)
+        self._nonempty = np.zeros(0, dtype=bool)
+        self.lemma_ids = np.zeros(0, dtype=np.int32)
+        # Posições das palavras agrupadas por lema (CSR)
+        self._lemma_positions = np.zeros(0, dtype=np.int64)
+        self._lemma_offsets = np.zeros(1, dtype=np.int64)
+        self.lemmas: List[str] = []
+        self._lemma_lookup: Dict[str, List[int]] = {}
+        # (traço, código) → bitmap compactado sobre as palavras
+        self.bitmaps: Dict[tuple, np.ndarray] = {}
+
+    def build(self, verses: List[Dict]):
+        """
+        Constrói a tabela a partir dos campos ``pos``, ``parsing`` e
+        ``lemmas`` gerados por CorpusProcessor.parse_sblgnt_file.
+
+        Raises:
+            ValueError: Se os versos não tiverem dados morfológicos
+        """
+        if verses and "parsing" not in verses[0]:
+            raise ValueError(
+                "Versos sem códigos morfológicos. Reprocesse o corpus com "
+                "CorpusProcessor."
+            )
+
+        self.num_verses = len(verses)
+        counts = [len(v["parsing"]) for v in verses]
+        self.num_words = int(sum(counts))
+        self.verse_rows = np.repeat(
+            np.arange(self.num_verses, dtype=np.int32), counts
+        )
+        self.verse_offsets = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(
+            np.int64
+        )
+        self._nonempty = np.asarray(counts) > 0
+
+        vocab: Dict[str, int] = {}
+        self.lemma_ids = np.fromiter(
+            (
+                vocab.setdefault(lemma, len(vocab))
+                for v in verses
+                for lemma in v["lemmas"]
+            ),
+            dtype=np.int32,
+            count=self.num_words,
+        )
+        self.lemmas = list(vocab)
+        self._lemma_positions = np.argsort(self.lemma_ids, kind="stable")
+        self._lemma_offsets = np.concatenate(
+            [[0], np.cumsum(np.bincount(self.lemma_ids, minlength=len(vocab)))]
+        ).astype(np.int64)
+        self._lemma_lookup = {}
+        for lemma, lemma_id in vocab.items():
+            self._lemma_lookup.setdefault(normalize_word(lemma), []).append(lemma_id)
+
+        # Colunas de caracteres: parsing (8 bytes) e pos (2 bytes) por palavra
+        parsing = np.frombuffer(
+            "".join(code.ljust(8, "-")[:8] for v in verses for code in v["parsing"])
+            .encode("ascii"),
+            dtype="S1",
+        ).reshape(self.num_words, 8)
+        pos = np.array(
+            [p for v in verses for p in v["pos"]], dtype="S2"
+        )
+
+        self.bitmaps = {}
+        for code in FEATURE_VALUES["pos"].values():
+            self.bitmaps[("pos", code)] = np.packbits(pos == code.encode("ascii"))
+        for col, feature in enumerate(PARSING_FEATURES):
+            for code in FEATURE_VALUES[feature].values():
+                mask = parsing[:, col] == code.encode("ascii")
+                self.bitmaps[(feature, code)] = np.packbits(mask)
+
+        print(
+            f"✓ Índice morfológico: {self.num_words:,} palavras, "
+            f"{len(self.bitmaps)} bitmaps"
+        )
+
+    def _code_for(self, feature: str, value: str) -> str:
+        values = FEATURE_VALUES.get(feature)
+        if values is None:
+            raise ValueError(f"Traço morfológico desconhecido: {feature}")
+        if value in values.values():
+            return value
+        code = values.get(str(value).lower())
+        if code is None:
+            raise ValueError(f"Valor inválido para {feature}: {value}")
+        return code
+
+    def _word_mask(self, spec: Dict[str, str]) -> np.ndarray:
+        """Bitmap compactado das palavras que satisfazem todos os traços."""
+        packed = np.full((self.num_words + 7) // 8, 0xFF, dtype=np.uint8)
+        for feature, value in spec.items():
+            if feature == "lemma":
+                mask = np.zeros(self.num_words, dtype=bool)
+                for lemma_id in self._lemma_lookup.get(normalize_word(value), []):
+                    start, end = self._lemma_offsets[lemma_id : lemma_id + 2]
+                    mask[self._lemma_positions[start:end]] = True
+                packed &= np.packbits(mask)
+            else:
+                packed &= self.bitmaps[(feature, self._code_for(feature, value))]
+        return packed
+
+    def _verse_mask(self, spec: Dict[str, str]) -> np.ndarray:
+        """Bitmap compactado dos versos com alguma palavra que satisfaz ``spec``."""
+        words = np.unpackbits(self._word_mask(spec), count=self.num_words)
+        mask = np.zeros(self.num_verses, dtype=np.uint8)
+        # OR por verso: máximo de cada segmento contíguo de palavras
+        mask[self._nonempty] = np.maximum.reduceat(
+            words, self.verse_offsets[self._nonempty]
+        )
+        return np.packbits(mask)
+
+    def query(self, words: List[Dict[str, str]], op: str = "and") -> np.ndarray:
+        """
+        Retorna as linhas dos versos que satisfazem a consulta.
+
+        Ex.: particípio aoristo passivo e o lema ἀγάπη no mesmo verso::
+
+            index.query([
+                {"tense": "aorist", "voice": "passive", "mood": "participle"},
+                {"lemma": "ἀγάπη"},
+            ])
+
+        Args:
+            words: Especificações de palavra (traço → valor); os traços
+                aceitos são ``lemma`` e as chaves de FEATURE_VALUES
+            op: "and" (todas as especificações) ou "or" (qualquer uma)
+
+        Returns:
+            Array ordenado com as linhas dos versos
+
+        Raises:
+            ValueError: Para traços/valores desconhecidos ou op inválido
+        """
+        if op not in ("and", "or"):
+            raise ValueError(f"Operador inválido: {op}")
+        if not words:
+            return np.arange(self.num_verses)
+
+        combined: Optional[np.ndarray] = None
+        for spec in words:
+            mask = self._verse_mask(spec)
+            if combined is None:
+                combined = mask
+            elif op == "and":
+                combined &= mask
+            else:
+                combined |= mask
+        return np.flatnonzero(np.unpackbits(combined, count=self.num_verses))
@@ -0,0 +1,233 @@
+import difflib
+import zlib
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.services.greek_text import normalize_greek
+
+# Primo > 2^32: com a, b, h < 2^32 o produto a*h + b cabe em uint64
+_HASH_PRIME = np.uint64(4294967311)
+
+
+class QuotationIndex:
+    """
+    Detector de citações quase literais: shingles de palavras normalizadas,
+    assinaturas MinHash e LSH por bandas.
+
+    Cada verso vira um conjunto de n-gramas de palavras (sem acentos e
+    caixa). Versos cujas assinaturas coincidem em alguma banda são
+    candidatos; a confirmação alinha as sequências de palavras e devolve os
+    trechos em comum.
+    """
+
+    def __init__(
+        self,
+        shingle_size: int = 4,
+        num_perm: int = 64,
+        bands: int = 16,
+        seed: int = 1,
+    ):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm deve ser múltiplo de bands")
+        self.shingle_size = shingle_size
+        self.num_perm = num_perm
+        self.bands = bands
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2**32, size=num_perm, dtype=np.uint64)
+        self._band_mult = rng.integers(1, 2**63, size=num_perm // bands, dtype=np.uint64)
+        self.tokens: List[List[str]] = []
+        self.signatures = np.zeros((0, num_perm), dtype=np.uint64)
+        # Por banda: chaves ordenadas e linhas correspondentes
+        self._band_keys: List[np.ndarray] = []
+        self._band_rows: List[np.ndarray] = []
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """
+        Palavras normalizadas (sem diacríticos/pontuação) de um texto; a
+        mesma tokenização do campo ``normalized`` do corpus, usada também
+        para as queries.
+        """
+        return normalize_greek(text).split()
+
+    def _shingle_hashes(self, tokens: Sequence[str]) -> np.ndarray:
+        n = self.shingle_size
+        if len(tokens) < n:
+            shingles = [" ".join(tokens)] if tokens else []
+        else:
+            shingles = [" ".join(tokens[i : i + n]) for i in range(len(tokens) - n + 1)]
+        return np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+
+    def signature(self, tokens: Sequence[str]) -> np.ndarray:
+        """Assinatura MinHash (num_perm,) dos shingles de ``tokens``."""
+        hashes = self._shingle_hashes(tokens)
+        if hashes.size == 0:
+            return np.full(self.num_perm, _HASH_PRIME, dtype=np.uint64)
+        permuted = (np.outer(self._a, hashes) + self._b[:, None]) % _HASH_PRIME
+        return permuted.min(axis=1)
+
+    def _band_key_matrix(self, signatures: np.ndarray) -> np.ndarray:
+        """Chave uint64 de cada (assinatura, banda)."""
+        rows_per_band = self.num_perm // self.bands
+        banded = signatures.reshape(len(signatures), self.bands, rows_per_band)
+        # Overflow intencional (aritmética módulo 2^64)
+        with np.errstate(over="ignore"):
+            return (banded * self._band_mult).sum(axis=2, dtype=np.uint64)
+
+    def build(self, verses: List[Dict]):
+        """Calcula assinaturas e buckets LSH para todos os versos."""
+        self.tokens = [
+            v["normalized"].split()
+            if "normalized" in v
+            else self.tokenize(" ".join(v["words"]) if v.get("words") else v["text"])
+            for v in verses
+        ]
+        self.signatures = np.vstack(
+            [self.signature(t) for t in self.tokens]
+            or [np.zeros((0, self.num_perm), dtype=np.uint64)]
+        )
+        self._index_bands()
+        print(f"✓ Índice MinHash/LSH: {len(self.tokens):,} versos, {self.bands} bandas")
+
+    def _index_bands(self):
+        keys = self._band_key_matrix(self.signatures)
+        self._band_keys, self._band_rows = [], []
+        for band in range(self.bands):
+            order = np.argsort(keys[:, band], kind="stable")
+            self._band_keys.append(keys[order, band])
+            self._band_rows.append(order.astype(np.int64))
+
+    def candidates(self, signature: np.ndarray) -> np.ndarray:
+        """Linhas que compartilham pelo menos um bucket com a assinatura."""
+        keys = self._band_key_matrix(signature.reshape(1, -1))[0]
+        found = []
+        for band, key in enumerate(keys):
+            band_keys = self._band_keys[band]
+            lo = np.searchsorted(band_keys, key, side="left")
+            hi = np.searchsorted(band_keys, key, side="right")
+            if hi > lo:
+                found.append(self._band_rows[band][lo:hi])
+        if not found:
+            return np.zeros(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def estimated_jaccard(self, signature: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """Jaccard estimado (fração de minhashes iguais) contra várias linhas."""
+        return (self.signatures[rows] == signature).mean(axis=1)
+
+    def aligned_spans(
+        self, query_tokens: Sequence[str], row: int, min_span: int
+    ) -> List[Dict]:
+        """Trechos contíguos de pelo menos ``min_span`` palavras em comum."""
+        matcher = difflib.SequenceMatcher(
+            None, list(query_tokens), self.tokens[row], autojunk=False
+        )
+        return [
+            {
+                "query_start": block.a,
+                "query_end": block.a + block.size,
+                "target_start": block.b,
+                "target_end": block.b + block.size,
+                "text": " ".join(query_tokens[block.a : block.a + block.size]),
+            }
+            for block in matcher.get_matching_blocks()
+            if block.size >= min_span
+        ]
+
+    def find(
+        self,
+        query_tokens: Sequence[str],
+        top_k: int = 10,
+        min_span: Optional[int] = None,
+        exclude_row: Optional[int] = None,
+    ) -> List[Tuple[int, float, List[Dict]]]:
+        """
+        Busca versos que compartilham trechos longos com a query.
+
+        Args:
+            query_tokens: Palavras normalizadas (ver tokenize)
+            top_k: Máximo de resultados
+            min_span: Tamanho mínimo (em palavras) de um trecho alinhado
+                (default: shingle_size)
+            exclude_row: Linha a ignorar (o próprio verso da query)
+
+        Returns:
+            Lista (linha, jaccard estimado, trechos alinhados), ordenada pelo
+            tamanho do maior trecho e depois pelo Jaccard
+        """
+        min_span = min_span or self.shingle_size
+        signature = self.signature(query_tokens)
+        rows = self.candidates(signature)
+        if exclude_row is not None:
+            rows = rows[rows != exclude_row]
+        if rows.size == 0:
+            return []
+
+        jaccard = self.estimated_jaccard(signature, rows)
+        hits = []
+        for row, score in zip(rows, jaccard):
+            spans = self.aligned_spans(query_tokens, int(row), min_span)
+            if spans:
+                hits.append((int(row), float(score), spans))
+        hits.sort(
+            key=lambda h: (max(s["query_end"] - s["query_start"] for s in h[2]), h[1]),
+            reverse=True,
+        )
+        return hits[:top_k]
+
+    def all_pairs(self, threshold: float = 0.5) -> Iterator[Tuple[int, int, float]]:
+        """
+        Enumera pares (i, j, jaccard estimado) com i < j e Jaccard estimado
+        >= threshold, visitando apenas pares que colidem em alguma banda.
+        """
+        seen = set()
+        for band_keys, band_rows in zip(self._band_keys, self._band_rows):
+            # Início de cada grupo de chaves iguais com 2+ membros
+            boundaries = np.flatnonzero(np.diff(band_keys)) + 1
+            starts = np.concatenate([[0], boundaries])
+            ends = np.concatenate([boundaries, [len(band_keys)]])
+            for start, end in zip(starts, ends):
+                if end - start < 2:
+                    continue
+                bucket = np.sort(band_rows[start:end])
+                for offset, i in enumerate(bucket[:-1]):
+                    others = bucket[offset + 1 :]
+                    scores = self.estimated_jaccard(self.signatures[i], others)
+                    for j, score in zip(others, scores):
+                        pair = (int(i), int(j))
+                        if score >= threshold and pair not in seen:
+                            seen.add(pair)
+                            yield pair[0], pair[1], float(score)
+
+    def save(self, path: str):
+        """Salva assinaturas, parâmetros e palavras normalizadas (.npz)."""
+        np.savez(
+            path,
+            signatures=self.signatures,
+            params=np.array([self.shingle_size, self.num_perm, self.bands]),
+            a=self._a,
+            b=self._b,
+            band_mult=self._band_mult,
+            tokens=np.array("\n".join(" ".join(t) for t in self.tokens)),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "QuotationIndex":
+        """Carrega um índice salvo com save()."""
+        data = np.load(path)
+        shingle_size, num_perm, bands = (int(x) for x in data["params"])
+        index = cls(shingle_size, num_perm, bands)
+        index._a, index._b = data["a"], data["b"]
+        index._band_mult = data["band_mult"]
+        index.signatures = data["signatures"]
+        lines = str(data["tokens"]).split("\n")
+        index.tokens = [line.split() if line else [] for line in lines]
+        index.tokens = index.tokens[: len(index.signatures)]
+        index._index_bands()
+        return index
@@ -0,0 +1,217 @@
+import re
+import unicodedata
+from typing import Dict, Optional, Tuple
+
+from src.services.corpus_processor import NT_BOOKS, OT_BOOKS
+from src.services.greek_text import normalize_greek
+
+# Aliases por livro canônico (mesmos nomes de CorpusProcessor._get_book_name).
+# Os aliases são normalizados na importação, então podem ser escritos com
+# acentos, espaços e pontos (ex.: "1 Coríntios", "Α΄ Κορινθίους").
+BOOK_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "Matthew": ("Matthew", "Matt", "Mt", "Mateus", "Mat", "Ματθαῖον", "Ματθ"),
+    "Mark": ("Mark", "Mk", "Mrk", "Marcos", "Mc", "Μᾶρκον", "Μαρκ"),
+    "Luke": ("Luke", "Lk", "Luc", "Lucas", "Lc", "Λουκᾶν", "Λουκ"),
+    "John": ("John", "Jn", "Jhn", "João", "Jo", "Ἰωάννην", "Ἰω"),
+    "Acts": ("Acts", "Act", "Atos", "At", "Πράξεις", "Πραξ"),
+    "Romans": ("Romans", "Rom", "Rm", "Romanos", "Ῥωμαίους", "Ρωμ"),
+    "1Corinthians": (
+        "1 Corinthians", "1 Cor", "1 Co", "1 Coríntios", "Α΄ Κορινθίους",
+        "Α Κορ",
+    ),
+    "2Corinthians": (
+        "2 Corinthians", "2 Cor", "2 Co", "2 Coríntios", "Β΄ Κορινθίους",
+        "Β Κορ",
+    ),
+    "Galatians": ("Galatians", "Gal", "Gl", "Gálatas", "Γαλάτας", "Γαλ"),
+    "Ephesians": ("Ephesians", "Eph", "Ef", "Efésios", "Ἐφεσίους", "Εφ"),
+    "Philippians": (
+        "Philippians", "Phil", "Php", "Fp", "Filipenses", "Φιλιππησίους",
+        "Φιλιπ",
+    ),
+    "Colossians": ("Colossians", "Col", "Cl", "Colossenses", "Κολοσσαεῖς", "Κολ"),
+    "1Thessalonians": (
+        "1 Thessalonians", "1 Thess", "1 Th", "1 Ts", "1 Tessalonicenses",
+        "Α΄ Θεσσαλονικεῖς", "Α Θεσ",
+    ),
+    "2Thessalonians": (
+        "2 Thessalonians", "2 Thess", "2 Th", "2 Ts", "2 Tessalonicenses",
+        "Β΄ Θεσσαλονικεῖς", "Β Θεσ",
+    ),
+    "1Timothy": (
+        "1 Timothy", "1 Tim", "1 Tm", "1 Timóteo", "Α΄ Τιμόθεον", "Α Τιμ",
+    ),
+    "2Timothy": (
+        "2 Timothy", "2 Tim", "2 Tm", "2 Timóteo", "Β΄ Τιμόθεον", "Β Τιμ",
+    ),
+    "Titus": ("Titus", "Tit", "Tt", "Tito", "Τίτον", "Τιτ"),
+    "Philemon": ("Philemon", "Phlm", "Phm", "Fm", "Filemom", "Φιλήμονα", "Φιλημ"),
+    "Hebrews": ("Hebrews", "Heb", "Hb", "Hebreus", "Ἑβραίους", "Εβρ"),
+    "James": ("James", "Jas", "Jm", "Tiago", "Tg", "Ἰακώβου", "Ιακ"),
+    "1Peter": ("1 Peter", "1 Pet", "1 Pe", "1 Pd", "1 Pedro", "Α΄ Πέτρου", "Α Πετ"),
+    "2Peter": ("2 Peter", "2 Pet", "2 Pe", "2 Pd", "2 Pedro", "Β΄ Πέτρου", "Β Πετ"),
+    "1John": ("1 John", "1 Jn", "1 Jo", "1 João", "Α΄ Ἰωάννου", "Α Ιω"),
+    "2John": ("2 John", "2 Jn", "2 Jo", "2 João", "Β΄ Ἰωάννου", "Β Ιω"),
+    "3John": ("3 John", "3 Jn", "3 Jo", "3 João", "Γ΄ Ἰωάννου", "Γ Ιω"),
+    "Jude": ("Jude", "Jud", "Jd", "Judas", "Ἰούδα", "Ιουδ"),
+    "Revelation": (
+        "Revelation", "Rev", "Rv", "Apocalipse", "Ap", "Apoc",
+        "Ἀποκάλυψις", "Αποκ",
+    ),
+}
+
+# Aliases do AT (inglês e português). Abreviações que coincidem com as do
+# NT (ex.: "Jo", "Jn") ficam com o livro do NT; as que só coincidem depois
+# de tirar os acentos ("Jó" x "Jo") são desempatadas pela grafia exata.
+OT_BOOK_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "Genesis": ("Genesis", "Gen", "Gn", "Gênesis"),
+    "Exodus": ("Exodus", "Exod", "Ex", "Êxodo"),
+    "Leviticus": ("Leviticus", "Lev", "Lv", "Levítico"),
+    "Numbers": ("Numbers", "Num", "Nm", "Números"),
+    "Deuteronomy": ("Deuteronomy", "Deut", "Dt", "Deuteronômio"),
+    "Joshua": ("Joshua", "Josh", "Js", "Josué"),
+    "Judges": ("Judges", "Judg", "Jz", "Juízes"),
+    "Ruth": ("Ruth", "Rt", "Rute"),
+    "1Samuel": ("1 Samuel", "1 Sam", "1 Sm"),
+    "2Samuel": ("2 Samuel", "2 Sam", "2 Sm"),
+    "1Kings": ("1 Kings", "1 Kgs", "1 Rs", "1 Reis"),
+    "2Kings": ("2 Kings", "2 Kgs", "2 Rs", "2 Reis"),
+    "1Chronicles": ("1 Chronicles", "1 Chr", "1 Cr", "1 Crônicas"),
+    "2Chronicles": ("2 Chronicles", "2 Chr", "2 Cr", "2 Crônicas"),
+    "Ezra": ("Ezra", "Ezr", "Esd", "Esdras"),
+    "Nehemiah": ("Nehemiah", "Neh", "Ne", "Neemias"),
+    "Esther": ("Esther", "Esth", "Et", "Ester"),
+    "Job": ("Job", "Jb", "Jó"),
+    "Psalms": ("Psalms", "Psalm", "Ps", "Sl", "Salmos", "Salmo"),
+    "Proverbs": ("Proverbs", "Prov", "Pv", "Provérbios"),
+    "Ecclesiastes": ("Ecclesiastes", "Eccl", "Ec", "Eclesiastes"),
+    "SongOfSongs": ("Song of Songs", "Song", "Ct", "Cantares", "Cânticos"),
+    "Isaiah": ("Isaiah", "Isa", "Is", "Isaías"),
+    "Jeremiah": ("Jeremiah", "Jer", "Jr", "Jeremias"),
+    "Lamentations": ("Lamentations", "Lam", "Lm", "Lamentações"),
+    "Ezekiel": ("Ezekiel", "Ezek", "Ez", "Ezequiel"),
+    "Daniel": ("Daniel", "Dan", "Dn"),
+    "Hosea": ("Hosea", "Hos", "Os", "Oseias"),
+    "Joel": ("Joel", "Jl"),
+    "Amos": ("Amos", "Am", "Amós"),
+    "Obadiah": ("Obadiah", "Obad", "Ob", "Abdias"),
+    "Jonah": ("Jonah", "Jon", "Jonas"),
+    "Micah": ("Micah", "Mic", "Mq", "Miqueias"),
+    "Nahum": ("Nahum", "Nah", "Na", "Naum"),
+    "Habakkuk": ("Habakkuk", "Hab", "Hc", "Habacuque"),
+    "Zephaniah": ("Zephaniah", "Zeph", "Sf", "Sofonias"),
+    "Haggai": ("Haggai", "Hag", "Ag", "Ageu"),
+    "Zechariah": ("Zechariah", "Zech", "Zc", "Zacarias"),
+    "Malachi": ("Malachi", "Mal", "Ml", "Malaquias"),
+}
+
+# Ordinais aceitos em livros numerados (árabe, romano, grego, português)
+_ORDINALS = {
+    "1": "1", "i": "1", "α": "1", "primeira": "1", "primeiro": "1",
+    "2": "2", "ii": "2", "β": "2", "segunda": "2", "segundo": "2",
+    "3": "3", "iii": "3", "γ": "3", "terceira": "3", "terceiro": "3",
+}
+
+# Preposições de títulos gregos ("κατὰ Ἰωάννην", "πρὸς Ῥωμαίους")
+_TITLE_PREFIXES = {"κατα", "προσ", "epistola", "evangelho", "carta"}
+
+_REFERENCE_RE = re.compile(
+    r"^\s*(?P<book>\S.*?)\s*(?P<chapter>\d{1,3})\s*[:.,]\s*(?P<verse>\d{1,3})\s*$"
+)
+_MORPHGNT_REF_RE = re.compile(r"^\s*(?P<book>\d{2})(?P<chapter>\d{2})(?P<verse>\d{2})\s*$")
+
+
+def normalize_book_name(name: str) -> str:
+    """
+    Normaliza um nome de livro para a chave usada no lookup de aliases.
+
+    Ex.: "1 Coríntios" → "1corintios", "Α΄ Κορινθίους" → "1κορινθιουσ",
+    "κατὰ Ἰωάννην" → "ιωαννην".
+    """
+    folded = normalize_greek(name)
+    # Separa ordinal colado ao nome ("1cor" → "1 cor")
+    folded = re.sub(r"^(\d)(?=\D)", r"\1 ", folded.strip())
+    tokens = [t for t in folded.split() if t not in _TITLE_PREFIXES]
+    if not tokens:
+        return ""
+
+    ordinal = ""
+    if len(tokens) > 1 and tokens[0] in _ORDINALS:
+        ordinal = _ORDINALS[tokens.pop(0)]
+    elif len(tokens) > 1 and tokens[-1] in _ORDINALS:
+        ordinal = _ORDINALS[tokens.pop()]
+    return ordinal + "".join(tokens)
+
+
+def _exact_key(name: str) -> str:
+    """Chave com acentos preservados (só caixa e espaços normalizados)."""
+    return " ".join(unicodedata.normalize("NFC", name).casefold().split())
+
+
+def _build_exact_lookup() -> Dict[str, str]:
+    lookup = {}
+    for aliases in (BOOK_ALIASES, OT_BOOK_ALIASES):
+        for canonical, names in aliases.items():
+            for alias in (canonical,) + names:
+                lookup.setdefault(_exact_key(alias), canonical)
+    return lookup
+
+
+def _build_alias_lookup() -> Dict[str, str]:
+    lookup = {}
+    for canonical, aliases in BOOK_ALIASES.items():
+        for alias in (canonical,) + aliases:
+            lookup[normalize_book_name(alias)] = canonical
+    for code, canonical in NT_BOOKS.items():
+        lookup[code] = canonical
+    for canonical, aliases in OT_BOOK_ALIASES.items():
+        for alias in (canonical,) + aliases:
+            lookup.setdefault(normalize_book_name(alias), canonical)
+    for bhsa_name, canonical in OT_BOOKS.items():
+        lookup.setdefault(normalize_book_name(bhsa_name), canonical)
+    return lookup
+
+
+_ALIAS_LOOKUP = _build_alias_lookup()
+_EXACT_LOOKUP = _build_exact_lookup()
+
+
+def resolve_book(name: str) -> Optional[str]:
+    """
+    Resolve um nome/abreviação/código de livro para o nome canônico. A
+    grafia exata de um alias vem antes da normalizada ("Jó" é Jó, "Jo" é
+    João).
+    """
+    return _EXACT_LOOKUP.get(_exact_key(name)) or _ALIAS_LOOKUP.get(normalize_book_name(name))
+
+
+def parse_reference(query: str) -> Optional[Tuple[str, int, int]]:
+    """
+    Interpreta uma referência bíblica.
+
+    Aceita nomes em português, inglês e grego (NT; AT em português e
+    inglês), abreviações, os códigos
+    MorphGNT ("64 3:16") e a forma compacta BBCCVV ("640316").
+
+    Args:
+        query: Texto digitado pelo usuário (ex.: "João 3:16", "Rev 12.1")
+
+    Returns:
+        Tupla (livro canônico, capítulo, verso) ou None se não for referência
+    """
+    if not query:
+        return None
+
+    match = _MORPHGNT_REF_RE.match(query) or _REFERENCE_RE.match(query)
+    if match is None:
+        return None
+
+    book = resolve_book(match.group("book"))
+    if book is None:
+        return None
+
+    chapter = int(match.group("chapter"))
+    verse = int(match.group("verse"))
+    if chapter < 1 or verse < 1:
+        return None
+    return book, chapter, verse
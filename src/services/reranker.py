@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError:  # noqa: PERF401
+    CrossEncoder = None
+
+
+class CrossEncoderReranker:
+    """
+    Segundo estágio de ranking: re-pontua os candidatos do FAISS com um
+    cross-encoder, dentro de um orçamento de latência por requisição.
+    """
+
+    def __init__(
+        self,
+        model_name: Optional[str] = None,
+        budget_ms: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        cache_size: Optional[int] = None,
+        device: Optional[str] = None,
+    ):
+        """
+        Args:
+            model_name: Modelo cross-encoder (default: env RERANKER_MODEL)
+            budget_ms: Orçamento de latência por requisição
+                (default: env RERANK_BUDGET_MS ou 250)
+            batch_size: Pares por chamada ao modelo
+                (default: env RERANK_BATCH_SIZE ou 32)
+            cache_size: Máximo de pares (query, verso) em cache
+                (default: env RERANK_CACHE_SIZE ou 4096)
+            device: Device do modelo ('cpu'/'cuda')
+        """
+        if CrossEncoder is None:
+            raise ImportError("sentence-transformers não instalado")
+
+        self.model_name = model_name or os.getenv(
+            "RERANKER_MODEL", "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+        )
+        self.budget_ms = (
+            budget_ms
+            if budget_ms is not None
+            else float(os.getenv("RERANK_BUDGET_MS", "250"))
+        )
+        self.batch_size = batch_size or int(os.getenv("RERANK_BATCH_SIZE", "32"))
+        self._cache_max = cache_size or int(os.getenv("RERANK_CACHE_SIZE", "4096"))
+        self._cache: "OrderedDict[Tuple[str, tuple], float]" = OrderedDict()
+        # Requisições concorrentes compartilham o LRU
+        self._cache_lock = threading.Lock()
+
+        print(f"Carregando re-ranker {self.model_name}...")
+        self.model = CrossEncoder(self.model_name, device=device)
+
+    @staticmethod
+    def _verse_key(verse: Dict) -> tuple:
+        return (
+            verse["book"],
+            verse["chapter"],
+            verse["verse"],
+            verse.get("end_chapter"),
+            verse.get("end_verse"),
+        )
+
+    def _cache_put(self, key: Tuple[str, tuple], score: float):
+        with self._cache_lock:
+            self._cache[key] = score
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_max:
+                self._cache.popitem(last=False)
+
+    def clear_cache(self):
+        """Descarta os scores em cache (textos dos versos mudaram)."""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def rerank(
+        self, query: str, candidates: List[Tuple[Dict, float]]
+    ) -> Tuple[List[Tuple[Dict, float]], bool]:
+        """
+        Re-ordena candidatos pelo score do cross-encoder.
+
+        Pares já vistos vêm do cache; os demais são pontuados em lotes de
+        ``batch_size``. Antes de cada lote verifica-se se ele ainda cabe no
+        orçamento (estimado pela duração do lote anterior). Se não couber,
+        devolve a ordem do primeiro estágio; os scores já calculados ficam
+        em cache e aproveitam à próxima requisição.
+
+        Args:
+            query: Texto da consulta
+            candidates: Lista (verso, score bi-encoder) do primeiro estágio
+
+        Returns:
+            Tupla (lista (verso, score) re-ordenada, True se re-ranqueado)
+        """
+        start = time.perf_counter()
+        deadline = start + self.budget_ms / 1000.0
+
+        keys = [(query, self._verse_key(verse)) for verse, _ in candidates]
+        scores: List[Optional[float]] = []
+        with self._cache_lock:
+            for key in keys:
+                score = self._cache.get(key)
+                if score is not None:
+                    self._cache.move_to_end(key)
+                scores.append(score)
+
+        pending = [i for i, score in enumerate(scores) if score is None]
+        last_batch_s = 0.0
+        for offset in range(0, len(pending), self.batch_size):
+            now = time.perf_counter()
+            if now + last_batch_s > deadline:
+                return candidates, False
+
+            batch = pending[offset : offset + self.batch_size]
+            pairs = [(query, candidates[i][0]["text"]) for i in batch]
+            batch_scores = self.model.predict(
+                pairs, batch_size=len(pairs), show_progress_bar=False
+            )
+            for i, score in zip(batch, batch_scores):
+                scores[i] = float(score)
+                self._cache_put(keys[i], scores[i])
+            last_batch_s = time.perf_counter() - now
+
+        order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+        return [(candidates[i][0], scores[i]) for i in order], True
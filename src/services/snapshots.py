@@ -0,0 +1,340 @@
+"""
+Snapshots versionados dos índices (índice, metadados, embeddings e
+artefatos derivados de um corpus).
+
+Layout, por corpus::
+
+    indexes/snapshots/nt/
+        20260101-120000/      # uma versão: arquivos do save_index + manifest.json
+        20260102-090000/
+        CURRENT               # nome da versão ativa
+        .local/               # deltas e caches gravados após a publicação
+
+Uma versão é gravada inteira em um diretório temporário e publicada com
+``os.rename`` (atômico no mesmo sistema de arquivos); só então o ponteiro
+``CURRENT`` é trocado (arquivo temporário + ``os.replace``). Um leitor vê
+sempre uma versão completa: um setup interrompido deixa no máximo um
+``.tmp-*`` órfão, removido na próxima publicação. Uma versão publicada
+nunca é alterada: as mutações (deltas) ficam em ``.local/`` e são
+reaplicadas sobre qualquer versão carregada.
+
+Com ``SNAPSHOT_LOCAL_DIR``, o diretório local de cada corpus fica em
+``SNAPSHOT_LOCAL_DIR/<corpus>`` e a árvore de snapshots é tratada como
+somente leitura (ex.: dentro de um bundle): a compactação não publica
+versões novas nela.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.services.intertextuality_engine import IntertextualityEngine
+
+INDEX_FILE = "faiss.index"
+META_FILE = "verses_meta.json"
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+LOCAL_DIR = ".local"
+
+
+def snapshot_root(name: str) -> str:
+    """Diretório dos snapshots de um corpus (``SNAPSHOT_DIR/<nome>``)."""
+    return os.path.join(os.getenv("SNAPSHOT_DIR", "indexes/snapshots"), name)
+
+
+def snapshot_paths(path: str) -> Tuple[str, str]:
+    """(índice, metadados) dentro do diretório de uma versão."""
+    return os.path.join(path, INDEX_FILE), os.path.join(path, META_FILE)
+
+
+def local_dir(root: str) -> str:
+    """Diretório gravável do corpus, fora das versões (deltas e caches)."""
+    base = os.getenv("SNAPSHOT_LOCAL_DIR")
+    if base:
+        return os.path.join(base, os.path.basename(os.path.normpath(root)))
+    return os.path.join(root, LOCAL_DIR)
+
+
+def writable_root(root: str) -> Optional[str]:
+    """Raiz onde a compactação publica versões (None: árvore somente leitura)."""
+    return None if os.getenv("SNAPSHOT_LOCAL_DIR") else root
+
+
+def check_version(root: str, version: str) -> None:
+    """
+    Confere se ``version`` é uma versão publicada em ``root``.
+
+    Raises:
+        ValueError: Nome que não é uma entrada de ``root`` (ex.: "..") ou
+            versão inexistente/incompleta
+    """
+    if version not in {s["version"] for s in list_snapshots(root)}:
+        raise ValueError(f"Versão '{version}' não encontrada em {root}")
+
+
+def file_sha256(path: str, block: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def list_files(directory: str) -> Dict[str, Dict]:
+    """Arquivos (caminho relativo → bytes e sha256) de um diretório, recursivo."""
+    files = {}
+    for base, _dirs, names in os.walk(directory):
+        for name in sorted(names):
+            path = os.path.join(base, name)
+            relative = os.path.relpath(path, directory).replace(os.sep, "/")
+            if relative == MANIFEST_FILE:
+                continue
+            files[relative] = {"bytes": os.path.getsize(path), "sha256": file_sha256(path)}
+    return dict(sorted(files.items()))
+
+
+def _fsync_dir(directory: str):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Windows: diretórios não abrem para fsync
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_json_atomic(path: str, payload) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_manifest(path: str) -> Dict:
+    """
+    Manifest de uma versão.
+
+    Raises:
+        ValueError: Se a versão não existir ou estiver incompleta
+    """
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise ValueError(f"Snapshot inválido (sem manifest): {path}")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    for required in (INDEX_FILE, META_FILE):
+        if not os.path.exists(os.path.join(path, required)):
+            raise ValueError(f"Snapshot incompleto (sem {required}): {path}")
+    return manifest
+
+
+def verify_files(directory: str, files: Dict[str, Dict], checksums: bool = True) -> List[str]:
+    """
+    Confere os arquivos de ``directory`` contra a lista de um manifest
+    (tamanho sempre; sha256 se ``checksums``).
+
+    Returns:
+        Arquivos ausentes ou divergentes (lista vazia = íntegro)
+    """
+    problems = []
+    for relative, expected in files.items():
+        file_path = os.path.join(directory, relative)
+        if not os.path.exists(file_path):
+            problems.append(f"{relative}: ausente")
+        elif os.path.getsize(file_path) != expected["bytes"]:
+            problems.append(f"{relative}: tamanho divergente")
+        elif checksums and file_sha256(file_path) != expected["sha256"]:
+            problems.append(f"{relative}: sha256 divergente")
+    return problems
+
+
+def verify_snapshot(path: str) -> List[str]:
+    """Confere tamanhos e sha256 dos arquivos de uma versão contra o manifest."""
+    return verify_files(path, read_manifest(path)["files"])
+
+
+def current_version(root: str) -> Optional[str]:
+    """Versão ativa (conteúdo de ``CURRENT``), ou None."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r", encoding="utf-8") as f:
+            version = f.read().strip()
+    except OSError:
+        return None
+    return version or None
+
+
+def current_snapshot(root: str) -> Optional[str]:
+    """Diretório da versão ativa, ou None se não houver snapshot."""
+    version = current_version(root)
+    if version is None:
+        return None
+    path = os.path.join(root, version)
+    return path if os.path.isdir(path) else None
+
+
+def list_snapshots(root: str) -> List[Dict]:
+    """Versões publicadas (mais antiga primeiro) com o resumo do manifest."""
+    if not os.path.isdir(root):
+        return []
+    current = current_version(root)
+    snapshots = []
+    for version in sorted(os.listdir(root)):
+        path = os.path.join(root, version)
+        if version.startswith(".") or not os.path.isdir(path):
+            continue
+        try:
+            manifest = read_manifest(path)
+        except ValueError:
+            continue
+        snapshots.append(
+            {
+                "version": version,
+                "current": version == current,
+                "created_at": manifest.get("created_at"),
+                "verses": manifest.get("verses"),
+                "bytes": sum(f["bytes"] for f in manifest["files"].values()),
+            }
+        )
+    return snapshots
+
+
+def activate(root: str, version: str) -> None:
+    """
+    Aponta ``CURRENT`` para ``version`` (troca atômica).
+
+    Raises:
+        ValueError: Se a versão não existir ou estiver incompleta
+    """
+    check_version(root, version)
+    tmp_path = os.path.join(root, CURRENT_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+    _fsync_dir(root)
+
+
+def prune_snapshots(root: str, keep: int) -> List[str]:
+    """Apaga as versões mais antigas além das ``keep`` últimas (nunca a ativa)."""
+    current = current_version(root)
+    versions = [s["version"] for s in list_snapshots(root)]
+    removed = []
+    for version in versions[: max(0, len(versions) - keep)]:
+        if version == current:
+            continue
+        shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+        removed.append(version)
+    return removed
+
+
+def write_snapshot(
+    engine: IntertextualityEngine,
+    root: str,
+    version: Optional[str] = None,
+    prepare: Optional[Callable[[IntertextualityEngine], None]] = None,
+    activate_version: bool = True,
+    keep: Optional[int] = None,
+) -> str:
+    """
+    Grava o engine como nova versão e (por padrão) a ativa.
+
+    Args:
+        engine: Engine com índice construído
+        root: Diretório dos snapshots do corpus (ver snapshot_root)
+        version: Nome da versão (default: data/hora UTC)
+        prepare: Chamado após o save_index e antes da publicação, para
+            gravar artefatos extras ao lado do índice (ex.: matrizes)
+        activate_version: Se True, troca o CURRENT para a nova versão
+        keep: Versões mantidas (default: SNAPSHOT_KEEP ou 3)
+
+    Returns:
+        Diretório da versão publicada
+
+    Raises:
+        ValueError: Se a versão já existir
+    """
+    version = version or datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    final_dir = os.path.join(root, version)
+    if os.path.exists(final_dir):
+        raise ValueError(f"Snapshot já existe: {final_dir}")
+    os.makedirs(root, exist_ok=True)
+    for name in os.listdir(root):
+        if name.startswith(".tmp-"):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+    tmp_dir = os.path.join(root, f".tmp-{version}")
+    engine.save_index(*snapshot_paths(tmp_dir))
+    # Artefatos do prepare vão para a versão nova, não para o diretório local
+    engine._local_dir = None
+    if prepare is not None:
+        prepare(engine)
+    for base, _dirs, names in os.walk(tmp_dir):
+        for name in names:
+            with open(os.path.join(base, name), "rb") as f:
+                os.fsync(f.fileno())
+    embeddings = engine.embeddings
+    write_json_atomic(
+        os.path.join(tmp_dir, MANIFEST_FILE),
+        {
+            "version": version,
+            "corpus": engine.corpus,
+            "model": engine.model_name,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "verses": len(engine.verses),
+            "dimension": int(embeddings.shape[1]) if embeddings is not None else None,
+            "files": list_files(tmp_dir),
+        },
+    )
+    os.rename(tmp_dir, final_dir)
+    _fsync_dir(root)
+    # O engine passa a ler da versão publicada; deltas e caches vão para .local
+    engine._paths = snapshot_paths(final_dir)
+    engine._local_dir = local_dir(root)
+    engine._snapshot_root = writable_root(root)
+    engine.snapshot_version = version
+    print(f"✓ Snapshot {version} publicado em {final_dir}")
+
+    if activate_version:
+        activate(root, version)
+        print(f"✓ Snapshot ativo: {version}")
+    keep = keep if keep is not None else int(os.getenv("SNAPSHOT_KEEP", "3"))
+    removed = prune_snapshots(root, keep)
+    if removed:
+        print(f"✓ Snapshots antigos removidos: {', '.join(removed)}")
+    return final_dir
+
+
+def load_snapshot(
+    path: str, model=None, model_name: Optional[str] = None
+) -> IntertextualityEngine:
+    """
+    Carrega uma versão em um engine novo (o encoder pode ser compartilhado)
+    e reaplica os deltas do diretório local do corpus.
+
+    Raises:
+        ValueError: Se a versão estiver incompleta
+    """
+    manifest = read_manifest(path)
+    kwargs = {"model_name": model_name or manifest["model"]} if model is None else {}
+    engine = IntertextualityEngine(model=model, corpus=manifest["corpus"], **kwargs)
+    if model is not None:
+        engine.model_name = model_name or manifest["model"]
+    root = os.path.dirname(os.path.normpath(path))
+    engine._local_dir = local_dir(root)
+    engine._snapshot_root = writable_root(root)
+    engine.load_index(*snapshot_paths(path))
+    engine.snapshot_version = manifest["version"]
+    return engine
+
+
+def resolve_paths(name: str, index_path: str, meta_path: str) -> Tuple[str, str]:
+    """Caminhos da versão ativa do corpus, ou os caminhos legados sem snapshot."""
+    path = current_snapshot(snapshot_root(name))
+    return snapshot_paths(path) if path else (index_path, meta_path)
@@ -0,0 +1,243 @@
+"""
+Spans por requisição (header Server-Timing) e profiler por amostragem.
+
+Os spans vivem em uma ``ContextVar``: o middleware abre um trace por
+requisição e as etapas instrumentadas (``span`` ou ``metrics.timed(...,
+span=...)``) acrescentam (nome, duração) à lista dele. Fora de uma
+requisição (scripts, testes) não há trace ativo e ``span`` não registra
+nada.
+
+O profiler amostra as pilhas das threads (``sys._current_frames``) em
+intervalo fixo e grava no formato "folded" (uma pilha por linha com a
+contagem), aceito por flamegraph.pl, speedscope e inferno. O profiler de
+uma requisição (``profile_request``) amostra só as threads que abriram
+spans dela; as requisições concorrentes ficam de fora.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+_TRACE: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("trace", default=None)
+# Threads da requisição perfilada (preenchido por ``record`` e ``span``)
+_PROFILED_THREADS: ContextVar[Optional[Set[int]]] = ContextVar("profiled_threads", default=None)
+
+# Código da aplicação: pilhas sem nenhum frame daqui são threads ociosas
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_THIS_FILE = os.path.abspath(__file__)
+
+
+def start_trace() -> List[Tuple[str, float]]:
+    """Abre um trace no contexto atual e retorna a lista de spans."""
+    spans: List[Tuple[str, float]] = []
+    _TRACE.set(spans)
+    return spans
+
+
+def _mark_thread():
+    threads = _PROFILED_THREADS.get()
+    if threads is not None:
+        threads.add(threading.get_ident())
+
+
+def record(name: str, seconds: float):
+    """Acrescenta um span ao trace ativo (sem trace, não faz nada)."""
+    _mark_thread()
+    spans = _TRACE.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Mede o bloco como um span do trace ativo."""
+    if _TRACE.get() is None:
+        yield
+        return
+    _mark_thread()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+def summarize(spans: List[Tuple[str, float]]) -> Dict[str, Dict]:
+    """Spans agregados por nome: duração total (ms) e número de chamadas."""
+    summary: Dict[str, Dict] = {}
+    for name, seconds in spans:
+        entry = summary.setdefault(name, {"ms": 0.0, "count": 0})
+        entry["ms"] += seconds * 1000
+        entry["count"] += 1
+    for entry in summary.values():
+        entry["ms"] = round(entry["ms"], 3)
+    return summary
+
+
+def server_timing(spans: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    """Valor do header Server-Timing (ex.: ``encode;dur=12.1, llm;dur=830``)."""
+    parts = []
+    for name, entry in summarize(spans).items():
+        part = f"{name};dur={entry['ms']:.2f}"
+        if entry["count"] > 1:
+            part += f';desc="{entry["count"]}x"'
+        parts.append(part)
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class SamplingProfiler:
+    """
+    Profiler por amostragem de pilhas (thread em segundo plano).
+
+    Só as pilhas com algum frame de ``src/`` entram no perfil: threads
+    ociosas do servidor (event loop, pool esperando trabalho) ficam de fora.
+    Com ``threads``, só as threads do conjunto (que pode crescer durante a
+    amostragem) são amostradas.
+    """
+
+    def __init__(self, interval_ms: float = 5.0, threads: Optional[Set[int]] = None):
+        self.interval = interval_ms / 1000
+        self.threads = threads
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @staticmethod
+    def _folded(frame) -> Optional[str]:
+        names = []
+        in_app = False
+        while frame is not None:
+            code = frame.f_code
+            filename = code.co_filename
+            if filename == _THIS_FILE:
+                return None  # threads do próprio profiler
+            in_app = in_app or filename.startswith(_APP_ROOT)
+            names.append(f"{os.path.basename(filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names)) if in_app else None
+
+    def _sample(self):
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or (self.threads is not None and thread_id not in self.threads):
+                continue
+            stack = self._folded(frame)
+            if stack is not None:
+                self.samples[stack] += 1
+                self.sample_count += 1
+
+    def _run(self, duration: Optional[float]):
+        deadline = None if duration is None else time.monotonic() + duration
+        while not self._stop.wait(self.interval):
+            self._sample()
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        self.stopped_at = time.time()
+
+    def start(self, duration: Optional[float] = None) -> "SamplingProfiler":
+        """Inicia a amostragem (por ``duration`` segundos ou até ``stop``)."""
+        self.started_at = time.time()
+        self._thread = threading.Thread(
+            target=self._run, args=(duration,), name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def folded(self) -> str:
+        """Perfil no formato folded (``pilha;de;frames contagem``)."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def top(self, limit: int = 10) -> List[Dict]:
+        """Funções com mais amostras no topo da pilha (self time)."""
+        leaves: Counter = Counter()
+        for stack, count in self.samples.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [
+            {"frame": frame, "samples": count, "share": round(count / total, 4)}
+            for frame, count in leaves.most_common(limit)
+        ]
+
+    def write(self, directory: Optional[str] = None, label: str = "profile") -> str:
+        """Grava o perfil folded em ``PROFILE_DIR`` e retorna o caminho."""
+        directory = directory or os.getenv("PROFILE_DIR", "profiles")
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = os.path.join(directory, f"{label}-{stamp}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.folded())
+        return path
+
+
+def profile_request(interval_ms: float = 5.0) -> SamplingProfiler:
+    """
+    Inicia um profiler restrito à requisição do contexto atual: amostra só
+    as threads em que ela registra spans (o handler no threadpool).
+    """
+    threads: Set[int] = set()
+    _PROFILED_THREADS.set(threads)
+    return SamplingProfiler(interval_ms, threads=threads).start()
+
+
+# Profiler global disparado pelo endpoint de administração
+_lock = threading.Lock()
+_active: Optional[SamplingProfiler] = None
+_last_output: Optional[str] = None
+
+
+def start_profiling(seconds: float, interval_ms: float = 5.0) -> Dict:
+    """
+    Perfila o processo inteiro por ``seconds`` segundos; ao final o perfil
+    é gravado em ``PROFILE_DIR``.
+
+    Raises:
+        ValueError: Se já houver um profiler global em execução
+    """
+    global _active
+
+    with _lock:
+        if _active is not None and _active.running:
+            raise ValueError("Já existe um profiling em andamento")
+        profiler = SamplingProfiler(interval_ms).start(seconds)
+        _active = profiler
+
+    def finish():
+        global _last_output
+        profiler._thread.join()
+        _last_output = profiler.write(label="live")
+        print(f"✓ Perfil gravado em {_last_output} ({profiler.sample_count} amostras)")
+
+    threading.Thread(target=finish, name="profile-writer", daemon=True).start()
+    return {"status": "started", "seconds": seconds, "interval_ms": interval_ms}
+
+
+def profiling_status() -> Dict:
+    """Estado do profiler global e caminho do último perfil gravado."""
+    profiler = _active
+    return {
+        "running": bool(profiler and profiler.running),
+        "samples": profiler.sample_count if profiler else 0,
+        "last_output": _last_output,
+        "top": profiler.top() if profiler and not profiler.running else [],
+    }
@@ -0,0 +1,84 @@
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.services.corpus_processor import NT_BOOKS, OT_BOOKS
+
+# Número de cada livro na ordem canônica: AT 1-39, NT 40-66
+BOOK_NUMBERS: Dict[str, int] = {
+    book: number
+    for number, book in enumerate(
+        list(OT_BOOKS.values()) + list(NT_BOOKS.values()), start=1
+    )
+}
+
+# Códigos fixos dos corpora conhecidos; os demais usam um hash do nome
+CORPUS_CODES: Dict[str, int] = {"sblgnt": 1, "bhsa": 2, "wh": 3}
+
+# Layout (bit 63 sempre 0, ids positivos em int64):
+# corpus (15 bits) | livro (8) | capítulo (16) | verso (16) | variante (8)
+_CORPUS_SHIFT, _BOOK_SHIFT, _CHAPTER_SHIFT, _VERSE_SHIFT = 48, 40, 24, 8
+
+
+def corpus_code(corpus: str) -> int:
+    """Código de 15 bits de um corpus (fixo para os conhecidos)."""
+    code = CORPUS_CODES.get(corpus)
+    if code is None:
+        # Faixa acima dos códigos fixos, estável entre execuções
+        code = 256 + zlib.crc32(corpus.encode("utf-8")) % (2**15 - 256)
+    return code
+
+
+def make_verse_id(
+    corpus: str, book: str, chapter: int, verse: int, variant: int = 0
+) -> int:
+    """
+    Id estável de 64 bits de um verso, usado como rótulo no índice FAISS.
+
+    Livros fora de BOOK_NUMBERS recebem o número 0; ``variant`` desambigua
+    versos repetidos (ex.: adições textuais com a mesma numeração).
+    """
+    return (
+        corpus_code(corpus) << _CORPUS_SHIFT
+        | BOOK_NUMBERS.get(book, 0) << _BOOK_SHIFT
+        | (int(chapter) & 0xFFFF) << _CHAPTER_SHIFT
+        | (int(verse) & 0xFFFF) << _VERSE_SHIFT
+        | variant & 0xFF
+    )
+
+
+def split_verse_id(verse_id: int) -> Tuple[int, int, int, int, int]:
+    """Decompõe um id em (corpus, livro, capítulo, verso, variante)."""
+    return (
+        verse_id >> _CORPUS_SHIFT,
+        verse_id >> _BOOK_SHIFT & 0xFF,
+        verse_id >> _CHAPTER_SHIFT & 0xFFFF,
+        verse_id >> _VERSE_SHIFT & 0xFFFF,
+        verse_id & 0xFF,
+    )
+
+
+def assign_verse_ids(verses: List[Dict], corpus: str) -> np.ndarray:
+    """
+    Ids estáveis de uma lista de versos, gravados em ``verse["id"]``.
+
+    Versos que já têm id o mantêm; repetidos no mesmo corpus recebem
+    variantes (byte baixo do id).
+    """
+    ids, seen = [], set()
+    for verse in verses:
+        verse_id = verse.get("id")
+        if verse_id is None:
+            verse_id = make_verse_id(
+                verse.get("corpus", corpus),
+                verse["book"],
+                verse["chapter"],
+                verse["verse"],
+            )
+            while verse_id in seen:
+                verse_id += 1
+            verse["id"] = verse_id
+        seen.add(verse_id)
+        ids.append(verse_id)
+    return np.asarray(ids, dtype=np.int64)
@@ -0,0 +1,70 @@
+import numpy as np
+
+from src.services.alignment import AlignmentJob, read_alignment, top_k_block
+
+
+def _unit_vectors(n, d, seed):
+    vectors = np.random.default_rng(seed).normal(size=(n, d)).astype("float32")
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_top_k_block_matches_brute_force_across_tiles():
+    source, target = _unit_vectors(7, 8, 0), _unit_vectors(50, 8, 1)
+
+    scores, cols = top_k_block(source, target, top_k=3, block_cols=16)
+
+    expected = np.argsort(-(source @ target.T), axis=1)[:, :3]
+    assert np.array_equal(cols, expected)
+    assert np.allclose(scores, np.take_along_axis(source @ target.T, expected, axis=1))
+
+
+def test_top_k_block_excludes_self_in_same_corpus():
+    vectors = _unit_vectors(20, 4, 2)
+
+    _scores, cols = top_k_block(vectors[5:10], vectors, top_k=2, block_cols=6, self_offset=5)
+
+    assert all(row + 5 not in cols[row] for row in range(5))
+
+
+def test_alignment_job_resumes_from_checkpoint(tmp_path):
+    source, target = _unit_vectors(25, 8, 3), _unit_vectors(40, 8, 4)
+    source_ids = np.arange(100, 125)
+    target_ids = np.arange(500, 540)
+
+    def job(output):
+        return AlignmentJob(
+            source, target, source_ids, target_ids, str(output),
+            top_k=4, block_rows=6, block_cols=16, workers=2,
+        )
+
+    full = job(tmp_path / "full.bin").run()
+    assert full["done"] and full["pairs"] == 25 * 4
+
+    partial = job(tmp_path / "partial.bin")
+    assert not partial.run(max_blocks=2)["done"]
+    # Lixo após o checkpoint (escrita interrompida) é descartado
+    with open(tmp_path / "partial.bin", "ab") as f:
+        f.write(b"\0" * 7)
+    assert partial.run()["done"]
+
+    expected = read_alignment(str(tmp_path / "full.bin"))
+    resumed = read_alignment(str(tmp_path / "partial.bin"))
+    assert np.array_equal(resumed, expected)
+    assert expected["source_id"][0] == 100 and expected["target_id"].min() >= 500
+
+    # Saída menor que o checkpoint: recomeça em vez de preencher com zeros
+    short = job(tmp_path / "short.bin")
+    short.run(max_blocks=2)
+    with open(tmp_path / "short.bin", "r+b") as f:
+        f.truncate(10)
+    assert short.run()["done"]
+    assert np.array_equal(read_alignment(str(tmp_path / "short.bin")), expected)
+
+    # Alvo recodificado com a mesma forma: o checkpoint não é reaproveitado
+    partial = job(tmp_path / "changed.bin")
+    partial.run(max_blocks=2)
+    changed = AlignmentJob(
+        source, _unit_vectors(40, 8, 5), source_ids, target_ids, str(tmp_path / "changed.bin"),
+        top_k=4, block_rows=6, block_cols=16, workers=2,
+    )
+    assert changed.run(max_blocks=1)["next_block"] == 1
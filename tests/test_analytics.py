@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from src.services import analytics
+
+
+def _verses():
+    layout = [("Mark", 1), ("Mark", 1), ("Mark", 2), ("Luke", 1), ("Luke", 1), ("John", 1)]
+    return [
+        {"book": book, "chapter": chapter, "verse": v, "text": ""}
+        for v, (book, chapter) in enumerate(layout, 1)
+    ]
+
+
+def test_group_rows_by_book_and_chapter():
+    verses = _verses() + [{"book": "Acts", "chapter": 1, "verse": 1, "removed": True}]
+    labels, groups = analytics.group_rows(verses, "chapter")
+    assert labels == ["Mark 1", "Mark 2", "Luke 1", "John 1"]
+    assert groups.tolist() == [0, 0, 1, 2, 2, 3, -1]
+    with pytest.raises(ValueError):
+        analytics.group_rows(verses, "verse")
+
+
+def test_similarity_matrices_match_brute_force():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(6, 5)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Ordem intercalada: as linhas não precisam estar agrupadas
+    groups = np.array([0, 1, 0, 2, 1, 2])
+
+    m = analytics.similarity_matrices(vectors, groups, 3, top_k=2, block_rows=4)
+
+    scores = vectors @ vectors.T
+    np.fill_diagonal(scores, -np.inf)
+    centroids = np.stack([vectors[groups == g].mean(axis=0) for g in range(3)])
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+    links = np.zeros((3, 3), dtype=int)
+    for row in range(6):
+        for j in np.argsort(-scores[row])[:2]:
+            links[groups[row], groups[j]] += 1
+    for a in range(3):
+        for b in range(3):
+            block = scores[np.ix_(groups == a, groups == b)]
+            assert m["max"][a, b] == pytest.approx(block.max(), abs=1e-5)
+    assert np.allclose(m["mean"], centroids @ centroids.T, atol=1e-5)
+    assert np.array_equal(m["links"], links)
+    assert m["counts"].tolist() == [2, 2, 2]
+
+
+def test_matrices_cache_is_keyed_by_corpus_state(tmp_path):
+    path = str(tmp_path / "analytics_book.npz")
+    matrices = {name: np.eye(2) for name in ("mean", "max", "links", "counts")}
+    analytics.save_matrices(path, ["Mark", "Luke"], matrices, key=7)
+
+    labels, loaded = analytics.load_matrices(path, key=7)
+    assert labels == ["Mark", "Luke"] and np.array_equal(loaded["mean"], np.eye(2))
+    assert analytics.load_matrices(path, key=8) is None
+
+
+def test_concurrent_saves_use_their_own_temporary_files(tmp_path):
+    import threading
+
+    path = str(tmp_path / "analytics_book.npz")
+    matrices = {name: np.eye(64) for name in ("mean", "max", "links", "counts")}
+    errors = []
+
+    def save(key):
+        try:
+            for _ in range(20):
+                analytics.save_matrices(path, ["Mark"], matrices, key=key)
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(key,)) for key in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert [p.name for p in tmp_path.iterdir()] == ["analytics_book.npz"]
+
+
+def test_fingerprint_covers_embeddings():
+    ids, groups = np.arange(3), np.zeros(3)
+    embeddings = np.eye(3, dtype="float32")
+    key = analytics.fingerprint(ids, groups, 10, embeddings)
+    assert analytics.fingerprint(ids, groups, 10, embeddings.copy()) == key
+    embeddings[0, 1] = 0.5
+    assert analytics.fingerprint(ids, groups, 10, embeddings) != key
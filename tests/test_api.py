@@ -33,3 +33,53 @@ def test_explain_links_handles_no_index():
     # Se não houver links, campo links deve existir
     assert "links" in data
     assert "explanation" in data
+
+
+def test_explain_links_forwards_testament():
+    # Fora do NT só há busca por verso: a opção chega ao serviço
+    payload = {"query": "fé", "testament": "ot", "granularity": "coarse"}
+    assert client.post("/explain-links", json=payload).status_code == 400
+
+
+def test_find_similar_range_rejects_bad_cursor():
+    payload = {"query": "amor", "threshold": 0.8, "cursor": "%%%"}
+    r = client.post("/find-similar/range", json=payload)
+    assert r.status_code == 400
+
+
+def test_admin_verses_requires_token(monkeypatch):
+    payload = {"references": ["João 3:16"]}
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.post("/admin/verses/remove", json=payload).status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "segredo")
+    r = client.post("/admin/verses/remove", json=payload, headers={"x-admin-token": "x"})
+    assert r.status_code == 401
+
+
+def test_metrics_endpoint_exposes_request_histogram():
+    client.get("/health")
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert 'bible_request_seconds_count{method="GET",route="/health",status="200"}' in r.text
+    assert "bible_resident_memory_bytes" in r.text
+
+
+def test_server_timing_header_and_debug_block(monkeypatch):
+    r = client.post("/find-similar?debug=timing", json={"query": "amor", "top_k": 2})
+    assert r.status_code == 200
+    # Header opcional: desligado por padrão
+    assert "server-timing" not in r.headers
+    assert r.json()["debug"]["total_ms"] >= 0
+
+    monkeypatch.setenv("SERVER_TIMING", "1")
+    r = client.post("/find-similar", json={"query": "amor", "top_k": 2})
+    assert "total;dur=" in r.headers["server-timing"]
+
+
+def test_profile_endpoint_requires_token(monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.post("/admin/profile?seconds=1").status_code == 403
+    r = client.post("/find-similar", json={"query": "amor"}, headers={"x-profile": "1"})
+    assert r.status_code == 403
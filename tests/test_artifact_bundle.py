@@ -0,0 +1,89 @@
+import os
+
+import huggingface_hub.constants
+import pytest
+
+from src.services import artifact_bundle, intertextuality_engine, snapshots
+from src.services.bible_service import BibleService
+from src.services.intertextuality_engine import IntertextualityEngine
+from tests.test_encoders import _tiny_bert
+
+
+def test_bundle_loads_offline_and_detects_corruption(tmp_path, monkeypatch):
+    import sentence_transformers
+
+    from tests.test_intertextuality_engine import RealSentenceTransformer as SentenceTransformer
+
+    # test_intertextuality_engine troca a classe por um dummy no pacote
+    monkeypatch.setattr(sentence_transformers, "SentenceTransformer", SentenceTransformer)
+    monkeypatch.setattr(intertextuality_engine, "SentenceTransformer", SentenceTransformer)
+    # activate_bundle altera o ambiente do processo: restaurado no fim
+    for name in ("HF_HUB_OFFLINE", "TRANSFORMERS_OFFLINE", "RERANKER_MODEL", "SNAPSHOT_LOCAL_DIR"):
+        monkeypatch.setenv(name, os.getenv(name, ""))
+    monkeypatch.setattr(huggingface_hub.constants, "HF_HUB_OFFLINE", True)
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+
+    os.makedirs(tmp_path / "hub")
+    model_dir = _tiny_bert(str(tmp_path / "hub"))
+    engine = IntertextualityEngine(model=SentenceTransformer(model_dir, device="cpu"))
+    engine.model_name = model_dir
+    verses = [
+        {"text": text, "book": "John", "chapter": 1, "verse": i + 1}
+        for i, text in enumerate(["ἐν ἀρχῇ ἦν ὁ λόγος", "ἀγάπη τοῦ θεοῦ", "πίστις ἐλπίς"])
+    ]
+    engine.build_index(engine.create_embeddings(verses))
+    snapshots.write_snapshot(engine, snapshots.snapshot_root("nt"), version="s1")
+
+    with pytest.raises(ValueError):
+        artifact_bundle.build_bundle(str(tmp_path / "bundles"), "outro-modelo", ["nt"], version="b0")
+    # Sem --model: o encoder registrado no snapshot
+    path = artifact_bundle.build_bundle(str(tmp_path / "bundles"), None, ["nt"], version="b1")
+    manifest = artifact_bundle.read_bundle_manifest(path)
+    assert manifest["corpora"] == {"nt": "s1"}
+    assert manifest["model"] == model_dir
+    assert "indexes/nt/s1/faiss.index" in manifest["files"]
+    assert any(name.startswith("model/") for name in manifest["files"])
+    assert artifact_bundle.verify_bundle(path) == []
+    with pytest.raises(ValueError):
+        artifact_bundle.build_bundle(str(tmp_path / "bundles"), model_dir, ["nt"], version="b1")
+
+    # Deltas não compactados entram no bundle como versão nova
+    engine.add_verses([{"text": "ὁ δίκαιος ζήσεται", "book": "Romans", "chapter": 1, "verse": 17}])
+    with_deltas = artifact_bundle.build_bundle(str(tmp_path / "bundles"), None, ["nt"], version="b2")
+    assert artifact_bundle.read_bundle_manifest(with_deltas)["corpora"] == {"nt": "b2"}
+    assert len(snapshots.load_snapshot(os.path.join(with_deltas, "indexes", "nt", "b2")).verses) == 4
+
+    # Sem o modelo de origem e sem os snapshots originais: só o bundle
+    monkeypatch.setenv("ARTIFACT_BUNDLE", path)
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path / "missing"))
+    monkeypatch.setenv("SNAPSHOT_LOCAL_DIR", str(tmp_path / "local"))
+    service = BibleService()
+    assert service.index_loaded
+    assert service.intertextuality_engine.snapshot_version == "s1"
+    assert service.intertextuality_engine.model_name == os.path.join(path, "model")
+    assert os.environ["HF_HUB_OFFLINE"] == "1"
+    assert len(service.find_similar_verses("λόγος", 2)) == 2
+    # Mutações e caches ficam fora do bundle, que não é compactado
+    service.intertextuality_engine.add_verses(
+        [{"text": "ὁ δίκαιος ζήσεται", "book": "Romans", "chapter": 1, "verse": 17}]
+    )
+    assert os.listdir(tmp_path / "local" / "nt" / "deltas")
+    with pytest.raises(ValueError):
+        service.intertextuality_engine.compact()
+    assert artifact_bundle.verify_bundle(path) == []
+    # Corpus fora do bundle: nada de índice legado do host
+    legacy = str(tmp_path / "legacy" / "faiss_ot.index")
+    engine.save_index(legacy, str(tmp_path / "legacy" / "verses_meta_ot.json"))
+    service.index_registry.register("ot", legacy, str(tmp_path / "legacy" / "verses_meta_ot.json"))
+    assert "ot" not in service.index_registry.available()
+    with pytest.raises(ValueError):
+        service.index_registry.get("ot")
+
+    with open(os.path.join(path, "indexes", "nt", "s1", "verses_meta.json"), "a") as f:
+        f.write(" ")
+    assert artifact_bundle.verify_bundle(path) == ["indexes/nt/s1/verses_meta.json: tamanho divergente"]
+    with pytest.raises(ValueError):
+        artifact_bundle.activate_bundle(path)
+    # Bundle corrompido: a API não sobe
+    with pytest.raises(ValueError):
+        BibleService()
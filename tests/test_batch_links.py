@@ -0,0 +1,112 @@
+import csv
+import os
+
+import numpy as np
+
+from src.services.batch_links import BatchLinkJob, parse_range, select_rows
+from src.services.intertextuality_engine import IntertextualityEngine
+
+
+class UnusedEncoder:
+    """O job usa os vetores salvos; o encoder nunca é chamado."""
+
+    device = "cpu"
+
+
+def _saved_index(tmp_path):
+    verses = [
+        {"book": book, "chapter": chapter, "verse": verse, "text": f"{book} {chapter}:{verse}"}
+        for book, chapter, verse in [
+            ("Matthew", 1, 1), ("Matthew", 2, 1), ("Mark", 1, 1), ("Mark", 1, 2), ("Luke", 3, 1),
+        ]
+    ]
+    vectors = np.random.default_rng(0).normal(size=(len(verses), 4)).astype("float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    engine = IntertextualityEngine(model=UnusedEncoder())
+    engine.verses = verses
+    engine.build_index(vectors)
+    index_path, meta_path = str(tmp_path / "nt.index"), str(tmp_path / "nt.json")
+    engine.save_index(index_path, meta_path)
+    return verses, vectors, index_path, meta_path
+
+
+def _read_links(output_dir):
+    rows = []
+    for path in sorted(output_dir.glob("part-*.csv")):
+        with open(path, encoding="utf-8") as f:
+            rows.extend(csv.DictReader(f))
+    return rows
+
+
+def test_select_rows_filters_books_and_chapters():
+    verses = [
+        {"book": "Mark", "chapter": 1, "verse": 1},
+        {"book": "Mark", "chapter": 4, "verse": 1},
+        {"book": "Luke", "chapter": 2, "verse": 1, "removed": True},
+    ]
+    assert select_rows(verses).tolist() == [0, 1]
+    assert select_rows(verses, ["Mark"], parse_range("2-5")).tolist() == [1]
+
+
+def test_batch_links_match_brute_force_and_resume(tmp_path):
+    verses, vectors, index_path, meta_path = _saved_index(tmp_path)
+    output_dir = tmp_path / "links"
+    job = BatchLinkJob(
+        index_path, meta_path, str(output_dir),
+        top_k=2, exclude_same_book=True, batch_size=2, workers=2, fmt="csv",
+    )
+
+    assert job.run() == {"shards": 3, "computed": 3, "links": 10}
+    links = _read_links(output_dir)
+    scores = vectors @ vectors.T
+    for row, verse in enumerate(verses):
+        ref = f"{verse['book']} {verse['chapter']}:{verse['verse']}"
+        others = [j for j in np.argsort(-scores[row]) if verses[j]["book"] != verse["book"]]
+        expected = [f"{verses[j]['book']} {verses[j]['chapter']}:{verses[j]['verse']}" for j in others[:2]]
+        assert [l["target_ref"] for l in links if l["source_ref"] == ref] == expected
+
+    # Shard perdido (interrupção): só ele é recalculado
+    (output_dir / "part-00001.csv").unlink()
+    assert job.run()["computed"] == 1
+    assert _read_links(output_dir) == links
+
+
+def test_batch_links_search_past_same_book_neighbours(tmp_path):
+    # 12 versos de Mateus mais próximos que o único verso de outro livro
+    verses = [{"book": "Matthew", "chapter": 1, "verse": v, "text": ""} for v in range(1, 13)]
+    verses.append({"book": "Mark", "chapter": 1, "verse": 1, "text": ""})
+    vectors = np.zeros((len(verses), 4), dtype="float32")
+    vectors[:, 0] = 1.0
+    vectors[-1] = [0.0, 1.0, 0.0, 0.0]
+    engine = IntertextualityEngine(model=UnusedEncoder())
+    engine.verses = verses
+    engine.build_index(vectors)
+    index_path, meta_path = str(tmp_path / "nt.index"), str(tmp_path / "nt.json")
+    engine.save_index(index_path, meta_path)
+
+    output_dir = tmp_path / "links"
+    job = BatchLinkJob(
+        index_path, meta_path, str(output_dir),
+        top_k=1, exclude_same_book=True, batch_size=16, workers=1, fmt="csv",
+    )
+    job.run()
+    links = _read_links(output_dir)
+    assert len(links) == len(verses)
+    assert {l["target_ref"] for l in links if l["source_ref"].startswith("Matthew")} == {"Mark 1:1"}
+
+
+def test_batch_links_rewritten_index_invalidates_shards(tmp_path):
+    _verses, _vectors, index_path, meta_path = _saved_index(tmp_path)
+    output_dir = tmp_path / "links"
+    job = BatchLinkJob(
+        index_path, meta_path, str(output_dir),
+        top_k=2, exclude_same_book=True, batch_size=2, workers=1, fmt="csv",
+    )
+    assert job.run()["computed"] == 3
+    assert job.run()["computed"] == 0
+
+    # Índice regravado no mesmo caminho: nenhum shard é reaproveitado
+    _saved_index(tmp_path)
+    stat = os.stat(index_path)
+    os.utime(index_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert job.run()["computed"] == 3
@@ -35,6 +35,32 @@ def test_bible_service_with_dummy_engine_cache():
     assert len(first) == 1
 
 
+def test_cache_hit_does_not_load_corpus():
+    service = BibleService()
+    service.intertextuality_engine = DummyEngine()
+    service.index_loaded = True
+    first = service.find_similar_verses("amor", 3)
+    loads = []
+    service._engine_for = lambda corpus: loads.append(corpus)
+    assert service.find_similar_verses("amor", 3) == first
+    assert loads == []
+
+
+def test_search_rejects_unsupported_options():
+    import pytest
+
+    service = BibleService()
+    service.intertextuality_engine = DummyEngine()
+    service.index_loaded = True
+    for options in ({"granularity": "passage"}, {"rerank": True}):
+        with pytest.raises(ValueError):
+            service.find_similar_verses("amor", 3, hybrid=True, **options)
+    # Fora do NT só há busca por verso
+    for options in ({"granularity": "coarse"}, {"rerank": True}, {"hybrid": True}):
+        with pytest.raises(ValueError):
+            service.find_similar_verses("amor", 3, testament="ot", **options)
+
+
 def test_bible_service_llm_dummy_provider():
     # Provider desconhecido força DummyProvider
     import os
@@ -42,3 +68,49 @@ def test_bible_service_llm_dummy_provider():
     service = BibleService()
     resp = service.get_bible_study_response("Explique João 3:16")
     assert "DummyProvider" in resp
+
+
+def test_upsert_routes_verses_to_their_corpus():
+    import numpy as np
+    import pytest
+
+    from src.services.encoders import HashingEncoder
+    from src.services.intertextuality_engine import IntertextualityEngine
+
+    def engine(corpus, book):
+        engine = IntertextualityEngine(model=HashingEncoder(dim=16), corpus=corpus)
+        engine.build_index(
+            engine.create_embeddings([{"text": "λόγος", "book": book, "chapter": 1, "verse": 1}])
+        )
+        return engine
+
+    service = BibleService()
+    service._swap_engine("nt", engine("sblgnt", "John"))
+    service._swap_engine("wh", engine("wh", "John"))
+    nt, wh = service.intertextuality_engine, service.index_registry.get("wh")
+
+    verse = {"text": "θεός", "book": "John", "chapter": 1, "verse": 2}
+    ids = service.upsert_verses([{**verse, "corpus": "wh"}, verse])
+    assert len(nt.verses) == 2 and len(wh.verses) == 2
+    assert ids == [wh.verses[1]["id"], nt.verses[1]["id"]] and ids[0] != ids[1]
+
+    with pytest.raises(ValueError):
+        service.upsert_verses([verse, {**verse, "corpus": "desconhecido"}])
+    assert len(nt.verses) == 2 and np.asarray(nt.embeddings).shape[0] == 2
+
+
+def test_cache_key_keeps_raw_query_without_normalized_corpus():
+    from src.services.encoders import HashingEncoder
+    from src.services.intertextuality_engine import IntertextualityEngine
+
+    service = BibleService()
+    engine = IntertextualityEngine(model=HashingEncoder(dim=16))
+    engine.build_index(engine.create_embeddings([{"text": "ἀγάπη", "book": "John", "chapter": 1, "verse": 1}]))
+    service._swap_engine("nt", engine)
+    # Corpus sem ``normalized``: o engine não normaliza, o cache também não
+    assert service._cache_query("ἀγάπη", ["nt"]) == "ἀγάπη"
+
+    engine.verses[0]["normalized"] = "αγαπη"
+    assert service._cache_query("ἀγάπη", ["nt"]) == "αγαπη"
+    # Corpus não carregado: forma original
+    assert service._cache_query("ἀγάπη", ["ot"]) == "ἀγάπη"
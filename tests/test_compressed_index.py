@@ -0,0 +1,64 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.services.compressed_index import build_compressed_index, is_compressed
+from src.services.encoders import HashingEncoder
+from src.services.intertextuality_engine import IntertextualityEngine
+
+WORDS = ["λόγος", "θεός", "ἀγάπη", "πίστις", "ἐλπίς", "κόσμος", "ζωή", "φῶς", "ἀρχή", "χάρις"]
+
+
+def _verses(count: int = 300):
+    rng = random.Random(0)
+    return [
+        {
+            "text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 9))),
+            "book": "John",
+            "chapter": i // 30 + 1,
+            "verse": i % 30 + 1,
+        }
+        for i in range(count)
+    ]
+
+
+def _engine(first_pass=None):
+    engine = IntertextualityEngine(model=HashingEncoder(dim=64))
+    engine.build_index(engine.create_embeddings(_verses()), first_pass=first_pass)
+    return engine
+
+
+def test_compressed_first_pass_rescored_with_exact_scores(tmp_path):
+    exact = _engine()
+    compressed = _engine(first_pass=(16, "int8"))
+    assert is_compressed(compressed.index) and not is_compressed(exact.index)
+
+    for query in ("λόγος θεός", "ἀγάπη πίστις ἐλπίς", "φῶς ζωή"):
+        expected = exact.find_similar(query, top_k=5)
+        results = compressed.find_similar(query, top_k=5)
+        # Scores exatos (re-pontuados com os embeddings completos)
+        np.testing.assert_allclose(
+            [s for _, s in results], [s for _, s in expected], rtol=1e-5
+        )
+        page, total = compressed.find_above_threshold(query, 0.5)
+        exact_page, exact_total = exact.find_above_threshold(query, 0.5)
+        assert total == exact_total
+        np.testing.assert_allclose([s for _, s in page], [s for _, s in exact_page], rtol=1e-5)
+
+    compressed.save_index(str(tmp_path / "faiss.index"), str(tmp_path / "meta.json"))
+    loaded = IntertextualityEngine(model=HashingEncoder(dim=64))
+    loaded.load_index(str(tmp_path / "faiss.index"), str(tmp_path / "meta.json"))
+    assert loaded.rescores
+    assert loaded.find_similar("λόγος θεός", 3)[0][1] == pytest.approx(
+        exact.find_similar("λόγος θεός", 3)[0][1], rel=1e-5
+    )
+
+
+def test_build_compressed_index_shrinks_codes():
+    vectors = np.random.default_rng(0).standard_normal((500, 64)).astype("float32")
+    index = build_compressed_index(vectors, 16, "int8")
+    index.add_with_ids(vectors, np.arange(500, dtype=np.int64))
+    assert index.sa_code_size() == 16
+    with pytest.raises(ValueError):
+        build_compressed_index(vectors, 16, "int4")
@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.services.concordance import Concordance, build_suffix_array
+
+VERSES = [
+    {"text": "Ἐν ἀρχῇ ἦν ὁ λόγος, καὶ ὁ λόγος ἦν πρὸς τὸν θεόν,"},
+    {"text": "οὗτος ἦν ἐν ἀρχῇ πρὸς τὸν θεόν."},
+]
+
+
+def test_suffix_array_matches_naive_sort():
+    text = "abracadabra\n"
+    codes = np.frombuffer(text.encode("utf-32-be"), dtype=">u4")
+    expected = sorted(range(len(text)), key=lambda i: text[i:])
+    assert build_suffix_array(codes).tolist() == expected
+
+
+def test_kwic_and_count(tmp_path):
+    concordance = Concordance()
+    concordance.build(VERSES)
+
+    assert concordance.count("ΛΟΓΟΣ") == 2
+    assert concordance.count("πρὸς τὸν θεόν") == 2
+    assert concordance.count("ἀγάπη") == 0
+
+    total, lines = concordance.kwic("ἐν ἀρχῇ", context=10)
+    assert total == 2
+    assert sorted(line["row"] for line in lines) == [0, 1]
+    line = next(line for line in lines if line["row"] == 1)
+    assert line["left"] == "ουτοσ ην "
+    assert line["right"] == " προσ τον "
+
+    concordance.save(str(tmp_path / "concordance"))
+    loaded = Concordance.load(str(tmp_path / "concordance"))
+    assert loaded.count("λογοσ") == 2
@@ -0,0 +1,115 @@
+from src.services.corpus_processor import CorpusProcessor
+
+
+def _write_tf(directory, name, kind, lines):
+    header = f"@{kind}\n@valueType=str\n\n"
+    (directory / f"{name}.tf").write_text(header + "\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_process_bhsa_reads_text_fabric_features(tmp_path):
+    tf_dir = tmp_path / "bhsa" / "tf" / "2021"
+    tf_dir.mkdir(parents=True)
+    # 5 palavras; nó 6 = livro, 7 = capítulo, 8-9 = versos
+    _write_tf(tf_dir, "otype", "node", ["1-5\tword", "6\tbook", "7\tchapter", "8-9\tverse"])
+    _write_tf(tf_dir, "oslots", "edge", ["1-5", "1-5", "1-3", "4-5"])
+    _write_tf(tf_dir, "book", "node", ["6\tGenesis"])
+    _write_tf(tf_dir, "chapter", "node", ["7\t1"])
+    _write_tf(tf_dir, "verse", "node", ["8\t1", "2"])
+    _write_tf(tf_dir, "g_word_utf8", "node", ["בְּ", "רֵאשִׁ֖ית", "בָּרָ֣א", "וְ", "הָאָֽרֶץ"])
+    _write_tf(tf_dir, "trailer_utf8", "node", ["", " ", "׃ ", "", "׃"])
+    _write_tf(tf_dir, "lex_utf8", "node", ["ב", "ראשׁית", "ברא", "ו", "ארץ"])
+
+    verses = CorpusProcessor().process_bhsa(str(tmp_path / "bhsa"))
+
+    assert [(v["book"], v["chapter"], v["verse"]) for v in verses] == [
+        ("Genesis", 1, 1),
+        ("Genesis", 1, 2),
+    ]
+    assert verses[0]["text"] == "בְּרֵאשִׁ֖ית בָּרָ֣א׃"
+    assert verses[0]["lemmas"] == ["ב", "ראשׁית", "ברא"]
+    assert verses[1]["words"] == ["וְ", "הָאָֽרֶץ"]
+    assert verses[1]["testament"] == "OT"
+    assert verses[1]["normalized"] == "והארץ"
+
+
+def test_process_bhsa_missing_directory(tmp_path):
+    assert CorpusProcessor().process_bhsa(str(tmp_path)) == []
+
+
+def _write_morphgnt(path, verses):
+    lines = [
+        f"87{chapter:02d}{verse:02d} X- -------- {word} {word} {word} {word}"
+        for chapter, verse, text in verses
+        for word in text.split()
+    ]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def test_process_wh_skips_titles_placeholders_and_code(tmp_path):
+    source = tmp_path / "wh.txt"
+    source.write_text(
+        "# Revelation 1\n"
+        'content = """ΑΠΟΚΑΛΥΨΙΣ ΙΩΑΝΝΟΥ — ΚΕΦΑΛΑΙΟΝ 1 (Westcott–Hort 1881)\n'
+        "\n"
+        "[ΚΕΦΑΛΑΙΟΝ 1]\n"
+        "Ἀποκάλυψις Ἰησοῦ Χριστοῦ,\n"
+        "\n"
+        "[...]\n"
+        "μακάριος ὁ ἀναγινώσκων.\n"
+        '"""\n'
+        'cap2 = """ΑΠΟΚΑΛΥΨΙΣ ΙΩΑΝΝΟΥ — ΚΕΦΑΛΑΙΟΝ 2\n'
+        "\n"
+        "Marcador técnico.\n"
+        '"""\n'
+        'cap2 = """ΑΠΟΚΑΛΥΨΙΣ ΙΩΑΝΝΟΥ — ΚΕΦΑΛΑΙΟΝ 2\n'
+        "[ΚΕΦΑΛΑΙΟΝ 2]\n"
+        'Τῷ ἀγγέλῳ τῷ ἐν Ἐφέσῳ."""\n'
+        'path = "/tmp/cap2.txt"\n',
+        encoding="utf-8",
+    )
+    reference = tmp_path / "87-Re-morphgnt.txt"
+    _write_morphgnt(reference, [
+        (1, 1, "Ἀποκάλυψις Ἰησοῦ Χριστοῦ"),
+        (1, 3, "μακάριος ὁ ἀναγινώσκων"),
+        (2, 1, "Τῷ ἀγγέλῳ τῷ ἐν Ἐφέσῳ"),
+    ])
+
+    verses = CorpusProcessor().process_wh(str(source), str(reference))
+
+    assert [(v["book"], v["chapter"], v["verse"]) for v in verses] == [
+        ("Revelation", 1, 1),
+        ("Revelation", 1, 3),
+        ("Revelation", 2, 1),
+    ]
+    assert verses[1]["text"] == "μακάριος ὁ ἀναγινώσκων."
+    assert verses[2]["normalized"] == "τω αγγελω τω εν εφεσω"
+    # Sem versificação de referência o WH não é gerado
+    assert CorpusProcessor().process_wh(str(source), str(tmp_path / "ausente.txt")) == []
+
+
+def test_process_wh_follows_reference_verse_breaks(tmp_path):
+    source = tmp_path / "wh.txt"
+    source.write_text(
+        "[ΚΕΦΑΛΑΙΟΝ 7]\n"
+        "καὶ εἶδον ἄλλον ἄγγελον ἀναβαίνοντα, καὶ ἔκραξεν φωνῇ μεγάλῃ\n"
+        "λέγων, Μὴ ἀδικήσητε τὴν γῆν.\n"
+        "ἐκ φυλῆς Ἰοῦδα δώδεκα χιλιάδες,\n"
+        "ἐκ φυλῆς Ῥουβὴν δώδεκα χιλιάδες,\n"
+        "Ἀμήν, ἡ εὐλογία [ἀμήν].\n",
+        encoding="utf-8",
+    )
+    reference = tmp_path / "87-Re-morphgnt.txt"
+    _write_morphgnt(reference, [
+        (7, 2, "καὶ εἶδον ἄλλον ἄγγελον ἀναβαίνοντα καὶ ἔκραξεν φωνῇ μεγάλῃ"),
+        (7, 3, "λέγων Μὴ ἀδικήσητε τὴν γῆν"),
+        (7, 5, "ἐκ φυλῆς Ἰούδα δώδεκα χιλιάδες ἐκ φυλῆς Ῥουβὴν δώδεκα χιλιάδες"),
+        (7, 12, "Ἀμήν ἡ εὐλογία"),
+    ])
+
+    verses = CorpusProcessor().process_wh(str(source), str(reference))
+
+    assert [v["verse"] for v in verses] == [2, 3, 5, 12]
+    assert verses[1]["text"] == "λέγων, Μὴ ἀδικήσητε τὴν γῆν."
+    assert verses[2]["text"] == "ἐκ φυλῆς Ἰοῦδα δώδεκα χιλιάδες, ἐκ φυλῆς Ῥουβὴν δώδεκα χιλιάδες,"
+    # Palavra sem par na referência fica no verso anterior
+    assert verses[3]["text"] == "Ἀμήν, ἡ εὐλογία [ἀμήν]."
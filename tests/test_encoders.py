@@ -0,0 +1,72 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.services.encoders import (
+    HashingEncoder,
+    encoder_backend,
+    encoder_parity,
+    load_encoder,
+)
+
+
+def test_hashing_encoder_is_deterministic_and_normalized():
+    encoder = HashingEncoder(dim=64)
+    vectors = encoder.encode(["ἀγάπη θεοῦ", "αγαπη θεου", "πίστις"])
+
+    assert vectors.shape == (3, 64) and vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    # Acentos e caixa não mudam a forma normalizada
+    assert np.allclose(vectors[0], vectors[1])
+    assert vectors[0] @ vectors[2] < 0.5
+
+
+def _tiny_bert(directory: str) -> str:
+    """BERT minúsculo (aleatório) salvo em disco, com tokenizer próprio."""
+    import torch
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    letters = "αβγδεζηθικλμνξοπρστυφχψω"
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", *letters]
+    vocab += [f"##{c}" for c in letters]
+    vocab_file = os.path.join(directory, "vocab.txt")
+    with open(vocab_file, "w", encoding="utf-8") as f:
+        f.write("\n".join(vocab))
+    torch.manual_seed(0)
+    config = BertConfig(
+        vocab_size=len(vocab),
+        hidden_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=128,
+    )
+    BertModel(config).save_pretrained(directory)
+    BertTokenizerFast(vocab_file).save_pretrained(directory)
+    return directory
+
+
+def test_torch_int8_backend_keeps_scores_close(tmp_path, monkeypatch):
+    import sentence_transformers
+
+    from tests.test_intertextuality_engine import RealSentenceTransformer as SentenceTransformer
+
+    # test_intertextuality_engine troca a classe por um dummy no pacote
+    monkeypatch.setattr(sentence_transformers, "SentenceTransformer", SentenceTransformer)
+    model_dir = _tiny_bert(str(tmp_path))
+    reference = load_encoder(model_dir, "torch")
+    quantized = load_encoder(model_dir, "torch-int8")
+    assert quantized.encoder_backend == "torch-int8"
+
+    corpus = ["ἐν ἀρχῇ ἦν ὁ λόγος", "ἀγάπη τοῦ θεοῦ", "πίστις ἐλπίς ἀγάπη", "ὁ δίκαιος ζήσεται"]
+    report = encoder_parity(reference, quantized, corpus, ["λόγος", "ἀγάπη"], top_k=2)
+    assert report["min_cosine"] > 0.98
+    assert report["max_score_deviation"] < 0.05
+    assert report["recall@2"] == 1.0
+
+
+def test_encoder_backend_validation(monkeypatch):
+    monkeypatch.setenv("ENCODER_BACKEND", "ONNX-INT8")
+    assert encoder_backend() == "onnx-int8"
+    with pytest.raises(ValueError):
+        encoder_backend("tensorrt")
@@ -0,0 +1,89 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.services.encoding_pipeline import EncodingPipeline, chunk_path, length_order
+
+
+class LengthEncoder:
+    """Vetor derivado do texto: permite conferir a ordem de remontagem."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **_kwargs):
+        self.calls.append(list(texts))
+        vectors = np.array([[len(t), sum(map(ord, t)) % 97, 1.0] for t in texts], dtype="float32")
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+TEXTS = ["ἀγάπη", "ἐν ἀρχῇ ἦν ὁ λόγος", "πίστις", "ὁ δίκαιος ἐκ πίστεως ζήσεται", "λόγος", "θεός"]
+
+
+def test_chunks_are_length_sorted_and_reassembled_in_order(tmp_path):
+    model = LengthEncoder()
+    pipeline = EncodingPipeline(str(tmp_path), model=model, chunk_size=2)
+
+    embeddings = pipeline.run(TEXTS)
+
+    assert embeddings.shape == (len(TEXTS), 3)
+    np.testing.assert_allclose(embeddings, LengthEncoder().encode(TEXTS), rtol=1e-6)
+    # Cada chunk recebe textos vizinhos em tamanho
+    assert [t for call in model.calls for t in call] == [TEXTS[i] for i in length_order(TEXTS)]
+    assert len(model.calls) == 3
+
+
+def test_resume_encodes_only_missing_chunks(tmp_path):
+    EncodingPipeline(str(tmp_path), model=LengthEncoder(), chunk_size=2).run(TEXTS)
+    os.remove(chunk_path(str(tmp_path), 1))
+
+    model = LengthEncoder()
+    embeddings = EncodingPipeline(str(tmp_path), model=model, chunk_size=2).run(TEXTS)
+
+    assert len(model.calls) == 1
+    np.testing.assert_allclose(embeddings, LengthEncoder().encode(TEXTS), rtol=1e-6)
+
+    # Corpus diferente invalida os chunks gravados
+    model = LengthEncoder()
+    EncodingPipeline(str(tmp_path), model=model, chunk_size=2).run(TEXTS[:-1])
+    assert len(model.calls) == 3
+
+
+def test_workers_require_model_factory(tmp_path):
+    with pytest.raises(ValueError):
+        EncodingPipeline(str(tmp_path), model=LengthEncoder(), workers=2)
+
+
+def test_engine_create_embeddings_through_pipeline(tmp_path):
+    from src.services.intertextuality_engine import IntertextualityEngine
+
+    verses = [
+        {"text": text, "book": "John", "chapter": 1, "verse": i + 1}
+        for i, text in enumerate(TEXTS)
+    ]
+    engine = IntertextualityEngine(model=LengthEncoder())
+    direct = engine.create_embeddings(verses)
+
+    pipeline = engine.encoding_pipeline(str(tmp_path), chunk_size=4)
+    embeddings = engine.create_embeddings(verses, pipeline)
+
+    np.testing.assert_allclose(embeddings, direct, rtol=1e-6)
+    assert sorted(os.listdir(tmp_path)) == ["chunk-00000.npy", "chunk-00001.npy", "manifest.json"]
+
+
+def test_pipeline_uses_the_engine_backend(tmp_path):
+    from src.services.intertextuality_engine import IntertextualityEngine
+
+    engine = IntertextualityEngine(model=LengthEncoder())
+    assert engine.encoding_pipeline(str(tmp_path), workers=2).workers == 1
+
+    engine.encoder_backend = "torch-int8"
+    pipeline = engine.encoding_pipeline(str(tmp_path), workers=2)
+    assert pipeline.model_factory.args == (engine.model_name, "torch-int8")
+
+    # Chunks de outro backend não são retomados
+    EncodingPipeline(str(tmp_path), model=LengthEncoder(), backend="torch", chunk_size=2).run(TEXTS)
+    model = LengthEncoder()
+    EncodingPipeline(str(tmp_path), model=model, backend="torch-int8", chunk_size=2).run(TEXTS)
+    assert len(model.calls) == 3
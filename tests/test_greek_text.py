@@ -0,0 +1,18 @@
+from src.services.greek_text import normalize_greek, normalize_word
+
+
+def test_accent_case_and_sigma_variants_share_canonical_form():
+    forms = {normalize_greek(q) for q in ("ἀγάπη θεοῦ", "αγαπη θεου", "ΑΓΑΠΗ ΘΕΟΥ")}
+    assert forms == {"αγαπη θεου"}
+    assert normalize_greek("λόγος,  καὶ ὁ Λόγος·") == "λογοσ και ο λογοσ"
+
+
+def test_punctuation_does_not_merge_numbers():
+    assert normalize_greek("João 3:16") == "joao 3 16"
+    assert normalize_greek("Jo 31:6") != normalize_greek("Jo 3:16")
+    assert normalize_greek("Αʹ Κορινθίους") == "α κορινθιουσ"
+
+
+def test_normalized_forms_are_interned():
+    assert normalize_word("Λόγος,") == "λογοσ"
+    assert normalize_greek("λόγος".upper()) is normalize_greek("ΛΌΓΟΣ")
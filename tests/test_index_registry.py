@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from src.services.index_registry import IndexRegistry
+from src.services.intertextuality_engine import IntertextualityEngine
+
+
+class FixedEncoder:
+    """Codifica toda query no mesmo vetor (eixo 0)."""
+
+    device = "cpu"
+
+    def encode(self, texts, **_kwargs):
+        vectors = np.zeros((len(texts), 2), dtype="float32")
+        vectors[:, 0] = 1.0
+        return vectors
+
+
+def _engine(model, verses, vectors):
+    engine = IntertextualityEngine(model=model)
+    engine.verses = verses
+    engine._build_reference_index()
+    engine.build_index(np.asarray(vectors, dtype="float32"))
+    return engine
+
+
+def test_search_merges_shards_by_score():
+    model = FixedEncoder()
+    nt = _engine(
+        model,
+        [
+            {"book": "John", "chapter": 1, "verse": 1, "text": "ἐν ἀρχῇ"},
+            {"book": "John", "chapter": 1, "verse": 2, "text": "οὗτος"},
+        ],
+        [[0.9, 0.436], [0.1, 0.995]],
+    )
+    ot = _engine(
+        model,
+        [
+            {"book": "Genesis", "chapter": 1, "verse": 1, "text": "בְּרֵאשִׁית"},
+            {"book": "Genesis", "chapter": 1, "verse": 2, "text": "וְהָאָרֶץ"},
+        ],
+        [[1.0, 0.0], [0.5, 0.866]],
+    )
+    registry = IndexRegistry(max_workers=2)
+    registry.add("nt", nt)
+    registry.add("ot", ot)
+
+    results = registry.search("no princípio", top_k=3)
+    assert [(v["corpus"], v["book"], v["verse"]) for v, _ in results] == [
+        ("ot", "Genesis", 1),
+        ("nt", "John", 1),
+        ("ot", "Genesis", 2),
+    ]
+
+    # Referência: usa o vetor do verso e o exclui dos resultados
+    results = registry.search("Gn 1:1", top_k=1)
+    assert [(v["corpus"], v["book"]) for v, _ in results] == [("nt", "John")]
+
+    only_nt = registry.search("no princípio", top_k=5, shards=["nt"])
+    assert {v["corpus"] for v, _ in only_nt} == {"nt"}
+
+    # Outra edição carregada (ex.: WH) não entra na busca por testamento
+    registry.add("wh", _engine(model, [{"book": "John", "chapter": 1, "verse": 1, "text": "ἐν ἀρχῇ"}], [[1.0, 0.0]]))
+    assert {v["corpus"] for v, _ in registry.search("no princípio", top_k=5)} == {"nt", "ot"}
+
+
+def test_corpora_load_on_demand_and_unload_lru(tmp_path, monkeypatch):
+    monkeypatch.delenv("CORPORA_CONFIG", raising=False)
+    model = FixedEncoder()
+    registry = IndexRegistry(max_workers=1, memory_budget_mb=0)
+    registry.catalog.clear()
+    for name in ("wh", "tr1", "tr2"):
+        engine = _engine(
+            model,
+            [{"book": "Revelation", "chapter": 12, "verse": 1, "text": name}],
+            [[1.0, 0.0]],
+        )
+        index_path = str(tmp_path / f"{name}.index")
+        engine.save_index(index_path, str(tmp_path / f"{name}.json"))
+        registry.register(name, index_path, str(tmp_path / f"{name}.json"))
+    registry.add("nt", _engine(model, [], np.zeros((0, 2))), pin=True)
+
+    # Nada além do NT é carregado até o primeiro uso
+    assert set(registry.engines) == {"nt"}
+    results = registry.search("x", top_k=1, shards=["wh"])
+    assert results[0][0]["corpus"] == "wh"
+
+    # Orçamento para um corpus por vez: o menos usado sai, o NT fica
+    registry.memory_budget = registry.memory["wh"] + 1
+    registry.get("tr1")
+    assert set(registry.engines) == {"nt", "tr1"}
+    registry.get("wh")
+    assert set(registry.engines) == {"nt", "wh"}
+    assert [c["name"] for c in registry.stats()["loaded"]] == ["nt", "wh"]
+
+    with pytest.raises(ValueError):
+        registry.get("vulgata")
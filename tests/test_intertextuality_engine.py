@@ -1,6 +1,8 @@
 import os
 import importlib
+import faiss
 import numpy as np
+import pytest
 import types
 
 # Monkeypatch SentenceTransformer before importing engine to avoid heavy model download
@@ -23,12 +25,21 @@ class DummySentenceTransformer:
             pass
         return arr
 
-# Replace original class
+# Replace original class (kept for tests that need a real encoder; the
+# module may be imported twice, under "tests." and as a rootdir module)
+RealSentenceTransformer = getattr(
+    sentence_transformers.SentenceTransformer, "real", sentence_transformers.SentenceTransformer
+)
+DummySentenceTransformer.real = RealSentenceTransformer
 sentence_transformers.SentenceTransformer = DummySentenceTransformer
 
 # Now import engine
+from src.services import intertextuality_engine
 from src.services.intertextuality_engine import IntertextualityEngine
 
+# Engine may already be imported by other test modules (via src.app)
+intertextuality_engine.SentenceTransformer = DummySentenceTransformer
+
 
 def test_find_similar_basic():
     verses = [
@@ -50,3 +61,378 @@ def test_find_similar_basic():
 
     # The top result should contain word 'amor'
     assert "amor" in results[0][0]["text"].lower()
+
+
+def test_find_by_reference_uses_stored_vector():
+    verses = [
+        {"text": "amor de Deus", "book": "John", "chapter": 3, "verse": 16},
+        {"text": "fé e esperança", "book": "Hebrews", "chapter": 11, "verse": 1},
+        {"text": "amor ao próximo", "book": "Matthew", "chapter": 22, "verse": 39},
+    ]
+    engine = IntertextualityEngine()
+    engine.create_embeddings(verses)
+    engine.build_index()
+
+    def fail_encode(*_args, **_kwargs):
+        raise AssertionError("referência não deve passar pelo modelo")
+
+    engine.model.encode = fail_encode
+
+    assert engine.lookup_reference("Hb 11:1") == 1
+    assert engine.lookup_reference("amor de Deus") is None
+    assert engine.find_by_reference("Apocalipse 1:1") is None
+
+    source, links = engine.find_by_reference("João 3:16", top_k=2)
+    assert source is engine.verses[0]
+    # O engine guarda cópias: os dicts de quem chamou não ganham "id"
+    assert "id" not in verses[0]
+    assert len(links) == 2
+    assert all(verse is not source for verse, _ in links)
+
+
+def test_find_above_threshold_paginates_by_cursor():
+    verses = [
+        {"text": "a", "book": "John", "chapter": 3, "verse": 16},
+        {"text": "b", "book": "John", "chapter": 3, "verse": 17},
+        {"text": "c", "book": "John", "chapter": 3, "verse": 18},
+        {"text": "d", "book": "John", "chapter": 3, "verse": 19},
+    ]
+    embeddings = np.array(
+        [[1.0, 0.0], [0.9, 0.436], [0.8, 0.6], [0.0, 1.0]], dtype="float32"
+    )
+    engine = IntertextualityEngine()
+    engine.create_embeddings(verses)
+    engine.build_index(embeddings)
+
+    first, total = engine.find_above_threshold("João 3:16", 0.5, limit=2)
+    assert total == 3
+    assert [row for row, _ in first] == [0, 1]
+
+    last_row, last_score = first[-1]
+    second, _ = engine.find_above_threshold(
+        "João 3:16", 0.5, limit=2, after=(last_score, last_row)
+    )
+    assert [row for row, _ in second] == [2]
+
+
+def test_granularity_indexes_and_coarse_to_fine(tmp_path):
+    verses = [
+        {"text": "a", "book": "Hebrews", "chapter": 1, "verse": 1},
+        {"text": "b", "book": "Hebrews", "chapter": 1, "verse": 2},
+        {"text": "c", "book": "Hebrews", "chapter": 2, "verse": 1},
+        {"text": "d", "book": "Revelation", "chapter": 12, "verse": 1},
+        {"text": "e", "book": "Revelation", "chapter": 12, "verse": 2},
+    ]
+    embeddings = np.array(
+        [[1, 0, 0], [0.8, 0.6, 0], [0, 1, 0], [0, 0, 1], [0, 0.6, 0.8]],
+        dtype="float32",
+    )
+    engine = IntertextualityEngine()
+    engine.create_embeddings(verses)
+    engine.build_index(embeddings)
+    engine.build_granularity_indexes(window_sizes=(2,), stride=1)
+
+    assert [(c["book"], c["chapter"]) for c in engine.chapters] == [
+        ("Hebrews", 1), ("Hebrews", 2), ("Revelation", 12)
+    ]
+    # Janelas não atravessam livros: Heb 1:1-2, Heb 1:2-2:1, Rev 12:1-2
+    assert len(engine.passages) == 3
+    assert engine.passages[1]["end_chapter"] == 2
+
+    # Texto livre (o dummy codifica como [1, 0, 0]): capítulo Hb 1
+    results = engine.find_similar_coarse_to_fine("a", top_k=2, n_chapters=1)
+    assert [v["verse"] for v, _ in results] == [1, 2]
+    assert all(v["book"] == "Hebrews" for v, _ in results)
+    # Referência: o próprio capítulo e as janelas com o verso ficam fora
+    results = engine.find_similar_coarse_to_fine("Ap 12:2", top_k=2, n_chapters=1)
+    assert [(v["book"], v["chapter"], v["verse"]) for v, _ in results] == [("Hebrews", 2, 1)]
+    passages = engine.find_similar_passages("Hb 1:1", top_k=3)
+    assert sorted(p["row_start"] for p, _ in passages) == [1, 3]
+
+    index_path = str(tmp_path / "faiss_nt.index")
+    meta_path = str(tmp_path / "verses_meta.json")
+    engine.save_index(index_path, meta_path)
+    loaded = IntertextualityEngine()
+    loaded.load_index(index_path, meta_path)
+    assert len(loaded.passages) == 3
+    assert loaded.chapter_index.ntotal == 3
+    assert loaded.embeddings.shape == embeddings.shape
+
+
+def test_find_similar_hybrid_returns_shared_lemmas():
+    verses = [
+        {"text": "a", "book": "John", "chapter": 3, "verse": 16,
+         "words": ["ἠγάπησεν", "θεὸς"], "lemmas": ["ἀγαπάω", "θεός"]},
+        {"text": "b", "book": "John", "chapter": 3, "verse": 17,
+         "words": ["θεὸς", "κόσμον"], "lemmas": ["θεός", "κόσμος"]},
+        {"text": "c", "book": "Mark", "chapter": 1, "verse": 1,
+         "words": ["ἀρχὴ"], "lemmas": ["ἀρχή"]},
+    ]
+    embeddings = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype="float32")
+    engine = IntertextualityEngine()
+    engine.create_embeddings(verses)
+    engine.build_index(embeddings)
+
+    assert engine.lemma_index is not None
+    results = engine.find_similar_hybrid("João 3:16", top_k=2, depth=3)
+    # O próprio verso não é resultado
+    assert [verse["verse"] for verse, _ in results] == [17, 1]
+    assert results[0][0]["shared_lemmas"] == ["θεός"]
+    assert "shared_lemmas" not in engine.verses[1]
+
+    # Mutações refazem o índice de lemas na hora
+    engine.add_verses([{"text": "d", "book": "Rom", "chapter": 5, "verse": 8, "lemmas": ["ἀγαπάω"]}], np.array([[0, 0, 1]], dtype="float32"))
+    assert "ἀγαπάω" in engine.lemma_index.vocab
+
+
+def test_find_similar_with_verse_filter():
+    verses = [
+        {"text": "a", "book": "John", "chapter": 1, "verse": 1},
+        {"text": "b", "book": "John", "chapter": 1, "verse": 2},
+        {"text": "c", "book": "John", "chapter": 1, "verse": 3},
+    ]
+    engine = IntertextualityEngine()
+    engine.create_embeddings(verses)
+    engine.build_index()
+
+    # A query dummy sempre cai no vetor da linha 0; o filtro a exclui
+    results = engine.find_similar("x", top_k=3, verse_filter=np.array([1, 2]))
+    assert {v["verse"] for v, _ in results} == {2, 3}
+
+
+def test_canonical_inputs_share_query_embedding():
+    verses = [
+        {"text": "ἀγάπη θεοῦ", "normalized": "αγαπη θεου", "book": "1John", "chapter": 4, "verse": 8},
+        {"text": "πίστις", "normalized": "πιστισ", "book": "Heb", "chapter": 11, "verse": 1},
+    ]
+    engine = IntertextualityEngine(model_name="dummy")
+    engine.create_embeddings(verses)
+    engine.build_index()
+
+    first = engine._encode_query("ἀγάπη θεοῦ")
+    assert engine._encode_query("ΑΓΑΠΗ ΘΕΟΥ") is first
+    assert list(engine._query_cache) == ["αγαπη θεου"]
+
+
+def test_incremental_mutations_persist_as_deltas(tmp_path, monkeypatch):
+    monkeypatch.setenv("DELTA_COMPACT_THRESHOLD", "0")
+    verses = [
+        {"text": "a", "book": "John", "chapter": 1, "verse": 1},
+        {"text": "b", "book": "John", "chapter": 1, "verse": 2},
+        {"text": "c", "book": "John", "chapter": 1, "verse": 3},
+    ]
+    engine = IntertextualityEngine()
+    engine.create_embeddings(verses)
+    engine.build_index(np.eye(3, dtype="float32"))
+    index_path = str(tmp_path / "faiss_nt.index")
+    meta_path = str(tmp_path / "verses_meta.json")
+    engine.save_index(index_path, meta_path)
+    verses = engine.verses
+    john_1_1 = verses[0]["id"]
+
+    [new_id] = engine.add_verses(
+        [{"text": "d", "book": "Mark", "chapter": 1, "verse": 1}],
+        embeddings=np.array([[0.0, 0.6, 0.8]], dtype="float32"),
+    )
+    engine.replace_verses(
+        [{**verses[2], "text": "c2"}],
+        embeddings=np.array([[0.8, 0.6, 0.0]], dtype="float32"),
+    )
+    assert engine.remove_verses([verses[1]["id"], 12345]) == [verses[1]["id"]]
+    assert engine.lookup_reference("Jo 1:2") is None
+
+    links = engine.find_intertextual_links(engine.row_for_id(john_1_1), top_k=3)
+    assert [(v["verse"], v["text"]) for v, _ in links] == [(3, "c2"), (1, "d")]
+
+    # Nova carga: base + deltas reaplicados
+    reloaded = IntertextualityEngine()
+    reloaded.load_index(index_path, meta_path)
+    links = reloaded.find_intertextual_links(reloaded.row_for_id(john_1_1), top_k=3)
+    assert [(v["book"], v["verse"]) for v, _ in links] == [("John", 3), ("Mark", 1)]
+
+    # Compactação: base canônica sem tombstones e sem deltas
+    reloaded.compact()
+    compacted = IntertextualityEngine()
+    compacted.load_index(index_path, meta_path)
+    assert not os.listdir(str(tmp_path / "faiss_nt.deltas"))
+    # Ordem canônica: Marcos antes de João
+    assert [v["text"] for v in compacted.verses] == ["d", "a", "c2"]
+    assert compacted.row_for_id(new_id) == 0
+    assert compacted.index.ntotal == 3
+
+
+def test_failed_mutation_leaves_state_untouched_and_upserts_get_defaults():
+    verses = [
+        {"text": "a", "book": "John", "chapter": 1, "verse": 1,
+         "words": ["a"], "lemmas": ["a"], "pos": ["N-"], "parsing": ["----NSF-"]},
+        {"text": "b", "book": "John", "chapter": 1, "verse": 2,
+         "words": ["b"], "lemmas": ["b"], "pos": ["V-"], "parsing": ["3AAI-S--"]},
+    ]
+    engine = IntertextualityEngine()
+    engine.create_embeddings(verses)
+    engine.build_index(np.eye(3, dtype="float32")[:2])
+    engine.remove_verses([engine.verses[1]["id"]])
+    state = engine._state
+
+    # Id novo + id existente sem replace: nada muda
+    with pytest.raises(ValueError):
+        engine.add_verses(
+            [
+                {"text": "c", "book": "Mark", "chapter": 1, "verse": 1},
+                {"text": "a2", "book": "John", "chapter": 1, "verse": 1},
+            ],
+            embeddings=np.eye(3, dtype="float32")[1:],
+        )
+    assert engine._state is state and engine.index.ntotal == 1
+
+    # Fallback sem embeddings: tombstones viram vetor nulo
+    engine.embeddings = None
+    assert engine._get_embeddings()[1].tolist() == [0.0, 0.0, 0.0]
+
+    engine.replace_verses(
+        [{"text": "novo verso", "book": "Mark", "chapter": 1, "verse": 1}],
+        embeddings=np.array([[0.0, 0.0, 1.0]], dtype="float32"),
+    )
+    added = engine.verses[-1]
+    assert added["lemmas"] == ["novo", "verso"] and added["parsing"] == ["", ""]
+    # Índices derivados reconstruídos com o verso sem morfologia
+    assert len(engine.search_morphology([{"pos": "verb"}])) == 0
+    assert engine.find_similar_hybrid("novo", top_k=1, depth=3)[0][0]["book"] == "Mark"
+
+
+def test_similarity_matrices_cached_next_to_index(tmp_path, monkeypatch):
+    verses = [
+        {"text": "a", "book": "Mark", "chapter": 1, "verse": 1},
+        {"text": "b", "book": "Mark", "chapter": 1, "verse": 2},
+        {"text": "c", "book": "Luke", "chapter": 1, "verse": 1},
+    ]
+    engine = IntertextualityEngine()
+    engine.create_embeddings(verses)
+    engine.build_index()
+    index_path = str(tmp_path / "faiss_nt.index")
+    engine.save_index(index_path, str(tmp_path / "verses_meta.json"))
+
+    labels, matrices = engine.get_similarity_matrices("book", top_k=1)
+    assert labels == ["Mark", "Luke"]
+    assert matrices["counts"].tolist() == [2, 1]
+    assert os.path.exists(str(tmp_path / "faiss_nt.analytics_book.npz"))
+
+    # Outro processo lê do disco, sem recalcular
+    reloaded = IntertextualityEngine()
+    reloaded.load_index(index_path, str(tmp_path / "verses_meta.json"))
+
+    def fail(*_args, **_kwargs):
+        raise AssertionError("matrizes recalculadas")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(intertextuality_engine.analytics, "similarity_matrices", fail)
+        cached_labels, cached = reloaded.get_similarity_matrices("book", top_k=1)
+    assert cached_labels == labels
+    assert np.array_equal(cached["links"], matrices["links"])
+
+    # Mesmos ids e grupos, vetor novo: recalculadas (em memória e em disco)
+    monkeypatch.setenv("DELTA_COMPACT_THRESHOLD", "0")
+    calls = []
+    compute = intertextuality_engine.analytics.similarity_matrices
+    monkeypatch.setattr(
+        intertextuality_engine.analytics,
+        "similarity_matrices",
+        lambda *args: calls.append(1) or compute(*args),
+    )
+    reloaded.replace_verses([dict(reloaded.verses[0], text="outro texto")], np.array([[0, 0, 1]], dtype="float32"))
+    reloaded.get_similarity_matrices("book", top_k=1)
+    reloaded.get_similarity_matrices("book", top_k=1)
+    assert calls == [1]
+
+    # Diretório sem escrita: a matriz calculada é devolvida mesmo assim
+    def read_only(*_args, **_kwargs):
+        raise PermissionError("somente leitura")
+
+    monkeypatch.setattr(intertextuality_engine.analytics, "save_matrices", read_only)
+    chapter_labels, _ = reloaded.get_similarity_matrices("chapter", top_k=1)
+    assert chapter_labels
+
+
+def test_thread_budget_applies_and_caps_concurrent_encodes(monkeypatch):
+    import threading
+    import time
+
+    import torch
+
+    monkeypatch.setenv("MAX_CONCURRENT_ENCODES", "1")
+    monkeypatch.setenv("TORCH_THREADS", "2")
+    monkeypatch.setenv("FAISS_THREADS", "1")
+    intertextuality_engine.apply_thread_budget(force=True)
+
+    class SlowEncoder:
+        device = "cpu"
+
+        def __init__(self):
+            self.active = 0
+            self.peak = 0
+            self.lock = threading.Lock()
+
+        def encode(self, texts, **_kwargs):
+            with self.lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            time.sleep(0.02)
+            with self.lock:
+                self.active -= 1
+            return np.ones((len(texts), 3), dtype=np.float32)
+
+    try:
+        encoder = SlowEncoder()
+        engine = IntertextualityEngine(model=encoder)
+        info = engine.get_device_info()["threads"]
+        assert info["torch_threads"] == torch.get_num_threads() == 2
+        assert info["faiss_threads"] == 1 and info["max_concurrent_encodes"] == 1
+
+        threads = [
+            threading.Thread(target=engine._encode_query, args=(f"query {i}",))
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert encoder.peak == 1
+
+        # FAISS_THREADS vale por thread: aplicado na thread que busca
+        engine.build_index(np.eye(3, dtype="float32"))
+        seen = []
+
+        def search():
+            engine._search_rows(np.eye(3, dtype="float32")[:1], 1)
+            seen.append(faiss.omp_get_max_threads())
+
+        worker = threading.Thread(target=search)
+        worker.start()
+        worker.join()
+        assert seen == [1]
+
+        # Orçamento reaplicado com vagas ocupadas: a vaga volta ao mesmo semáforo
+        slots = intertextuality_engine._encode_slots
+        with engine._encode_slot():
+            monkeypatch.setenv("MAX_CONCURRENT_ENCODES", "2")
+            intertextuality_engine.apply_thread_budget(force=True)
+        assert intertextuality_engine._encode_slots is slots and slots._value == 2
+    finally:
+        monkeypatch.undo()
+        intertextuality_engine.apply_thread_budget(force=True)
+
+
+def test_granularity_searches_on_tiny_corpora_return_nothing():
+    verses = [
+        {"text": "a", "book": "Jude", "chapter": 1, "verse": 1},
+        {"text": "b", "book": "Jude", "chapter": 1, "verse": 2},
+    ]
+    engine = IntertextualityEngine()
+    engine.create_embeddings(verses)
+    engine.build_index(np.array([[1, 0, 0], [0, 1, 0]], dtype="float32"))
+    # Janelas maiores que o livro: nenhuma passagem
+    engine.build_granularity_indexes(window_sizes=(3,), stride=1)
+
+    assert engine.find_similar_passages("a", top_k=2) == []
+    # Um só capítulo, o do próprio verso
+    assert engine.find_similar_coarse_to_fine("Jd 1:1", top_k=2) == []
@@ -0,0 +1,49 @@
+from src.services.corpus_processor import CorpusProcessor
+from src.services.lexical_index import LemmaIndex, reciprocal_rank_fusion
+
+MORPHGNT_SAMPLE = """\
+640316 C- -------- οὕτως οὕτως οὕτως οὕτως
+640316 V- 3AAI-S-- ἠγάπησεν ἠγάπησεν ἠγάπησε(ν) ἀγαπάω
+640316 RA ----NSM- ὁ ὁ ὁ ὁ
+640316 N- ----NSM- θεὸς θεὸς θεός θεός
+640317 RA ----NSM- ὁ ὁ ὁ ὁ
+640317 N- ----NSM- θεὸς θεὸς θεός θεός
+640317 N- ----ASM- κόσμον κόσμον κόσμον κόσμος
+"""
+
+
+def _verses(tmp_path):
+    path = tmp_path / "64-Jn-morphgnt.txt"
+    path.write_text(MORPHGNT_SAMPLE, encoding="utf-8")
+    return CorpusProcessor().parse_sblgnt_file(str(path))
+
+
+def test_parser_keeps_lemmas(tmp_path):
+    verses = _verses(tmp_path)
+    assert [v["verse"] for v in verses] == [16, 17]
+    assert verses[0]["lemmas"] == ["οὕτως", "ἀγαπάω", "ὁ", "θεός"]
+
+
+def test_lemma_index_bm25_and_forms(tmp_path):
+    index = LemmaIndex()
+    index.build(_verses(tmp_path))
+
+    # Forma flexionada sem acentos resolve para o lema
+    assert index.query_lemmas("ΗΓΑΠΗΣΕΝ θεος") == ["ἀγαπάω", "θεός"]
+
+    rows, scores = index.search(["κόσμος"], top_k=5)
+    assert rows.tolist() == [1]
+    rows, scores = index.search(["θεός", "ἀγαπάω"], top_k=5)
+    assert rows.tolist() == [0, 1]
+    assert scores[0] > scores[1]
+
+    index.save(str(tmp_path / "lemmas.npz"), str(tmp_path / "lemmas.json"))
+    loaded = LemmaIndex.load(str(tmp_path / "lemmas.npz"), str(tmp_path / "lemmas.json"))
+    assert loaded.search(["κόσμος"], top_k=5)[0].tolist() == [1]
+
+
+def test_reciprocal_rank_fusion():
+    rows, scores = reciprocal_rank_fusion([[3, 1, 2], [1, 4]], k=60)
+    assert rows[0] == 1
+    assert set(rows.tolist()) == {1, 2, 3, 4}
+    assert list(scores) == sorted(scores, reverse=True)
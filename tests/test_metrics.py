@@ -0,0 +1,53 @@
+from src.services import metrics
+from src.services.encoders import HashingEncoder
+from src.services.intertextuality_engine import IntertextualityEngine
+
+
+def _sample(text: str, prefix: str) -> float:
+    """Valor da amostra cuja linha começa com ``prefix`` (0 se ausente)."""
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_fallback_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("demo_seconds", "Demo", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.labels("encode").observe(value)
+
+    text = "\n".join(histogram.render())
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{stage="encode",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="encode",le="1"} 3' in text
+    assert 'demo_seconds_bucket{stage="encode",le="+Inf"} 4' in text
+    assert 'demo_seconds_count{stage="encode"} 4' in text
+
+    counter = metrics.Counter("demo_events_total", "Demo", ["event"])
+    counter.labels("hit").inc()
+    assert counter.render()[-1] == 'demo_events_total{event="hit"} 1'
+
+
+def test_engine_records_stages_and_query_cache():
+    engine = IntertextualityEngine(model=HashingEncoder(dim=32))
+    engine.create_embeddings(
+        [
+            {"text": "ἀγάπη τοῦ θεοῦ", "book": "John", "chapter": 3, "verse": 16},
+            {"text": "πίστις καὶ ἐλπίς", "book": "Heb", "chapter": 11, "verse": 1},
+        ]
+    )
+    engine.build_index()
+
+    before, _ = metrics.render()
+    engine.find_similar("λόγος ζωῆς", top_k=1)
+    engine.find_similar("λόγος ζωῆς", top_k=1)
+    after, _ = metrics.render()
+    before, after = before.decode(), after.decode()
+
+    hits = 'bible_cache_events_total{cache="query_embedding",event="hit"}'
+    misses = 'bible_cache_events_total{cache="query_embedding",event="miss"}'
+    assert _sample(after, hits) - _sample(before, hits) == 1
+    assert _sample(after, misses) - _sample(before, misses) == 1
+    for stage, calls in (("encode", 1), ("faiss_search", 2), ("metadata", 2)):
+        count = f'bible_stage_seconds_count{{stage="{stage}"}}'
+        assert _sample(after, count) - _sample(before, count) == calls
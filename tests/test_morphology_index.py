@@ -0,0 +1,43 @@
+import pytest
+
+from src.services.corpus_processor import CorpusProcessor
+from src.services.morphology_index import MorphologyIndex
+
+MORPHGNT_SAMPLE = """\
+620101 N- ----NSF- ἀγάπη ἀγάπη ἀγάπη ἀγάπη
+620101 V- -APPNSM- ἀγαπηθεὶς ἀγαπηθεὶς ἀγαπηθείς ἀγαπάω
+620102 N- ----NSF- ἀγάπη ἀγάπη ἀγάπη ἀγάπη
+620102 V- 3AAI-S-- ἠγάπησεν ἠγάπησεν ἠγάπησε(ν) ἀγαπάω
+620103 V- -APPNSM- λυθεὶς λυθεὶς λυθείς λύω
+"""
+
+
+@pytest.fixture
+def morphology_index(tmp_path):
+    path = tmp_path / "62-Mk-morphgnt.txt"
+    path.write_text(MORPHGNT_SAMPLE, encoding="utf-8")
+    verses = CorpusProcessor().parse_sblgnt_file(str(path))
+    index = MorphologyIndex()
+    index.build(verses)
+    return index
+
+
+def test_participle_and_lemma(morphology_index):
+    participle = {"tense": "aorist", "voice": "passive", "mood": "participle"}
+    rows = morphology_index.query([participle, {"lemma": "αγαπη"}])
+    assert rows.tolist() == [0]
+
+    rows = morphology_index.query([participle, {"lemma": "ἀγάπη"}], op="or")
+    assert rows.tolist() == [0, 1, 2]
+
+
+def test_codes_and_pos(morphology_index):
+    rows = morphology_index.query([{"pos": "verb", "mood": "I", "person": "third"}])
+    assert rows.tolist() == [1]
+
+
+def test_invalid_feature(morphology_index):
+    with pytest.raises(ValueError):
+        morphology_index.query([{"tense": "perfectish"}])
+    with pytest.raises(ValueError):
+        morphology_index.query([{"colour": "red"}])
@@ -0,0 +1,42 @@
+from src.services.quotation_detector import QuotationIndex
+
+VERSES = [
+    {"words": "οὐκ ἐπ’ ἄρτῳ μόνῳ ζήσεται ὁ ἄνθρωπος".split(), "text": ""},
+    {"words": "γέγραπται οὐκ ἐπ᾽ ἄρτῳ μόνῳ ζήσεται ὁ ἄνθρωπος ἀλλ᾽".split(), "text": ""},
+    {"words": "ἐν ἀρχῇ ἦν ὁ λόγος καὶ ὁ λόγος ἦν πρὸς τὸν θεόν".split(), "text": ""},
+]
+
+
+def test_find_returns_aligned_spans():
+    index = QuotationIndex(shingle_size=3, num_perm=32, bands=16)
+    index.build(VERSES)
+
+    hits = index.find(index.tokens[0], exclude_row=0)
+    assert [row for row, _, _ in hits] == [1]
+    span = hits[0][2][0]
+    assert span["query_end"] - span["query_start"] == 7
+    assert span["target_start"] == 1
+
+
+def test_all_pairs_and_save_load(tmp_path):
+    index = QuotationIndex(shingle_size=3, num_perm=32, bands=16)
+    index.build(VERSES)
+    pairs = list(index.all_pairs(threshold=0.3))
+    assert [(i, j) for i, j, _ in pairs] == [(0, 1)]
+
+    path = str(tmp_path / "minhash.npz")
+    index.save(path)
+    loaded = QuotationIndex.load(path)
+    assert loaded.tokens == index.tokens
+    assert [row for row, _, _ in loaded.find(loaded.tokens[0], exclude_row=0)] == [1]
+
+
+def test_queries_and_corpus_share_tokenization():
+    from src.services.greek_text import normalize_greek
+
+    text = "ἀλλ’ ἐν ἀρχῇ·ἦν ὁ λόγος 3:16"
+    assert QuotationIndex.tokenize(text) == normalize_greek(text).split()
+
+    index = QuotationIndex(shingle_size=3, num_perm=32, bands=16)
+    index.build([{"text": text, "normalized": normalize_greek(text)}, {"text": text}])
+    assert index.tokens[0] == index.tokens[1] == QuotationIndex.tokenize(text)
@@ -0,0 +1,32 @@
+from src.services.reference_parser import parse_reference, resolve_book
+
+
+def test_parse_reference_languages():
+    assert parse_reference("João 3:16") == ("John", 3, 16)
+    assert parse_reference("Rev 12:1") == ("Revelation", 12, 1)
+    assert parse_reference("Ἀποκάλυψις 12:1") == ("Revelation", 12, 1)
+    assert parse_reference("κατὰ Ἰωάννην 1.1") == ("John", 1, 1)
+    assert parse_reference("Α΄ Κορινθίους 13:4") == ("1Corinthians", 13, 4)
+    assert parse_reference("1Cor 13,4") == ("1Corinthians", 13, 4)
+    assert parse_reference("I John 4:8") == ("1John", 4, 8)
+
+
+def test_parse_reference_accented_ot_aliases():
+    # "Jó" e "Jo" só diferem no acento: a grafia exata decide
+    assert parse_reference("Jó 1:1") == ("Job", 1, 1)
+    assert parse_reference("JÓ 1:1") == ("Job", 1, 1)
+    assert parse_reference("Jo 1:1") == ("John", 1, 1)
+    assert parse_reference("Gênesis 1:1") == ("Genesis", 1, 1)
+
+
+def test_parse_reference_morphgnt_codes():
+    assert resolve_book("64") == "John"
+    assert parse_reference("64 3:16") == ("John", 3, 16)
+    assert parse_reference("640316") == ("John", 3, 16)
+
+
+def test_parse_reference_rejects_free_text():
+    assert parse_reference("ἀγάπη θεοῦ") is None
+    assert parse_reference("amor de Deus") is None
+    assert parse_reference("Rom 3") is None
+    assert parse_reference("") is None
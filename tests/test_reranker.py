@@ -0,0 +1,91 @@
+import time
+
+from src.services import reranker as reranker_module
+from src.services.reranker import CrossEncoderReranker
+
+
+class DummyCrossEncoder:
+    calls = []
+
+    def __init__(self, *args, **kwargs):
+        self.delay = 0.0
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        DummyCrossEncoder.calls.append(len(pairs))
+        time.sleep(self.delay)
+        # Score = tamanho do texto (determinístico)
+        return [float(len(text)) for _, text in pairs]
+
+
+def _candidates():
+    return [
+        ({"book": "John", "chapter": 1, "verse": i, "text": "x" * i}, 0.9 - i / 10)
+        for i in range(1, 5)
+    ]
+
+
+def test_rerank_orders_by_cross_encoder_and_caches(monkeypatch):
+    monkeypatch.setattr(reranker_module, "CrossEncoder", DummyCrossEncoder)
+    DummyCrossEncoder.calls = []
+    reranker = CrossEncoderReranker("dummy", budget_ms=1000, batch_size=10)
+
+    results, reranked = reranker.rerank("q", _candidates())
+    assert reranked
+    assert [v["verse"] for v, _ in results] == [4, 3, 2, 1]
+    assert DummyCrossEncoder.calls == [4]
+
+    # Segunda chamada usa apenas o cache
+    reranker.rerank("q", _candidates())
+    assert DummyCrossEncoder.calls == [4]
+
+
+def test_rerank_falls_back_when_budget_exhausted(monkeypatch):
+    monkeypatch.setattr(reranker_module, "CrossEncoder", DummyCrossEncoder)
+    reranker = CrossEncoderReranker("dummy", budget_ms=5, batch_size=1)
+    reranker.model.delay = 0.01
+
+    candidates = _candidates()
+    results, reranked = reranker.rerank("q", candidates)
+    assert not reranked
+    assert results == candidates
+
+
+def test_concurrent_reranks_share_the_cache(monkeypatch):
+    import threading
+
+    monkeypatch.setattr(reranker_module, "CrossEncoder", DummyCrossEncoder)
+    reranker = CrossEncoderReranker("dummy", budget_ms=10_000, batch_size=2, cache_size=8)
+    errors = []
+
+    def run(worker):
+        try:
+            for i in range(50):
+                reranker.rerank(f"q{worker}-{i % 5}", _candidates())
+        except Exception as e:  # noqa: BLE001
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert len(reranker._cache) <= 8
+
+
+def test_failed_reranker_load_does_not_touch_environment(monkeypatch):
+    import os
+
+    from src.services import intertextuality_engine
+    from src.services.encoders import HashingEncoder
+
+    def broken(*_args, **_kwargs):
+        raise OSError("modelo ausente")
+
+    monkeypatch.setenv("RERANKER_MODEL", "dummy")
+    monkeypatch.setattr(intertextuality_engine, "CrossEncoderReranker", broken)
+    engine = intertextuality_engine.IntertextualityEngine(model=HashingEncoder(dim=8))
+    assert engine.get_reranker() is None
+    assert engine.get_reranker() is None
+    assert os.environ["RERANKER_MODEL"] == "dummy"
+    assert engine._reranker_failed
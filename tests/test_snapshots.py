@@ -0,0 +1,137 @@
+import json
+import os
+
+import pytest
+
+from src.services import snapshots
+from src.services.bible_service import BibleService
+from src.services.encoders import HashingEncoder
+from src.services.intertextuality_engine import IntertextualityEngine
+
+
+def _engine(texts):
+    engine = IntertextualityEngine(model=HashingEncoder(dim=32))
+    verses = [
+        {"text": text, "book": "John", "chapter": 1, "verse": i + 1}
+        for i, text in enumerate(texts)
+    ]
+    engine.build_index(engine.create_embeddings(verses))
+    return engine
+
+
+def test_write_snapshot_publishes_versions_atomically(tmp_path):
+    root = str(tmp_path / "nt")
+    first = snapshots.write_snapshot(_engine(["λόγος", "θεός"]), root, version="v1")
+    assert snapshots.current_version(root) == "v1"
+    manifest = snapshots.read_manifest(first)
+    assert manifest["verses"] == 2
+    assert {"faiss.index", "verses_meta.json", "faiss.embeddings.npy"} <= set(manifest["files"])
+    assert snapshots.verify_snapshot(first) == []
+
+    # Versão interrompida no meio: fica só o temporário, CURRENT não muda
+    os.makedirs(os.path.join(root, ".tmp-v2"))
+    snapshots.write_snapshot(_engine(["λόγος", "θεός", "ἀγάπη"]), root, version="v3", keep=1)
+    assert snapshots.current_version(root) == "v3"
+    assert [s["version"] for s in snapshots.list_snapshots(root)] == ["v3"]
+    assert not os.path.exists(os.path.join(root, ".tmp-v2"))
+
+    with open(os.path.join(root, "v3", "verses_meta.json"), "a", encoding="utf-8") as f:
+        f.write(" ")
+    assert snapshots.verify_snapshot(os.path.join(root, "v3")) == [
+        "verses_meta.json: tamanho divergente"
+    ]
+    with pytest.raises(ValueError):
+        snapshots.activate(root, "v1")
+
+
+def test_service_reload_swaps_engine_and_invalidates_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path))
+    root = snapshots.snapshot_root("nt")
+    old = _engine(["λόγος", "θεός"])
+    snapshots.write_snapshot(old, root, version="v1")
+    snapshots.write_snapshot(_engine(["λόγος", "θεός", "ἀγάπη"]), root, version="v2")
+    snapshots.activate(root, "v1")
+
+    class Reranker:
+        cache = {("λόγος", "John", 1, 1): 0.9}
+
+        def clear_cache(self):
+            self.cache.clear()
+
+    old._reranker = Reranker()
+    service = BibleService()
+    service._swap_engine("nt", old)
+    assert len(service.find_similar_verses("λόγος", 5)) == 2
+
+    status = service.reload_index("nt", "v2", wait=True)
+    assert status["state"] == "done"
+    assert service.intertextuality_engine.snapshot_version == "v2"
+    assert service.intertextuality_engine.model is old.model
+    # O cross-encoder é reaproveitado, os scores por referência não
+    assert service.intertextuality_engine._reranker is old._reranker
+    assert old._reranker.cache == {}
+    assert snapshots.current_version(root) == "v2"
+    # Cache de similaridade invalidado: a busca já vê o verso novo
+    assert len(service.find_similar_verses("λόγος", 5)) == 3
+    assert service.snapshot_status()["loaded"]["nt"] == "v2"
+
+    with open(os.path.join(root, "v1", "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({}, f)
+    os.remove(os.path.join(root, "v1", "faiss.index"))
+    with pytest.raises(ValueError):
+        service.reload_index("nt", "v1")
+
+
+def test_mutations_never_touch_published_versions(tmp_path, monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setenv("DELTA_COMPACT_THRESHOLD", "0")
+    root = snapshots.snapshot_root("nt")
+    snapshots.write_snapshot(_engine(["λόγος", "θεός"]), root, version="v1")
+    snapshots.write_snapshot(_engine(["λόγος", "θεός", "ἀγάπη"]), root, version="v2")
+    snapshots.activate(root, "v1")
+
+    service = BibleService()
+    service._swap_engine("nt", snapshots.load_snapshot(os.path.join(root, "v1"), model=HashingEncoder(dim=32)))
+    service.upsert_verses([{"text": "πίστις", "book": "Rom", "chapter": 1, "verse": 17}])
+    assert snapshots.verify_snapshot(os.path.join(root, "v1")) == []
+
+    # Recarga para uma versão mais nova: o upsert é reaplicado
+    assert service.reload_index("nt", "v2", wait=True)["state"] == "done"
+    engine = service.intertextuality_engine
+    assert "πίστις" in [v["text"] for v in engine.verses]
+
+    # Compactação publica uma versão nova em vez de reescrever a ativa
+    engine.compact()
+    latest = snapshots.current_snapshot(root)
+    assert os.path.basename(latest) not in ("v1", "v2")
+    assert snapshots.read_manifest(latest)["verses"] == 4
+    assert snapshots.verify_snapshot(os.path.join(root, "v2")) == []
+    assert not os.listdir(os.path.join(snapshots.local_dir(root), "deltas"))
+
+    for bad in ("..", ".local", "missing"):
+        with pytest.raises(ValueError):
+            service.reload_index("nt", bad)
+
+
+def test_reload_with_another_model_loads_a_new_encoder(tmp_path, monkeypatch):
+    monkeypatch.setenv("SNAPSHOT_DIR", str(tmp_path))
+    root = snapshots.snapshot_root("nt")
+    old = _engine(["λόγος", "θεός"])
+    snapshots.write_snapshot(old, root, version="v1")
+    other = _engine(["λόγος", "θεός"])
+    other.model_name = "outro-modelo"
+    snapshots.write_snapshot(other, root, version="v2")
+
+    service = BibleService()
+    service._swap_engine("nt", old)
+    old._query_cache["λόγος"] = "stale"
+    loaded = []
+    monkeypatch.setattr(
+        snapshots,
+        "load_snapshot",
+        lambda path, model=None, model_name=None: loaded.append((model, model_name))
+        or IntertextualityEngine(model=model or HashingEncoder(dim=32), corpus="sblgnt"),
+    )
+    assert service.reload_index("nt", "v2", wait=True)["state"] == "done"
+    assert loaded == [(None, "outro-modelo")]
+    assert "λόγος" not in service.intertextuality_engine._query_cache
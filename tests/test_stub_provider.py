@@ -0,0 +1,41 @@
+import time
+
+import pytest
+
+from src.providers.stub_provider import LatencySimulator, StubError, StubProvider
+
+
+def test_stub_provider_streams_configured_tokens():
+    simulator = LatencySimulator(latency_ms=0, distribution="fixed", tokens=5, seed=1)
+    provider = StubProvider(simulator)
+
+    tokens = list(provider.stream("ἀγάπη"))
+    assert len(tokens) == 5
+    assert provider.generate("ἀγάπη") == "".join(tokens).strip()
+    assert simulator.stats() == {"in_flight": 0, "max_in_flight": 1, "served": 2, "failed": 0}
+
+
+def test_stub_latency_distributions():
+    fixed = LatencySimulator(latency_ms=20, distribution="fixed")
+    assert fixed.sample_latency() == pytest.approx(0.02)
+
+    lognormal = LatencySimulator(latency_ms=100, distribution="lognormal", sigma=0.5, seed=0)
+    samples = [lognormal.sample_latency() for _ in range(4000)]
+    assert sum(samples) / len(samples) == pytest.approx(0.1, rel=0.1)
+
+    with pytest.raises(ValueError):
+        LatencySimulator(distribution="uniforme")
+
+
+def test_stub_injects_errors_and_throttles():
+    failing = StubProvider(LatencySimulator(latency_ms=0, error_rate=1.0))
+    with pytest.raises(StubError):
+        failing.generate("x")
+    assert failing.simulator.stats()["failed"] == 1
+
+    throttled = LatencySimulator(latency_ms=0, distribution="fixed", tokens=1, max_rps=50)
+    start = time.perf_counter()
+    for _ in range(6):
+        list(throttled.stream("x"))
+    # 6 chamadas a 50/s: a primeira é imediata, as outras esperam 20 ms cada
+    assert time.perf_counter() - start >= 0.09
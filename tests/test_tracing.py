@@ -0,0 +1,75 @@
+import contextvars
+import threading
+import time
+
+from src.services import tracing
+from src.services.encoders import HashingEncoder
+
+
+def test_spans_aggregate_into_server_timing_header():
+    with tracing.span("ignorado"):
+        pass  # sem trace ativo: nada é registrado
+
+    spans = tracing.start_trace()
+    tracing.record("encode", 0.012)
+    tracing.record("faiss_search", 0.001)
+    tracing.record("faiss_search", 0.002)
+    with tracing.span("llm"):
+        pass
+
+    assert [name for name, _ in spans] == ["encode", "faiss_search", "faiss_search", "llm"]
+    header = tracing.server_timing(spans, total=0.5)
+    assert header.startswith('encode;dur=12.00, faiss_search;dur=3.00;desc="2x", llm;dur=')
+    assert header.endswith("total;dur=500.00")
+    assert tracing.summarize(spans)["faiss_search"] == {"ms": 3.0, "count": 2}
+
+
+def test_sampling_profiler_writes_folded_stacks(tmp_path):
+    encoder = HashingEncoder(dim=64)
+    stop = threading.Event()
+
+    def busy():
+        while not stop.is_set():
+            encoder.encode(["ἐν ἀρχῇ ἦν ὁ λόγος"] * 50)
+
+    worker = threading.Thread(target=busy)
+    worker.start()
+    profiler = tracing.SamplingProfiler(interval_ms=1).start(duration=0.2)
+    profiler._thread.join()
+    stop.set()
+    worker.join()
+
+    assert profiler.sample_count > 0
+    path = profiler.write(str(tmp_path), label="teste")
+    lines = open(path, encoding="utf-8").read().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert "encoders.py:encode" in stack and int(count) > 0
+    assert profiler.top()[0]["samples"] > 0
+
+
+def test_request_profiler_samples_only_its_threads():
+    encoder = HashingEncoder(dim=64)
+    stop = threading.Event()
+
+    def busy(name):
+        with tracing.span(name):
+            while not stop.is_set():
+                encoder.encode(["ἐν ἀρχῇ ἦν ὁ λόγος"] * 50)
+
+    # Contexto próprio da "requisição": não vaza para os outros testes
+    request = contextvars.copy_context()
+    request.run(tracing.start_trace)
+    profiler = request.run(tracing.profile_request, 1)
+    # A thread da requisição herda o contexto; a outra, não
+    mine = threading.Thread(target=request.copy().run, args=(busy, "mine"))
+    other = threading.Thread(target=busy, args=("other",))
+    mine.start()
+    other.start()
+    time.sleep(0.2)
+    profiler.stop()
+    stop.set()
+    mine.join()
+    other.join()
+
+    assert profiler.threads == {mine.ident}
+    assert profiler.sample_count > 0